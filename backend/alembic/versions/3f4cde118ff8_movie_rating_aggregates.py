@@ -0,0 +1,88 @@
+"""movie_rating_aggregates
+
+Revision ID: 3f4cde118ff8
+Revises: fff5cf71aabb
+Create Date: 2026-10-17 13:05:48.117392
+
+"""
+
+import json
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "3f4cde118ff8"
+down_revision: Union[str, None] = "fff5cf71aabb"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+RATING_HISTOGRAM_SIZE = 11
+
+
+def upgrade() -> None:
+    """
+    Agregaty ocen na movies (liczba, suma, średnia, histogram) -
+    listy i sortowanie nie liczą już AVG/COUNT po całej tabeli ratings
+    """
+    op.add_column(
+        "movies",
+        sa.Column("rating_count", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.add_column(
+        "movies",
+        sa.Column("rating_sum", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.add_column("movies", sa.Column("average_rating", sa.Float(), nullable=True))
+    op.add_column("movies", sa.Column("rating_histogram", sa.JSON(), nullable=True))
+    op.create_index(op.f("ix_movies_rating_count"), "movies", ["rating_count"])
+    op.create_index(op.f("ix_movies_average_rating"), "movies", ["average_rating"])
+
+    # Wypełnienie agregatów z istniejących ocen
+    bind = op.get_bind()
+    histograms = {}
+    rows = bind.execute(
+        sa.text(
+            "SELECT movie_id, rating, COUNT(*) FROM ratings GROUP BY movie_id, rating"
+        )
+    )
+    for movie_id, value, count in rows:
+        histogram = histograms.setdefault(movie_id, [0] * RATING_HISTOGRAM_SIZE)
+        histogram[value] = count
+
+    update = sa.text(
+        "UPDATE movies SET rating_count = :count, rating_sum = :total, "
+        "average_rating = :average, rating_histogram = :histogram "
+        "WHERE movie_id = :movie_id"
+    ).bindparams(sa.bindparam("histogram", type_=sa.JSON()))
+    params = []
+    for movie_id, histogram in histograms.items():
+        count = sum(histogram)
+        total = sum(value * n for value, n in enumerate(histogram))
+        params.append(
+            {
+                "movie_id": movie_id,
+                "count": count,
+                "total": total,
+                "average": total / count if count else None,
+                "histogram": histogram,
+            }
+        )
+    if params:
+        bind.execute(update, params)
+
+    op.execute(
+        "UPDATE movies SET rating_histogram = '"
+        + json.dumps([0] * RATING_HISTOGRAM_SIZE)
+        + "' WHERE rating_histogram IS NULL"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_movies_average_rating"), table_name="movies")
+    op.drop_index(op.f("ix_movies_rating_count"), table_name="movies")
+    op.drop_column("movies", "rating_histogram")
+    op.drop_column("movies", "average_rating")
+    op.drop_column("movies", "rating_sum")
+    op.drop_column("movies", "rating_count")
@@ -0,0 +1,36 @@
+"""stats_snapshots
+
+Revision ID: 5b2e7d9c4f10
+Revises: a81d5e3c92b7
+Create Date: 2026-10-17 16:20:41.118204
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "5b2e7d9c4f10"
+down_revision: Union[str, None] = "a81d5e3c92b7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """
+    Snapshoty agregatów dashboardów admina. Wypełniane przy pierwszym odczycie
+    albo przez `flask stats refresh`.
+    """
+    op.create_table(
+        "stats_snapshots",
+        sa.Column("name", sa.String(length=64), nullable=False),
+        sa.Column("payload", sa.JSON(), nullable=False),
+        sa.Column("computed_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("name"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("stats_snapshots")
@@ -0,0 +1,38 @@
+"""stats_rollups
+
+Revision ID: 8d3f61a2b7e4
+Revises: 5b2e7d9c4f10
+Create Date: 2026-10-17 17:05:12.640391
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "8d3f61a2b7e4"
+down_revision: Union[str, None] = "5b2e7d9c4f10"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """
+    Dzienne / miesięczne liczniki zdarzeń. Historię z tabel źródłowych
+    odtwarza `flask stats rebuild-rollups` - uruchomić po migracji.
+    """
+    op.create_table(
+        "stats_rollups",
+        sa.Column("metric", sa.String(length=32), nullable=False),
+        sa.Column("period", sa.String(length=8), nullable=False),
+        sa.Column("period_start", sa.Date(), nullable=False),
+        sa.Column("event_count", sa.Integer(), nullable=False),
+        sa.Column("value_sum", sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint("metric", "period", "period_start"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("stats_rollups")
@@ -0,0 +1,52 @@
+"""search_terms
+
+Revision ID: a81d5e3c92b7
+Revises: 3f4cde118ff8
+Create Date: 2026-10-17 15:42:10.503918
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "a81d5e3c92b7"
+down_revision: Union[str, None] = "3f4cde118ff8"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """
+    Odwrócony indeks wyszukiwania (term -> dokument). Tabelę wypełnia
+    `flask search rebuild-index` - uruchomić po migracji.
+    """
+    op.create_table(
+        "search_terms",
+        sa.Column("term", sa.String(length=64), nullable=False),
+        sa.Column("doc_type", sa.String(length=16), nullable=False),
+        sa.Column("doc_id", sa.Integer(), nullable=False),
+        sa.Column("weight", sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint("term", "doc_type", "doc_id"),
+    )
+    op.create_index(
+        "ix_search_terms_doc", "search_terms", ["doc_type", "doc_id"], unique=False
+    )
+
+    if op.get_bind().dialect.name == "postgresql":
+        # LIKE 'prefix%' korzysta z indeksu niezależnie od collation bazy
+        op.create_index(
+            "ix_search_terms_term_pattern",
+            "search_terms",
+            ["term"],
+            postgresql_ops={"term": "varchar_pattern_ops"},
+        )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        op.drop_index("ix_search_terms_term_pattern", table_name="search_terms")
+    op.drop_index("ix_search_terms_doc", table_name="search_terms")
+    op.drop_table("search_terms")
@@ -0,0 +1,32 @@
+"""user_ratings_deleted_at
+
+Revision ID: c5d1e8f3a6b2
+Revises: e4a7c2d95b18
+Create Date: 2026-10-17 16:12:40.527391
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "c5d1e8f3a6b2"
+down_revision: Union[str, None] = "e4a7c2d95b18"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """
+    Chwila ostatniego usunięcia oceny użytkownika - `flask recommendations
+    rebuild --incremental` przelicza też użytkowników, którym ocena ubyła
+    """
+    op.add_column(
+        "users", sa.Column("ratings_deleted_at", sa.DateTime(), nullable=True)
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("users", "ratings_deleted_at")
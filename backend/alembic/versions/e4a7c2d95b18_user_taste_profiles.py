@@ -0,0 +1,41 @@
+"""user_taste_profiles
+
+Revision ID: e4a7c2d95b18
+Revises: 8d3f61a2b7e4
+Create Date: 2026-10-17 19:42:08.118204
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "e4a7c2d95b18"
+down_revision: Union[str, None] = "8d3f61a2b7e4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """
+    Profile gustu K-NN aktualizowane przy zapisie oceny. Profile istniejących
+    użytkowników liczy `flask recommendations rebuild-taste-profiles` -
+    uruchomić po migracji (do tego czasu K-NN liczy profil z ocen jak dotąd).
+    """
+    op.create_table(
+        "user_taste_profiles",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("positive_window", sa.JSON(), nullable=False),
+        sa.Column("positive_counts", sa.JSON(), nullable=False),
+        sa.Column("negative_window", sa.JSON(), nullable=False),
+        sa.Column("negative_counts", sa.JSON(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.user_id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("user_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("user_taste_profiles")
@@ -0,0 +1,68 @@
+"""recommendation_jobs
+
+Revision ID: fff5cf71aabb
+Revises: 8c1df3f2c8bf
+Create Date: 2026-10-17 10:12:31.402118
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "fff5cf71aabb"
+down_revision: Union[str, None] = "8c1df3f2c8bf"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """
+    Tabela recommendation_jobs - zadania generowania rekomendacji w tle
+    """
+    op.create_table(
+        "recommendation_jobs",
+        sa.Column("job_id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("status", sa.String(length=20), nullable=False),
+        sa.Column("progress", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("stage", sa.String(length=50), nullable=True),
+        sa.Column("message", sa.String(length=500), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.Column("started_at", sa.DateTime(), nullable=True),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.user_id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("job_id"),
+    )
+    op.create_index(
+        op.f("ix_recommendation_jobs_user_id"), "recommendation_jobs", ["user_id"]
+    )
+    op.create_index(
+        op.f("ix_recommendation_jobs_status"), "recommendation_jobs", ["status"]
+    )
+
+    # Co najwyżej jedno aktywne zadanie na użytkownika
+    op.create_index(
+        "uq_recommendation_jobs_active_user",
+        "recommendation_jobs",
+        ["user_id"],
+        unique=True,
+        postgresql_where=sa.text("status IN ('queued', 'running')"),
+        sqlite_where=sa.text("status IN ('queued', 'running')"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "uq_recommendation_jobs_active_user", table_name="recommendation_jobs"
+    )
+    op.drop_index(
+        op.f("ix_recommendation_jobs_status"), table_name="recommendation_jobs"
+    )
+    op.drop_index(
+        op.f("ix_recommendation_jobs_user_id"), table_name="recommendation_jobs"
+    )
+    op.drop_table("recommendation_jobs")
@@ -17,8 +17,10 @@ oauth = OAuth()
 
 def create_app():
     app = Flask(__name__, static_folder="static", static_url_path="/static")
-    app.logger.setLevel(logging.DEBUG)
-    logging.basicConfig(level=logging.DEBUG)
+    # DEBUG (np. LOG_LEVEL=DEBUG lokalnie) spowalnia produkcję - domyślnie INFO
+    log_level = os.environ.get("LOG_LEVEL", "INFO").upper()
+    app.logger.setLevel(log_level)
+    logging.basicConfig(level=log_level)
 
     CORS(
         app,
@@ -44,11 +46,13 @@ def create_app():
     app.config["GITHUB_CLIENT_SECRET"] = os.environ.get("GITHUB_CLIENT_SECRET")
 
     # Inicjalizacja rozszerzeń
-    from app.extensions import db, migrate, jwt
+    from app.extensions import db, migrate, jwt, response_cache, request_metrics
 
     db.init_app(app)
     migrate.init_app(app, db)
     jwt.init_app(app)
+    response_cache.init_app(app)
+    request_metrics.init_app(app)
 
     with app.app_context():
         # Import modeli PO inicjalizacji db
@@ -97,6 +101,9 @@ def create_app():
     from app.routes.notifications import notifications_bp
     from app.routes.comment_replies import comment_replies_bp
     from app.routes.recommendation_routes import recommendations_bp
+    from app.routes.search_routes import search_bp
+    from app.routes.autocomplete_routes import autocomplete_bp
+    from app.routes.stats_routes import stats_bp
 
     app.register_blueprint(movies_bp, url_prefix="/api/movies")
     app.register_blueprint(genres_bp, url_prefix="/api/genres")
@@ -115,6 +122,17 @@ def create_app():
     app.register_blueprint(notifications_bp)
     app.register_blueprint(comment_replies_bp)
     app.register_blueprint(recommendations_bp, url_prefix="/api/recommendations")
+    app.register_blueprint(search_bp, url_prefix="/api/search")
+    app.register_blueprint(autocomplete_bp, url_prefix="/api/autocomplete")
+    app.register_blueprint(stats_bp, url_prefix="/api/statistics")
+
+    from app.commands import register_commands
+
+    register_commands(app)
+
+    from app.services.autocomplete_service import init_autocomplete
+
+    init_autocomplete(app)
 
     @app.before_request
     def handle_options():
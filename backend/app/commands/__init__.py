@@ -0,0 +1,12 @@
+from app.commands.movies import movies_cli
+from app.commands.recommendations import recommendations_cli
+from app.commands.search import search_cli
+from app.commands.stats import stats_cli
+
+
+def register_commands(app):
+    """Rejestruje komendy `flask ...` aplikacji"""
+    app.cli.add_command(movies_cli)
+    app.cli.add_command(recommendations_cli)
+    app.cli.add_command(search_cli)
+    app.cli.add_command(stats_cli)
@@ -0,0 +1,35 @@
+import click
+from flask.cli import AppGroup
+
+from app.recommendation_algorithm.utils.similar_movies import (
+    apply_pending_similar_movies,
+    rebuild_similar_movies_index,
+)
+from app.services.database import db
+from app.services.rating_service import rebuild_rating_aggregates
+
+movies_cli = AppGroup("movies", help="Operacje serwisowe na filmach.")
+
+
+@movies_cli.command("rebuild-rating-stats")
+def rebuild_rating_stats():
+    """Przelicza agregaty ocen filmów (liczba, suma, średnia, histogram)."""
+    fixed = rebuild_rating_aggregates()
+    click.echo(f"✅ Rating aggregates rebuilt, {fixed} movies corrected")
+
+
+@movies_cli.command("rebuild-similar")
+def rebuild_similar():
+    """Przebudowuje indeks filmów podobnych (/api/movies/<id>/similar)."""
+    index = rebuild_similar_movies_index(db.session)
+    click.echo(
+        f"✅ Similar movies index rebuilt: {len(index)} movies, "
+        f"top {index.neighbors.shape[1]} neighbours each"
+    )
+
+
+@movies_cli.command("refresh-similar")
+def refresh_similar():
+    """Odświeża filmy podobne dla filmów czekających w kolejce po edycjach."""
+    refreshed = apply_pending_similar_movies(db.session)
+    click.echo(f"✅ Similar movies refreshed for {refreshed} pending movies")
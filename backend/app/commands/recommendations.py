@@ -0,0 +1,94 @@
+import os
+
+import click
+from flask.cli import AppGroup
+
+from app.services.recommendation_batch_service import (
+    find_users_to_rebuild,
+    rebuild_recommendations,
+    rebuild_taste_profiles,
+)
+
+recommendations_cli = AppGroup(
+    "recommendations", help="Operacje wsadowe na rekomendacjach."
+)
+
+
+@recommendations_cli.command("rebuild")
+@click.option(
+    "--incremental",
+    is_flag=True,
+    help="Tylko użytkownicy z ocenami nowszymi niż ostatnie rekomendacje.",
+)
+@click.option(
+    "--workers",
+    type=int,
+    default=lambda: os.cpu_count() or 1,
+    show_default="liczba CPU",
+    help="Liczba procesów liczących rekomendacje (1 = bez puli).",
+)
+@click.option(
+    "--batch-size",
+    type=int,
+    default=100,
+    show_default=True,
+    help="Liczba użytkowników zapisywanych w jednej transakcji.",
+)
+@click.option(
+    "--user-id",
+    "user_ids",
+    type=int,
+    multiple=True,
+    help="Przebuduj tylko wskazanych użytkowników (można powtarzać).",
+)
+@click.option("--verbose", is_flag=True, help="Pełne logi algorytmu.")
+def rebuild(incremental, workers, batch_size, user_ids, verbose):
+    """Przelicza rekomendacje wszystkich kwalifikujących się użytkowników."""
+    eligible = find_users_to_rebuild(incremental=incremental)
+    if user_ids:
+        selected = set(user_ids)
+        eligible = [user_id for user_id in eligible if user_id in selected]
+
+    mode = "incremental" if incremental else "full"
+    click.echo(f"🎬 {len(eligible)} users to rebuild ({mode}, workers={workers})")
+    if not eligible:
+        return
+
+    def report(processed, total):
+        click.echo(f"   saved {processed}/{total}")
+
+    stats = rebuild_recommendations(
+        eligible,
+        workers=workers,
+        batch_size=batch_size,
+        quiet=not verbose,
+        on_batch_saved=report,
+    )
+
+    click.echo("=" * 80)
+    click.echo(
+        f"✅ {stats['succeeded']}/{stats['users']} users, "
+        f"{stats['saved_rows']} recommendations saved"
+    )
+    click.echo(
+        f"⏱️  {stats['elapsed_seconds']:.1f}s ({stats['users_per_second']:.2f} users/s)"
+    )
+
+    if stats["failed"]:
+        click.echo(f"❌ {stats['failed']} failed:")
+        for user_id, message in list(stats["errors"].items())[:20]:
+            click.echo(f"   user {user_id}: {message}")
+
+
+@recommendations_cli.command("rebuild-taste-profiles")
+@click.option(
+    "--user-id",
+    "user_ids",
+    type=int,
+    multiple=True,
+    help="Przelicz tylko wskazanych użytkowników (można powtarzać).",
+)
+def rebuild_taste_profiles_command(user_ids):
+    """Liczy profile gustu K-NN od zera z ocen (uruchom po migracji)."""
+    saved = rebuild_taste_profiles(list(user_ids) or None)
+    click.echo(f"✅ {saved} taste profiles saved")
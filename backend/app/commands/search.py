@@ -0,0 +1,35 @@
+import click
+from flask.cli import AppGroup
+
+from app.models.search_term import SEARCH_DOC_TYPES
+from app.services.search_service import rebuild_search_index
+
+search_cli = AppGroup("search", help="Indeks wyszukiwania pełnotekstowego.")
+
+
+@search_cli.command("rebuild-index")
+@click.option(
+    "--type",
+    "doc_types",
+    type=click.Choice(SEARCH_DOC_TYPES),
+    multiple=True,
+    help="Przebuduj tylko wskazane typy dokumentów (można powtarzać).",
+)
+@click.option(
+    "--batch-size",
+    type=int,
+    default=5000,
+    show_default=True,
+    help="Liczba dokumentów analizowanych i zapisywanych naraz.",
+)
+def rebuild_index(doc_types, batch_size):
+    """Buduje od zera tabelę search_terms (uruchom po migracji)."""
+
+    def report(doc_type, indexed):
+        click.echo(f"   {doc_type}: {indexed} indexed")
+
+    stats = rebuild_search_index(
+        doc_types=list(doc_types) or None, batch_size=batch_size, on_batch=report
+    )
+    for doc_type, indexed in stats.items():
+        click.echo(f"✅ {doc_type}: {indexed} documents")
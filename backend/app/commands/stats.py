@@ -0,0 +1,43 @@
+import click
+from flask.cli import AppGroup
+
+from app.models.stats_rollup import ROLLUP_METRICS
+from app.services.stats_rollup_service import rebuild_rollups
+from app.services.stats_snapshot_service import (
+    STATS_SNAPSHOTS,
+    refresh_stats_snapshots,
+)
+
+stats_cli = AppGroup(
+    "stats", help="Zmaterializowane statystyki i liczniki dashboardów admina."
+)
+
+
+@stats_cli.command("refresh")
+@click.option(
+    "--name",
+    "names",
+    type=click.Choice(list(STATS_SNAPSHOTS)),
+    multiple=True,
+    help="Odśwież tylko wskazane snapshoty (można powtarzać).",
+)
+def refresh(names):
+    """Przelicza snapshoty statystyk (uruchamiaj z crona, np. co 5 minut)."""
+    timings = refresh_stats_snapshots(list(names) or None)
+    for name, seconds in timings.items():
+        click.echo(f"✅ {name}: {seconds:.2f}s")
+
+
+@stats_cli.command("rebuild-rollups")
+@click.option(
+    "--metric",
+    "metrics",
+    type=click.Choice(ROLLUP_METRICS),
+    multiple=True,
+    help="Przebuduj tylko wskazane metryki (można powtarzać).",
+)
+def rebuild_rollups_command(metrics):
+    """Odtwarza liczniki stats_rollups z tabel źródłowych (uruchom po migracji)."""
+    stats = rebuild_rollups(list(metrics) or None)
+    for metric, rows in stats.items():
+        click.echo(f"✅ {metric}: {rows} counters")
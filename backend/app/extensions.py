@@ -2,6 +2,8 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_jwt_extended import JWTManager
 from sqlalchemy.ext.declarative import declarative_base
+from app.utils.response_cache import ResponseCache
+from app.utils.request_metrics import RequestMetrics
 
 # Create SQLAlchemy instance
 db = SQLAlchemy()
@@ -12,3 +14,5 @@ Base = db.Model
 # Initialize other extensions
 migrate = Migrate()
 jwt = JWTManager()
+response_cache = ResponseCache()
+request_metrics = RequestMetrics()
@@ -12,6 +12,11 @@ from .movie_actor import MovieActor
 from .director import Director
 from .movie_director import MovieDirector
 from .recommendation import Recommendation
+from .recommendation_job import RecommendationJob
+from .search_term import SearchTerm
+from .stats_snapshot import StatsSnapshot
+from .stats_rollup import StatsRollup
+from .user_taste_profile import UserTasteProfile
 from .user_activity_log import UserActivityLog
 from .login_activity import LoginActivity
 
@@ -30,6 +35,11 @@ __all__ = [
     "Director",
     "MovieDirector",
     "Recommendation",
+    "RecommendationJob",
+    "SearchTerm",
+    "StatsSnapshot",
+    "StatsRollup",
+    "UserTasteProfile",
     "UserActivityLog",
     "LoginActivity",
 ]
@@ -7,9 +7,10 @@ from .base import (
     Integer,
     Date,
     DateTime,
+    Float,
 )
 from flask import url_for
-from sqlalchemy import desc, func
+from sqlalchemy import JSON, desc
 from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import column_property, deferred, joinedload
 from app.extensions import db
@@ -23,6 +24,10 @@ def _get_photo_url(photo_url: str, folder: str):
     return url_for("static", filename=f"{folder}/{photo_url}", _external=True)
 
 
+# Oceny 0-10 -> indeksy histogramu
+RATING_HISTOGRAM_SIZE = 11
+
+
 class Movie(db.Model):
     __tablename__ = "movies"
 
@@ -36,6 +41,18 @@ class Movie(db.Model):
     original_language: Mapped[str] = mapped_column(String(50))
     trailer_url: Mapped[str] = mapped_column(String(255), nullable=True)
 
+    # Agregaty ocen utrzymywane przez RatingRepository w transakcji zapisu oceny
+    # (naprawa rozjazdów: `flask movies rebuild-rating-stats`)
+    rating_count: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0", index=True
+    )
+    rating_sum: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
+    average_rating: Mapped[float] = mapped_column(Float, nullable=True, index=True)
+    # rating_histogram[i] = liczba ocen o wartości i (0-10)
+    rating_histogram: Mapped[list] = mapped_column(JSON, nullable=True)
+
     genres = relationship(
         "Genre",
         secondary="movies_genres",
@@ -68,50 +85,44 @@ class Movie(db.Model):
         "Recommendation", back_populates="movie", lazy="select", cascade="all, delete"
     )
 
-    _average_rating = None
-    _rating_count = None
-
     def __repr__(self):
         return f"<Movie(id={self.movie_id}, title='{self.title}', release_date={self.release_date})>"
 
-    @property
-    def average_rating(self):
-        if self._average_rating is None:
-            from sqlalchemy import func
-            from sqlalchemy.orm import Session
-            from app.models.rating import Rating
-
-            session = Session.object_session(self)
-            if session:
-                avg_rating = (
-                    session.query(func.avg(Rating.rating))
-                    .filter(Rating.movie_id == self.movie_id)
-                    .scalar()
-                )
-                self._average_rating = (
-                    float(avg_rating) if avg_rating is not None else None
-                )
-            else:
-                self._average_rating = None
-        return self._average_rating
-
-    @property
-    def rating_count(self):
-        if self._rating_count is None:
-            from sqlalchemy import func
-            from sqlalchemy.orm import Session
-            from app.models.rating import Rating
-
-            session = Session.object_session(self)
-            if session:
-                self._rating_count = (
-                    session.query(func.count(Rating.rating_id))
-                    .filter(Rating.movie_id == self.movie_id)
-                    .scalar()
-                )
-            else:
-                self._rating_count = 0
-        return self._rating_count
+    def apply_rating_change(self, added=None, removed=None):
+        """
+        Aktualizuje agregaty ocen o jedną ocenę dodaną / usuniętą
+        (zmiana oceny = removed stara + added nowa). Bez commitu.
+        """
+        count = self.rating_count or 0
+        total = self.rating_sum or 0
+        histogram = list(self.rating_histogram or [0] * RATING_HISTOGRAM_SIZE)
+
+        if removed is not None:
+            count -= 1
+            total -= removed
+            histogram[removed] -= 1
+        if added is not None:
+            count += 1
+            total += added
+            histogram[added] += 1
+
+        self.set_rating_aggregates(count, total, histogram)
+
+    def set_rating_aggregates(self, count, total, histogram):
+        self.rating_count = count
+        self.rating_sum = total
+        self.average_rating = total / count if count else None
+        # nowa lista - JSON nie śledzi zmian w miejscu
+        self.rating_histogram = list(histogram)
+
+    def _load_actor_roles(self):
+        from sqlalchemy import select
+        from sqlalchemy.orm import Session
+        from app.models.movie_actor import MovieActor
+
+        session = Session.object_session(self)
+        stmt = select(MovieActor).where(MovieActor.movie_id == self.movie_id)
+        return {ma.actor_id: ma.movie_role for ma in session.execute(stmt).scalars()}
 
     def _get_poster_url(self):
         if not self.poster_url:
@@ -156,18 +167,12 @@ class Movie(db.Model):
 
         if include_actors:
             if include_actors_roles:
-                from sqlalchemy import select
-                from sqlalchemy.orm import Session
-                from app.models.movie_actor import MovieActor
-
-                session = Session.object_session(self)
+                # Role z MovieRepository.load_credits; bez niego osobne zapytanie
+                roles_map = getattr(self, "_actor_roles", None)
+                if roles_map is None:
+                    roles_map = self._load_actor_roles()
                 actors_with_roles = []
 
-                stmt = select(MovieActor).where(MovieActor.movie_id == self.movie_id)
-                roles_map = {
-                    ma.actor_id: ma.movie_role for ma in session.execute(stmt).scalars()
-                }
-
                 for actor in self.actors:
                     actors_with_roles.append(
                         {
@@ -227,34 +232,12 @@ class Movie(db.Model):
 
     @classmethod
     def get_with_ratings(cls, session, page=1, per_page=10):
-        from app.models.rating import Rating
-
-        subq = (
-            session.query(
-                Rating.movie_id,
-                func.avg(Rating.rating).label("avg_rating"),
-                func.count(Rating.rating_id).label("rating_count"),
-            )
-            .group_by(Rating.movie_id)
-            .subquery()
-        )
-
         query = (
-            session.query(Movie, subq.c.avg_rating, subq.c.rating_count)
-            .outerjoin(subq, Movie.movie_id == subq.c.movie_id)
+            session.query(Movie)
             .options(joinedload(Movie.genres))
-            .order_by(desc(subq.c.avg_rating))
+            .order_by(desc(Movie.average_rating))
         )
 
         total = query.count()
-        movies_with_ratings = query.offset((page - 1) * per_page).limit(per_page).all()
-
-        result = []
-        for movie, avg_rating, rating_count in movies_with_ratings:
-            movie._average_rating = (
-                float(avg_rating) if avg_rating is not None else None
-            )
-            movie._rating_count = rating_count or 0
-            result.append(movie)
-
-        return result, total
+        movies = query.offset((page - 1) * per_page).limit(per_page).all()
+        return movies, total
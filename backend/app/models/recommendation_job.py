@@ -0,0 +1,89 @@
+from .base import (
+    Mapped,
+    mapped_column,
+    relationship,
+    ForeignKey,
+    Integer,
+    Float,
+    String,
+    DateTime,
+    datetime,
+)
+from app.extensions import db
+from enum import Enum
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .user import User
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+# Zadania, które jeszcze trwają (do deduplikacji żądań)
+ACTIVE_JOB_STATUSES = (JobStatus.QUEUED.value, JobStatus.RUNNING.value)
+
+
+class RecommendationJob(db.Model):
+    """Zadanie generowania rekomendacji w tle (POST /api/recommendations/)"""
+
+    __tablename__ = "recommendation_jobs"
+
+    job_id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey("users.user_id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    status: Mapped[str] = mapped_column(
+        String(20), nullable=False, default=JobStatus.QUEUED.value, index=True
+    )
+    progress: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    stage: Mapped[str] = mapped_column(String(50), nullable=True)
+    message: Mapped[str] = mapped_column(String(500), nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.utcnow, onupdate=datetime.utcnow
+    )
+    started_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+    finished_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # Co najwyżej jedno aktywne zadanie na użytkownika - deduplikacja
+        # równoległych żądań także między procesami / workerami
+        db.Index(
+            "uq_recommendation_jobs_active_user",
+            "user_id",
+            unique=True,
+            postgresql_where=db.text("status IN ('queued', 'running')"),
+            sqlite_where=db.text("status IN ('queued', 'running')"),
+        ),
+    )
+
+    user: Mapped["User"] = relationship("User")
+
+    @property
+    def is_active(self):
+        return self.status in ACTIVE_JOB_STATUSES
+
+    def __repr__(self):
+        return (
+            f"<RecommendationJob(id={self.job_id}, user_id={self.user_id}, "
+            f"status={self.status}, progress={self.progress:.2f})>"
+        )
+
+    def serialize(self):
+        return {
+            "job_id": self.job_id,
+            "user_id": self.user_id,
+            "status": self.status,
+            "progress": round(self.progress or 0.0, 3),
+            "stage": self.stage,
+            "message": self.message,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
@@ -0,0 +1,28 @@
+from .base import Mapped, mapped_column, Integer, Float, String
+from sqlalchemy import Index
+from app.extensions import db
+
+# Typy dokumentów w indeksie wyszukiwania
+SEARCH_DOC_TYPES = ("movie", "actor", "director", "user", "comment")
+
+
+class SearchTerm(db.Model):
+    """
+    Odwrócony indeks wyszukiwania: term -> dokument z wagą.
+    Wypełniany przez app.services.search_service (termy z SearchTextAnalyzer).
+    """
+
+    __tablename__ = "search_terms"
+
+    term: Mapped[str] = mapped_column(String(64), primary_key=True)
+    doc_type: Mapped[str] = mapped_column(String(16), primary_key=True)
+    doc_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    weight: Mapped[float] = mapped_column(Float, nullable=False)
+
+    __table_args__ = (
+        # Przebudowa / usuwanie termów jednego dokumentu
+        Index("ix_search_terms_doc", "doc_type", "doc_id"),
+    )
+
+    def __repr__(self):
+        return f"<SearchTerm(term='{self.term}', {self.doc_type}={self.doc_id})>"
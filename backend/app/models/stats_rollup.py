@@ -0,0 +1,37 @@
+from .base import Mapped, mapped_column, String, Integer, Date
+from sqlalchemy import BigInteger
+from app.extensions import db
+
+# Metryki zdarzeń zliczanych w rollupach (app.services.stats_rollup_service)
+ROLLUP_METRICS = ("ratings", "comments", "registrations", "logins", "recommendations")
+
+# Okresy liczników: dzień i miesiąc (period_start = pierwszy dzień miesiąca)
+ROLLUP_PERIODS = ("day", "month")
+
+
+class StatsRollup(db.Model):
+    """
+    Licznik zdarzeń metryki w okresie. Zwiększany w tej samej transakcji co
+    zdarzenie (StatsRollupRepository.increment), więc wykresy admina czytają
+    kilkadziesiąt wierszy zamiast skanować tabele źródłowe.
+
+    "ratings" i "comments" odpowiadają bieżącym wierszom (zmiana i usunięcie
+    oceny / komentarza korygują liczniki), pozostałe metryki to historia
+    zdarzeń.
+    """
+
+    __tablename__ = "stats_rollups"
+
+    metric: Mapped[str] = mapped_column(String(32), primary_key=True)
+    period: Mapped[str] = mapped_column(String(8), primary_key=True)
+    period_start: Mapped[Date] = mapped_column(Date, primary_key=True)
+    # liczba zdarzeń
+    event_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    # suma wartości zdarzeń (np. ocen, długości komentarzy) - do średnich
+    value_sum: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return (
+            f"<StatsRollup({self.metric} {self.period} {self.period_start}: "
+            f"{self.event_count})>"
+        )
@@ -0,0 +1,22 @@
+from .base import Mapped, mapped_column, String, DateTime, datetime
+from sqlalchemy import JSON
+from app.extensions import db
+
+
+class StatsSnapshot(db.Model):
+    """
+    Zmaterializowane agregaty dashboardów admina (np. "movies_dashboard").
+    Odświeżane przez `flask stats refresh` (cron) albo przy odczycie
+    przeterminowanego snapshotu - app.services.stats_snapshot_service.
+    """
+
+    __tablename__ = "stats_snapshots"
+
+    name: Mapped[str] = mapped_column(String(64), primary_key=True)
+    payload: Mapped[dict] = mapped_column(JSON, nullable=False)
+    computed_at: Mapped[datetime] = mapped_column(
+        DateTime, nullable=False, default=datetime.utcnow
+    )
+
+    def __repr__(self):
+        return f"<StatsSnapshot(name='{self.name}', computed_at={self.computed_at})>"
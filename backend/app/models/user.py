@@ -44,6 +44,8 @@ class User(db.Model):
         DateTime, default=datetime.utcnow
     )
     last_login: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+    # Ostatnie usunięcie oceny - batch rebuild (incremental) nie widzi go w ratings
+    ratings_deleted_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
     profile_picture: Mapped[str] = mapped_column(String(255), nullable=True)
     background_image: Mapped[str] = mapped_column(String(255), nullable=True)
@@ -0,0 +1,96 @@
+from .base import Mapped, mapped_column, ForeignKey, DateTime, datetime
+from sqlalchemy import JSON
+from app.extensions import db
+
+# Okna profilu: oceny pozytywne i negatywne (progi i limity jak w get_training_data)
+TASTE_POLARITIES = ("positive", "negative")
+
+
+class UserTasteProfile(db.Model):
+    """
+    Profil gustu użytkownika dla K-NN: okno ostatnich ocen pozytywnych
+    i negatywnych (jak w get_training_data) razem z cechami filmów w chwili
+    oceny oraz rzadki wektor sum tych cech (nazwa cechy -> liczba filmów okna).
+
+    Aktualizowany w tej samej transakcji co ocena
+    (UserTasteProfileRepository.apply_rating_change) kosztem cech jednego
+    filmu, więc generowanie rekomendacji nie koduje historii ocen od nowa.
+    Zmiana metadanych filmu (refresh_movie_features) usuwa profile jego
+    oceniających (invalidate_movies) - przy następnym użyciu liczone są od
+    zera; `flask recommendations rebuild-taste-profiles` przelicza wszystkie.
+    """
+
+    __tablename__ = "user_taste_profiles"
+
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey("users.user_id", ondelete="CASCADE"), primary_key=True
+    )
+    # [{"movie_id", "features", "year", "duration"}, ...] od najnowszej oceny
+    positive_window: Mapped[list] = mapped_column(JSON, nullable=False, default=list)
+    positive_counts: Mapped[dict] = mapped_column(JSON, nullable=False, default=dict)
+    negative_window: Mapped[list] = mapped_column(JSON, nullable=False, default=list)
+    negative_counts: Mapped[dict] = mapped_column(JSON, nullable=False, default=dict)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow
+    )
+
+    def __repr__(self):
+        return (
+            f"<UserTasteProfile(user_id={self.user_id}, "
+            f"positive={len(self.positive_window or [])}, "
+            f"negative={len(self.negative_window or [])})>"
+        )
+
+    def window(self, polarity):
+        return list(getattr(self, f"{polarity}_window") or [])
+
+    def counts(self, polarity):
+        return dict(getattr(self, f"{polarity}_counts") or {})
+
+    def movie_ids(self, polarity):
+        return [entry["movie_id"] for entry in self.window(polarity)]
+
+    def add_movie(self, polarity, entry, limit, newest=True):
+        """
+        Dodaje film na początek okna (nowa ocena) albo na koniec (starsza
+        ocena uzupełniająca okno); filmy ponad limit wypadają z końca.
+        Bez commitu.
+        """
+        window = self.window(polarity)
+        counts = self.counts(polarity)
+
+        if newest:
+            window.insert(0, entry)
+        else:
+            window.append(entry)
+        _count(counts, entry["features"], 1)
+
+        while len(window) > limit:
+            _count(counts, window.pop()["features"], -1)
+
+        self._store(polarity, window, counts)
+
+    def remove_movie(self, polarity, movie_id):
+        """Usuwa film z okna (z jego cechami); False gdy go w nim nie było"""
+        window = self.window(polarity)
+        for i, entry in enumerate(window):
+            if entry["movie_id"] == movie_id:
+                counts = self.counts(polarity)
+                _count(counts, window.pop(i)["features"], -1)
+                self._store(polarity, window, counts)
+                return True
+        return False
+
+    def _store(self, polarity, window, counts):
+        # nowe obiekty - JSON nie śledzi zmian w miejscu
+        setattr(self, f"{polarity}_window", window)
+        setattr(self, f"{polarity}_counts", counts)
+
+
+def _count(counts, features, delta):
+    for name in features:
+        count = counts.get(name, 0) + delta
+        if count > 0:
+            counts[name] = count
+        else:
+            counts.pop(name, None)
@@ -1,3 +1,5 @@
+import os
+
 MIN_USER_RATINGS = 5
 MIN_POSITIVES_FOR_QUALITY = 3
 TRAINING_POSITIVE_LIMIT = 10
@@ -24,6 +26,8 @@ ADAPTIVE_BASE_WEIGHT = 0.10
 ADAPTIVE_SCALING_FACTOR = 0.70
 MIN_PATTERN_OCCURRENCES = 2
 TOP_ACTORS_IN_PATTERN = 5
+# Użytkowników z wagami preferencji w cache procesu (DataPreprocessor)
+PREFERENCE_CACHE_SIZE = 1000
 TFIDF_MAX_FEATURES = 5000
 TFIDF_MIN_DF = 2
 TFIDF_MAX_DF = 0.8
@@ -31,6 +35,7 @@ TFIDF_NGRAM_RANGE = (1, 2)
 TFIDF_SUBLINEAR_TF = True
 USE_SNOWBALL_STEMMER = True
 STEMMER_LANGUAGE = "polish"
+STEM_CACHE_SIZE = 100000
 NB_ALPHA = 1.0
 NB_MODEL_TYPE = "multinomial"
 ENSEMBLE_KNN_WEIGHT = 0.65
@@ -45,3 +50,25 @@ BATCH_SIZE = 1000
 MAX_CANDIDATES = None
 NEGATIVE_PROFILE_WEIGHT = 0.3
 TOP_ENTITIES = 10000
+FEATURE_STORE_DIR = os.environ.get(
+    "FEATURE_STORE_DIR",
+    os.path.join(
+        os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+        "instance",
+        "recommendation_cache",
+    ),
+)
+# Indeks filmów podobnych: sąsiadów na film, udział podobieństwa opisów
+# (TF-IDF) w wyniku i komórek gęstego bloku wyników podczas budowy
+SIMILAR_MOVIES_TOP_K = int(os.environ.get("SIMILAR_MOVIES_TOP_K", 50))
+SIMILAR_MOVIES_TEXT_WEIGHT = 0.3
+SIMILAR_MOVIES_BLOCK_CELLS = 2**24
+# Shortlista kandydatów z indeksów odwróconych przed K-NN / NB: długość
+# (0 = cały katalog), udział filmów dobranych po opisach i liczba termów-ziaren
+CANDIDATE_SHORTLIST_SIZE = int(os.environ.get("CANDIDATE_SHORTLIST_SIZE", 3000))
+CANDIDATE_SHORTLIST_TEXT_SHARE = 0.4
+CANDIDATE_SHORTLIST_SEED_TERMS = 200
+RECOMMENDATION_JOB_WORKERS = int(os.environ.get("RECOMMENDATION_JOB_WORKERS", 2))
+RECOMMENDATION_JOB_TIMEOUT_MINUTES = 15
+# Zadanie w kolejce czeka na wolny wątek puli (kilka generowań przed nim)
+RECOMMENDATION_JOB_QUEUE_TIMEOUT_MINUTES = 60
@@ -1,6 +1,6 @@
-from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
 import pandas as pd
+import scipy.sparse as sp
 from typing import List, Dict, Tuple, Optional
 import logging
 
@@ -35,6 +35,9 @@ class KNNRecommender:
         self.user_profile = None
         self.adaptive_weights = None
         self.feature_names = None
+        self._feature_weights = None
+        self._actor_mask = None
+        self._director_mask = None
         self.logger = logging.getLogger(__name__)
 
     def fit(
@@ -59,43 +62,92 @@ class KNNRecommender:
         if features_only.empty:
             raise ValueError("Brak cech po usunięciu movie_id")
 
-        self.feature_names = features_only.columns.tolist()
-        features_matrix = features_only.values.astype(float)
-
-        # Profil pozytywny (średnia)
-        positive_profile = np.mean(features_matrix, axis=0)
-
-        # Obsługa negatywnych ocen (Pazzani & Billsus)
+        negative_matrix = None
         if not negative_features.empty and len(negative_ratings) >= 2:
             negative_features_only = negative_features.drop("movie_id", axis=1)
 
-            if list(negative_features_only.columns) == self.feature_names:
-                negative_matrix = negative_features_only.values.astype(float)
-                negative_profile = np.mean(negative_matrix, axis=0)
-
-                # Odejmujemy profil negatywny (z wagą 0.3)
-                self.user_profile = positive_profile - (0.3 * negative_profile)
-                self.user_profile = np.clip(
-                    self.user_profile, 0, None
-                )  # Nie chcemy ujemnych wartości
-
-                self.logger.info(
-                    f"User profile built WITH negative feedback: "
-                    f"{len(positive_ratings)} positive, {len(negative_ratings)} negative movies"
+            if list(negative_features_only.columns) == features_only.columns.tolist():
+                negative_matrix = sp.csr_matrix(
+                    negative_features_only.values.astype(float)
                 )
             else:
                 self.logger.warning(
                     "Negative features columns mismatch, using only positive profile"
                 )
-                self.user_profile = positive_profile
+
+        self.fit_sparse(
+            sp.csr_matrix(features_only.values.astype(float)),
+            negative_matrix,
+            features_only.columns.tolist(),
+            adaptive_weights,
+        )
+
+    def fit_sparse(
+        self,
+        positive_matrix: sp.csr_matrix,
+        negative_matrix: Optional[sp.csr_matrix],
+        feature_names: List[str],
+        adaptive_weights: Dict[str, float],
+    ) -> None:
+        """
+        Build user profile z macierzy CSR (wiersze = filmy, kolumny = feature_names)
+        """
+        if positive_matrix.shape[0] == 0:
+            raise ValueError("Brak pozytywnych filmów do budowy profilu")
+
+        negative_count = negative_matrix.shape[0] if negative_matrix is not None else 0
+        self.fit_profile(
+            np.asarray(positive_matrix.mean(axis=0)).ravel(),
+            (
+                np.asarray(negative_matrix.mean(axis=0)).ravel()
+                if negative_count
+                else None
+            ),
+            positive_matrix.shape[0],
+            negative_count,
+            feature_names,
+            adaptive_weights,
+        )
+
+    def fit_profile(
+        self,
+        positive_profile: np.ndarray,
+        negative_profile: Optional[np.ndarray],
+        positive_count: int,
+        negative_count: int,
+        feature_names: List[str],
+        adaptive_weights: Dict[str, float],
+    ) -> None:
+        """
+        Build user profile z gotowych średnich cech filmów pozytywnych
+        i negatywnych (np. z UserTasteProfile) - bez macierzy ocenionych filmów
+        """
+        if positive_count == 0:
+            raise ValueError("Brak pozytywnych filmów do budowy profilu")
+
+        self.feature_names = list(feature_names)
+
+        # Obsługa negatywnych ocen (Pazzani & Billsus)
+        if negative_profile is not None and negative_count >= 2:
+            # Odejmujemy profil negatywny (z wagą 0.3)
+            self.user_profile = positive_profile - (0.3 * negative_profile)
+            self.user_profile = np.clip(
+                self.user_profile, 0, None
+            )  # Nie chcemy ujemnych wartości
+
+            self.logger.info(
+                f"User profile built WITH negative feedback: "
+                f"{positive_count} positive, {negative_count} negative movies"
+            )
         else:
             self.user_profile = positive_profile
             self.logger.info(
                 f"User profile built WITHOUT negative feedback: "
-                f"{len(positive_ratings)} positive movies only"
+                f"{positive_count} positive movies only"
             )
 
         self.adaptive_weights = adaptive_weights
+        self._feature_weights = self._build_feature_weights()
 
         non_zero_features = np.count_nonzero(self.user_profile)
         self.logger.info(
@@ -124,72 +176,93 @@ class KNNRecommender:
         if "movie_id" not in candidate_features.columns:
             raise ValueError("candidate_features brak kolumny 'movie_id'")
 
-        try:
-            candidate_movie_ids = candidate_features["movie_id"].values
-            features_only = candidate_features.drop("movie_id", axis=1)
-
-            if list(features_only.columns) != self.feature_names:
-                raise ValueError("Feature columns mismatch with fitted model")
+        candidate_movie_ids = candidate_features["movie_id"].values
+        features_only = candidate_features.drop("movie_id", axis=1)
 
-            features_matrix = features_only.values.astype(float)
-
-            # 1. Wagi adaptacyjne
-            weighted_user_profile = self._apply_adaptive_weights(
-                self.user_profile.reshape(1, -1)
-            )[0]
-            weighted_candidate_features = self._apply_adaptive_weights(features_matrix)
-
-            # 2. Bazowe podobieństwo (Cosine)
-            base_similarities = cosine_similarity(
-                weighted_user_profile.reshape(1, -1), weighted_candidate_features
-            )[0]
+        if list(features_only.columns) != self.feature_names:
+            self.logger.error(
+                "K-NN predict error: Feature columns mismatch with fitted model"
+            )
+            return {}
 
-            # 3. Indeksy dla bonusów
-            actor_indices = [
-                i for i, f in enumerate(self.feature_names) if f.startswith("actor_")
-            ]
-            director_indices = [
-                i for i, f in enumerate(self.feature_names) if f.startswith("director_")
-            ]
+        return self.predict_sparse(
+            candidate_movie_ids, sp.csr_matrix(features_only.values.astype(float))
+        )
 
-           
-            ACTOR_BONUS_VAL = 0.10  
-            DIRECTOR_BONUS_VAL = 0.12  
+    def predict_sparse(
+        self, candidate_movie_ids: np.ndarray, candidate_matrix: sp.csr_matrix
+    ) -> Dict[int, float]:
+        """
+        Cosine similarity + bonusy na macierzy CSR.
 
-            predictions = {}
+        Pamięć rośnie z liczbą niezerowych elementów, nie z kandydaci x cechy:
+        wagi adaptacyjne to skalowanie diagonalne, a bonusy za aktorów
+        i reżyserów liczone są jednym iloczynem z maskowanym profilem.
+        """
+        if self.user_profile is None:
+            raise ValueError("Model nie został wytrenowany. Wywołaj fit() najpierw.")
 
-            for i, movie_id in enumerate(candidate_movie_ids):
-                base_score = float(base_similarities[i])
-                bonus = 0.0
+        if candidate_matrix.shape[0] == 0:
+            self.logger.warning("Brak kandydatów do predict")
+            return {}
 
-                # Bonus za Aktorów
-                current_movie_actors = features_matrix[i, actor_indices]
-                user_pref_actors = self.user_profile[actor_indices]
+        try:
+            if candidate_matrix.shape[1] != len(self.feature_names):
+                raise ValueError("Feature columns mismatch with fitted model")
 
-                matches = (current_movie_actors > 0) & (user_pref_actors > 0)
-                if np.any(matches):
-                    # Sumujemy siłę preferencji, ale pierwiastkujemy, żeby nie rosła liniowo
-                    strength_sum = np.sum(user_pref_actors[matches])
-                    # Wzór: mały bonus + (mały bonus * log(1 + siła)) - rośnie wolniej
-                    bonus += ACTOR_BONUS_VAL * (1.0 + np.log1p(strength_sum))
+            candidate_matrix = sp.csr_matrix(candidate_matrix, dtype=np.float64)
+            weights = self._feature_weights
 
-                # Bonus za Reżyserów
-                current_movie_directors = features_matrix[i, director_indices]
-                user_pref_directors = self.user_profile[director_indices]
+            # 1. Wagi adaptacyjne (diagonalnie): <Xw, pw> = X @ (w^2 * p)
+            weighted_user_profile = self.user_profile * weights
+            dot_products = candidate_matrix @ (weights * weighted_user_profile)
 
-                dir_matches = (current_movie_directors > 0) & (user_pref_directors > 0)
-                if np.any(dir_matches):
-                    strength_sum = np.sum(user_pref_directors[dir_matches])
-                    bonus += DIRECTOR_BONUS_VAL * (1.0 + np.log1p(strength_sum))
+            # 2. Bazowe podobieństwo (Cosine); zerowa norma -> 0 jak w sklearn
+            profile_norm = np.linalg.norm(weighted_user_profile)
+            candidate_norms = np.sqrt(
+                candidate_matrix.multiply(candidate_matrix) @ (weights**2)
+            )
+            denominator = candidate_norms * profile_norm
+            base_similarities = np.divide(
+                dot_products,
+                denominator,
+                out=np.zeros_like(dot_products),
+                where=denominator > 0,
+            )
 
-                # Soft blending: zamiast score + bonus, robimy średnią ważoną w stronę 1.0
-                # Jeśli bonus > 0, wynik przesuwa się w stronę 1.0, ale nie przekracza go drastycznie.
-                # Wzór: base + (1 - base) * bonus_factor
+            # 3. Bonusy: suma preferencji użytkownika po dopasowanych aktorach
+            # / reżyserach, jednym iloczynem binarnej macierzy z profilem [F x 2]
+            ACTOR_BONUS_VAL = 0.10
+            DIRECTOR_BONUS_VAL = 0.12
+
+            positive_profile = np.where(self.user_profile > 0, self.user_profile, 0.0)
+            bonus_profile = np.column_stack(
+                [
+                    positive_profile * self._actor_mask,
+                    positive_profile * self._director_mask,
+                ]
+            )
+            present = (candidate_matrix > 0).astype(np.float64)
+            strength_sums = np.asarray(present @ bonus_profile)
+
+            # Wzór: mały bonus + (mały bonus * log(1 + siła)) - rośnie wolniej
+            bonus = np.where(
+                strength_sums[:, 0] > 0,
+                ACTOR_BONUS_VAL * (1.0 + np.log1p(strength_sums[:, 0])),
+                0.0,
+            ) + np.where(
+                strength_sums[:, 1] > 0,
+                DIRECTOR_BONUS_VAL * (1.0 + np.log1p(strength_sums[:, 1])),
+                0.0,
+            )
 
-                # Ale zostańmy przy addytywnym, tylko mniejszym, bo jest bardziej przewidywalny w debugowaniu.
-                final_score = base_score + bonus
+            # Addytywny bonus, przycięty do [0, 1]
+            final_scores = np.clip(base_similarities + bonus, 0.0, 1.0)
 
-                predictions[movie_id] = min(1.0, max(0.0, final_score))
+            predictions = {
+                movie_id: float(score)
+                for movie_id, score in zip(candidate_movie_ids.tolist(), final_scores)
+            }
 
             top_preds = sorted(predictions.items(), key=lambda x: x[1], reverse=True)[
                 :5
@@ -208,27 +281,31 @@ class KNNRecommender:
         """
         Apply adaptive weights do feature vectors
         """
-        weighted_matrix = features_matrix.copy()
+        return features_matrix * self._feature_weights
+
+    def _build_feature_weights(self) -> np.ndarray:
+        """Wektor wag kolumn (diagonala) + maski kolumn aktorów i reżyserów"""
+        weights = np.ones(len(self.feature_names))
+        self._actor_mask = np.zeros(len(self.feature_names))
+        self._director_mask = np.zeros(len(self.feature_names))
 
         for i, feature_name in enumerate(self.feature_names):
             if feature_name.startswith("genre_"):
-                weight = self.adaptive_weights.get("genres", 1.0)
+                weights[i] = self.adaptive_weights.get("genres", 1.0)
             elif feature_name.startswith("actor_"):
-                weight = self.adaptive_weights.get("actors", 1.0)
+                weights[i] = self.adaptive_weights.get("actors", 1.0)
+                self._actor_mask[i] = 1.0
             elif feature_name.startswith("director_"):
-                weight = self.adaptive_weights.get("directors", 1.0)
+                weights[i] = self.adaptive_weights.get("directors", 1.0)
+                self._director_mask[i] = 1.0
             elif feature_name.startswith("country_"):
-                weight = self.adaptive_weights.get("country", 1.0)
+                weights[i] = self.adaptive_weights.get("country", 1.0)
             elif feature_name == "release_year_normalized":
-                weight = self.adaptive_weights.get("year", 1.0)
+                weights[i] = self.adaptive_weights.get("year", 1.0)
             elif feature_name == "duration_normalized":
-                weight = 0.5
-            else:
-                weight = 1.0
+                weights[i] = 0.5
 
-            weighted_matrix[:, i] *= weight
-
-        return weighted_matrix
+        return weights
 
     def recommend(
         self,
@@ -252,7 +329,58 @@ class KNNRecommender:
         )
 
         predictions = self.predict(candidate_features)
+        return self._rank(predictions, top_k)
+
+    def recommend_sparse(
+        self,
+        positive_matrix: sp.csr_matrix,
+        negative_matrix: Optional[sp.csr_matrix],
+        candidate_movie_ids: np.ndarray,
+        candidate_matrix: sp.csr_matrix,
+        feature_names: List[str],
+        adaptive_weights: Dict[str, float],
+        top_k: int = KNN_RECOMMENDATIONS,
+    ) -> List[Tuple[int, float]]:
+        """
+        Pełny pipeline na macierzach CSR (np. wycinki z MovieFeatureStore)
+        """
+        self.fit_sparse(
+            positive_matrix, negative_matrix, feature_names, adaptive_weights
+        )
+
+        predictions = self.predict_sparse(candidate_movie_ids, candidate_matrix)
+        return self._rank(predictions, top_k)
 
+    def recommend_profile(
+        self,
+        positive_profile: np.ndarray,
+        negative_profile: Optional[np.ndarray],
+        positive_count: int,
+        negative_count: int,
+        candidate_movie_ids: np.ndarray,
+        candidate_matrix: sp.csr_matrix,
+        feature_names: List[str],
+        adaptive_weights: Dict[str, float],
+        top_k: int = KNN_RECOMMENDATIONS,
+    ) -> List[Tuple[int, float]]:
+        """
+        Pełny pipeline z zapisanego profilu gustu (średnie cech zamiast macierzy)
+        """
+        self.fit_profile(
+            positive_profile,
+            negative_profile,
+            positive_count,
+            negative_count,
+            feature_names,
+            adaptive_weights,
+        )
+
+        predictions = self.predict_sparse(candidate_movie_ids, candidate_matrix)
+        return self._rank(predictions, top_k)
+
+    def _rank(
+        self, predictions: Dict[int, float], top_k: int
+    ) -> List[Tuple[int, float]]:
         if not predictions:
             self.logger.warning("K-NN: No predictions generated")
             return []
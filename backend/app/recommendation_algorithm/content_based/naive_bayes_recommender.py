@@ -1,10 +1,11 @@
 from sklearn.feature_extraction.text import TfidfVectorizer
 import numpy as np
 import pandas as pd
+import scipy.sparse as sp
 from typing import List, Dict, Tuple, Optional
 import logging
-import math
 import nltk
+from scipy.special import logsumexp
 
 from ..config import (
     POSITIVE_RATING_THRESHOLD,
@@ -55,6 +56,9 @@ class NaiveBayesRecommender:
         self.class_priors = {}
         self.feature_likelihoods = {}
         self.vocabulary_size = 0
+        self._log_priors = None
+        self._log_likelihoods = None
+        self._log_complement_sums = None
         self.logger = logging.getLogger(__name__)
 
     def fit(
@@ -101,49 +105,136 @@ class NaiveBayesRecommender:
                 self.is_fitted = False
                 return
 
-            unique_labels = set(labels)
-            if len(unique_labels) < 2:
-                self.logger.warning(
-                    f"Only one class present: {unique_labels}. "
-                    f"Adding synthetic sample for missing class."
-                )
-                if "positive" not in unique_labels:
-                    descriptions.append(
-                        "excellent great amazing wonderful fantastic masterpiece"
-                    )
-                    labels.append("positive")
-                if "negative" not in unique_labels:
-                    descriptions.append(
-                        "terrible awful bad horrible boring disappointing waste"
-                    )
-                    labels.append("negative")
+            for label, text in self._synthetic_samples(labels):
+                descriptions.append(text)
+                labels.append(label)
 
             tfidf_matrix = self.tfidf_processor.fit_transform(descriptions)
-            self.vocabulary_size = len(self.tfidf_processor.feature_names)
+            self._fit_matrix(tfidf_matrix, labels)
 
-            y = np.array(labels)
+        except Exception as e:
+            self.logger.error(f"NaiveBayes.fit failed: {e}", exc_info=True)
+            self.is_fitted = False
+            self.logger.warning("NB fit failed - fallback P=0.5")
 
-            if self.model_type == "multinomial":
-                self._train_multinomial_nb(tfidf_matrix, y)
-            elif self.model_type == "bernoulli":
-                self._train_bernoulli_nb(tfidf_matrix, y)
-            else:
-                raise ValueError(f"Unknown model_type: {self.model_type}")
+    def fit_from_index(
+        self,
+        description_index,
+        positive_movie_ids: List[int],
+        negative_movie_ids: List[int],
+    ) -> None:
+        """
+        Train Naive Bayes na gotowych zliczeniach termów z MovieDescriptionIndex
+        (bez ponownego preprocessingu / stemmingu opisów)
+        """
+        self.logger.info(
+            f"=== NaiveBayes.fit_from_index START: positive={len(positive_movie_ids)}, "
+            f"negative={len(negative_movie_ids)} ==="
+        )
 
-            self.is_fitted = True
+        try:
+            _, positive_counts = description_index.get_counts(
+                positive_movie_ids, trainable_only=True
+            )
+            _, negative_counts = description_index.get_counts(
+                negative_movie_ids, trainable_only=True
+            )
+            labels = ["positive"] * positive_counts.shape[0] + ["negative"] * (
+                negative_counts.shape[0]
+            )
 
-            pos_count = np.sum(y == "positive")
-            neg_count = np.sum(y == "negative")
-            self.logger.info(
-                f"NaiveBayes ({self.model_type}, α={NB_ALPHA}) fitted: "
-                f"positive={pos_count}, negative={neg_count}, vocab={self.vocabulary_size}"
+            if len(labels) == 0:
+                self.logger.warning(
+                    "No valid descriptions after preprocessing - NB not fitted"
+                )
+                self.is_fitted = False
+                return
+
+            # Syntetyczne próbki mogą mieć termy spoza katalogu - dokładamy
+            # je jako lokalne kolumny za słownikiem indeksu
+            terms = list(description_index.terms)
+            local_columns = {}
+            rows = [positive_counts, negative_counts]
+
+            for label, text in self._synthetic_samples(labels):
+                term_counts = description_index.count_text(text)
+                columns = []
+                for term in term_counts:
+                    column = description_index.term_index.get(term)
+                    if column is None:
+                        column = local_columns.setdefault(
+                            term, len(terms) + len(local_columns)
+                        )
+                    columns.append(column)
+
+                rows.append(
+                    sp.csr_matrix(
+                        (
+                            list(term_counts.values()),
+                            (np.zeros(len(columns), dtype=np.int64), columns),
+                        ),
+                        shape=(1, len(terms) + len(local_columns)),
+                    )
+                )
+                labels.append(label)
+
+            terms.extend(local_columns)
+            for matrix in rows:
+                matrix.resize((matrix.shape[0], len(terms)))
+
+            tfidf_matrix = self.tfidf_processor.fit_transform_counts(
+                sp.vstack(rows, format="csr"), terms
             )
+            self._fit_matrix(tfidf_matrix, labels)
 
         except Exception as e:
-            self.logger.error(f"NaiveBayes.fit failed: {e}", exc_info=True)
+            self.logger.error(f"NaiveBayes.fit_from_index failed: {e}", exc_info=True)
             self.is_fitted = False
             self.logger.warning("NB fit failed - fallback P=0.5")
 
+    def _synthetic_samples(self, labels: List[str]) -> List[Tuple[str, str]]:
+        """Syntetyczny dokument dla brakującej klasy (NB potrzebuje obu klas)"""
+        unique_labels = set(labels)
+        if len(unique_labels) >= 2:
+            return []
+
+        self.logger.warning(
+            f"Only one class present: {unique_labels}. "
+            f"Adding synthetic sample for missing class."
+        )
+        samples = []
+        if "positive" not in unique_labels:
+            samples.append(
+                ("positive", "excellent great amazing wonderful fantastic masterpiece")
+            )
+        if "negative" not in unique_labels:
+            samples.append(
+                ("negative", "terrible awful bad horrible boring disappointing waste")
+            )
+        return samples
+
+    def _fit_matrix(self, tfidf_matrix, labels: List[str]) -> None:
+        self.vocabulary_size = len(self.tfidf_processor.feature_names)
+
+        y = np.array(labels)
+
+        if self.model_type == "multinomial":
+            self._train_multinomial_nb(tfidf_matrix, y)
+        elif self.model_type == "bernoulli":
+            self._train_bernoulli_nb(tfidf_matrix, y)
+        else:
+            raise ValueError(f"Unknown model_type: {self.model_type}")
+
+        self._precompute_log_parameters()
+        self.is_fitted = True
+
+        pos_count = np.sum(y == "positive")
+        neg_count = np.sum(y == "negative")
+        self.logger.info(
+            f"NaiveBayes ({self.model_type}, α={NB_ALPHA}) fitted: "
+            f"positive={pos_count}, negative={neg_count}, vocab={self.vocabulary_size}"
+        )
+
     def _prepare_training_data(
         self, positive_descriptions: pd.DataFrame, negative_descriptions: pd.DataFrame
     ) -> Tuple[List[str], List[str]]:
@@ -250,6 +341,42 @@ class NaiveBayesRecommender:
                 f"likelihoods shape={likelihoods.shape}"
             )
 
+    def _precompute_log_parameters(self) -> None:
+        """
+        Log-prawdopodobieństwa jako macierze [klasy x słownik], liczone raz po treningu.
+
+        Bernoulli (complement-log): sum_j log(1 - p_j) jest stałą klasy, a dla
+        obecnych słów dodajemy log(p_j) - log(1 - p_j) - dzięki temu scoring
+        dotyka tylko niezerowych elementów macierzy kandydatów.
+        """
+        self._log_priors = np.log(
+            np.array([self.class_priors[c] for c in self.class_labels], dtype=float)
+        )
+        likelihoods = np.vstack(
+            [self.feature_likelihoods[c] for c in self.class_labels]
+        ).astype(float)
+
+        if self.model_type == "bernoulli":
+            log_complements = np.log(1 - likelihoods)
+            self._log_likelihoods = np.log(likelihoods) - log_complements
+            self._log_complement_sums = log_complements.sum(axis=1)
+        else:
+            self._log_likelihoods = np.log(likelihoods)
+            self._log_complement_sums = np.zeros(len(self.class_labels))
+
+    def _positive_probabilities(self, X) -> np.ndarray:
+        """P(positive | doc) dla wszystkich wierszy X jednym iloczynem macierzy"""
+        if self.model_type == "bernoulli":
+            X = (X > 0).astype(float)
+
+        # [n_docs x klasy]
+        log_joint = np.asarray(X @ self._log_likelihoods.T) + (
+            self._log_priors + self._log_complement_sums
+        )
+        log_posterior = log_joint - logsumexp(log_joint, axis=1, keepdims=True)
+
+        return np.exp(log_posterior[:, self.class_labels.index("positive")])
+
     def predict_with_movie_ids(self, candidates_df: pd.DataFrame) -> Dict[int, float]:
         """
         Predict P(positive | description) dla candidates
@@ -288,38 +415,10 @@ class NaiveBayesRecommender:
                 f"shape={candidate_tfidf.shape}"
             )
 
-            if self.model_type == "bernoulli":
-                candidate_tfidf = (candidate_tfidf > 0).astype(int)
-
-            for i, movie_id in enumerate(movie_ids):
-                doc_vector = candidate_tfidf[i].toarray().flatten()
-
-                class_log_probs = {}
-                for class_label in self.class_labels:
-                    log_prob = math.log(self.class_priors[class_label])
-
-                    for j, tf_idf_weight in enumerate(doc_vector):
-                        p_w_c = self.feature_likelihoods[class_label][j]
-
-                        if self.model_type == "multinomial":
-                            if tf_idf_weight > 0:
-                                log_prob += tf_idf_weight * math.log(p_w_c)
-                        else:
-                            if tf_idf_weight > 0:
-                                log_prob += math.log(p_w_c)
-                            else:
-                                log_prob += math.log(1 - p_w_c)
-
-                    class_log_probs[class_label] = log_prob
-
-                max_log = max(class_log_probs.values())
-                exp_probs = {
-                    k: math.exp(v - max_log) for k, v in class_log_probs.items()
-                }
-                total = sum(exp_probs.values())
-                norm_probs = {k: v / total for k, v in exp_probs.items()}
-
-                predictions[movie_id] = norm_probs.get("positive", 0.5)
+            probabilities = self._positive_probabilities(candidate_tfidf)
+            predictions = {
+                movie_id: float(p) for movie_id, p in zip(movie_ids, probabilities)
+            }
 
             if predictions:
                 top_preds = sorted(
@@ -335,6 +434,59 @@ class NaiveBayesRecommender:
 
         return predictions
 
+    def predict_from_index(
+        self, description_index, candidate_movie_ids: List[int]
+    ) -> Dict[int, float]:
+        """predict_with_movie_ids na zliczeniach z MovieDescriptionIndex"""
+        movie_ids, counts = description_index.get_counts(candidate_movie_ids)
+
+        if not self.is_fitted:
+            self.logger.warning(
+                "NaiveBayes not fitted - returning default P=0.5 for all"
+            )
+            return {mid: 0.5 for mid in movie_ids.tolist()}
+
+        try:
+            candidate_tfidf = self.tfidf_processor.transform_counts(counts)
+            probabilities = self._positive_probabilities(candidate_tfidf)
+            predictions = dict(zip(movie_ids.tolist(), probabilities.tolist()))
+
+        except Exception as e:
+            self.logger.error(f"NaiveBayes.predict failed: {e}", exc_info=True)
+            return {mid: 0.5 for mid in movie_ids.tolist()}
+
+        if predictions:
+            top_preds = sorted(predictions.items(), key=lambda x: x[1], reverse=True)[
+                :5
+            ]
+            self.logger.info(
+                f"NaiveBayes top 5 P(positive): {[(mid, f'{p:.3f}') for mid, p in top_preds]}"
+            )
+
+        return predictions
+
+    def recommend_from_index(
+        self,
+        description_index,
+        positive_movie_ids: List[int],
+        negative_movie_ids: List[int],
+        candidate_movie_ids: List[int],
+        top_k: int = NB_RECOMMENDATIONS,
+    ) -> List[Tuple[int, float]]:
+        """
+        Full pipeline (fit + predict + rank) na katalogowym indeksie opisów
+        """
+        self.fit_from_index(description_index, positive_movie_ids, negative_movie_ids)
+
+        if not self.is_fitted:
+            self.logger.warning(
+                "NaiveBayes not fitted - returning empty recommendations"
+            )
+            return []
+
+        predictions = self.predict_from_index(description_index, candidate_movie_ids)
+        return self._rank(predictions, top_k)
+
     def recommend(
         self,
         positive_descriptions: pd.DataFrame,
@@ -363,7 +515,11 @@ class NaiveBayesRecommender:
             return []
 
         predictions = self.predict_with_movie_ids(candidate_descriptions)
+        return self._rank(predictions, top_k)
 
+    def _rank(
+        self, predictions: Dict[int, float], top_k: int
+    ) -> List[Tuple[int, float]]:
         if not predictions:
             self.logger.warning("NaiveBayes: No predictions generated")
             return []
@@ -1,8 +1,10 @@
-from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.feature_extraction.text import TfidfTransformer, TfidfVectorizer
 import pandas as pd
 import numpy as np
+import scipy.sparse as sp
 import re
 from typing import List, Dict, Tuple, Optional
+from functools import lru_cache
 import logging
 import nltk
 
@@ -14,9 +16,93 @@ from ..config import (
     TFIDF_SUBLINEAR_TF,
     USE_SNOWBALL_STEMMER,
     STEMMER_LANGUAGE,
+    STEM_CACHE_SIZE,
 )
 
 
+# Słowo = maksymalny ciąg znaków \w bez cyfr. Odpowiada dawnym trzem
+# przebiegom re.sub (interpunkcja -> spacja, cyfry -> spacja, zwijanie spacji)
+TOKEN_PATTERN = re.compile(r"[^\W\d]+", flags=re.UNICODE)
+
+# Kolejność ma znaczenie: wygrywa pierwszy pasujący sufiks z listy
+POLISH_SUFFIXES = (
+    "owanie",
+    "iwanie",
+    "ywanie",
+    "ności",
+    "ość",
+    "acja",
+    "cja",
+    "enie",
+    "anie",
+    "nik",
+    "acz",
+    "arz",
+    "owski",
+    "ewski",
+    "owy",
+    "owa",
+    "owe",
+    "ski",
+    "ska",
+    "skie",
+    "ny",
+    "na",
+    "ne",
+    "owie",
+    "ami",
+    "ach",
+    "ów",
+    "em",
+    "om",
+    "ego",
+    "iej",
+    "ie",
+    "ą",
+    "ę",
+    "y",
+    "a",
+    "o",
+    "e",
+    "ić",
+    "ać",
+    "eć",
+)
+
+
+class SuffixTrie:
+    """
+    Trie odwróconych sufiksów - jedno przejście od końca słowa zamiast
+    sprawdzania endswith() dla każdego sufiksu z listy
+    """
+
+    _END = None
+
+    def __init__(self, suffixes: Tuple[str, ...]):
+        self.root: Dict = {}
+        for priority, suffix in enumerate(suffixes):
+            node = self.root
+            for char in reversed(suffix):
+                node = node.setdefault(char, {})
+            node.setdefault(self._END, priority)
+
+    def matches(self, word: str) -> List[Tuple[int, int]]:
+        """Pasujące sufiksy słowa jako (pozycja na liście, długość), wg pozycji"""
+        found = []
+        node = self.root
+        for depth, char in enumerate(reversed(word), start=1):
+            node = node.get(char)
+            if node is None:
+                break
+            if self._END in node:
+                found.append((node[self._END], depth))
+        found.sort()
+        return found
+
+
+POLISH_SUFFIX_TRIE = SuffixTrie(POLISH_SUFFIXES)
+
+
 class TFIDFProcessor:
     """
     TF-IDF processor dla opisów filmów
@@ -43,9 +129,13 @@ class TFIDFProcessor:
         """
         self.vectorizer = None
         self.feature_names = None
+        self.count_columns = None
+        self.transformer = None
         self.language = language
         self.use_snowball = use_snowball
         self.logger = logging.getLogger(__name__)
+        # Te same słowa powtarzają się w tysiącach opisów - stem liczony raz
+        self._stem_token = lru_cache(maxsize=STEM_CACHE_SIZE)(self._stem_word)
 
         if language == "polish":
             try:
@@ -97,32 +187,24 @@ class TFIDFProcessor:
         if not isinstance(text, str) or not text.strip():
             return ""
 
-        text = text.lower()
-
-        text = re.sub(r"[^\w\sąćęłńóśźżĄĆĘŁŃÓŚŹŻ]", " ", text, flags=re.UNICODE)
-
-        text = re.sub(r"\d+", " ", text)
-
-        text = re.sub(r"\s+", " ", text).strip()
-
-        # 5. Stemming
-        words = text.split()
         stemmed_words = []
+        for word in TOKEN_PATTERN.findall(text.lower()):
+            stemmed_word = self._stem_token(word)
+            if stemmed_word is not None:
+                stemmed_words.append(stemmed_word)
 
-        for word in words:
-            if len(word) <= 2:
-                continue
-
-            if self.stemmer:
-                stemmed_word = self.stemmer.stem(word)
-            elif self.language == "polish":
-                stemmed_word = self._simple_polish_stemming(word)
-            else:
-                stemmed_word = word
+        return " ".join(stemmed_words)
 
-            stemmed_words.append(stemmed_word)
+    def _stem_word(self, word: str) -> Optional[str]:
+        """Stem pojedynczego tokenu; None dla słów krótszych niż 3 znaki"""
+        if len(word) <= 2:
+            return None
 
-        return " ".join(stemmed_words)
+        if self.stemmer:
+            return self.stemmer.stem(word)
+        elif self.language == "polish":
+            return self._simple_polish_stemming(word)
+        return word
 
     def _simple_polish_stemming(self, word: str) -> str:
         """
@@ -138,54 +220,12 @@ class TFIDFProcessor:
         "technologia" → "technolog"
         "wchodzenie" → "wchodz"
         "śpiącego" → "śpi"
-        """
-        polish_suffixes = [
-            "owanie",
-            "iwanie",
-            "ywanie",
-            "ności",
-            "ość",
-            "acja",
-            "cja",
-            "enie",
-            "anie",
-            "nik",
-            "acz",
-            "arz",
-            "owski",
-            "ewski",
-            "owy",
-            "owa",
-            "owe",
-            "ski",
-            "ska",
-            "skie",
-            "ny",
-            "na",
-            "ne",
-            "owie",
-            "ami",
-            "ach",
-            "ów",
-            "em",
-            "om",
-            "ego",
-            "iej",
-            "ie",
-            "ą",
-            "ę",
-            "y",
-            "a",
-            "o",
-            "e",
-            "ić",
-            "ać",
-            "eć",
-        ]
 
-        for suffix in polish_suffixes:
-            if word.endswith(suffix) and len(word) > len(suffix) + 2:
-                return word[: -len(suffix)]
+        Sufiksy z POLISH_SUFFIXES (pierwszy pasujący wygrywa), wyszukiwane w SuffixTrie
+        """
+        for _, suffix_length in POLISH_SUFFIX_TRIE.matches(word):
+            if len(word) > suffix_length + 2:
+                return word[:-suffix_length]
 
         return word
 
@@ -218,18 +258,9 @@ class TFIDFProcessor:
             f"TF-IDF preprocessing: {len(valid_docs)}/{len(documents)} documents valid"
         )
 
-        self.vectorizer = TfidfVectorizer(
-            max_features=TFIDF_MAX_FEATURES,
-            min_df=TFIDF_MIN_DF,
-            max_df=TFIDF_MAX_DF,
-            stop_words=self._get_stopwords(),
-            ngram_range=TFIDF_NGRAM_RANGE,
-            lowercase=False,
-            sublinear_tf=TFIDF_SUBLINEAR_TF,
-            norm="l2",
-            smooth_idf=True,
-            analyzer="word",
-        )
+        self.vectorizer = self._make_vectorizer()
+        self.count_columns = None
+        self.transformer = None
 
         try:
             tfidf_matrix = self.vectorizer.fit_transform(valid_docs)
@@ -247,6 +278,122 @@ class TFIDFProcessor:
             self.logger.error(f"TF-IDF fit_transform failed: {e}", exc_info=True)
             raise
 
+    def _make_vectorizer(self) -> TfidfVectorizer:
+        return TfidfVectorizer(
+            max_features=TFIDF_MAX_FEATURES,
+            min_df=TFIDF_MIN_DF,
+            max_df=TFIDF_MAX_DF,
+            stop_words=self._get_stopwords(),
+            ngram_range=TFIDF_NGRAM_RANGE,
+            lowercase=False,
+            sublinear_tf=TFIDF_SUBLINEAR_TF,
+            norm="l2",
+            smooth_idf=True,
+            analyzer="word",
+        )
+
+    def build_analyzer(self):
+        """
+        Analyzer (stopwords + n-gramy) identyczny jak w fit_transform.
+        Wejściem jest tekst już po preprocess_text().
+        """
+        return self._make_vectorizer().build_analyzer()
+
+    def fit_transform_counts(
+        self, counts: sp.csr_matrix, terms: List[str]
+    ) -> sp.csr_matrix:
+        """
+        Odpowiednik fit_transform dla gotowych zliczeń termów (np. wiersze
+        MovieDescriptionIndex) - bez ponownego preprocessingu tekstu.
+
+        Powtarza semantykę TfidfVectorizer: słownik = termy obecne w dokumentach
+        (alfabetycznie), odcięcie min_df / max_df / max_features, potem
+        sublinear tf, smooth idf i normalizacja L2.
+
+        Args:
+            counts: [dokumenty x len(terms)] liczności termów
+            terms: nazwy kolumn counts
+
+        Returns:
+            Sparse matrix (n_documents, n_features)
+        """
+        counts = sp.csr_matrix(counts, dtype=np.int64)
+        n_docs = counts.shape[0]
+
+        used_columns = np.unique(counts.indices)
+        used_columns = np.array(
+            sorted(used_columns, key=lambda col: terms[col]), dtype=np.int64
+        )
+        X = counts[:, used_columns]
+
+        max_doc_count = (
+            TFIDF_MAX_DF if isinstance(TFIDF_MAX_DF, int) else TFIDF_MAX_DF * n_docs
+        )
+        min_doc_count = (
+            TFIDF_MIN_DF if isinstance(TFIDF_MIN_DF, int) else TFIDF_MIN_DF * n_docs
+        )
+        if max_doc_count < min_doc_count:
+            raise ValueError("max_df corresponds to < documents than min_df")
+
+        document_frequency = np.bincount(X.indices, minlength=X.shape[1])
+        mask = (document_frequency <= max_doc_count) & (
+            document_frequency >= min_doc_count
+        )
+        if TFIDF_MAX_FEATURES is not None and mask.sum() > TFIDF_MAX_FEATURES:
+            term_frequency = np.asarray(X.sum(axis=0)).ravel()
+            top = (-term_frequency[mask]).argsort()[:TFIDF_MAX_FEATURES]
+            limited = np.zeros(len(mask), dtype=bool)
+            limited[np.where(mask)[0][top]] = True
+            mask = limited
+
+        kept = np.where(mask)[0]
+        if len(kept) == 0:
+            raise ValueError(
+                "After pruning, no terms remain. Try a lower min_df or a higher max_df."
+            )
+
+        self.vectorizer = None
+        self.count_columns = used_columns[kept]
+        self.feature_names = np.array(
+            [terms[col] for col in self.count_columns], dtype=object
+        )
+        self.transformer = TfidfTransformer(
+            norm="l2", smooth_idf=True, sublinear_tf=TFIDF_SUBLINEAR_TF
+        )
+
+        X = X[:, kept]
+        self.transformer.fit(X)
+        tfidf_matrix = self.transformer.transform(X, copy=False)
+
+        self.logger.info(
+            f"TF-IDF (from counts): shape={tfidf_matrix.shape}, "
+            f"features={len(self.feature_names)}"
+        )
+        return tfidf_matrix
+
+    def transform_counts(self, counts: sp.csr_matrix) -> sp.csr_matrix:
+        """transform() dla zliczeń w tych samych kolumnach co w fit_transform_counts"""
+        if self.count_columns is None:
+            raise ValueError("Counts not fitted. Call fit_transform_counts() first.")
+
+        X = sp.csr_matrix(counts, dtype=np.int64)[:, self.count_columns]
+        return self.transformer.transform(X, copy=False)
+
+    def load_counts_model(
+        self, count_columns: np.ndarray, feature_names: List[str], idf: np.ndarray
+    ) -> None:
+        """
+        Odtwarza model fit_transform_counts z zapisanych kolumn zliczeń, termów
+        i wag idf - transform_counts bez ponownego dopasowania na korpusie
+        """
+        self.vectorizer = None
+        self.count_columns = np.asarray(count_columns, dtype=np.int64)
+        self.feature_names = np.asarray(feature_names, dtype=object)
+        self.transformer = TfidfTransformer(
+            norm="l2", smooth_idf=True, sublinear_tf=TFIDF_SUBLINEAR_TF
+        )
+        self.transformer.idf_ = np.asarray(idf, dtype=np.float64)
+
     def transform(self, documents: List[str]) -> np.ndarray:
         """
         Transform new documents using fitted vectorizer
@@ -587,19 +734,28 @@ class TFIDFProcessor:
         Returns:
             Dict with vectorizer parameters and statistics
         """
-        if self.vectorizer is None:
+        # fit_transform_counts() nie tworzy vectorizera - idf ma transformer
+        fitted = self.vectorizer if self.vectorizer is not None else self.transformer
+        if fitted is None:
             return {"error": "Vectorizer not fitted"}
 
         try:
+            feature_count = (
+                len(self.feature_names) if self.feature_names is not None else 0
+            )
             info = {
-                "vocabulary_size": len(self.vectorizer.vocabulary_),
-                "feature_count": len(self.feature_names) if self.feature_names else 0,
+                "vocabulary_size": (
+                    len(self.vectorizer.vocabulary_)
+                    if self.vectorizer is not None
+                    else feature_count
+                ),
+                "feature_count": feature_count,
                 "max_features": TFIDF_MAX_FEATURES,
                 "min_df": TFIDF_MIN_DF,
                 "max_df": TFIDF_MAX_DF,
                 "ngram_range": TFIDF_NGRAM_RANGE,
                 "sublinear_tf": TFIDF_SUBLINEAR_TF,
-                "norm": self.vectorizer.norm,
+                "norm": fitted.norm,
                 "stop_words_count": len(self._get_stopwords()),
                 "language": self.language,
                 "stemmer": (
@@ -609,12 +765,12 @@ class TFIDFProcessor:
                 ),
             }
 
-            if hasattr(self.vectorizer, "idf_"):
+            if hasattr(fitted, "idf_"):
                 info.update(
                     {
-                        "min_idf": float(np.min(self.vectorizer.idf_)),
-                        "max_idf": float(np.max(self.vectorizer.idf_)),
-                        "mean_idf": float(np.mean(self.vectorizer.idf_)),
+                        "min_idf": float(np.min(fitted.idf_)),
+                        "max_idf": float(np.max(fitted.idf_)),
+                        "mean_idf": float(np.mean(fitted.idf_)),
                     }
                 )
 
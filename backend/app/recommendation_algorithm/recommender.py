@@ -1,8 +1,9 @@
 from sqlalchemy.orm import Session
+import numpy as np
 import pandas as pd
-from typing import List, Dict, Optional, Tuple
+from typing import Callable, List, Dict, Optional, Tuple
 import logging
-from datetime import datetime
+import heapq
 
 from .config import (
     MIN_USER_RATINGS,
@@ -18,13 +19,20 @@ from .config import (
     POSITIVE_RATING_THRESHOLD,
     NEGATIVE_RATING_THRESHOLD,
     MIN_POSITIVES_FOR_QUALITY,
+    CANDIDATE_SHORTLIST_SIZE,
 )
 from .utils.data_preprocessor import DataPreprocessor
 from .content_based.knn_recommender import KNNRecommender
 from .content_based.naive_bayes_recommender import NaiveBayesRecommender
 from .utils.similarity_metrics import SimilarityMetrics
+from .utils.feature_store import get_feature_store
+from .utils.candidate_shortlist import get_candidate_shortlist
+from .utils.description_index import get_description_index
 from app.models.recommendation import Recommendation
 from app.models.rating import Rating
+from app.models.user_taste_profile import TASTE_POLARITIES
+from app.repositories.recommendation_repository import RecommendationRepository
+from app.repositories.user_taste_profile_repository import UserTasteProfileRepository
 
 
 class MovieRecommender:
@@ -37,10 +45,24 @@ class MovieRecommender:
         self._knn_scores = {}
         self._nb_scores = {}
         self._adaptive_weights = {}
+        self._progress_callback = None
         logging.basicConfig(level=logging.INFO)
         self.logger = logging.getLogger(__name__)
 
-    def generate_recommendations(self, user_id: int) -> Dict[str, any]:
+    def generate_recommendations(
+        self,
+        user_id: int,
+        progress_callback: Optional[Callable[[str, float], None]] = None,
+        save: bool = True,
+    ) -> Dict[str, any]:
+        """
+        Args:
+            progress_callback: opcjonalnie wywoływany jako (etap, postęp 0-1)
+                na początku każdego kroku (np. aktualizacja RecommendationJob)
+            save: False = tylko wynik, zapis robi wołający (batch rebuild)
+        """
+        self._progress_callback = progress_callback
+
         try:
             if not self.preprocessor.check_user_eligibility(user_id):
                 actual_count = (
@@ -52,6 +74,7 @@ class MovieRecommender:
                     "recommendations": {"knn": [], "naive_bayes": [], "hybrid": []},
                 }
 
+            self._report_progress("training_data", 0.05)
             all_user_ratings = self.preprocessor.get_user_ratings(user_id)
             positive_ratings, negative_ratings, stats = (
                 self.preprocessor.get_training_data(all_user_ratings)
@@ -68,7 +91,22 @@ class MovieRecommender:
                     f"(recommended: {MIN_POSITIVES_FOR_QUALITY}+). Results may be suboptimal."
                 )
 
-            candidate_movies = self.preprocessor.get_candidate_movies(user_id)
+            self._adaptive_weights = self.preprocessor.analyze_user_preferences(
+                positive_ratings
+            )
+            preference_strength = (
+                max(self._adaptive_weights.values()) if self._adaptive_weights else 0.0
+            )
+
+            self._report_progress("candidates", 0.15)
+            # Cechy strukturalne kandydatów idą z feature store - bez ładowania relacji
+            candidate_movies = self.preprocessor.get_candidate_movies(
+                user_id,
+                with_relations=False,
+                movie_ids=self._get_candidate_shortlist(
+                    positive_ratings, all_user_ratings
+                ),
+            )
 
             if candidate_movies.empty:
                 return {
@@ -82,29 +120,25 @@ class MovieRecommender:
                 f"Candidates: {len(candidate_movies)} movies"
             )
 
-            self._adaptive_weights = self.preprocessor.analyze_user_preferences(
-                positive_ratings
-            )
-            preference_strength = (
-                max(self._adaptive_weights.values()) if self._adaptive_weights else 0.0
-            )
-
             self.logger.info(
                 f"Adaptive weights: {self._adaptive_weights}, "
                 f"max_strength={preference_strength:.3f}"
             )
 
             # 1. KNN Recommendations
+            self._report_progress("knn", 0.3)
             self._knn_scores = self._get_knn_recommendations(
-                positive_ratings, negative_ratings, candidate_movies
+                positive_ratings, negative_ratings, candidate_movies, user_id
             )
 
             # 2. Naive Bayes Recommendations
+            self._report_progress("naive_bayes", 0.55)
             self._nb_scores = self._get_nb_recommendations(
                 positive_ratings, negative_ratings, candidate_movies
             )
 
             # 3. Hybrid Recommendations (Ensemble)
+            self._report_progress("hybrid", 0.8)
             hybrid_scores = self._get_hybrid_recommendations(
                 self._knn_scores, self._nb_scores, preference_strength
             )
@@ -115,7 +149,9 @@ class MovieRecommender:
             )
 
             # 5. Save to DB
-            self._save_recommendations(user_id, top_recommendations)
+            if save:
+                self._report_progress("saving", 0.9)
+                self._save_recommendations(user_id, top_recommendations)
 
             return {
                 "success": True,
@@ -145,11 +181,44 @@ class MovieRecommender:
                 "recommendations": {"knn": [], "naive_bayes": [], "hybrid": []},
             }
 
+    def _report_progress(self, stage: str, progress: float) -> None:
+        if self._progress_callback is None:
+            return
+        try:
+            self._progress_callback(stage, progress)
+        except Exception as e:
+            # Raportowanie postępu nie może przerwać generowania
+            self.logger.warning(f"Progress callback failed at {stage}: {e}")
+
+    def _get_candidate_shortlist(
+        self, positive_ratings: pd.DataFrame, all_user_ratings: pd.DataFrame
+    ) -> Optional[List[int]]:
+        """
+        Ograniczona lista kandydatów z indeksów odwróconych (CandidateShortlist);
+        None = cały nieoceniony katalog (mały katalog, wyłączona lub błąd)
+        """
+        if CANDIDATE_SHORTLIST_SIZE <= 0:
+            return None
+
+        try:
+            movie_ids = get_candidate_shortlist(self.db).select(
+                positive_ratings["movie_id"].tolist(),
+                all_user_ratings["movie_id"].tolist(),
+                self._adaptive_weights,
+                CANDIDATE_SHORTLIST_SIZE,
+            )
+            return movie_ids.tolist() if movie_ids is not None else None
+
+        except Exception as e:
+            self.logger.error(f"Candidate shortlist error: {e}", exc_info=True)
+            return None
+
     def _get_knn_recommendations(
         self,
         positive_ratings: pd.DataFrame,
         negative_ratings: pd.DataFrame,
         candidate_movies: pd.DataFrame,
+        user_id: Optional[int] = None,
     ) -> Dict[int, float]:
         try:
             self.logger.info(
@@ -157,39 +226,45 @@ class MovieRecommender:
                 f"{len(negative_ratings)} negative ratings"
             )
 
-            positive_features = self.preprocessor.prepare_structural_features(
-                positive_ratings, user_ratings=positive_ratings
-            )
+            feature_store = get_feature_store(self.db)
 
-            negative_features = (
-                self.preprocessor.prepare_structural_features(
-                    negative_ratings, user_ratings=positive_ratings
-                )
+            positive_ids = positive_ratings["movie_id"].tolist()
+            negative_ids = (
+                negative_ratings["movie_id"].tolist()
                 if not negative_ratings.empty
-                else pd.DataFrame()
+                else []
             )
+            candidate_ids = candidate_movies["movie_id"].tolist()
 
-            candidate_features = self.preprocessor.prepare_structural_features(
-                candidate_movies, user_ratings=positive_ratings
+            profile = self._get_taste_profile(
+                user_id, feature_store, positive_ids, negative_ids
             )
+            if profile is not None:
+                return self._get_knn_profile_recommendations(
+                    profile, feature_store, candidate_ids
+                )
 
-            positive_aligned, candidates_aligned = self.preprocessor.align_features(
-                positive_features, candidate_features
+            # Tylko kolumny niezerowe w tym zbiorze filmów - reszta katalogu
+            # nie wpływa na podobieństwo cosinusowe
+            _, positive_matrix = feature_store.get_features(positive_ids)
+            _, negative_matrix = feature_store.get_features(negative_ids)
+            candidate_ids, candidate_matrix = feature_store.get_features(candidate_ids)
+            columns = feature_store.active_columns(
+                positive_matrix, negative_matrix, candidate_matrix
             )
+            feature_names = [feature_store.all_feature_names[i] for i in columns]
 
-            if not negative_features.empty:
-                negative_aligned, _ = self.preprocessor.align_features(
-                    negative_features, candidates_aligned
-                )
-            else:
-                negative_aligned = pd.DataFrame()
-
-            knn_scores = self.knn_recommender.recommend(
-                positive_ratings=positive_ratings,
-                positive_features=positive_aligned,
-                negative_ratings=negative_ratings,
-                negative_features=negative_aligned,
-                candidate_features=candidates_aligned,
+            self.logger.info(
+                f"K-NN features from store: {len(columns)} active of "
+                f"{len(feature_store.all_feature_names)} columns"
+            )
+
+            knn_scores = self.knn_recommender.recommend_sparse(
+                positive_matrix=positive_matrix[:, columns],
+                negative_matrix=(negative_matrix[:, columns] if negative_ids else None),
+                candidate_movie_ids=candidate_ids,
+                candidate_matrix=candidate_matrix[:, columns],
+                feature_names=feature_names,
                 adaptive_weights=self._adaptive_weights,
                 top_k=len(candidate_movies),
             )
@@ -208,6 +283,88 @@ class MovieRecommender:
             self.logger.error(f"K-NN error: {e}", exc_info=True)
             return {}
 
+    def _get_taste_profile(self, user_id, feature_store, positive_ids, negative_ids):
+        """
+        Zapisany profil gustu, jeśli jego okna to dokładnie bieżące oceny
+        treningowe i store zna wszystkie jego filmy i cechy; inaczej None
+        (ocena zapisana z pominięciem repozytorium, usunięty film) - wtedy
+        profil liczony jest z wierszy store'u. Brakujący profil (unieważniony
+        po zmianie metadanych filmu, sprzed migracji) jest liczony od nowa.
+        """
+        if user_id is None:
+            return None
+
+        try:
+            profile = UserTasteProfileRepository(self.db).ensure(user_id)
+        except Exception as e:
+            self.db.rollback()
+            self.logger.error(f"K-NN: taste profile of user {user_id}: {e}")
+            return None
+        if profile is None:
+            return None
+
+        for polarity, movie_ids in (
+            ("positive", positive_ids),
+            ("negative", negative_ids),
+        ):
+            window_ids = profile.movie_ids(polarity)
+            if window_ids != movie_ids or any(
+                movie_id not in feature_store for movie_id in window_ids
+            ):
+                self.logger.info(
+                    f"K-NN: stored taste profile of user {user_id} is out of date "
+                    f"({polarity} window), building profile from feature store"
+                )
+                return None
+            if feature_store.profile_columns(profile.counts(polarity)) is None:
+                return None
+
+        return profile
+
+    def _get_knn_profile_recommendations(
+        self, profile, feature_store, candidate_ids
+    ) -> Dict[int, float]:
+        """K-NN z zapisanego profilu gustu - bez wycinania wierszy ocenionych filmów"""
+        candidate_ids, candidate_matrix = feature_store.get_features(candidate_ids)
+
+        windows = {p: profile.window(p) for p in TASTE_POLARITIES}
+        counts = {p: profile.counts(p) for p in TASTE_POLARITIES}
+        columns = np.union1d(
+            feature_store.active_columns(candidate_matrix),
+            np.concatenate(
+                [feature_store.profile_columns(counts[p]) for p in TASTE_POLARITIES]
+            ),
+        ).astype(np.int64)
+        feature_names = [feature_store.all_feature_names[i] for i in columns]
+
+        self.logger.info(
+            f"K-NN features from stored taste profile: {len(columns)} active of "
+            f"{len(feature_store.all_feature_names)} columns"
+        )
+
+        vectors = {
+            p: feature_store.profile_vector(windows[p], counts[p], columns)
+            for p in TASTE_POLARITIES
+        }
+        knn_scores = self.knn_recommender.recommend_profile(
+            positive_profile=vectors["positive"],
+            negative_profile=vectors["negative"] if windows["negative"] else None,
+            positive_count=len(windows["positive"]),
+            negative_count=len(windows["negative"]),
+            candidate_movie_ids=candidate_ids,
+            candidate_matrix=candidate_matrix[:, columns],
+            feature_names=feature_names,
+            adaptive_weights=self._adaptive_weights,
+            top_k=len(candidate_ids),
+        )
+
+        knn_scores_dict = {movie_id: score for movie_id, score in knn_scores}
+        if knn_scores_dict:
+            avg = sum(knn_scores_dict.values()) / len(knn_scores_dict)
+            self.logger.info(f"K-NN: {len(knn_scores_dict)} predictions, avg={avg:.3f}")
+
+        return knn_scores_dict
+
     def _get_nb_recommendations(
         self,
         positive_ratings: pd.DataFrame,
@@ -224,31 +381,20 @@ class MovieRecommender:
             negative_movie_ids = negative_ratings["movie_id"].tolist()
             candidate_movie_ids = candidate_movies["movie_id"].tolist()
 
-            all_movie_ids = list(
-                set(positive_movie_ids + negative_movie_ids + candidate_movie_ids)
-            )
-            all_descriptions = self.preprocessor.get_movie_descriptions(all_movie_ids)
-
-            positive_descriptions = all_descriptions[
-                all_descriptions["movie_id"].isin(positive_movie_ids)
-            ]
-            negative_descriptions = all_descriptions[
-                all_descriptions["movie_id"].isin(negative_movie_ids)
-            ]
-            candidate_descriptions = all_descriptions[
-                all_descriptions["movie_id"].isin(candidate_movie_ids)
-            ]
+            description_index = get_description_index(self.db)
 
             self.logger.info(
-                f"Descriptions: {len(positive_descriptions)} positive, "
-                f"{len(negative_descriptions)} negative, {len(candidate_descriptions)} candidates"
+                f"Descriptions: {sum(mid in description_index for mid in positive_movie_ids)} positive, "
+                f"{sum(mid in description_index for mid in negative_movie_ids)} negative, "
+                f"{sum(mid in description_index for mid in candidate_movie_ids)} candidates"
             )
 
-            nb_predictions = self.nb_recommender.recommend(
-                positive_descriptions=positive_descriptions,
-                negative_descriptions=negative_descriptions,
-                candidate_descriptions=candidate_descriptions,
-                top_k=len(candidate_descriptions),
+            nb_predictions = self.nb_recommender.recommend_from_index(
+                description_index,
+                positive_movie_ids,
+                negative_movie_ids,
+                candidate_movie_ids,
+                top_k=len(candidate_movie_ids),
             )
 
             # --- FIX: Slight confidence dampening for Naive Bayes ---
@@ -315,24 +461,23 @@ class MovieRecommender:
         candidate_movies: pd.DataFrame,
     ) -> Dict[str, List[Dict]]:
         used_ids = set()
+        candidate_info = self._index_candidates(candidate_movies)
 
         # 1. Select top KNN
-        top_knn_items = sorted(knn_scores.items(), key=lambda x: x[1], reverse=True)[
-            :KNN_RECOMMENDATIONS
-        ]
+        top_knn_items = heapq.nlargest(
+            KNN_RECOMMENDATIONS, knn_scores.items(), key=lambda x: x[1]
+        )
         top_knn = []
 
         for movie_id, score in top_knn_items:
             try:
-                movie_info = candidate_movies[
-                    candidate_movies["movie_id"] == movie_id
-                ].iloc[0]
+                movie_info = candidate_info[movie_id]
                 top_knn.append(
                     {
                         "movie_id": int(movie_id),
                         "title": movie_info["title"],
                         "score": float(score),
-                        "description": movie_info.get("description", ""),
+                        "description": movie_info["description"],
                         "algorithm_type": "knn",
                     }
                 )
@@ -341,7 +486,8 @@ class MovieRecommender:
                 self.logger.error(f"Error serializing KNN movie {movie_id}: {e}")
 
         # 2. Select top Naive Bayes (skipping duplicates)
-        nb_candidates = sorted(nb_scores.items(), key=lambda x: x[1], reverse=True)
+        # Wystarczy top NB + liczba już wybranych (tyle maksymalnie pominiemy)
+        nb_candidates = self._ranked(nb_scores, NB_RECOMMENDATIONS + len(used_ids))
         top_nb = []
         nb_skipped = 0
 
@@ -351,15 +497,13 @@ class MovieRecommender:
                 continue
 
             try:
-                movie_info = candidate_movies[
-                    candidate_movies["movie_id"] == movie_id
-                ].iloc[0]
+                movie_info = candidate_info[movie_id]
                 top_nb.append(
                     {
                         "movie_id": int(movie_id),
                         "title": movie_info["title"],
                         "score": float(score),
-                        "description": movie_info.get("description", ""),
+                        "description": movie_info["description"],
                         "algorithm_type": "naive_bayes",
                     }
                 )
@@ -374,7 +518,11 @@ class MovieRecommender:
         # 3. Select top Hybrid (skipping duplicates if configured)
         top_hybrid = []
         duplicates_skipped = 0
-        sorted_hybrid = sorted(hybrid_scores.items(), key=lambda x: x[1], reverse=True)
+        sorted_hybrid = self._ranked(
+            hybrid_scores,
+            HYBRID_RECOMMENDATIONS
+            + (len(used_ids) if HYBRID_EXCLUDE_DUPLICATES else 0),
+        )
 
         for movie_id, score in sorted_hybrid:
             if HYBRID_EXCLUDE_DUPLICATES and movie_id in used_ids:
@@ -382,9 +530,7 @@ class MovieRecommender:
                 continue
 
             try:
-                movie_info = candidate_movies[
-                    candidate_movies["movie_id"] == movie_id
-                ].iloc[0]
+                movie_info = candidate_info[movie_id]
                 knn_score = knn_scores.get(movie_id, 0.0)
                 nb_score = nb_scores.get(movie_id, 0.0)
 
@@ -393,7 +539,7 @@ class MovieRecommender:
                         "movie_id": int(movie_id),
                         "title": movie_info["title"],
                         "score": float(score),
-                        "description": movie_info.get("description", ""),
+                        "description": movie_info["description"],
                         "algorithm_type": "hybrid",
                         "breakdown": {
                             "knn_score": float(knn_score),
@@ -419,38 +565,56 @@ class MovieRecommender:
 
         return {"knn": top_knn, "naive_bayes": top_nb, "hybrid": top_hybrid}
 
+    @staticmethod
+    def _index_candidates(candidate_movies: pd.DataFrame) -> Dict[int, Dict]:
+        """movie_id -> {"title", "description"} - lookup O(1) zamiast skanu DataFrame"""
+        titles = candidate_movies["title"].tolist()
+        descriptions = (
+            candidate_movies["description"].tolist()
+            if "description" in candidate_movies.columns
+            else [""] * len(titles)
+        )
+        return {
+            movie_id: {"title": title, "description": description}
+            for movie_id, title, description in zip(
+                candidate_movies["movie_id"].tolist(), titles, descriptions
+            )
+        }
+
+    @staticmethod
+    def _ranked(scores: Dict[int, float], first_n: int):
+        """
+        (movie_id, score) malejąco po score - jak sorted(..., reverse=True).
+        Pierwsze first_n przez heap; resztę sortuje tylko, gdy wołający
+        przejdzie dalej (np. same błędy / duplikaty).
+        """
+        top = heapq.nlargest(first_n, scores.items(), key=lambda x: x[1])
+        yield from top
+
+        if len(top) < len(scores):
+            rest = sorted(scores.items(), key=lambda x: x[1], reverse=True)
+            yield from rest[len(top) :]
+
     def _save_recommendations(
         self, user_id: int, recommendations: Dict[str, List[Dict]]
     ) -> None:
+        """Zastępuje rekomendacje użytkownika jednym DELETE + jednym bulk INSERT"""
         try:
-            deleted = (
-                self.db.query(Recommendation)
-                .filter(Recommendation.user_id == user_id)
-                .delete()
-            )
             all_recs = (
                 recommendations["knn"]
                 + recommendations["naive_bayes"]
                 + recommendations["hybrid"]
             )
 
-            for rec in all_recs:
-                recommendation = Recommendation(
-                    user_id=user_id,
-                    movie_id=rec["movie_id"],
-                    score=rec["score"],
-                    algorithm_type=rec["algorithm_type"],
-                    created_at=datetime.utcnow(),
-                )
-                self.db.add(recommendation)
+            saved = RecommendationRepository(self.db).bulk_replace_user_recommendations(
+                {user_id: all_recs}
+            )
 
-            self.db.commit()
             self.logger.info(
-                f"Saved {len(all_recs)} recommendations (deleted {deleted} old) with algorithm_type tags"
+                f"Saved {saved} recommendations (bulk replace) with algorithm_type tags"
             )
 
         except Exception as e:
-            self.db.rollback()
             self.logger.error(f"Save recommendations failed: {e}", exc_info=True)
             raise
 
@@ -458,13 +622,7 @@ class MovieRecommender:
         self, user_id: int, movie_id: int
     ) -> Dict[str, any]:
         try:
-            all_ratings = self.preprocessor.get_user_ratings(user_id)
-            positive_ratings, negative_ratings, _ = self.preprocessor.get_training_data(
-                all_ratings
-            )
-            adaptive_weights = self.preprocessor.analyze_user_preferences(
-                positive_ratings
-            )
+            adaptive_weights, _ = self.preprocessor.get_user_preferences(user_id)
 
             rec = (
                 self.db.query(Recommendation)
@@ -509,10 +667,8 @@ class MovieRecommender:
 
     def analyze_user_preference_trends(self, user_id: int) -> Dict[str, any]:
         try:
-            all_ratings = self.preprocessor.get_user_ratings(user_id)
-            positive_ratings, _, _ = self.preprocessor.get_training_data(all_ratings)
-            adaptive_weights = self.preprocessor.analyze_user_preferences(
-                positive_ratings
+            adaptive_weights, positive_count = self.preprocessor.get_user_preferences(
+                user_id
             )
 
             max_weight = max(adaptive_weights.values()) if adaptive_weights else 0
@@ -535,7 +691,7 @@ class MovieRecommender:
                 "adaptive_weights": adaptive_weights,
                 "dominant_feature": dominant_feature,
                 "specialization_level": float(max_weight),
-                "positive_ratings_count": len(positive_ratings),
+                "positive_ratings_count": positive_count,
                 "interpretation": (
                     f"User shows strong preference for {dominant_feature}"
                     if max_weight > 0.5
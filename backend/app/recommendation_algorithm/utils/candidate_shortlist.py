@@ -0,0 +1,322 @@
+from sqlalchemy.orm import Session
+import numpy as np
+from typing import Dict, Iterable, Optional, Tuple
+import logging
+import threading
+
+from ..config import (
+    CANDIDATE_SHORTLIST_SEED_TERMS,
+    CANDIDATE_SHORTLIST_TEXT_SHARE,
+)
+from .description_index import MovieDescriptionIndex, get_description_index
+from .feature_store import MovieFeatureStore, get_feature_store
+
+# Grupy kolumn MovieFeatureStore -> klucz wag adaptacyjnych (jak w
+# KNNRecommender._build_feature_weights)
+WEIGHT_GROUPS = (
+    ("genre_", "genres"),
+    ("actor_", "actors"),
+    ("director_", "directors"),
+    ("country_", "country"),
+)
+
+# Bonusy K-NN za dopasowanych aktorów / reżyserów (KNNRecommender.predict_sparse)
+ACTOR_BONUS_VAL = 0.10
+DIRECTOR_BONUS_VAL = 0.12
+
+
+class CandidateShortlist:
+    """
+    Pierwszy etap rekomendacji: ograniczona lista kandydatów dla K-NN i NB
+    zamiast całego katalogu, z indeksów odwróconych
+
+    - cecha (genre_/actor_/director_/country_) -> filmy: transpozycja (CSC)
+      macierzy MovieFeatureStore
+    - dekada premiery -> filmy: wiersze store'u pogrupowane po roku
+    - term opisu -> filmy: transpozycja liczności MovieDescriptionIndex
+
+    Ziarna to cechy, dekady i najmocniejsze termy (TF-IDF) filmów ocenionych
+    pozytywnie, więc koszt zależy od długości ich list, nie od wielkości
+    katalogu. CANDIDATE_SHORTLIST_TEXT_SHARE listy zajmują filmy najbliższe
+    w opisach (pod NB), resztę - najbliższe strukturalnie (przybliżenie
+    cosinusa K-NN z wagami adaptacyjnymi i bonusami), a gdy tych brakuje,
+    filmy z dekad coraz dalszych od ulubionej.
+
+    Indeksy budowane są raz na wersję store'u / indeksu opisów (po
+    odświeżeniu filmów registry podmienia instancje).
+    """
+
+    def __init__(
+        self,
+        feature_store: MovieFeatureStore,
+        description_index: MovieDescriptionIndex,
+    ):
+        self.feature_store = feature_store
+        self.description_index = description_index
+        self.logger = logging.getLogger(__name__)
+
+        matrix = feature_store.matrix
+        self.feature_postings = matrix.tocsc()
+        self.feature_groups = np.full(len(feature_store.feature_names), -1)
+        for group, (prefix, _) in enumerate(WEIGHT_GROUPS):
+            for col, name in enumerate(feature_store.feature_names):
+                if name.startswith(prefix):
+                    self.feature_groups[col] = group
+
+        # Liczba cech filmu w każdej grupie - z niej norma ważonego wektora
+        # kandydata (mianownik cosinusa) bez wycinania jego wiersza
+        self.group_counts = np.zeros((len(feature_store), len(WEIGHT_GROUPS)))
+        row_of_entry = np.repeat(np.arange(matrix.shape[0]), np.diff(matrix.indptr))
+        grouped = self.feature_groups[matrix.indices] >= 0
+        np.add.at(
+            self.group_counts,
+            (row_of_entry[grouped], self.feature_groups[matrix.indices][grouped]),
+            1.0,
+        )
+
+        self.decades = np.where(
+            np.isnan(feature_store.years), -1, feature_store.years // 10
+        ).astype(np.int64)
+        order = np.argsort(self.decades, kind="stable")
+        keys, starts = np.unique(self.decades[order], return_index=True)
+        self.decade_postings = dict(zip(keys.tolist(), np.split(order, starts[1:])))
+
+        counts = description_index.counts
+        self.term_postings = counts.tocsc()
+        # wiersz indeksu opisów -> wiersz store'u (-1 gdy filmu nie ma w store)
+        self.text_rows = np.asarray(
+            [
+                feature_store.row_index.get(int(mid), -1)
+                for mid in description_index.movie_ids
+            ],
+            dtype=np.int64,
+        )
+        doc_freq = np.diff(self.term_postings.indptr)
+        self.term_idf = np.log((1 + len(description_index)) / (1 + doc_freq)) + 1.0
+        self.text_norms = np.sqrt(
+            np.maximum(np.asarray(counts.sum(axis=1)).ravel(), 1.0)
+        )
+
+        self.logger.info(
+            f"Candidate shortlist index built: {self.feature_postings.shape[1]} "
+            f"features, {len(self.decade_postings)} decades, "
+            f"{self.term_postings.shape[1]} terms"
+        )
+
+    def is_built_from(self, feature_store, description_index) -> bool:
+        return (
+            self.feature_store is feature_store
+            and self.description_index is description_index
+        )
+
+    def select(
+        self,
+        positive_ids: Iterable[int],
+        excluded_ids: Iterable[int],
+        adaptive_weights: Dict[str, float],
+        size: int,
+    ) -> Optional[np.ndarray]:
+        """
+        Args:
+            excluded_ids: filmy już ocenione (nie trafiają na listę)
+            size: długość listy (CANDIDATE_SHORTLIST_SIZE)
+
+        Returns:
+            movie_ids kandydatów albo None, gdy nieocenionych filmów jest nie
+            więcej niż size - wtedy punktowany jest cały katalog
+        """
+        store = self.feature_store
+        excluded = self._rows(excluded_ids)
+        if size <= 0 or len(store) - len(excluded) <= size:
+            return None
+
+        positive_rows = self._rows(positive_ids)
+        blocked = np.zeros(len(store), dtype=bool)
+        blocked[excluded] = True
+
+        chosen = []
+        text_rows, text_scores = self._text_scores(positive_ids)
+        self._take(
+            chosen,
+            blocked,
+            text_rows,
+            text_scores,
+            int(size * CANDIDATE_SHORTLIST_TEXT_SHARE),
+        )
+        structural_rows, structural_scores = self._structural_scores(
+            positive_rows, adaptive_weights
+        )
+        self._take(chosen, blocked, structural_rows, structural_scores, size)
+        if sum(len(rows) for rows in chosen) < size:
+            self._fill_by_decade(chosen, blocked, positive_rows, size)
+
+        rows = np.concatenate(chosen) if chosen else np.zeros(0, dtype=np.int64)
+        self.logger.info(
+            f"Candidate shortlist: {len(rows)} of {len(store) - len(excluded)} "
+            f"unrated movies ({len(text_rows)} reached by terms, "
+            f"{len(structural_rows)} by features / decades)"
+        )
+        return store.movie_ids[rows]
+
+    def _rows(self, movie_ids: Iterable[int]) -> np.ndarray:
+        row_index = self.feature_store.row_index
+        return np.asarray(
+            [row_index[int(mid)] for mid in movie_ids if int(mid) in row_index],
+            dtype=np.int64,
+        )
+
+    def _structural_scores(
+        self, positive_rows: np.ndarray, adaptive_weights: Dict[str, float]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Przybliżenie wyniku K-NN dla filmów z list ziaren: cosinus ważonego
+        profilu cech (bez roku / czasu trwania) + bonusy za aktorów
+        i reżyserów, plus udział ulubionych dekad z wagą roku
+        """
+        if len(positive_rows) == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+
+        positives = self.feature_store.matrix[positive_rows]
+        seeds, seed_counts = np.unique(positives.indices, return_counts=True)
+        groups = self.feature_groups[seeds]
+        seeds, seed_counts, groups = (
+            seeds[groups >= 0],
+            seed_counts[groups >= 0],
+            groups[groups >= 0],
+        )
+
+        group_weights = np.asarray(
+            [adaptive_weights.get(key, 1.0) for _, key in WEIGHT_GROUPS]
+        )
+        profile = seed_counts / len(positive_rows)
+        weights = group_weights[groups]
+        profile_norm = np.linalg.norm(weights * profile)
+
+        postings = self.feature_postings[:, seeds]
+        column_of_entry = np.repeat(np.arange(len(seeds)), np.diff(postings.indptr))
+        rows, inverse = np.unique(postings.indices, return_inverse=True)
+
+        dots = np.bincount(
+            inverse,
+            weights=(weights**2 * profile)[column_of_entry],
+            minlength=len(rows),
+        )
+        candidate_norms = np.sqrt(self.group_counts[rows] @ group_weights**2)
+        denominator = candidate_norms * profile_norm
+        scores = np.divide(
+            dots, denominator, out=np.zeros_like(dots), where=denominator > 0
+        )
+
+        for group, bonus in ((1, ACTOR_BONUS_VAL), (2, DIRECTOR_BONUS_VAL)):
+            strength = np.bincount(
+                inverse,
+                weights=np.where(groups == group, profile, 0.0)[column_of_entry],
+                minlength=len(rows),
+            )
+            scores += np.where(strength > 0, bonus * (1.0 + np.log1p(strength)), 0.0)
+
+        # Dekady: filmy bez wspólnych cech, ale z ulubionego okresu
+        positive_decades = self.decades[positive_rows]
+        decades, decade_counts = np.unique(
+            positive_decades[positive_decades >= 0], return_counts=True
+        )
+        year_weight = adaptive_weights.get("year", 1.0)
+        decade_rows = [rows] + [
+            self.decade_postings.get(decade, np.zeros(0, dtype=np.int64))
+            for decade in decades.tolist()
+        ]
+        decade_scores = [scores] + [
+            np.full(
+                len(decade_rows[i + 1]),
+                year_weight * count / len(positive_rows),
+            )
+            for i, count in enumerate(decade_counts.tolist())
+        ]
+        return _accumulate(np.concatenate(decade_rows), np.concatenate(decade_scores))
+
+    def _text_scores(
+        self, positive_ids: Iterable[int]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Zbliżenie opisów: suma TF-IDF najmocniejszych termów opisów filmów
+        pozytywnych (CANDIDATE_SHORTLIST_SEED_TERMS) w opisie kandydata
+        """
+        _, counts = self.description_index.get_counts(positive_ids)
+        if counts.nnz == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+
+        n_terms = self.term_postings.shape[1]
+        term_weights = np.bincount(
+            counts.indices, weights=counts.data, minlength=n_terms
+        )[:n_terms]
+        term_weights *= self.term_idf
+        seeds = np.flatnonzero(term_weights)
+        if len(seeds) > CANDIDATE_SHORTLIST_SEED_TERMS:
+            seeds = seeds[
+                np.argpartition(-term_weights[seeds], CANDIDATE_SHORTLIST_SEED_TERMS)[
+                    :CANDIDATE_SHORTLIST_SEED_TERMS
+                ]
+            ]
+
+        postings = self.term_postings[:, seeds]
+        column_of_entry = np.repeat(np.arange(len(seeds)), np.diff(postings.indptr))
+        values = (
+            postings.data
+            * (term_weights[seeds] * self.term_idf[seeds])[column_of_entry]
+            / self.text_norms[postings.indices]
+        )
+        rows = self.text_rows[postings.indices]
+        known = rows >= 0
+        return _accumulate(rows[known], values[known])
+
+    @staticmethod
+    def _take(chosen, blocked, rows, scores, limit) -> None:
+        """Dopisuje do `chosen` najlepsze niezablokowane wiersze, aż lista ma `limit`"""
+        free = ~blocked[rows]
+        rows, scores = rows[free], scores[free]
+        needed = limit - sum(len(taken) for taken in chosen)
+        if needed <= 0 or len(rows) == 0:
+            return
+
+        if len(rows) > needed:
+            best = np.argpartition(-scores, needed - 1)[:needed]
+            rows = rows[best]
+        chosen.append(rows)
+        blocked[rows] = True
+
+    def _fill_by_decade(self, chosen, blocked, positive_rows, size) -> None:
+        """Dopełnia listę filmami z dekad coraz dalszych od mediany filmów pozytywnych"""
+        known = self.decades[positive_rows]
+        known = known[known >= 0]
+        center = int(np.median(known)) if len(known) else 0
+        decades = sorted(
+            self.decade_postings, key=lambda d: (d < 0, abs(d - center), d)
+        )
+        for decade in decades:
+            rows = self.decade_postings[decade]
+            self._take(chosen, blocked, rows, np.zeros(len(rows)), size)
+            if sum(len(taken) for taken in chosen) >= size:
+                return
+
+
+def _accumulate(rows: np.ndarray, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Sumy wartości per wiersz: (unikalne wiersze, sumy)"""
+    rows, inverse = np.unique(rows, return_inverse=True)
+    return rows, np.bincount(inverse, weights=values, minlength=len(rows))
+
+
+_shortlist = None
+_lock = threading.Lock()
+
+
+def get_candidate_shortlist(db_session: Session) -> CandidateShortlist:
+    """Indeksy odwrócone dla bieżącego store'u i indeksu opisów procesu"""
+    global _shortlist
+    feature_store = get_feature_store(db_session)
+    description_index = get_description_index(db_session)
+    with _lock:
+        if _shortlist is None or not _shortlist.is_built_from(
+            feature_store, description_index
+        ):
+            _shortlist = CandidateShortlist(feature_store, description_index)
+        return _shortlist
@@ -3,8 +3,12 @@ import pandas as pd
 from typing import Dict, List, Optional, Tuple
 import logging
 import numpy as np
-from collections import Counter
+import scipy.sparse as sp
+from collections import Counter, OrderedDict
+from itertools import chain
+from sqlalchemy import func
 import re
+import threading
 
 from ..config import (
     MIN_USER_RATINGS,
@@ -33,6 +37,7 @@ from ..config import (
     MIN_POSITIVES_FOR_QUALITY,
     TOP_ACTORS_IN_PATTERN,
     MIN_PATTERN_OCCURRENCES,
+    PREFERENCE_CACHE_SIZE,
 )
 from app.models.rating import Rating
 from app.models.movie import Movie
@@ -45,6 +50,12 @@ from app.models.movie_actor import MovieActor
 from app.models.movie_director import MovieDirector
 from ..content_based.tfidf_processor import TFIDFProcessor
 
+# user_id -> (wersja ocen, wagi, liczba pozytywnych ocen) - get_user_preferences
+_preferences_cache: "OrderedDict[int, Tuple[Tuple, Dict[str, float], int]]" = (
+    OrderedDict()
+)
+_preferences_lock = threading.Lock()
+
 
 class DataPreprocessor:
     def __init__(self, db_session: Session):
@@ -172,7 +183,18 @@ class DataPreprocessor:
 
         return positive_training, negative_training, stats
 
-    def get_candidate_movies(self, user_id: int) -> pd.DataFrame:
+    def get_candidate_movies(
+        self,
+        user_id: int,
+        with_relations: bool = True,
+        movie_ids: Optional[List[int]] = None,
+    ) -> pd.DataFrame:
+        """
+        Args:
+            with_relations: dołącz listy genres/actors/directors; niepotrzebne,
+                gdy cechy strukturalne pochodzą z MovieFeatureStore
+            movie_ids: tylko te filmy (shortlista kandydatów); None = cały katalog
+        """
         rated_movie_ids = [
             r.movie_id
             for r in self.db.query(Rating.movie_id)
@@ -193,7 +215,13 @@ class DataPreprocessor:
         if rated_movie_ids:
             query = query.filter(~Movie.movie_id.in_(rated_movie_ids))
 
-        results = query.all()
+        if movie_ids is None:
+            results = query.all()
+        else:
+            results = []
+            for i in range(0, len(movie_ids), BATCH_SIZE):
+                batch_ids = movie_ids[i : i + BATCH_SIZE]
+                results.extend(query.filter(Movie.movie_id.in_(batch_ids)).all())
 
         data = [
             {
@@ -213,11 +241,13 @@ class DataPreprocessor:
         if not df.empty:
             df = df.sample(frac=1.0, random_state=None).reset_index(drop=True)
 
-        df = self._add_genres_to_dataframe(df)
-        df = self._add_actors_to_dataframe(df)
-        df = self._add_directors_to_dataframe(df)
+        if with_relations:
+            df = self._add_genres_to_dataframe(df)
+            df = self._add_actors_to_dataframe(df)
+            df = self._add_directors_to_dataframe(df)
 
-        self.logger.info(f"Pobrano {len(df)} candidate movies (all unrated, shuffled)")
+        scope = "all unrated" if movie_ids is None else "shortlisted"
+        self.logger.info(f"Pobrano {len(df)} candidate movies ({scope}, shuffled)")
         return df
 
     def analyze_user_preferences(self, user_ratings: pd.DataFrame) -> Dict[str, float]:
@@ -232,11 +262,13 @@ class DataPreprocessor:
             )
             return self._get_default_weights()
 
-        director_patterns = self._analyze_director_patterns(high_rated)
-        actor_patterns = self._analyze_actor_patterns(high_rated)
-        genre_patterns = self._analyze_genre_patterns(high_rated)
-        country_patterns = self._analyze_country_patterns(high_rated)
-        year_patterns = self._analyze_year_patterns(high_rated)
+        (
+            director_patterns,
+            actor_patterns,
+            genre_patterns,
+            country_patterns,
+            year_patterns,
+        ) = self._extract_preference_patterns(high_rated)
 
         return self._calculate_adaptive_weights(
             director_patterns,
@@ -255,83 +287,114 @@ class DataPreprocessor:
             "year": ADAPTIVE_BASE_YEAR_WEIGHT,
         }
 
-    def _analyze_director_patterns(self, high_rated: pd.DataFrame) -> Dict[str, int]:
-        director_counts = {}
-        for _, row in high_rated.iterrows():
-            directors = row.get("directors", [])
-            if isinstance(directors, list):
-                for director in directors:
-                    director_counts[director] = director_counts.get(director, 0) + 1
+    def get_ratings_version(self, user_id: int) -> Tuple:
+        """
+        Wersja ocen użytkownika (liczba, ostatnia zmiana, suma) - jedno zapytanie.
+        Dodanie, zmiana (aktualizuje rated_at) i usunięcie oceny zmieniają wersję.
+        """
+        count, last_rated_at, total = (
+            self.db.query(
+                func.count(Rating.rating_id),
+                func.max(Rating.rated_at),
+                func.coalesce(func.sum(Rating.rating), 0),
+            )
+            .filter(Rating.user_id == user_id)
+            .one()
+        )
+        return int(count), last_rated_at, int(total)
+
+    def get_user_preferences(self, user_id: int) -> Tuple[Dict[str, float], int]:
+        """
+        Adaptacyjne wagi (analyze_user_preferences na pozytywnych ocenach
+        treningowych) i liczba tych ocen - z cache procesu, dopóki wersja ocen
+        użytkownika się nie zmieni; bez trafienia ładuje oceny z bazy
+
+        Returns:
+            (wagi, liczba pozytywnych ocen treningowych)
+        """
+        version = self.get_ratings_version(user_id)
+        with _preferences_lock:
+            cached = _preferences_cache.get(user_id)
+            if cached is not None and cached[0] == version:
+                _preferences_cache.move_to_end(user_id)
+                return dict(cached[1]), cached[2]
+
+        all_ratings = self.get_user_ratings(user_id)
+        positive_ratings, _, _ = self.get_training_data(all_ratings)
+        weights = self.analyze_user_preferences(positive_ratings)
+
+        with _preferences_lock:
+            _preferences_cache[user_id] = (
+                version,
+                dict(weights),
+                len(positive_ratings),
+            )
+            _preferences_cache.move_to_end(user_id)
+            while len(_preferences_cache) > PREFERENCE_CACHE_SIZE:
+                _preferences_cache.popitem(last=False)
+        return weights, len(positive_ratings)
+
+    def _extract_preference_patterns(self, high_rated: pd.DataFrame) -> Tuple[
+        Dict[str, int],
+        Dict[str, int],
+        Dict[str, int],
+        Dict[int, int],
+        Dict[int, int],
+    ]:
+        """
+        Powtarzające się (>= MIN_PATTERN_OCCURRENCES) reżyserzy, aktorzy
+        (pierwsi TOP_ACTORS_IN_PATTERN z obsady), gatunki, kraje i dekady
+        premiery - jedno przejście po kolumnach zamiast iterrows() na wzorzec
+
+        Returns:
+            (director_patterns, actor_patterns, genre_patterns,
+             country_patterns, year_patterns)
+        """
+
+        def lists(column: str, limit: Optional[int] = None):
+            if column not in high_rated.columns:
+                return ()
+            return (
+                values[:limit]
+                for values in high_rated[column].tolist()
+                if isinstance(values, list)
+            )
 
-        repeated = {
-            d: c for d, c in director_counts.items() if c >= MIN_PATTERN_OCCURRENCES
-        }
-        if repeated:
-            self.logger.info(f"Director patterns: {repeated}")
-        return repeated
-
-    def _analyze_actor_patterns(self, high_rated: pd.DataFrame) -> Dict[str, int]:
-        actor_counts = {}
-        for _, row in high_rated.iterrows():
-            actors = row.get("actors", [])
-            if isinstance(actors, list):
-                for actor in actors[:TOP_ACTORS_IN_PATTERN]:
-                    actor_counts[actor] = actor_counts.get(actor, 0) + 1
-
-        repeated = {
-            a: c for a, c in actor_counts.items() if c >= MIN_PATTERN_OCCURRENCES
-        }
-        if repeated:
-            self.logger.info(f"Actor patterns: {repeated}")
-        return repeated
-
-    def _analyze_genre_patterns(self, high_rated: pd.DataFrame) -> Dict[str, int]:
-        genre_counts = {}
-        for _, row in high_rated.iterrows():
-            genres = row.get("genres", [])
-            if isinstance(genres, list):
-                for genre in genres:
-                    genre_counts[genre] = genre_counts.get(genre, 0) + 1
-
-        repeated = {
-            g: c for g, c in genre_counts.items() if c >= MIN_PATTERN_OCCURRENCES
+        counts = {
+            "Director": Counter(chain.from_iterable(lists("directors"))),
+            "Actor": Counter(
+                chain.from_iterable(lists("actors", TOP_ACTORS_IN_PATTERN))
+            ),
+            "Genre": Counter(chain.from_iterable(lists("genres"))),
+            "Country": Counter(),
+            "Year": Counter(),
         }
-        if repeated:
-            self.logger.info(f"Genre patterns: {repeated}")
-        return repeated
-
-    def _analyze_country_patterns(self, high_rated: pd.DataFrame) -> Dict[str, int]:
-        country_counts = {}
-        for _, row in high_rated.iterrows():
-            country = row.get("country", "Unknown")
-            if country and country != "Unknown":
-                country_counts[country] = country_counts.get(country, 0) + 1
-
-        repeated = {
-            c: cnt
-            for c, cnt in country_counts.items()
-            if cnt >= MIN_PATTERN_OCCURRENCES
-        }
-        if repeated:
-            self.logger.info(f"Country patterns: {repeated}")
-        return repeated
-
-    def _analyze_year_patterns(self, high_rated: pd.DataFrame) -> Dict[str, int]:
-        year_counts = {}
-        for _, row in high_rated.iterrows():
-            release_date = row.get("release_date")
-            if pd.notna(release_date):
-                year = pd.to_datetime(release_date, errors="coerce").year
-                if year:
-                    decade = (year // 10) * 10
-                    year_counts[decade] = year_counts.get(decade, 0) + 1
-
-        repeated = {
-            d: c for d, c in year_counts.items() if c >= MIN_PATTERN_OCCURRENCES
-        }
-        if repeated:
-            self.logger.info(f"Year patterns (decades): {repeated}")
-        return repeated
+
+        if "country" in high_rated.columns:
+            counts["Country"].update(
+                country
+                for country in high_rated["country"].tolist()
+                if country and country != "Unknown"
+            )
+
+        if "release_date" in high_rated.columns:
+            years = pd.to_datetime(high_rated["release_date"], errors="coerce").dt.year
+            counts["Year"].update((years.dropna().astype(int) // 10 * 10).tolist())
+
+        patterns = []
+        for name, counter in counts.items():
+            repeated = {
+                key: count
+                for key, count in counter.items()
+                if count >= MIN_PATTERN_OCCURRENCES
+            }
+            if repeated:
+                label = (
+                    "Year patterns (decades)" if name == "Year" else f"{name} patterns"
+                )
+                self.logger.info(f"{label}: {repeated}")
+            patterns.append(repeated)
+        return tuple(patterns)
 
     def _calculate_adaptive_weights(
         self,
@@ -442,119 +505,114 @@ class DataPreprocessor:
         if movies_df.empty:
             return pd.DataFrame()
 
-        features_df = movies_df[["movie_id"]].copy()
-
-        all_genres = set()
-        for genres_list in movies_df["genres"]:
-            if isinstance(genres_list, list):
-                all_genres.update(genres_list)
-
-        genre_cols = {}
-        for genre in sorted(all_genres):
-            genre_cols[f"genre_{genre}"] = movies_df["genres"].apply(
-                lambda x: 1.0 if isinstance(x, list) and genre in x else 0.0
-            )
-        if genre_cols:
-            features_df = pd.concat(
-                [features_df, pd.DataFrame(genre_cols, index=features_df.index)], axis=1
-            )
-
-        all_actors = []
-        for actors_list in movies_df["actors"]:
-            if isinstance(actors_list, list):
-                all_actors.extend(actors_list)
-        top_actors = [
-            actor for actor, _ in Counter(all_actors).most_common(TOP_ENTITIES)
-        ]
-
-        actor_cols = {}
-        for actor in sorted(top_actors):
-            actor_cols[f"actor_{actor}"] = movies_df["actors"].apply(
-                lambda x: 1.0 if isinstance(x, list) and actor in x else 0.0
-            )
-        if actor_cols:
-            features_df = pd.concat(
-                [features_df, pd.DataFrame(actor_cols, index=features_df.index)], axis=1
-            )
+        movie_ids, matrix, feature_names = self.encode_structural_features(movies_df)
 
-        all_directors = []
-        for directors_list in movies_df["directors"]:
-            if isinstance(directors_list, list):
-                all_directors.extend(directors_list)
-        top_directors = [
-            director for director, _ in Counter(all_directors).most_common(TOP_ENTITIES)
-        ]
+        features_df = pd.DataFrame(
+            matrix.toarray(), columns=feature_names, index=movies_df.index
+        )
+        features_df.insert(0, "movie_id", movie_ids)
 
-        director_cols = {}
-        for director in sorted(top_directors):
-            director_cols[f"director_{director}"] = movies_df["directors"].apply(
-                lambda x: 1.0 if isinstance(x, list) and director in x else 0.0
-            )
-        if director_cols:
-            features_df = pd.concat(
-                [features_df, pd.DataFrame(director_cols, index=features_df.index)],
-                axis=1,
-            )
+        genre_count = len([c for c in feature_names if c.startswith("genre_")])
+        actor_count = len([c for c in feature_names if c.startswith("actor_")])
+        director_count = len([c for c in feature_names if c.startswith("director_")])
+        country_count = len([c for c in feature_names if c.startswith("country_")])
 
-        all_countries = movies_df["country"].dropna().unique().tolist()
-        all_countries = [c for c in all_countries if c != "Unknown"]
-        top_countries = Counter(all_countries).most_common(TOP_ENTITIES)
+        self.logger.info(
+            f"Structural features: {genre_count} genres, {actor_count} actors, "
+            f"{director_count} directors, {country_count} countries + year/duration (RAW binary)"
+        )
 
-        country_cols = {}
-        for country, _ in top_countries:
-            country_cols[f"country_{country}"] = movies_df["country"].apply(
-                lambda x: 1.0 if x == country else 0.0
-            )
-        if country_cols:
-            features_df = pd.concat(
-                [features_df, pd.DataFrame(country_cols, index=features_df.index)],
-                axis=1,
+        return features_df
+
+    def encode_structural_features(
+        self, movies_df: pd.DataFrame
+    ) -> Tuple[np.ndarray, sp.csr_matrix, List[str]]:
+        """
+        Jednoprzebiegowe kodowanie one-hot do macierzy rzadkiej (CSR).
+
+        Kolumny i wartości identyczne jak w prepare_structural_features:
+        wszystkie gatunki, TOP_ENTITIES aktorów/reżyserów/krajów, a na końcu
+        release_year_normalized i duration_normalized (jeśli są kolumny źródłowe).
+
+        Returns:
+            (movie_ids, CSR [filmy x cechy], nazwy kolumn)
+        """
+        movie_ids = movies_df["movie_id"].to_numpy()
+        blocks, feature_names = [], []
+
+        genre_lists = self._as_label_lists(movies_df, "genres")
+        all_genres = sorted({genre for genres in genre_lists for genre in genres})
+        blocks.append(self._encode_labels(genre_lists, all_genres))
+        feature_names.extend(f"genre_{genre}" for genre in all_genres)
+
+        for column, prefix in (("actors", "actor_"), ("directors", "director_")):
+            label_lists = self._as_label_lists(movies_df, column)
+            counts = Counter(label for labels in label_lists for label in labels)
+            top_labels = sorted(label for label, _ in counts.most_common(TOP_ENTITIES))
+            blocks.append(self._encode_labels(label_lists, top_labels))
+            feature_names.extend(f"{prefix}{label}" for label in top_labels)
+
+        if "country" in movies_df.columns:
+            countries = movies_df["country"].tolist()
+            unique_countries = [
+                c for c in movies_df["country"].dropna().unique() if c != "Unknown"
+            ]
+            top_countries = [
+                c for c, _ in Counter(unique_countries).most_common(TOP_ENTITIES)
+            ]
+            blocks.append(
+                self._encode_labels(
+                    [[c] if isinstance(c, str) else [] for c in countries],
+                    top_countries,
+                )
             )
+            feature_names.extend(f"country_{country}" for country in top_countries)
 
+        numeric_columns = []
         if "release_date" in movies_df.columns:
-            movies_df_copy = movies_df.copy()
-            movies_df_copy["release_year"] = pd.to_datetime(
-                movies_df_copy["release_date"], errors="coerce"
-            ).dt.year
-            year_series = movies_df_copy["release_year"].fillna(0)
-            if year_series.nunique() > 1:
-                year_min, year_max = year_series.min(), year_series.max()
-                features_df["release_year_normalized"] = (year_series - year_min) / (
-                    year_max - year_min + 1e-9
-                )
-            else:
-                features_df["release_year_normalized"] = 0.0
+            years = pd.to_datetime(movies_df["release_date"], errors="coerce").dt.year
+            numeric_columns.append(self._min_max_normalize(years))
+            feature_names.append("release_year_normalized")
 
         if "duration_minutes" in movies_df.columns:
-            duration_series = pd.to_numeric(
-                movies_df["duration_minutes"], errors="coerce"
-            ).fillna(0)
-            if duration_series.nunique() > 1:
-                duration_min, duration_max = (
-                    duration_series.min(),
-                    duration_series.max(),
-                )
-                features_df["duration_normalized"] = (
-                    duration_series - duration_min
-                ) / (duration_max - duration_min + 1e-9)
-            else:
-                features_df["duration_normalized"] = 0.0
-
-        genre_count = len([c for c in features_df.columns if c.startswith("genre_")])
-        actor_count = len([c for c in features_df.columns if c.startswith("actor_")])
-        director_count = len(
-            [c for c in features_df.columns if c.startswith("director_")]
-        )
-        country_count = len(
-            [c for c in features_df.columns if c.startswith("country_")]
-        )
-
-        self.logger.info(
-            f"Structural features: {genre_count} genres, {actor_count} actors, "
-            f"{director_count} directors, {country_count} countries + year/duration (RAW binary)"
+            durations = pd.to_numeric(movies_df["duration_minutes"], errors="coerce")
+            numeric_columns.append(self._min_max_normalize(durations))
+            feature_names.append("duration_normalized")
+
+        if numeric_columns:
+            blocks.append(sp.csr_matrix(np.column_stack(numeric_columns)))
+
+        matrix = sp.hstack(blocks, format="csr", dtype=np.float64)
+        return movie_ids, matrix, feature_names
+
+    @staticmethod
+    def _as_label_lists(movies_df: pd.DataFrame, column: str) -> List[list]:
+        if column not in movies_df.columns:
+            return [[] for _ in range(len(movies_df))]
+        return [x if isinstance(x, list) else [] for x in movies_df[column]]
+
+    @staticmethod
+    def _encode_labels(label_lists: List[list], classes: List[str]) -> sp.csr_matrix:
+        """Listy etykiet -> binarna macierz CSR przez tablice indeksów (jeden przebieg)"""
+        class_index = {label: i for i, label in enumerate(classes)}
+        indptr, indices = [0], []
+
+        for labels in label_lists:
+            row = {class_index[l] for l in labels if l in class_index}
+            indices.extend(sorted(row))
+            indptr.append(len(indices))
+
+        return sp.csr_matrix(
+            (np.ones(len(indices)), np.asarray(indices, dtype=np.int64), indptr),
+            shape=(len(label_lists), len(classes)),
         )
 
-        return features_df.fillna(0.0)
+    @staticmethod
+    def _min_max_normalize(values: pd.Series) -> np.ndarray:
+        values = values.fillna(0).to_numpy(dtype=np.float64)
+        if len(np.unique(values)) <= 1:
+            return np.zeros(len(values))
+        return (values - values.min()) / (values.max() - values.min() + 1e-9)
 
     def prepare_textual_features(self, movies_df: pd.DataFrame) -> pd.DataFrame:
         if movies_df.empty or "description" not in movies_df.columns:
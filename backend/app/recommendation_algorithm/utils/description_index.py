@@ -0,0 +1,269 @@
+from sqlalchemy.orm import Session
+from collections import Counter
+import numpy as np
+import scipy.sparse as sp
+from typing import Dict, Iterable, List, Optional, Tuple
+import logging
+import os
+
+from ..config import BATCH_SIZE, FEATURE_STORE_DIR
+from ..content_based.tfidf_processor import TFIDFProcessor
+from .persistent_cache import PersistentCacheRegistry, save_npz_atomic
+from app.models.movie import Movie
+
+
+class MovieDescriptionIndex:
+    """
+    Katalogowa macierz liczności termów (CSR) dla opisów wszystkich filmów
+
+    - tekst = opis z fallbackiem jak w get_movie_descriptions ("Film: <tytuł>")
+    - termy = wynik preprocess_text (czyszczenie + stemming) i analyzera
+      TFIDFProcessor (stopwords, n-gramy), czyli dokładnie to, co widzi
+      TfidfVectorizer w fit_transform
+    - słownik tylko dopisywany, indeksy kolumn stabilne
+
+    Per-użytkownik NB wycina wiersze i przelicza wagi TF-IDF na podzbiorze
+    kolumn (TFIDFProcessor.fit_transform_counts) - bez ponownego stemmingu.
+    """
+
+    FILE_NAME = "description_counts.npz"
+    MIN_TRAINING_DESCRIPTION_LENGTH = 10
+
+    def __init__(
+        self,
+        movie_ids: Iterable[int],
+        counts: sp.spmatrix,
+        terms: List[str],
+        trainable: Iterable[bool],
+    ):
+        self.movie_ids = np.asarray(list(movie_ids), dtype=np.int64)
+        self.counts = sp.csr_matrix(counts, dtype=np.int32)
+        self.terms = list(terms)
+        self.term_index = {term: i for i, term in enumerate(self.terms)}
+        # Opis nadaje się do treningu NB (>= 10 znaków i niepusty po preprocessingu)
+        self.trainable = np.asarray(list(trainable), dtype=bool)
+        self.loaded_mtime = None
+        self.logger = logging.getLogger(__name__)
+        self._processor = None
+        self._analyzer = None
+        self._reindex()
+
+    def __len__(self) -> int:
+        return len(self.movie_ids)
+
+    def __contains__(self, movie_id: int) -> bool:
+        return int(movie_id) in self.row_index
+
+    @classmethod
+    def build(cls, db_session: Session) -> "MovieDescriptionIndex":
+        index = cls([], sp.csr_matrix((0, 0)), [], [])
+        movies = index._load_movies(db_session)
+
+        movie_ids = [m.movie_id for m in movies]
+        index.counts, index.trainable = index._encode_movies(movies)
+        index.movie_ids = np.asarray(movie_ids, dtype=np.int64)
+        index._reindex()
+
+        index.logger.info(
+            f"Description index built: {len(index)} movies x {len(index.terms)} terms, "
+            f"nnz={index.counts.nnz}"
+        )
+        return index
+
+    def refresh_movies(self, db_session: Session, movie_ids: Iterable[int]) -> None:
+        """Przelicza wiersze nowych / zmienionych filmów, usuwa skasowane"""
+        movie_ids = {int(mid) for mid in movie_ids}
+        if not movie_ids:
+            return
+
+        # Własne kopie słownika (instancja może być płytką kopią)
+        self.terms = list(self.terms)
+        self.term_index = dict(self.term_index)
+
+        movies = self._load_movies(db_session, sorted(movie_ids))
+        new_rows, new_trainable = self._encode_movies(movies)
+        keep_mask = ~np.isin(self.movie_ids, list(movie_ids))
+
+        kept = self.counts[keep_mask]
+        kept.resize((kept.shape[0], len(self.terms)))
+
+        self.counts = sp.vstack([kept, new_rows], format="csr", dtype=np.int32)
+        self.movie_ids = np.concatenate(
+            [
+                self.movie_ids[keep_mask],
+                np.asarray([m.movie_id for m in movies], dtype=np.int64),
+            ]
+        )
+        self.trainable = np.concatenate([self.trainable[keep_mask], new_trainable])
+        self._reindex()
+
+        self.logger.info(
+            f"Description index refreshed: {len(movies)} updated, "
+            f"{len(movie_ids) - len(movies)} removed, {len(self)} movies total"
+        )
+
+    def get_counts(
+        self, movie_ids: Iterable[int], trainable_only: bool = False
+    ) -> Tuple[np.ndarray, sp.csr_matrix]:
+        """
+        Wiersze liczności dla filmów (w podanej kolejności, pomija nieznane).
+
+        Args:
+            trainable_only: tylko opisy, które NB bierze do treningu
+        """
+        rows = [
+            self.row_index[int(mid)] for mid in movie_ids if int(mid) in self.row_index
+        ]
+        rows = np.asarray(rows, dtype=np.int64)
+        if trainable_only:
+            rows = rows[self.trainable[rows]]
+
+        counts = self.counts[rows]
+        counts.resize((len(rows), len(self.terms)))
+        return self.movie_ids[rows], counts
+
+    def count_text(self, text: str) -> Counter:
+        """Liczności termów dowolnego tekstu (np. syntetyczne próbki NB), bez zmiany słownika"""
+        _, terms = self._analyze(text)
+        return Counter(terms)
+
+    def save(self, directory: str = FEATURE_STORE_DIR) -> str:
+        path = os.path.join(directory, self.FILE_NAME)
+        self.loaded_mtime = save_npz_atomic(
+            path,
+            data=self.counts.data,
+            indices=self.counts.indices,
+            indptr=self.counts.indptr,
+            shape=np.asarray(self.counts.shape, dtype=np.int64),
+            movie_ids=self.movie_ids,
+            # Termy jako jeden blob UTF-8 - nie zawierają "\n" (tokeny są bez białych znaków)
+            terms=np.frombuffer("\n".join(self.terms).encode("utf-8"), dtype=np.uint8),
+            trainable=self.trainable,
+        )
+        self.logger.info(f"Description index saved to {path}")
+        return path
+
+    @classmethod
+    def load(
+        cls, directory: str = FEATURE_STORE_DIR
+    ) -> Optional["MovieDescriptionIndex"]:
+        path = os.path.join(directory, cls.FILE_NAME)
+        if not os.path.exists(path):
+            return None
+
+        try:
+            mtime = os.path.getmtime(path)
+            with np.load(path, allow_pickle=False) as npz:
+                counts = sp.csr_matrix(
+                    (npz["data"], npz["indices"], npz["indptr"]),
+                    shape=tuple(npz["shape"]),
+                )
+                blob = npz["terms"].tobytes().decode("utf-8")
+                index = cls(
+                    npz["movie_ids"],
+                    counts,
+                    blob.split("\n") if blob else [],
+                    npz["trainable"],
+                )
+            index.loaded_mtime = mtime
+            return index
+
+        except Exception as e:
+            logging.getLogger(__name__).error(
+                f"Description index load failed ({path}): {e}", exc_info=True
+            )
+            return None
+
+    def _reindex(self) -> None:
+        self.row_index = {int(mid): i for i, mid in enumerate(self.movie_ids)}
+
+    def _register_term(self, term: str) -> int:
+        col = self.term_index.get(term)
+        if col is None:
+            col = len(self.terms)
+            self.terms.append(term)
+            self.term_index[term] = col
+        return col
+
+    def _analyze(self, text: str) -> Tuple[str, List[str]]:
+        """(tekst po preprocess_text, termy po analyzerze)"""
+        if self._processor is None:
+            self._processor = TFIDFProcessor()
+            self._analyzer = self._processor.build_analyzer()
+
+        processed = self._processor.preprocess_text(text)
+        return processed, (self._analyzer(processed) if processed.strip() else [])
+
+    def _encode_movies(self, movies: list) -> Tuple[sp.csr_matrix, np.ndarray]:
+        indptr, indices, data = [0], [], []
+        trainable = np.zeros(len(movies), dtype=bool)
+
+        for row, movie in enumerate(movies):
+            text = self._description(movie)
+            processed, terms = self._analyze(text)
+
+            term_counts: Dict[int, int] = Counter()
+            for term in terms:
+                term_counts[self._register_term(term)] += 1
+
+            indices.extend(term_counts.keys())
+            data.extend(term_counts.values())
+            indptr.append(len(indices))
+
+            trainable[row] = len(
+                text.strip()
+            ) >= self.MIN_TRAINING_DESCRIPTION_LENGTH and bool(processed.strip())
+
+        counts = sp.csr_matrix(
+            (
+                np.asarray(data, dtype=np.int32),
+                np.asarray(indices, dtype=np.int64),
+                indptr,
+            ),
+            shape=(len(movies), len(self.terms)),
+        )
+        counts.sort_indices()
+        return counts, trainable
+
+    def _load_movies(
+        self, db_session: Session, movie_ids: Optional[List[int]] = None
+    ) -> list:
+        query = db_session.query(Movie.movie_id, Movie.description, Movie.title)
+
+        if movie_ids is None:
+            return query.order_by(Movie.movie_id).all()
+
+        movies = []
+        for i in range(0, len(movie_ids), BATCH_SIZE):
+            batch_ids = movie_ids[i : i + BATCH_SIZE]
+            movies.extend(
+                query.filter(Movie.movie_id.in_(batch_ids))
+                .order_by(Movie.movie_id)
+                .all()
+            )
+        return movies
+
+    @staticmethod
+    def _description(movie) -> str:
+        # Ten sam fallback co DataPreprocessor.get_movie_descriptions
+        desc = movie.description
+        if not desc or len(str(desc).strip()) == 0:
+            desc = f"Film: {movie.title}" if movie.title else "Film bez opisu"
+        return str(desc)
+
+
+_registry = PersistentCacheRegistry(MovieDescriptionIndex)
+
+
+def get_description_index(db_session: Session) -> MovieDescriptionIndex:
+    """Indeks dla procesu: z pamięci, z dysku, albo budowany przy pierwszym użyciu"""
+    return _registry.get(db_session)
+
+
+def rebuild_description_index(db_session: Session) -> MovieDescriptionIndex:
+    return _registry.rebuild(db_session)
+
+
+def refresh_movie_descriptions(db_session: Session, movie_ids: Iterable[int]) -> None:
+    """Aktualizuje wiersze po dodaniu / edycji / usunięciu filmów. Błędy są tylko logowane."""
+    _registry.refresh(db_session, movie_ids)
@@ -0,0 +1,444 @@
+from sqlalchemy.orm import Session
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from typing import Dict, Iterable, List, Optional, Tuple
+import logging
+import os
+
+from ..config import BATCH_SIZE, FEATURE_STORE_DIR
+from .persistent_cache import PersistentCacheRegistry, save_npz_atomic
+from app.models.movie import Movie
+from app.models.genre import Genre
+from app.models.actor import Actor
+from app.models.director import Director
+from app.models.movie_genre import MovieGenre
+from app.models.movie_actor import MovieActor
+from app.models.movie_director import MovieDirector
+
+
+class MovieFeatureStore:
+    """
+    Katalogowa macierz cech strukturalnych (scipy CSR) dla wszystkich filmów
+
+    - wiersz = film (movie_id -> wiersz przez row_index)
+    - kolumny = stabilny słownik genre_/actor_/director_/country_ (nowe nazwy
+      są tylko dopisywane na końcu, istniejące indeksy się nie zmieniają)
+    - rok premiery i czas trwania trzymane surowo, normalizowane min-max
+      dopiero przy wycinaniu wierszy (w obrębie wycinka, jak w
+      prepare_structural_features)
+
+    Budowana raz, zapisywana na dysk i aktualizowana punktowo przy zmianach
+    filmów lub ich relacji. Generowanie rekomendacji tylko wycina wiersze.
+    """
+
+    FILE_NAME = "structural_features.npz"
+    NUMERIC_FEATURES = ["release_year_normalized", "duration_normalized"]
+    ENTITY_PREFIXES = ["genre_", "actor_", "director_", "country_"]
+
+    def __init__(
+        self,
+        movie_ids: Iterable[int],
+        matrix: sp.spmatrix,
+        feature_names: List[str],
+        years: Iterable[float],
+        durations: Iterable[float],
+    ):
+        self.movie_ids = np.asarray(list(movie_ids), dtype=np.int64)
+        self.matrix = sp.csr_matrix(matrix, dtype=np.float64)
+        self.feature_names = list(feature_names)
+        self.years = np.asarray(list(years), dtype=np.float64)
+        self.durations = np.asarray(list(durations), dtype=np.float64)
+        self.column_index = {name: i for i, name in enumerate(self.feature_names)}
+        self.loaded_mtime = None
+        self.logger = logging.getLogger(__name__)
+        self._reindex()
+
+    @property
+    def all_feature_names(self) -> List[str]:
+        """Nazwy kolumn macierzy zwracanej przez get_features()"""
+        return self.feature_names + self.NUMERIC_FEATURES
+
+    def __len__(self) -> int:
+        return len(self.movie_ids)
+
+    def __contains__(self, movie_id: int) -> bool:
+        return int(movie_id) in self.row_index
+
+    @classmethod
+    def build(cls, db_session: Session) -> "MovieFeatureStore":
+        """Buduje macierz od zera dla całego katalogu"""
+        store = cls([], sp.csr_matrix((0, 0)), [], [], [])
+        movies, entities = store._load_movies(db_session)
+
+        # Początkowy słownik: grupami w kolejności jak w prepare_structural_features
+        names = {
+            name for movie_entities in entities.values() for name in movie_entities
+        }
+        for prefix in cls.ENTITY_PREFIXES:
+            for name in sorted(n for n in names if n.startswith(prefix)):
+                store._register_column(name)
+
+        movie_ids = [m.movie_id for m in movies]
+        store.matrix = store._encode_rows(movie_ids, entities)
+        store.movie_ids = np.asarray(movie_ids, dtype=np.int64)
+        store.years = np.asarray([cls._year(m) for m in movies], dtype=np.float64)
+        store.durations = np.asarray(
+            [cls._duration(m) for m in movies], dtype=np.float64
+        )
+        store._reindex()
+
+        store.logger.info(
+            f"Feature store built: {len(store)} movies x {len(store.feature_names)} "
+            f"entity features, nnz={store.matrix.nnz}"
+        )
+        return store
+
+    def refresh_movies(self, db_session: Session, movie_ids: Iterable[int]) -> None:
+        """
+        Przelicza wiersze podanych filmów (nowe, zmienione lub usunięte).
+        Koszt O(nnz) na przebudowę CSR, bez ponownego kodowania reszty katalogu.
+        """
+        movie_ids = {int(mid) for mid in movie_ids}
+        if not movie_ids:
+            return
+
+        # Własne kopie słownika kolumn (instancja może być płytką kopią)
+        self.feature_names = list(self.feature_names)
+        self.column_index = dict(self.column_index)
+
+        movies, entities = self._load_movies(db_session, sorted(movie_ids))
+        found_ids = [m.movie_id for m in movies]
+
+        new_rows = self._encode_rows(found_ids, entities)
+        keep_mask = ~np.isin(self.movie_ids, list(movie_ids))
+
+        kept = self.matrix[keep_mask]
+        kept.resize((kept.shape[0], len(self.feature_names)))
+
+        self.matrix = sp.vstack([kept, new_rows], format="csr")
+        self.movie_ids = np.concatenate(
+            [self.movie_ids[keep_mask], np.asarray(found_ids, dtype=np.int64)]
+        )
+        self.years = np.concatenate(
+            [self.years[keep_mask], [self._year(m) for m in movies]]
+        )
+        self.durations = np.concatenate(
+            [self.durations[keep_mask], [self._duration(m) for m in movies]]
+        )
+        self._reindex()
+
+        self.logger.info(
+            f"Feature store refreshed: {len(found_ids)} updated, "
+            f"{len(movie_ids) - len(found_ids)} removed, {len(self)} movies total"
+        )
+
+    def get_features(
+        self, movie_ids: Iterable[int]
+    ) -> Tuple[np.ndarray, sp.csr_matrix]:
+        """
+        Wycina wiersze dla podanych filmów (w podanej kolejności, pomija nieznane).
+
+        Returns:
+            (movie_ids, CSR) - kolumny zgodne z all_feature_names
+        """
+        rows = [
+            self.row_index[int(mid)] for mid in movie_ids if int(mid) in self.row_index
+        ]
+        rows = np.asarray(rows, dtype=np.int64)
+
+        numeric = np.column_stack(
+            [
+                self._normalize(self.years[rows]),
+                self._normalize(self.durations[rows]),
+            ]
+        )
+        matrix = sp.hstack([self.matrix[rows], sp.csr_matrix(numeric)], format="csr")
+
+        return self.movie_ids[rows], matrix
+
+    def get_features_frame(
+        self, movie_ids: Iterable[int], columns: Optional[np.ndarray] = None
+    ) -> pd.DataFrame:
+        """DataFrame w formacie prepare_structural_features (movie_id + cechy)"""
+        ids, matrix = self.get_features(movie_ids)
+        return self.to_frame(ids, matrix, columns)
+
+    def to_frame(
+        self,
+        movie_ids: np.ndarray,
+        matrix: sp.csr_matrix,
+        columns: Optional[np.ndarray] = None,
+    ) -> pd.DataFrame:
+        """
+        Zamienia wycięte wiersze na DataFrame.
+
+        Args:
+            columns: indeksy kolumn (z all_feature_names) do zachowania; None = wszystkie
+        """
+        names = self.all_feature_names
+        if columns is not None:
+            matrix = matrix[:, columns]
+            names = [names[i] for i in columns]
+
+        if len(movie_ids) == 0:
+            return pd.DataFrame()
+
+        features_df = pd.DataFrame(matrix.toarray(), columns=names)
+        features_df.insert(0, "movie_id", movie_ids)
+        return features_df
+
+    def active_columns(self, *matrices: sp.csr_matrix) -> np.ndarray:
+        """Indeksy kolumn niezerowych w którejkolwiek z macierzy (zawsze z year/duration)"""
+        used = [np.unique(m.indices) for m in matrices if m is not None and m.nnz]
+        numeric = np.arange(len(self.feature_names), len(self.all_feature_names))
+        return np.union1d(np.concatenate(used + [numeric]), numeric).astype(np.int64)
+
+    def profile_columns(self, counts: Dict[str, int]) -> Optional[np.ndarray]:
+        """Kolumny cech z liczników profilu; None gdy store nie zna którejś nazwy"""
+        columns = [self.column_index.get(name) for name in counts]
+        if any(col is None for col in columns):
+            return None
+        return np.asarray(columns, dtype=np.int64)
+
+    def profile_vector(
+        self, window: List[Dict], counts: Dict[str, int], columns: np.ndarray
+    ) -> np.ndarray:
+        """
+        Średnia cech okna profilu gustu (UserTasteProfile) w kolumnach
+        `columns` - bit w bit to samo co mean() wycinka get_features() dla
+        filmów okna, bez wycinania wierszy: encje z liczników, rok i czas
+        trwania normalizowane w obrębie okna.
+        """
+        vector = np.zeros(len(self.all_feature_names))
+        if window:
+            # mean() CSR sumuje wartości pomnożone przez 1/n wiersz po wierszu -
+            # kolejne sumy częściowe to średnie dla 1..n filmów z daną cechą
+            steps = np.cumsum(np.full(len(window), 1.0 / len(window)))
+            for name, count in counts.items():
+                vector[self.column_index[name]] = steps[count - 1]
+
+            numeric = np.column_stack(
+                [
+                    self._normalize(_raw_values(window, "year")),
+                    self._normalize(_raw_values(window, "duration")),
+                ]
+            )
+            vector[len(self.feature_names) :] = np.asarray(
+                sp.csr_matrix(numeric).mean(axis=0)
+            ).ravel()
+
+        return vector[columns]
+
+    def save(self, directory: str = FEATURE_STORE_DIR) -> str:
+        path = os.path.join(directory, self.FILE_NAME)
+        self.loaded_mtime = save_npz_atomic(
+            path,
+            data=self.matrix.data,
+            indices=self.matrix.indices,
+            indptr=self.matrix.indptr,
+            shape=np.asarray(self.matrix.shape, dtype=np.int64),
+            movie_ids=self.movie_ids,
+            feature_names=np.asarray(self.feature_names, dtype=str),
+            years=self.years,
+            durations=self.durations,
+        )
+        self.logger.info(f"Feature store saved to {path}")
+        return path
+
+    @classmethod
+    def load(cls, directory: str = FEATURE_STORE_DIR) -> Optional["MovieFeatureStore"]:
+        path = os.path.join(directory, cls.FILE_NAME)
+        if not os.path.exists(path):
+            return None
+
+        try:
+            mtime = os.path.getmtime(path)
+            with np.load(path, allow_pickle=False) as npz:
+                matrix = sp.csr_matrix(
+                    (npz["data"], npz["indices"], npz["indptr"]),
+                    shape=tuple(npz["shape"]),
+                )
+                store = cls(
+                    npz["movie_ids"],
+                    matrix,
+                    npz["feature_names"].tolist(),
+                    npz["years"],
+                    npz["durations"],
+                )
+            store.loaded_mtime = mtime
+            return store
+
+        except Exception as e:
+            logging.getLogger(__name__).error(
+                f"Feature store load failed ({path}): {e}", exc_info=True
+            )
+            return None
+
+    def _reindex(self) -> None:
+        self.row_index = {int(mid): i for i, mid in enumerate(self.movie_ids)}
+
+    def _register_column(self, name: str) -> int:
+        col = self.column_index.get(name)
+        if col is None:
+            col = len(self.feature_names)
+            self.feature_names.append(name)
+            self.column_index[name] = col
+        return col
+
+    def _encode_rows(
+        self, movie_ids: List[int], entities: Dict[int, List[str]]
+    ) -> sp.csr_matrix:
+        rows, cols = [], []
+        for row, movie_id in enumerate(movie_ids):
+            for name in entities.get(movie_id, []):
+                rows.append(row)
+                cols.append(self._register_column(name))
+
+        matrix = sp.csr_matrix(
+            (np.ones(len(rows), dtype=np.float64), (rows, cols)),
+            shape=(len(movie_ids), len(self.feature_names)),
+        )
+        matrix.sum_duplicates()
+        matrix.data[:] = 1.0
+        return matrix
+
+    @staticmethod
+    def _load_movies(
+        db_session: Session, movie_ids: Optional[List[int]] = None
+    ) -> Tuple[list, Dict[int, List[str]]]:
+        movie_query = db_session.query(
+            Movie.movie_id, Movie.release_date, Movie.duration_minutes, Movie.country
+        )
+        relation_queries = [
+            (
+                "genre_",
+                db_session.query(MovieGenre.movie_id, Genre.genre_name).join(
+                    Genre, MovieGenre.genre_id == Genre.genre_id
+                ),
+                MovieGenre.movie_id,
+            ),
+            (
+                "actor_",
+                db_session.query(MovieActor.movie_id, Actor.actor_name).join(
+                    Actor, MovieActor.actor_id == Actor.actor_id
+                ),
+                MovieActor.movie_id,
+            ),
+            (
+                "director_",
+                db_session.query(MovieDirector.movie_id, Director.director_name).join(
+                    Director, MovieDirector.director_id == Director.director_id
+                ),
+                MovieDirector.movie_id,
+            ),
+        ]
+
+        if movie_ids is None:
+            movies = movie_query.order_by(Movie.movie_id).all()
+            relations = [(prefix, query.all()) for prefix, query, _ in relation_queries]
+        else:
+            movies, relations = [], [(prefix, []) for prefix, _, _ in relation_queries]
+            for i in range(0, len(movie_ids), BATCH_SIZE):
+                batch_ids = movie_ids[i : i + BATCH_SIZE]
+                movies.extend(
+                    movie_query.filter(Movie.movie_id.in_(batch_ids))
+                    .order_by(Movie.movie_id)
+                    .all()
+                )
+                for (_, rows), (_, query, column) in zip(relations, relation_queries):
+                    rows.extend(query.filter(column.in_(batch_ids)).all())
+
+        entities = {m.movie_id: [] for m in movies}
+        for m in movies:
+            if m.country and m.country != "Unknown":
+                entities[m.movie_id].append(f"country_{m.country}")
+
+        for prefix, rows in relations:
+            for movie_id, name in rows:
+                if movie_id in entities and name:
+                    entities[movie_id].append(f"{prefix}{name}")
+
+        return movies, entities
+
+    @staticmethod
+    def _year(movie) -> float:
+        return float(movie.release_date.year) if movie.release_date else np.nan
+
+    @staticmethod
+    def _duration(movie) -> float:
+        return (
+            float(movie.duration_minutes)
+            if movie.duration_minutes is not None
+            else np.nan
+        )
+
+    @staticmethod
+    def _normalize(values: np.ndarray) -> np.ndarray:
+        # Braki jako 0, min-max w obrębie wycinka (zgodnie z prepare_structural_features)
+        values = np.nan_to_num(values, nan=0.0)
+        if len(np.unique(values)) <= 1:
+            return np.zeros(len(values))
+        low, high = values.min(), values.max()
+        return (values - low) / (high - low + 1e-9)
+
+
+def _raw_values(window: List[Dict], key: str) -> np.ndarray:
+    return np.asarray(
+        [np.nan if entry[key] is None else entry[key] for entry in window],
+        dtype=np.float64,
+    )
+
+
+_registry = PersistentCacheRegistry(MovieFeatureStore)
+
+
+def get_feature_store(db_session: Session) -> MovieFeatureStore:
+    """Store dla procesu: z pamięci, z dysku, albo budowany przy pierwszym użyciu"""
+    return _registry.get(db_session)
+
+
+def rebuild_feature_store(db_session: Session) -> MovieFeatureStore:
+    return _registry.rebuild(db_session)
+
+
+def load_movie_features(
+    db_session: Session, movie_ids: Iterable[int]
+) -> Dict[int, Dict]:
+    """
+    Cechy pojedynczych filmów prosto z bazy, bez ładowania store'u (np. przy
+    zapisie oceny): {movie_id: {"features", "year", "duration"}}; nazwy cech
+    jak kolumny store'u, rok i czas trwania surowe (None gdy brak)
+    """
+    movies, entities = MovieFeatureStore._load_movies(
+        db_session, sorted({int(mid) for mid in movie_ids})
+    )
+    return {
+        m.movie_id: {
+            "features": list(dict.fromkeys(entities[m.movie_id])),
+            "year": m.release_date.year if m.release_date else None,
+            "duration": m.duration_minutes,
+        }
+        for m in movies
+    }
+
+
+def refresh_movie_features(db_session: Session, movie_ids: Iterable[int]) -> None:
+    """
+    Aktualizuje wiersze po zmianie filmów lub ich relacji (gatunki, aktorzy,
+    reżyserzy) i unieważnia profile gustu z cechami tych filmów. Błędy są
+    tylko logowane.
+    """
+    movie_ids = list(movie_ids)
+    _registry.refresh(db_session, movie_ids)
+
+    # Import lokalny - repozytorium profili korzysta z load_movie_features
+    from app.repositories.user_taste_profile_repository import (
+        UserTasteProfileRepository,
+    )
+
+    try:
+        UserTasteProfileRepository(db_session).invalidate_movies(movie_ids)
+    except Exception as e:
+        db_session.rollback()
+        logging.getLogger(__name__).error(f"Taste profile invalidation failed: {e}")
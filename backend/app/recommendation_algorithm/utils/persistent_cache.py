@@ -0,0 +1,158 @@
+from sqlalchemy.orm import Session
+from contextlib import contextmanager
+import numpy as np
+import copy
+from typing import Iterable
+import logging
+import os
+import threading
+
+from ..config import FEATURE_STORE_DIR
+
+try:
+    import fcntl
+except ImportError:  # Windows - tylko blokada w obrębie procesu
+    fcntl = None
+
+
+def save_npz_atomic(path: str, **arrays: np.ndarray) -> float:
+    """
+    Zapis .npz przez plik tymczasowy + os.replace - inne procesy nigdy nie
+    widzą niekompletnego pliku. Zwraca mtime zapisanego pliku.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+    with open(tmp_path, "wb") as f:
+        np.savez_compressed(f, **arrays)
+    os.replace(tmp_path, path)
+
+    return os.path.getmtime(path)
+
+
+@contextmanager
+def file_lock(path: str):
+    """
+    Blokada wyłączna między procesami (flock na pliku path) - np. odczyt,
+    scalenie i zapis cache przez równoległe workery. Bez fcntl albo gdy
+    pliku blokady nie da się utworzyć - tylko przepuszcza.
+    """
+    if fcntl is None:
+        yield
+        return
+
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        handle = open(path, "a")
+    except OSError as e:
+        logging.getLogger(__name__).warning(f"No file lock {path}: {e}")
+        yield
+        return
+
+    with handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+class PersistentCacheRegistry:
+    """
+    Jedna instancja katalogowego cache (np. MovieFeatureStore) na proces
+
+    Klasa cache musi mieć: FILE_NAME, build(db_session), load(directory),
+    save(directory), refresh_movies(db_session, movie_ids) i loaded_mtime.
+    refresh_movies działa na płytkiej kopii, więc nie może modyfikować
+    współdzielonych tablic / słowników w miejscu.
+    Gdy inny worker zapisze nowszy plik, instancja jest przeładowywana z dysku.
+    Budowa, przebudowa i odświeżenie trzymają blokadę pliku <FILE_NAME>.lock,
+    a odświeżenie scala zmiany z najnowszą wersją z dysku - równoległe
+    workery nie nadpisują sobie nawzajem zmian.
+    """
+
+    def __init__(self, cache_cls, directory: str = FEATURE_STORE_DIR):
+        self.cache_cls = cache_cls
+        self.directory = directory
+        self._instance = None
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.directory, self.cache_cls.FILE_NAME)
+
+    @property
+    def lock_path(self) -> str:
+        return f"{self.path}.lock"
+
+    def _current(self):
+        disk_mtime = os.path.getmtime(self.path) if os.path.exists(self.path) else None
+
+        if disk_mtime is not None and (
+            self._instance is None
+            or self._instance.loaded_mtime is None
+            or disk_mtime != self._instance.loaded_mtime
+        ):
+            loaded = self.cache_cls.load(self.directory)
+            if loaded is not None:
+                self._instance = loaded
+
+        return self._instance
+
+    def get(self, db_session: Session):
+        """Z pamięci, z dysku, albo budowany i zapisywany przy pierwszym użyciu"""
+        with self._lock:
+            instance = self._current()
+            if instance is not None:
+                return instance
+
+            with file_lock(self.lock_path):
+                # Inny proces mógł zbudować plik, gdy czekaliśmy na blokadę
+                instance = self._current()
+                if instance is None:
+                    instance = self.cache_cls.build(db_session)
+                    try:
+                        instance.save(self.directory)
+                    except OSError as e:
+                        self.logger.warning(
+                            f"{self.cache_cls.__name__} not persisted: {e}"
+                        )
+                    self._instance = instance
+            return instance
+
+    def rebuild(self, db_session: Session):
+        """Pełna przebudowa (np. po imporcie danych z pominięciem serwisów)"""
+        with self._lock, file_lock(self.lock_path):
+            instance = self.cache_cls.build(db_session)
+            instance.save(self.directory)
+            self._instance = instance
+            return instance
+
+    def refresh(self, db_session: Session, movie_ids: Iterable[int]) -> None:
+        """
+        Przelicza wiersze zmienionych filmów. Jeśli cache jeszcze nie istnieje,
+        nic nie robi - zostanie zbudowany przy pierwszym użyciu.
+
+        Błędy są tylko logowane: zapis filmu nie może się wywrócić przez cache.
+        """
+        movie_ids = list(movie_ids)
+        try:
+            with self._lock, file_lock(self.lock_path):
+                # Pod blokadą pliku: baza do scalenia to najnowszy zapis
+                # dowolnego procesu, nie kopia z pamięci tego workera
+                current = self._current()
+                if current is None:
+                    return
+
+                # Copy-on-write: równoległe generowanie rekomendacji dalej
+                # czyta spójną, starą instancję aż do podmiany
+                instance = copy.copy(current)
+                instance.refresh_movies(db_session, movie_ids)
+                instance.save(self.directory)
+                self._instance = instance
+        except Exception as e:
+            self.logger.error(
+                f"{self.cache_cls.__name__} refresh failed for {movie_ids}: {e}",
+                exc_info=True,
+            )
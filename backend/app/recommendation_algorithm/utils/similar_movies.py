@@ -0,0 +1,452 @@
+from sqlalchemy.orm import Session
+import numpy as np
+import scipy.sparse as sp
+from typing import Iterable, List, Optional, Tuple
+import logging
+import os
+
+from ..config import (
+    ADAPTIVE_BASE_ACTOR_WEIGHT,
+    ADAPTIVE_BASE_COUNTRY_WEIGHT,
+    ADAPTIVE_BASE_DIRECTOR_WEIGHT,
+    ADAPTIVE_BASE_GENRE_WEIGHT,
+    ADAPTIVE_BASE_YEAR_WEIGHT,
+    FEATURE_STORE_DIR,
+    SIMILAR_MOVIES_BLOCK_CELLS,
+    SIMILAR_MOVIES_TEXT_WEIGHT,
+    SIMILAR_MOVIES_TOP_K,
+    YEAR_MAX_DIFF,
+)
+from ..content_based.tfidf_processor import TFIDFProcessor
+from .description_index import get_description_index
+from .feature_store import get_feature_store
+from .persistent_cache import PersistentCacheRegistry, file_lock, save_npz_atomic
+
+# Grupy kolumn MovieFeatureStore i ich wagi (jak w
+# SimilarityMetrics.calculate_adaptive_movie_similarity)
+STRUCTURAL_GROUPS = (
+    ("genre_", ADAPTIVE_BASE_GENRE_WEIGHT),
+    ("actor_", ADAPTIVE_BASE_ACTOR_WEIGHT),
+    ("director_", ADAPTIVE_BASE_DIRECTOR_WEIGHT),
+    ("country_", ADAPTIVE_BASE_COUNTRY_WEIGHT),
+)
+
+
+class _CatalogueVectors:
+    """
+    Macierze całego katalogu do liczenia podobieństw blokami wierszy
+
+    Wynik dla pary filmów = (1 - SIMILAR_MOVIES_TEXT_WEIGHT) * średnia ważona
+    Jaccarda gatunków / aktorów / reżyserów / kraju i bliskości roku
+    (calculate_movie_similarity) + SIMILAR_MOVIES_TEXT_WEIGHT * cosinus TF-IDF
+    opisów. Jaccard z iloczynu macierzy binarnych: |A ∩ B| = A @ B.T,
+    |A ∪ B| = |A| + |B| - |A ∩ B|.
+
+    text_model = (termy, idf) z poprzedniej budowy: opisy są wtedy tylko
+    transformowane zapisanym modelem zamiast dopasowywać TF-IDF od nowa.
+    """
+
+    def __init__(self, feature_store, description_index, text_model=None):
+        self.movie_ids = feature_store.movie_ids.astype(np.int64)
+        self.row_index = {int(mid): i for i, mid in enumerate(self.movie_ids)}
+
+        names = feature_store.feature_names
+        matrix = sp.csr_matrix(feature_store.matrix)
+        matrix.resize((len(self.movie_ids), len(names)))
+        total_weight = sum(w for _, w in STRUCTURAL_GROUPS) + ADAPTIVE_BASE_YEAR_WEIGHT
+
+        self.groups = []
+        for prefix, weight in STRUCTURAL_GROUPS:
+            columns = [i for i, name in enumerate(names) if name.startswith(prefix)]
+            group = matrix[:, columns].astype(np.float32).tocsr()
+            sizes = np.asarray(group.sum(axis=1), dtype=np.float32).ravel()
+            self.groups.append((weight / total_weight, group, group.T.tocsr(), sizes))
+
+        self.year_weight = ADAPTIVE_BASE_YEAR_WEIGHT / total_weight
+        self.years = feature_store.years.astype(np.float32)
+        self.text_terms = np.asarray([], dtype=str)
+        self.text_idf = np.asarray([], dtype=np.float64)
+        self.text = self._text_vectors(description_index, text_model)
+        self.text_t = self.text.T.tocsr() if self.text is not None else None
+
+    @classmethod
+    def load(cls, db_session: Session, text_model=None) -> "_CatalogueVectors":
+        return cls(
+            get_feature_store(db_session),
+            get_description_index(db_session),
+            text_model,
+        )
+
+    def __len__(self) -> int:
+        return len(self.movie_ids)
+
+    def _text_vectors(
+        self, description_index, text_model=None
+    ) -> Optional[sp.csr_matrix]:
+        """TF-IDF opisów (wiersze L2) w kolejności movie_ids; None bez słownika"""
+        ids, counts = description_index.get_counts(self.movie_ids)
+        if len(ids) == 0:
+            return None
+
+        processor = TFIDFProcessor()
+        columns = None
+        if text_model is not None:
+            # Termy spoza indeksu opisów (np. po jego przebudowie) odpadają
+            terms, idf = text_model
+            columns = np.asarray(
+                [description_index.term_index.get(str(term), -1) for term in terms],
+                dtype=np.int64,
+            )
+            known = columns >= 0
+        if columns is not None and known.any():
+            processor.load_counts_model(columns[known], terms[known], idf[known])
+            tfidf = processor.transform_counts(counts)
+        else:
+            try:
+                tfidf = processor.fit_transform_counts(counts, description_index.terms)
+            except ValueError as e:
+                logging.getLogger(__name__).warning(f"Similar movies without text: {e}")
+                return None
+
+        self.text_terms = np.asarray(processor.feature_names, dtype=str)
+        self.text_idf = np.asarray(processor.transformer.idf_, dtype=np.float64)
+
+        # Filmy bez wiersza w indeksie opisów dostają pusty wiersz
+        rows = np.asarray([self.row_index[int(mid)] for mid in ids], dtype=np.int64)
+        placement = sp.csr_matrix(
+            (np.ones(len(rows), dtype=np.float32), (rows, np.arange(len(rows)))),
+            shape=(len(self.movie_ids), len(rows)),
+        )
+        return (placement @ tfidf.astype(np.float32)).tocsr()
+
+    def block_rows(self) -> int:
+        """Wierszy w bloku tak, żeby gęsty wynik blok x katalog miał ~BLOCK_CELLS"""
+        return max(1, SIMILAR_MOVIES_BLOCK_CELLS // max(len(self), 1))
+
+    def scores(self, rows: np.ndarray) -> np.ndarray:
+        """Gęsta macierz podobieństw [len(rows) x katalog]; film z samym sobą = -1"""
+        scores = np.zeros((len(rows), len(self)), dtype=np.float32)
+        for weight, group, group_t, sizes in self.groups:
+            intersection = (group[rows] @ group_t).toarray()
+            union = sizes[rows][:, None] + sizes[None, :] - intersection
+            np.divide(intersection, union, out=intersection, where=union > 0)
+            intersection[union <= 0] = 0.0
+            scores += weight * intersection
+
+        year_diff = np.abs(self.years[rows][:, None] - self.years[None, :])
+        year_similarity = np.clip(1.0 - year_diff / YEAR_MAX_DIFF, 0.0, None)
+        scores += self.year_weight * np.nan_to_num(year_similarity, nan=0.0)
+
+        if self.text is not None:
+            scores *= 1.0 - SIMILAR_MOVIES_TEXT_WEIGHT
+            scores += (
+                SIMILAR_MOVIES_TEXT_WEIGHT * (self.text[rows] @ self.text_t).toarray()
+            )
+
+        scores[np.arange(len(rows)), rows] = -1.0
+        return scores
+
+    def top_k(self, scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        K najlepszych sąsiadów każdego wiersza: (movie_id, wynik), malejąco,
+        remisy po movie_id; brakujące pozycje (wynik <= 0) to -1 / 0
+        """
+        return _top_k(scores, np.broadcast_to(self.movie_ids, scores.shape), k)
+
+
+def _top_k(
+    scores: np.ndarray, ids: np.ndarray, k: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Wspólne dla pełnych wierszy i scalania list: scores / ids [wiersze x kandydaci].
+    Kolejność po wyniku w precyzji zapisu (float16), remisy po movie_id - dzięki
+    temu refresh_movies (scala zapisane wyniki) daje to samo co pełna budowa.
+    """
+    n_rows, n_candidates = scores.shape
+    neighbors = np.full((n_rows, k), -1, dtype=np.int32)
+    top_scores = np.zeros((n_rows, k), dtype=np.float16)
+    if n_rows == 0 or n_candidates == 0:
+        return neighbors, top_scores
+
+    scores = scores.astype(np.float16)
+    take = min(k, n_candidates)
+    if take < n_candidates:
+        part = np.argpartition(-scores, take - 1, axis=1)[:, :take]
+        # Remisy na granicy K: argpartition wybiera dowolne - takie wiersze
+        # (rzadkie) sortowane w całości
+        kth = np.take_along_axis(scores, part[:, -1:], axis=1)
+        ties = np.where((kth[:, 0] > 0) & ((scores >= kth).sum(axis=1) > take))[0]
+        for row in ties:
+            part[row] = np.lexsort((ids[row], -scores[row]))[:take]
+    else:
+        # Katalog nie większy niż K - wszyscy kandydaci
+        part = np.tile(np.arange(n_candidates), (n_rows, 1))
+    part_scores = np.take_along_axis(scores, part, axis=1)
+    part_ids = np.take_along_axis(ids, part, axis=1)
+
+    order = np.lexsort((part_ids, -part_scores), axis=1)
+    part_scores = np.take_along_axis(part_scores, order, axis=1)
+    part_ids = np.take_along_axis(part_ids, order, axis=1)
+
+    valid = part_scores > 0
+    neighbors[:, :take] = np.where(valid, part_ids, -1)
+    top_scores[:, :take] = np.where(valid, part_scores, 0)
+    return neighbors, top_scores
+
+
+class SimilarMoviesIndex:
+    """
+    Tabela "podobne filmy": K najbliższych sąsiadów każdego filmu
+
+    - budowana offline blokami wierszy (_CatalogueVectors.scores) - pamięć
+      ~SIMILAR_MOVIES_BLOCK_CELLS komórek na blok zamiast N x N
+    - zapis kompaktowy: id sąsiadów int32 + wyniki float16 (N x K)
+    - refresh_movies przelicza zmienione filmy i listy, w których występowały;
+      pozostałe listy dostają zmieniony film, jeśli wszedł do ich top K.
+      Wołane w tle (mark_similar_movies_stale + apply_pending_similar_movies),
+      nie w żądaniu edycji; opisy transformuje model TF-IDF zapisany przy
+      pełnej budowie (text_terms / text_idf)
+    - odczyt: słownik movie_id -> wiersz, więc O(K) niezależnie od katalogu
+    """
+
+    FILE_NAME = "similar_movies.npz"
+
+    def __init__(
+        self,
+        movie_ids: Iterable[int],
+        neighbors: np.ndarray,
+        scores: np.ndarray,
+        text_terms: Iterable[str] = (),
+        text_idf: Iterable[float] = (),
+    ):
+        self.movie_ids = np.asarray(list(movie_ids), dtype=np.int32)
+        self.neighbors = np.asarray(neighbors, dtype=np.int32).reshape(
+            len(self.movie_ids), -1
+        )
+        self.scores = np.asarray(scores, dtype=np.float16).reshape(
+            len(self.movie_ids), -1
+        )
+        # Model TF-IDF opisów z pełnej budowy (puste = bez opisów)
+        self.text_terms = np.asarray(list(text_terms), dtype=str)
+        self.text_idf = np.asarray(list(text_idf), dtype=np.float64)
+        self.loaded_mtime = None
+        self.logger = logging.getLogger(__name__)
+        self._reindex()
+
+    def __len__(self) -> int:
+        return len(self.movie_ids)
+
+    def __contains__(self, movie_id: int) -> bool:
+        return int(movie_id) in self.row_index
+
+    @classmethod
+    def build(
+        cls, db_session: Session, k: int = SIMILAR_MOVIES_TOP_K
+    ) -> "SimilarMoviesIndex":
+        vectors = _CatalogueVectors.load(db_session)
+        neighbors = np.full((len(vectors), k), -1, dtype=np.int32)
+        scores = np.zeros((len(vectors), k), dtype=np.float16)
+
+        step = vectors.block_rows()
+        for start in range(0, len(vectors), step):
+            rows = np.arange(start, min(start + step, len(vectors)))
+            neighbors[rows], scores[rows] = vectors.top_k(vectors.scores(rows), k)
+
+        index = cls(
+            vectors.movie_ids, neighbors, scores, vectors.text_terms, vectors.text_idf
+        )
+        index.logger.info(
+            f"Similar movies index built: {len(index)} movies x top {k}, "
+            f"{step} rows per block"
+        )
+        return index
+
+    def refresh_movies(self, db_session: Session, movie_ids: Iterable[int]) -> None:
+        """
+        Aktualizuje listy po zmianie / dodaniu / usunięciu filmów (po
+        odświeżeniu feature store i indeksu opisów). Opisy przechodzą przez
+        model TF-IDF z pełnej budowy - te same wagi co niezmienione listy;
+        termy, których model nie zna, liczą się dopiero po przebudowie.
+        """
+        changed = np.asarray(sorted({int(mid) for mid in movie_ids}), dtype=np.int64)
+        if len(changed) == 0:
+            return
+
+        k = self.neighbors.shape[1]
+        text_model = (self.text_terms, self.text_idf) if len(self.text_terms) else None
+        vectors = _CatalogueVectors.load(db_session, text_model)
+
+        # Stare listy w kolejności nowego katalogu (nowe arrays - copy-on-write)
+        neighbors = np.full((len(vectors), k), -1, dtype=np.int32)
+        scores = np.zeros((len(vectors), k), dtype=np.float16)
+        old_rows = np.asarray(
+            [self.row_index.get(int(mid), -1) for mid in vectors.movie_ids],
+            dtype=np.int64,
+        )
+        known = old_rows >= 0
+        neighbors[known] = self.neighbors[old_rows[known]]
+        scores[known] = self.scores[old_rows[known]]
+
+        present = np.isin(vectors.movie_ids, changed)
+        changed_rows = np.where(present)[0]
+        # Listy ze zmienionym / usuniętym filmem i filmy spoza starego indeksu
+        stale = np.isin(neighbors, changed).any(axis=1) | ~known
+        stale[changed_rows] = False
+        stale_rows = np.where(stale)[0]
+
+        step = vectors.block_rows()
+        for start in range(0, len(changed_rows), step):
+            rows = changed_rows[start : start + step]
+            block = vectors.scores(rows)
+            neighbors[rows], scores[rows] = vectors.top_k(block, k)
+
+            # Zmieniony film jako kandydat do list pozostałych filmów
+            others = np.where(~present & ~stale)[0]
+            candidate_ids = np.broadcast_to(
+                vectors.movie_ids[rows], (len(others), len(rows))
+            )
+            merged_scores = np.hstack(
+                [scores[others].astype(np.float32), block[:, others].T]
+            )
+            merged_ids = np.hstack([neighbors[others], candidate_ids])
+            merged_scores[merged_ids < 0] = 0.0
+            neighbors[others], scores[others] = _top_k(merged_scores, merged_ids, k)
+
+        for start in range(0, len(stale_rows), step):
+            rows = stale_rows[start : start + step]
+            neighbors[rows], scores[rows] = vectors.top_k(vectors.scores(rows), k)
+
+        self.movie_ids = vectors.movie_ids.astype(np.int32)
+        self.neighbors = neighbors
+        self.scores = scores
+        if text_model is None:
+            self.text_terms, self.text_idf = vectors.text_terms, vectors.text_idf
+        self._reindex()
+
+        self.logger.info(
+            f"Similar movies refreshed: {len(changed_rows)} movies, "
+            f"{len(stale_rows)} lists recomputed, {len(self)} movies total"
+        )
+
+    def get_similar(
+        self, movie_id: int, limit: int
+    ) -> Optional[List[Tuple[int, float]]]:
+        """Sąsiedzi filmu [(movie_id, wynik)] od najbardziej podobnego; None = brak filmu"""
+        row = self.row_index.get(int(movie_id))
+        if row is None:
+            return None
+        return [
+            (int(neighbor), float(score))
+            for neighbor, score in zip(self.neighbors[row], self.scores[row])
+            if neighbor >= 0
+        ][:limit]
+
+    def save(self, directory: str = FEATURE_STORE_DIR) -> str:
+        path = os.path.join(directory, self.FILE_NAME)
+        self.loaded_mtime = save_npz_atomic(
+            path,
+            movie_ids=self.movie_ids,
+            neighbors=self.neighbors,
+            scores=self.scores,
+            text_terms=self.text_terms,
+            text_idf=self.text_idf,
+        )
+        self.logger.info(f"Similar movies index saved to {path}")
+        return path
+
+    @classmethod
+    def load(cls, directory: str = FEATURE_STORE_DIR) -> Optional["SimilarMoviesIndex"]:
+        path = os.path.join(directory, cls.FILE_NAME)
+        if not os.path.exists(path):
+            return None
+
+        try:
+            mtime = os.path.getmtime(path)
+            with np.load(path, allow_pickle=False) as npz:
+                # Pliki sprzed zapisu modelu TF-IDF - dopasowany przy odświeżeniu
+                text_model = (
+                    (npz["text_terms"], npz["text_idf"])
+                    if "text_terms" in npz.files
+                    else ((), ())
+                )
+                index = cls(
+                    npz["movie_ids"], npz["neighbors"], npz["scores"], *text_model
+                )
+            index.loaded_mtime = mtime
+            return index
+
+        except Exception as e:
+            logging.getLogger(__name__).error(
+                f"Similar movies index load failed ({path}): {e}", exc_info=True
+            )
+            return None
+
+    def _reindex(self) -> None:
+        self.row_index = {int(mid): i for i, mid in enumerate(self.movie_ids)}
+
+
+_registry = PersistentCacheRegistry(SimilarMoviesIndex)
+
+
+def get_similar_movies_index(db_session: Session) -> SimilarMoviesIndex:
+    """Indeks dla procesu: z pamięci, z dysku, albo budowany przy pierwszym użyciu"""
+    return _registry.get(db_session)
+
+
+def rebuild_similar_movies_index(db_session: Session) -> SimilarMoviesIndex:
+    # Przebudowa obejmuje też filmy oczekujące na odświeżenie
+    _take_pending()
+    return _registry.rebuild(db_session)
+
+
+# Id filmów czekających na odświeżenie sąsiadów - plik wspólny dla procesów
+PENDING_FILE_NAME = "similar_movies.pending"
+
+
+def _pending_path() -> str:
+    return os.path.join(_registry.directory, PENDING_FILE_NAME)
+
+
+def mark_similar_movies_stale(movie_ids: Iterable[int]) -> None:
+    """
+    Dopisuje filmy (po zmianie metadanych) do kolejki odświeżenia - koszt
+    dopisania kilku linii, bez liczenia podobieństw w żądaniu edycji
+    """
+    movie_ids = [int(mid) for mid in movie_ids if mid is not None]
+    if not movie_ids:
+        return
+
+    path = _pending_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with file_lock(f"{path}.lock"):
+        with open(path, "a") as f:
+            f.write("".join(f"{mid}\n" for mid in movie_ids))
+
+
+def has_pending_similar_movies() -> bool:
+    path = _pending_path()
+    return os.path.exists(path) and os.path.getsize(path) > 0
+
+
+def _take_pending() -> List[int]:
+    """Zabiera całą kolejkę (pod blokadą - każdy film trafia do jednego procesu)"""
+    path = _pending_path()
+    with file_lock(f"{path}.lock"):
+        if not os.path.exists(path):
+            return []
+        with open(path) as f:
+            movie_ids = sorted({int(line) for line in f if line.strip()})
+        os.remove(path)
+    return movie_ids
+
+
+def apply_pending_similar_movies(db_session: Session) -> int:
+    """
+    Odświeża sąsiadów filmów z kolejki - w tle (similar_movies_service) albo
+    z CLI. Wołać po refresh_movie_features / refresh_movie_descriptions.
+    Zwraca liczbę odświeżonych filmów; błędy odświeżenia są tylko logowane.
+    """
+    movie_ids = _take_pending()
+    if movie_ids:
+        _registry.refresh(db_session, movie_ids)
+    return len(movie_ids)
@@ -448,16 +448,19 @@ class SimilarityMetrics:
         if diversity_factor <= 0 or movies_metadata.empty:
             return ranked_base[:top_k]
 
-        check_size = min(top_k, len(ranked_base))
-        top_ids = [mid for mid, _ in ranked_base[:check_size]]
+        if "genres" in movies_metadata.columns:
+            genres_by_id = dict(
+                zip(movies_metadata["movie_id"], movies_metadata["genres"])
+            )
+        else:
+            genres_by_id = dict.fromkeys(movies_metadata["movie_id"], [])
 
+        check_size = min(top_k, len(ranked_base))
         genres_in_top = []
-        for mid in top_ids:
-            movie_info = movies_metadata[movies_metadata["movie_id"] == mid]
-            if not movie_info.empty:
-                genres = movie_info.iloc[0].get("genres", [])
-                if isinstance(genres, list):
-                    genres_in_top.extend(genres)
+        for mid, _ in ranked_base[:check_size]:
+            genres = genres_by_id.get(mid)
+            if isinstance(genres, list):
+                genres_in_top.extend(genres)
 
         if len(genres_in_top) > 0:
             unique_genres = len(set(genres_in_top))
@@ -480,44 +483,46 @@ class SimilarityMetrics:
 
         self.logger.info(f"MMR enabled (λ={diversity_factor:.2f})")
 
-        features_dict = {}
-        for _, row in movies_metadata.iterrows():
-            mid = row["movie_id"]
-            features_dict[mid] = row.get("genres", [])
-
-        final_ranking = []
-        remaining = dict(ranked_base)
-
-        if remaining:
-            best_item = max(remaining.items(), key=lambda x: x[1])
-            final_ranking.append(best_item)
-            selected_ids = {best_item[0]}
-            del remaining[best_item[0]]
-
-        while remaining and len(final_ranking) < top_k:
-            best_score = -np.inf
-            best_item = None
-
-            for mid, relevance in remaining.items():
-
-                max_sim = 0.0
-                for sel_mid in selected_ids:
-                    if mid in features_dict and sel_mid in features_dict:
-                        sim = self.jaccard_similarity_score(
-                            features_dict[mid], features_dict[sel_mid]
-                        )
-                        max_sim = max(max_sim, sim)
-
-                mmr_score = relevance - diversity_factor * max_sim
-
-                if mmr_score > best_score:
-                    best_score = mmr_score
-                    best_item = (mid, relevance)
+        ids = [mid for mid, _ in ranked_base]
+        relevance = np.array([score for _, score in ranked_base], dtype=np.float64)
+        bits, sizes, has_features = _pack_feature_bits(
+            [genres_by_id.get(mid) for mid in ids]
+        )
 
-            if best_item:
-                final_ranking.append((best_item[0], best_score))
-                selected_ids.add(best_item[0])
-                del remaining[best_item[0]]
+        # max_sim[i] = max Jaccard kandydata i z wybranymi - aktualizowane
+        # raz na wybór (jeden wiersz bitów przeciw wszystkim) zamiast liczenia
+        # od nowa względem wszystkich wybranych w każdej iteracji
+        max_sim = np.zeros(len(ids))
+        available = np.ones(len(ids), dtype=bool)
+
+        # Pierwszy: najwyższa trafność (ranked_base[0]) z wynikiem bazowym
+        final_ranking = [ranked_base[0]]
+        picked, score = 0, ranked_base[0][1]
+        while True:
+            available[picked] = False
+            if has_features[picked]:
+                intersection = np.bitwise_count(bits & bits[picked]).sum(
+                    axis=1, dtype=np.int64
+                )
+                union = sizes + sizes[picked] - intersection
+                similarity = np.divide(
+                    intersection,
+                    union,
+                    out=np.ones(len(ids)),  # oba puste -> identyczne
+                    where=union > 0,
+                )
+                similarity[~has_features] = 0.0
+                np.maximum(max_sim, similarity, out=max_sim)
+
+            if len(final_ranking) >= top_k or not available.any():
+                break
+
+            mmr = relevance - diversity_factor * max_sim
+            mmr[~available] = -np.inf
+            # argmax: przy remisie pierwszy w kolejności trafności
+            picked = int(np.argmax(mmr))
+            score = float(mmr[picked])
+            final_ranking.append((ids[picked], score))
 
         final_ranking = [(mid, max(0.0, score)) for mid, score in final_ranking]
 
@@ -663,3 +668,46 @@ class SimilarityMetrics:
             "country": ADAPTIVE_BASE_COUNTRY_WEIGHT,
             "year": ADAPTIVE_BASE_YEAR_WEIGHT,
         }
+
+
+def _pack_feature_bits(
+    feature_lists: List[Optional[List]],
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Listy cech (np. gatunków) jako spakowana macierz bitów [n x słowa uint64]
+
+    Returns:
+        (bits, rozmiary zbiorów, maska wierszy z cechami - None / nie-lista
+        oznacza brak metadanych filmu)
+    """
+    # Kandydaci mają niewiele różnych kombinacji gatunków - bity liczone
+    # raz na kombinację, wiersze to tylko indeksy kombinacji
+    combinations = {}
+    combination_index = np.full(len(feature_lists), -1, dtype=np.int64)
+    for row, features in enumerate(feature_lists):
+        if isinstance(features, (list, tuple, set, np.ndarray)):
+            key = tuple(features)
+            combination_index[row] = combinations.setdefault(key, len(combinations))
+
+    vocabulary = {}
+    rows, columns = [], []
+    for row, features in enumerate(combinations):
+        for feature in features:
+            rows.append(row)
+            columns.append(vocabulary.setdefault(feature, len(vocabulary)))
+
+    words = max(1, (len(vocabulary) + 63) // 64)
+    # Ostatni wiersz (indeks -1) - puste bity dla filmów bez metadanych
+    combination_bits = np.zeros((len(combinations) + 1, words), dtype=np.uint64)
+    if rows:
+        rows = np.asarray(rows)
+        columns = np.asarray(columns)
+        np.bitwise_or.at(
+            combination_bits,
+            (rows, columns // 64),
+            np.left_shift(np.uint64(1), (columns % 64).astype(np.uint64)),
+        )
+
+    bits = combination_bits[combination_index]
+    sizes = np.bitwise_count(bits).sum(axis=1, dtype=np.int64)
+    return bits, sizes, combination_index >= 0
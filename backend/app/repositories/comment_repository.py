@@ -4,7 +4,10 @@ from app.models.user import User
 from app.models.rating import Rating
 from sqlalchemy.orm import joinedload
 from sqlalchemy.exc import SQLAlchemyError
-from datetime import datetime
+from datetime import datetime, timedelta
+from app.utils.pagination import SortKey, apply_keyset, cursor_page
+from app.repositories.search_repository import SearchRepository
+from app.repositories.stats_rollup_repository import StatsRollupRepository
 
 
 class CommentRepository:
@@ -17,6 +20,9 @@ class CommentRepository:
                 user_id=user_id, movie_id=movie_id, comment_text=comment_text
             )
             self.session.add(comment)
+            StatsRollupRepository(self.session).increment(
+                "comments", value=len(comment_text)
+            )
             self.session.commit()
             print(f"Dodano komentarz do filmu {movie_id} przez użytkownika {user_id}")
             return comment
@@ -39,6 +45,7 @@ class CommentRepository:
                 )
                 return None
 
+            self._rollup_text_change(comment, new_text)
             comment.comment_text = new_text
             self.session.commit()
             print(f"Zaktualizowano komentarz {comment_id}")
@@ -63,6 +70,7 @@ class CommentRepository:
                 return False
 
             self.session.delete(comment)
+            self._rollup_removed([comment])
             self.session.commit()
             print(f"Usunięto komentarz {comment_id}")
             return True
@@ -71,6 +79,44 @@ class CommentRepository:
             print(f"Błąd podczas usuwania komentarza: {e}")
             raise
 
+    def delete_user_comments(self, user_id):
+        """
+        Usuwa wszystkie komentarze użytkownika (usuwanie konta) razem z ich
+        udziałem w rollupach. Bez commitu - wywołujący usuwa konto w tej samej
+        transakcji. Zwraca id usuniętych komentarzy.
+        """
+        comments = (
+            self.session.query(
+                Comment.comment_id, Comment.created_at, Comment.comment_text
+            )
+            .filter(Comment.user_id == user_id)
+            .all()
+        )
+        if comments:
+            self.session.query(Comment).filter(Comment.user_id == user_id).delete(
+                synchronize_session=False
+            )
+            self._rollup_removed(comments)
+        return [comment.comment_id for comment in comments]
+
+    def _rollup_text_change(self, comment, new_text):
+        # Rollup "comments" jak stan tabeli - długość komentarza po edycji
+        StatsRollupRepository(self.session).increment(
+            "comments",
+            comment.created_at,
+            count=0,
+            value=len(new_text) - len(comment.comment_text or ""),
+        )
+
+    def _rollup_removed(self, comments):
+        StatsRollupRepository(self.session).remove(
+            "comments",
+            [
+                (comment.created_at, len(comment.comment_text or ""))
+                for comment in comments
+            ],
+        )
+
     def get_comment_by_id(self, comment_id):
         try:
             comment = (
@@ -84,6 +130,24 @@ class CommentRepository:
             print(f"Błąd podczas pobierania komentarza: {e}")
             raise
 
+    def _movie_comment_sort_keys(self, sort_by, sort_order, rating_model):
+        """
+        Klucz keyset dla komentarzy filmu; wiersze to (Comment, wartość klucza).
+        Oceny NULL na końcu jak w nullslast() trybu z page (0-10 -> -1 / 11).
+        """
+        from sqlalchemy import func
+
+        descending = sort_order == "desc"
+        if sort_by == "rating":
+            expression = func.coalesce(rating_model.rating, -1 if descending else 11)
+        else:
+            expression = Comment.created_at
+
+        return [
+            SortKey(expression, descending, lambda row: row[1]),
+            SortKey(Comment.comment_id, descending, lambda row: row[0].comment_id),
+        ]
+
     def get_movie_comments(
         self,
         movie_id,
@@ -92,7 +156,10 @@ class CommentRepository:
         sort_by="created_at",
         sort_order="desc",
         include_user_ratings=True,
+        after=None,
+        include_total=False,
     ):
+        """after: kursor keyset zamiast page ("" = pierwsza strona)"""
         try:
             from app.models.rating import Rating
             from sqlalchemy import desc, asc, case, nullslast
@@ -109,20 +176,43 @@ class CommentRepository:
                     & (Rating.movie_id == Comment.movie_id),
                 )
 
-                if sort_order == "desc":
-                    query = query.order_by(nullslast(desc(Rating.rating)))
-                else:
-                    query = query.order_by(nullslast(asc(Rating.rating)))
+            if after is not None:
+                keys = self._movie_comment_sort_keys(sort_by, sort_order, Rating)
+                signature = f"movie_comments:{movie_id}:{sort_by}:{sort_order}"
+                rows = apply_keyset(
+                    query.add_columns(keys[0].expression),
+                    keys,
+                    after,
+                    signature,
+                    per_page,
+                ).all()
+                rows, pagination = cursor_page(rows, keys, signature, per_page)
+                comments = [comment for comment, _ in rows]
+                if include_total:
+                    pagination["total"] = query.count()
             else:
-                if sort_order == "desc":
-                    query = query.order_by(Comment.created_at.desc())
+                if sort_by == "rating":
+                    if sort_order == "desc":
+                        query = query.order_by(nullslast(desc(Rating.rating)))
+                    else:
+                        query = query.order_by(nullslast(asc(Rating.rating)))
                 else:
-                    query = query.order_by(Comment.created_at.asc())
+                    if sort_order == "desc":
+                        query = query.order_by(Comment.created_at.desc())
+                    else:
+                        query = query.order_by(Comment.created_at.asc())
 
-            total = query.count()
+                total = query.count()
+
+                comments = query.limit(per_page).offset((page - 1) * per_page).all()
+                total_pages = (total + per_page - 1) // per_page if total > 0 else 0
+                pagination = {
+                    "total": total,
+                    "total_pages": total_pages,
+                    "page": page,
+                    "per_page": per_page,
+                }
 
-            comments = query.limit(per_page).offset((page - 1) * per_page).all()
-            total_pages = (total + per_page - 1) // per_page if total > 0 else 0
             if include_user_ratings:
                 user_ids = [comment.user_id for comment in comments]
 
@@ -150,18 +240,10 @@ class CommentRepository:
                 ]
 
             print(
-                f"Pobrano {len(comments)} z {total} komentarzy dla filmu {movie_id} (strona {page}/{total_pages})"
+                f"Pobrano {len(comments)} z {pagination.get('total')} komentarzy dla filmu {movie_id} (strona {pagination.get('page')}/{pagination.get('total_pages')})"
             )
 
-            return {
-                "comments": serialized_comments,
-                "pagination": {
-                    "total": total,
-                    "total_pages": total_pages,
-                    "page": page,
-                    "per_page": per_page,
-                },
-            }
+            return {"comments": serialized_comments, "pagination": pagination}
         except SQLAlchemyError as e:
             print(f"Błąd podczas pobierania komentarzy: {e}")
             raise
@@ -169,19 +251,48 @@ class CommentRepository:
             print(f"Nieoczekiwany błąd podczas pobierania komentarzy: {e}")
             raise
 
-    def get_user_comments(self, user_id, page=1, per_page=10, include_ratings=True):
+    def get_user_comments(
+        self,
+        user_id,
+        page=1,
+        per_page=10,
+        include_ratings=True,
+        after=None,
+        include_total=False,
+    ):
+        """after: kursor keyset zamiast page ("" = pierwsza strona)"""
         try:
             query = (
                 self.session.query(Comment)
                 .options(joinedload(Comment.movie))
                 .filter_by(user_id=user_id)
-                .order_by(Comment.created_at.desc())
             )
 
-            total = query.count()
-            comments = query.limit(per_page).offset((page - 1) * per_page).all()
-
-            total_pages = (total + per_page - 1) // per_page if total > 0 else 0
+            if after is not None:
+                keys = [
+                    SortKey(Comment.created_at, True, lambda c: c.created_at),
+                    SortKey(Comment.comment_id, True, lambda c: c.comment_id),
+                ]
+                signature = f"user_comments:{user_id}"
+                comments, pagination = cursor_page(
+                    apply_keyset(query, keys, after, signature, per_page).all(),
+                    keys,
+                    signature,
+                    per_page,
+                )
+                if include_total:
+                    pagination["total"] = query.count()
+            else:
+                query = query.order_by(Comment.created_at.desc())
+                total = query.count()
+                comments = query.limit(per_page).offset((page - 1) * per_page).all()
+                total_pages = (total + per_page - 1) // per_page if total > 0 else 0
+                pagination = {
+                    "total": total,
+                    "total_pages": total_pages,
+                    "page": page,
+                    "per_page": per_page,
+                }
 
             if include_ratings:
                 movie_ids = [comment.movie_id for comment in comments]
@@ -210,18 +321,10 @@ class CommentRepository:
                 ]
 
             print(
-                f"Pobrano {len(comments)} z {total} komentarzy użytkownika {user_id} (strona {page}/{total_pages})"
+                f"Pobrano {len(comments)} z {pagination.get('total')} komentarzy użytkownika {user_id} (strona {pagination.get('page')}/{pagination.get('total_pages')})"
             )
 
-            return {
-                "comments": serialized_comments,
-                "pagination": {
-                    "total": total,
-                    "total_pages": total_pages,
-                    "page": page,
-                    "per_page": per_page,
-                },
-            }
+            return {"comments": serialized_comments, "pagination": pagination}
         except SQLAlchemyError as e:
             print(f"Błąd podczas pobierania komentarzy użytkownika: {e}")
             raise
@@ -264,6 +367,22 @@ class CommentRepository:
             print(f"Błąd podczas pobierania komentarza użytkownika dla filmu: {e}")
             raise
 
+    def _search_condition(self, search):
+        """
+        Fraza w treści komentarza, nazwie użytkownika lub tytule filmu -
+        przez indeks search_terms; ILIKE gdy fraza nie ma słów albo indeks
+        nic nie znajduje
+        """
+        return SearchRepository(self.session).text_condition(
+            search,
+            [
+                ("comment", Comment.comment_id),
+                ("user", Comment.user_id),
+                ("movie", Comment.movie_id),
+            ],
+            [Comment.comment_text, User.username, Movie.title],
+        )
+
     def get_all_comments(
         self,
         page=1,
@@ -273,6 +392,8 @@ class CommentRepository:
         date_to=None,
         sort_by="created_at",
         sort_order="desc",
+        after=None,
+        include_total=False,
     ):
         """
         Pobiera wszystkie komentarze z zaawansowanym filtrowaniem i sortowaniem
@@ -285,10 +406,12 @@ class CommentRepository:
             date_to: data do (format: YYYY-MM-DD)
             sort_by: "created_at", "movie_title", "username"
             sort_order: "desc" lub "asc"
+            after: kursor keyset zamiast page ("" = pierwsza strona)
+            include_total: w trybie kursorowym dolicza COUNT(*)
         """
         try:
             # IMPORTY WEWNĄTRZ METODY - rozwiązuje problem cyklicznych importów
-            from sqlalchemy import desc, asc, or_, and_
+            from sqlalchemy import desc, asc, and_
             from sqlalchemy.orm import joinedload
             from datetime import datetime, timedelta
             from app.models.user import User
@@ -300,19 +423,10 @@ class CommentRepository:
 
             # FILTROWANIE PO WYSZUKIWANEJ FRAZIE
             if search and search.strip():
-                search_term = f"%{search.strip()}%"
                 query = (
                     query.join(User)
                     .join(Movie)
-                    .filter(
-                        or_(
-                            Comment.comment_text.ilike(
-                                search_term
-                            ),  # w treści komentarza
-                            User.username.ilike(search_term),  # w nazwie użytkownika
-                            Movie.title.ilike(search_term),  # w nazwie filmu
-                        )
-                    )
+                    .filter(self._search_condition(search.strip()))
                 )
             else:
                 # Jeśli nie ma search, dodaj join dla sortowania
@@ -335,27 +449,55 @@ class CommentRepository:
                 except ValueError:
                     print(f"Nieprawidłowy format daty 'date_to': {date_to}")
 
-            # SORTOWANIE
-            if sort_by == "movie_title":
-                if sort_order == "desc":
-                    query = query.order_by(desc(Movie.title))
-                else:
-                    query = query.order_by(asc(Movie.title))
-            elif sort_by == "username":
-                if sort_order == "desc":
-                    query = query.order_by(desc(User.username))
-                else:
-                    query = query.order_by(asc(User.username))
-            else:  # created_at (domyślne)
-                if sort_order == "desc":
-                    query = query.order_by(desc(Comment.created_at))
-                else:
-                    query = query.order_by(asc(Comment.created_at))
+            if after is not None:
+                # PAGINACJA KURSOROWA (keyset) - bez OFFSET, COUNT tylko na żądanie
+                sort_column = {
+                    "movie_title": Movie.title,
+                    "username": User.username,
+                }.get(sort_by, Comment.created_at)
+                descending = sort_order == "desc"
+                keys = [
+                    SortKey(sort_column, descending, lambda row: row[1]),
+                    SortKey(
+                        Comment.comment_id, descending, lambda row: row[0].comment_id
+                    ),
+                ]
+                signature = f"all_comments:{sort_by}:{sort_order}"
+                rows = apply_keyset(
+                    query.add_columns(sort_column), keys, after, signature, per_page
+                ).all()
+                rows, pagination = cursor_page(rows, keys, signature, per_page)
+                comments = [comment for comment, _ in rows]
+                if include_total:
+                    pagination["total"] = query.count()
+            else:
+                # SORTOWANIE
+                if sort_by == "movie_title":
+                    if sort_order == "desc":
+                        query = query.order_by(desc(Movie.title))
+                    else:
+                        query = query.order_by(asc(Movie.title))
+                elif sort_by == "username":
+                    if sort_order == "desc":
+                        query = query.order_by(desc(User.username))
+                    else:
+                        query = query.order_by(asc(User.username))
+                else:  # created_at (domyślne)
+                    if sort_order == "desc":
+                        query = query.order_by(desc(Comment.created_at))
+                    else:
+                        query = query.order_by(asc(Comment.created_at))
 
-            # PAGINACJA
-            total = query.count()
-            comments = query.limit(per_page).offset((page - 1) * per_page).all()
-            total_pages = (total + per_page - 1) // per_page if total > 0 else 0
+                # PAGINACJA
+                total = query.count()
+                comments = query.limit(per_page).offset((page - 1) * per_page).all()
+                total_pages = (total + per_page - 1) // per_page if total > 0 else 0
+                pagination = {
+                    "total": total,
+                    "total_pages": total_pages,
+                    "page": page,
+                    "per_page": per_page,
+                }
 
             # SERIALIZACJA
             serialized_comments = [
@@ -364,17 +506,12 @@ class CommentRepository:
             ]
 
             print(
-                f"Pobrano {len(comments)} z {total} komentarzy (strona {page}/{total_pages})"
+                f"Pobrano {len(comments)} z {pagination.get('total')} komentarzy (strona {pagination.get('page')}/{pagination.get('total_pages')})"
             )
 
             return {
                 "comments": serialized_comments,
-                "pagination": {
-                    "total": total,
-                    "total_pages": total_pages,
-                    "page": page,
-                    "per_page": per_page,
-                },
+                "pagination": pagination,
                 "filters": {
                     "search": search,
                     "date_from": date_from,
@@ -401,6 +538,7 @@ class CommentRepository:
             # Zapisz oryginalny tekst do logów
             original_text = comment.comment_text
 
+            self._rollup_text_change(comment, new_text)
             comment.comment_text = new_text
             self.session.commit()
 
@@ -435,6 +573,7 @@ class CommentRepository:
             }
 
             self.session.delete(comment)
+            self._rollup_removed([comment])
             self.session.commit()
 
             print(f"Staff {staff_user_id} usunął komentarz {comment_id}")
@@ -528,34 +667,30 @@ class CommentRepository:
             raise
 
     def get_basic_statistics(self):
-        """Pobiera podstawowe statystyki komentarzy"""
+        """
+        Pobiera podstawowe statystyki komentarzy. Liczby z ostatnich dni
+        i średnia długość pochodzą z rollupów (stats_rollups), nie ze skanu
+        tabeli komentarzy - rollupy uwzględniają edycje i usunięcia, więc
+        zgadzają się z total_comments.
+        """
         try:
-            from sqlalchemy import func
-            from datetime import datetime, timedelta
+            rollups = StatsRollupRepository(self.session)
+            today = datetime.utcnow().date()
 
             # Podstawowe liczby
             total_comments = self.session.query(Comment).count()
 
-            # Komentarze z ostatnich 30 dni
-            thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-            recent_comments = (
-                self.session.query(Comment)
-                .filter(Comment.created_at >= thirty_days_ago)
-                .count()
+            # Komentarze z ostatnich 30 / 7 dni (z dzisiejszym)
+            recent_comments, _ = rollups.get_totals(
+                "comments", since=today - timedelta(days=29)
             )
-
-            # Komentarze z ostatnich 7 dni
-            week_ago = datetime.utcnow() - timedelta(days=7)
-            weekly_comments = (
-                self.session.query(Comment)
-                .filter(Comment.created_at >= week_ago)
-                .count()
+            weekly_comments, _ = rollups.get_totals(
+                "comments", since=today - timedelta(days=6)
             )
 
-            # Średnia długość komentarza
-            avg_length = self.session.query(
-                func.avg(func.length(Comment.comment_text))
-            ).scalar()
+            # Średnia długość istniejących komentarzy
+            written, total_length = rollups.get_totals("comments")
+            avg_length = total_length / written if written else 0
 
             return {
                 "total_comments": total_comments,
@@ -571,8 +706,7 @@ class CommentRepository:
     def get_dashboard_data(self):
         """Pobiera dane dashboard dla komentarzy"""
         try:
-            from sqlalchemy import func, extract
-            from datetime import datetime, timedelta
+            from sqlalchemy import func
 
             # Podstawowe statystyki
             basic_stats = self.get_basic_statistics()
@@ -604,26 +738,13 @@ class CommentRepository:
                 .first()
             )
 
-            # Komentarze według miesięcy (ostatnie 6 miesięcy)
-            monthly_stats = []
-            for i in range(6):
-                month_start = datetime.utcnow().replace(day=1) - timedelta(days=30 * i)
-                month_end = (month_start + timedelta(days=32)).replace(
-                    day=1
-                ) - timedelta(days=1)
-
-                count = (
-                    self.session.query(Comment)
-                    .filter(
-                        Comment.created_at >= month_start,
-                        Comment.created_at <= month_end,
-                    )
-                    .count()
-                )
-
-                monthly_stats.append(
-                    {"month": month_start.strftime("%Y-%m"), "count": count}
+            # Komentarze według miesięcy kalendarzowych (ostatnie 6, z rollupów)
+            monthly_stats = [
+                {"month": month.strftime("%Y-%m"), "count": count}
+                for month, count, _ in StatsRollupRepository(self.session).get_trend(
+                    "comments", "month", 6
                 )
+            ]
 
             return {
                 "statistics": basic_stats,
@@ -635,7 +756,7 @@ class CommentRepository:
                     "username": top_user.username if top_user else None,
                     "comment_count": top_user.comment_count if top_user else 0,
                 },
-                "monthly_trends": list(reversed(monthly_stats)),
+                "monthly_trends": monthly_stats,
             }
 
         except Exception as e:
@@ -1,10 +1,23 @@
 from app.models.movie import Movie
 from app.models.genre import Genre
 from app.models.rating import Rating
-from sqlalchemy import func, or_, extract, desc
-from sqlalchemy.orm import joinedload, selectinload
-from datetime import date
+from app.models.comment import Comment
+from app.models.actor import Actor
+from app.models.director import Director
+from app.models.movie_actor import MovieActor
+from app.models.movie_director import MovieDirector
+from sqlalchemy import and_, func, or_, extract, desc, select
+from sqlalchemy.orm import joinedload, lazyload, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+from datetime import date, datetime, timedelta
 from app.models.watchlist import Watchlist
+from app.utils.pagination import SortKey, apply_keyset, cursor_page, order_clauses
+from app.repositories.search_repository import SearchRepository
+from app.repositories.stats_rollup_repository import StatsRollupRepository
+from app.repositories.rating_repository import mark_ratings_deleted
+
+# Zapytania GET /api/movies/<id> (sprawdza app.scripts.benchmark_movie_detail)
+MOVIE_DETAIL_QUERY_BUDGET = 3
 
 
 class MovieRepository:
@@ -16,11 +29,42 @@ class MovieRepository:
         return (
             self.session.query(Movie)
             # USUNIĘTO: .filter(Movie.release_date <= today)
-            .options(joinedload(Movie.genres), selectinload(Movie.ratings))
+            .options(joinedload(Movie.genres))
             .order_by(Movie.release_date.desc())
             .all()
         )
 
+    def iter_all(self, user_id=None, include_genres=True, batch_size=500):
+        """
+        Wszystkie filmy partiami po batch_size (yield_per - w PostgreSQL kursor
+        po stronie serwera), bez ładowania ocen. Ocena użytkownika (_user_rating)
+        jednym zapytaniem na partię. Pamięć zależy od batch_size, nie od
+        wielkości katalogu - obiekty z poprzednich partii zwalnia słaba mapa
+        tożsamości sesji.
+        """
+        stmt = (
+            select(Movie)
+            .order_by(Movie.release_date.desc(), Movie.movie_id)
+            .execution_options(yield_per=batch_size)
+        )
+        # joinedload (domyślny dla gatunków) nie działa z yield_per
+        stmt = stmt.options(
+            selectinload(Movie.genres) if include_genres else lazyload(Movie.genres)
+        )
+
+        for movies in self.session.scalars(stmt).partitions():
+            user_ratings = {}
+            if user_id:
+                user_ratings = dict(
+                    self.session.query(Rating.movie_id, Rating.rating).filter(
+                        Rating.user_id == user_id,
+                        Rating.movie_id.in_([movie.movie_id for movie in movies]),
+                    )
+                )
+            for movie in movies:
+                movie._user_rating = user_ratings.get(movie.movie_id)
+            yield movies
+
     def get_paginated(self, page=1, per_page=10, genre_id=None, user_id=None):
         """✅ POPRAWIONE - zwraca WSZYSTKIE filmy z paginacją"""
         movies, total = Movie.get_with_ratings(
@@ -47,44 +91,60 @@ class MovieRepository:
     def get_top_rated(self, limit=10, user_id=None):
         """✅ POPRAWIONE - zwraca najlepiej oceniane filmy bez filtrowania dat"""
         query = (
-            self.session.query(
-                Movie,
-                func.avg(Rating.rating).label("avg_rating"),
-                func.count(Rating.rating_id).label("rating_count"),
-            )
+            self.session.query(Movie)
             # USUNIĘTO: .filter(Movie.release_date <= today)
-            .outerjoin(Rating, Movie.movie_id == Rating.movie_id)
-            .group_by(Movie.movie_id)
-            .order_by(func.count(Rating.rating_id).desc())
+            .order_by(Movie.rating_count.desc(), Movie.movie_id)
             .options(joinedload(Movie.genres))
             .limit(limit)
         )
 
-        movies_with_ratings = query.all()
+        movies = query.all()
 
         user_ratings = {}
         if user_id:
             user_ratings_query = (
                 self.session.query(Rating.movie_id, Rating.rating)
                 .filter(Rating.user_id == user_id)
-                .filter(
-                    Rating.movie_id.in_(
-                        [movie.movie_id for movie, _, _ in movies_with_ratings]
-                    )
-                )
+                .filter(Rating.movie_id.in_([movie.movie_id for movie in movies]))
             )
             user_ratings = {movie_id: rating for movie_id, rating in user_ratings_query}
 
-        result = []
-        for movie, avg_rating, rating_count in movies_with_ratings:
-            movie._average_rating = (
-                float(avg_rating) if avg_rating is not None else None
-            )
-            movie._rating_count = rating_count or 0
+        for movie in movies:
             movie._user_rating = user_ratings.get(movie.movie_id)
-            result.append(movie)
 
-        return result
+        return movies
+
+    def get_by_ids(self, movie_ids, user_id=None):
+        """Filmy z gatunkami i oceną użytkownika w kolejności movie_ids (brakujące pomijane)"""
+        if not movie_ids:
+            return []
+
+        query = (
+            self.session.query(Movie)
+            .options(joinedload(Movie.genres))
+            .filter(Movie.movie_id.in_(movie_ids))
+        )
+        if user_id:
+            query = query.outerjoin(
+                Rating,
+                and_(Rating.movie_id == Movie.movie_id, Rating.user_id == user_id),
+            ).add_columns(Rating.rating)
+
+        found = {}
+        for row in query.all():
+            movie, user_rating = row if user_id else (row, None)
+            movie._user_rating = user_rating
+            found[movie.movie_id] = movie
+
+        return [found[movie_id] for movie_id in movie_ids if movie_id in found]
+
+    def exists(self, movie_id):
+        return (
+            self.session.query(Movie.movie_id)
+            .filter(Movie.movie_id == movie_id)
+            .first()
+            is not None
+        )
 
     def get_by_id(self, movie_id, user_id=None):
         """Pobiera pojedynczy film - bez względu na datę premiery"""
@@ -92,7 +152,6 @@ class MovieRepository:
             self.session.query(Movie)
             .options(
                 joinedload(Movie.genres),
-                selectinload(Movie.ratings),
                 selectinload(Movie.actors),
                 selectinload(Movie.directors),
             )
@@ -109,6 +168,73 @@ class MovieRepository:
 
         return movie
 
+    def get_detail(self, movie_id, user_id=None):
+        """
+        Film do widoku szczegółów: film z gatunkami i oceną użytkownika,
+        obsada z rolami i reżyserzy - MOVIE_DETAIL_QUERY_BUDGET zapytań
+        niezależnie od obsady (bez ładowania ocen)
+        """
+        query = (
+            self.session.query(Movie)
+            .options(joinedload(Movie.genres))
+            .filter(Movie.movie_id == movie_id)
+        )
+        if user_id:
+            query = query.outerjoin(
+                Rating,
+                and_(Rating.movie_id == Movie.movie_id, Rating.user_id == user_id),
+            ).add_columns(Rating.rating)
+
+        row = query.one_or_none()
+        if row is None:
+            return None
+
+        movie, user_rating = row if user_id else (row, None)
+        movie._user_rating = user_rating
+        self.load_credits([movie], include_directors=True)
+        return movie
+
+    def load_credits(self, movies, include_directors=False):
+        """
+        Ładuje obsadę (z rolami dla Movie.serialize(include_actors_roles=True))
+        i opcjonalnie reżyserów wielu filmów - jedno zapytanie na relację
+        zamiast leniwego ładowania i osobnego zapytania o role dla każdego filmu
+        """
+        by_id = {movie.movie_id: movie for movie in movies}
+        if not by_id:
+            return movies
+
+        cast = {movie_id: [] for movie_id in by_id}
+        roles = {movie_id: {} for movie_id in by_id}
+        cast_rows = (
+            self.session.query(MovieActor.movie_id, MovieActor.movie_role, Actor)
+            .join(Actor, Actor.actor_id == MovieActor.actor_id)
+            .filter(MovieActor.movie_id.in_(by_id))
+            .order_by(MovieActor.movie_id, MovieActor.actor_id)
+        )
+        for movie_id, role, actor in cast_rows:
+            cast[movie_id].append(actor)
+            roles[movie_id][actor.actor_id] = role
+
+        for movie_id, movie in by_id.items():
+            set_committed_value(movie, "actors", cast[movie_id])
+            movie._actor_roles = roles[movie_id]
+
+        if include_directors:
+            crew = {movie_id: [] for movie_id in by_id}
+            crew_rows = (
+                self.session.query(MovieDirector.movie_id, Director)
+                .join(Director, Director.director_id == MovieDirector.director_id)
+                .filter(MovieDirector.movie_id.in_(by_id))
+                .order_by(MovieDirector.movie_id, MovieDirector.director_id)
+            )
+            for movie_id, director in crew_rows:
+                crew[movie_id].append(director)
+            for movie_id, movie in by_id.items():
+                set_committed_value(movie, "directors", crew[movie_id])
+
+        return movies
+
     def add(self, movie):
         """Dodaje nowy film - bez ograniczenia dat premiery"""
         self.session.add(movie)
@@ -119,6 +245,25 @@ class MovieRepository:
         """Usuwa film - bez względu na datę premiery"""
         movie = self.get_by_id(movie_id)
         if movie:
+            # Oceny i komentarze filmu znikają kaskadowo - razem z rollupami;
+            # rekomendacje oceniających liczone z tą oceną są nieaktualne
+            mark_ratings_deleted(
+                self.session,
+                select(Rating.user_id).where(Rating.movie_id == movie_id),
+            )
+            rollups = StatsRollupRepository(self.session)
+            rollups.remove(
+                "ratings",
+                self.session.query(Rating.rated_at, Rating.rating).filter(
+                    Rating.movie_id == movie_id
+                ),
+            )
+            rollups.remove(
+                "comments",
+                self.session.query(
+                    Comment.created_at, func.length(Comment.comment_text)
+                ).filter(Comment.movie_id == movie_id),
+            )
             self.session.delete(movie)
             self.session.commit()
             return True
@@ -126,9 +271,6 @@ class MovieRepository:
 
     def get_filter_options(self):
         """✅ POPRAWIONE - opcje filtrów dla WSZYSTKICH filmów"""
-        if hasattr(self, "_filter_options_cache"):
-            return self._filter_options_cache
-
         genres = self.session.query(Genre).order_by(Genre.genre_name).all()
         countries = (
             self.session.query(Movie.country)
@@ -142,13 +284,18 @@ class MovieRepository:
             "genres": [{"id": g.genre_id, "name": g.genre_name} for g in genres],
             "countries": countries,
         }
-        self._filter_options_cache = result
         return result
 
+    def _title_condition(self, title):
+        """Tytuł przez indeks search_terms; ILIKE gdy indeks fraz nie wyrazi"""
+        return SearchRepository(self.session).text_condition(
+            title, [("movie", Movie.movie_id)], [Movie.title]
+        )
+
     def _apply_filters(self, query, filters):
         """Stosuje filtry bez ograniczenia dat premiery"""
         if filters.get("title"):
-            query = query.filter(Movie.title.ilike(f"%{filters['title']}%"))
+            query = query.filter(self._title_condition(filters["title"]))
 
         if filters.get("countries"):
             query = query.filter(Movie.country.in_(filters["countries"].split(",")))
@@ -165,76 +312,44 @@ class MovieRepository:
             if genre_ids:
                 query = query.join(Movie.genres).filter(Genre.genre_id.in_(genre_ids))
 
-        if filters.get("rating_count_min") or filters.get("average_rating"):
-            ratings_subquery = (
-                self.session.query(
-                    Rating.movie_id,
-                    func.count(Rating.rating_id).label("count"),
-                    func.avg(Rating.rating).label("avg_rating"),
-                )
-                .group_by(Rating.movie_id)
-                .subquery()
-            )
-            query = query.outerjoin(
-                ratings_subquery, Movie.movie_id == ratings_subquery.c.movie_id
-            )
+        if filters.get("rating_count_min"):
+            query = query.filter(Movie.rating_count >= int(filters["rating_count_min"]))
 
-            if filters.get("rating_count_min"):
-                query = query.filter(
-                    ratings_subquery.c.count >= int(filters["rating_count_min"])
-                )
-
-            if filters.get("average_rating"):
-                query = query.filter(
-                    ratings_subquery.c.avg_rating >= float(filters["average_rating"])
-                )
+        if filters.get("average_rating"):
+            query = query.filter(
+                Movie.average_rating >= float(filters["average_rating"])
+            )
 
         return query
 
-    def _apply_sorting(self, query, sort_by="title", sort_order="asc"):
-        """Sortowanie bez ograniczenia dat"""
-        if sort_by in ["average_rating", "rating_count"]:
-            ratings_subquery = (
-                self.session.query(
-                    Rating.movie_id,
-                    func.avg(Rating.rating).label("avg_rating"),
-                    func.count(Rating.rating_id).label("count"),
-                )
-                .group_by(Rating.movie_id)
-                .subquery()
+    def _sort_keys(self, sort_by="title", sort_order="asc"):
+        """Klucz sortowania list filmów (zakończony movie_id - kolejność stabilna)"""
+        descending = sort_order.lower() != "asc"
+
+        if sort_by == "average_rating":
+            key = SortKey(
+                func.coalesce(Movie.average_rating, 0.0),
+                descending,
+                lambda movie: movie.average_rating or 0.0,
             )
-            query = query.outerjoin(
-                ratings_subquery, Movie.movie_id == ratings_subquery.c.movie_id
+        elif sort_by == "rating_count":
+            key = SortKey(
+                Movie.rating_count, descending, lambda movie: movie.rating_count
             )
-
-            if sort_by == "average_rating":
-                order = (
-                    func.coalesce(ratings_subquery.c.avg_rating, 0).asc()
-                    if sort_order.lower() == "asc"
-                    else func.coalesce(ratings_subquery.c.avg_rating, 0).desc()
-                )
-                query = query.order_by(order)
-            else:
-                order = (
-                    func.coalesce(ratings_subquery.c.count, 0).asc()
-                    if sort_order.lower() == "asc"
-                    else func.coalesce(ratings_subquery.c.count, 0).desc()
-                )
-                query = query.order_by(order)
         elif sort_by == "year":
-            order = (
-                extract("year", Movie.release_date).asc()
-                if sort_order.lower() == "asc"
-                else extract("year", Movie.release_date).desc()
+            key = SortKey(
+                extract("year", Movie.release_date),
+                descending,
+                lambda movie: movie.release_date.year,
             )
-            query = query.order_by(order)
         else:
-            order = (
-                Movie.title.asc() if sort_order.lower() == "asc" else Movie.title.desc()
-            )
-            query = query.order_by(order)
+            key = SortKey(Movie.title, descending, lambda movie: movie.title)
 
-        return query
+        return [key, SortKey(Movie.movie_id, descending, lambda movie: movie.movie_id)]
+
+    def _apply_sorting(self, query, sort_by="title", sort_order="asc"):
+        """Sortowanie bez ograniczenia dat"""
+        return query.order_by(*order_clauses(self._sort_keys(sort_by, sort_order)))
 
     def filter_movies(
         self,
@@ -244,16 +359,42 @@ class MovieRepository:
         sort_by="title",
         sort_order="asc",
         user_id=None,
+        after=None,
+        include_total=False,
     ):
-        """✅ POPRAWIONE - filtruje WSZYSTKIE filmy bez ograniczenia dat"""
+        """
+        ✅ POPRAWIONE - filtruje WSZYSTKIE filmy bez ograniczenia dat
+
+        after: kursor z poprzedniej strony ("" = pierwsza strona) włącza
+        paginację keyset zamiast page; include_total dolicza COUNT(*)
+        """
         query = self.session.query(Movie)
         # USUNIĘTO: query = query.filter(Movie.release_date <= today)
-        query = query.options(joinedload(Movie.genres), selectinload(Movie.ratings))
+        query = query.options(joinedload(Movie.genres))
         query = self._apply_filters(query, filters)
-        query = self._apply_sorting(query, sort_by, sort_order)
 
-        total = query.count()
-        movies = query.offset((page - 1) * per_page).limit(per_page).all()
+        if after is not None:
+            # Tryb kursorowy: bez OFFSET, COUNT(*) tylko na żądanie
+            keys = self._sort_keys(sort_by, sort_order)
+            signature = f"movies:{sort_by}:{sort_order.lower()}"
+            movies, pagination = cursor_page(
+                apply_keyset(query, keys, after, signature, per_page).all(),
+                keys,
+                signature,
+                per_page,
+            )
+            if include_total:
+                pagination["total"] = query.count()
+        else:
+            query = self._apply_sorting(query, sort_by, sort_order)
+            total = query.count()
+            movies = query.offset((page - 1) * per_page).limit(per_page).all()
+            pagination = {
+                "page": page,
+                "per_page": per_page,
+                "total": total,
+                "total_pages": (total + per_page - 1) // per_page,
+            }
 
         if user_id:
             movie_ids = [movie.movie_id for movie in movies]
@@ -268,16 +409,7 @@ class MovieRepository:
             for movie in movies:
                 movie._user_rating = ratings_map.get(movie.movie_id)
 
-        total_pages = (total + per_page - 1) // per_page
-        return {
-            "movies": movies,
-            "pagination": {
-                "page": page,
-                "per_page": per_page,
-                "total": total,
-                "total_pages": total_pages,
-            },
-        }
+        return {"movies": movies, "pagination": pagination}
 
     def search(self, query, page=1, per_page=10, user_id=None):
         """✅ POPRAWIONE - wyszukuje WSZYSTKIE filmy"""
@@ -303,7 +435,7 @@ class MovieRepository:
             # USUNIĘTO: query = query.filter(Movie.release_date <= today)
 
             if title_filter and title_filter.strip():
-                query = query.filter(Movie.title.ilike(f"%{title_filter}%"))
+                query = query.filter(self._title_condition(title_filter))
 
             query = query.order_by(Movie.title.asc())
 
@@ -382,60 +514,46 @@ class MovieRepository:
             raise e
 
     def get_basic_statistics(self):
-        """✅ POPRAWIONE - statystyki WSZYSTKICH filmów"""
+        """Statystyki wszystkich filmów - jedno zapytanie agregujące"""
         try:
-            from sqlalchemy import func
-            from datetime import datetime, timedelta
-
-            # ✅ Statystyki wszystkich filmów
-            total_movies = self.session.query(Movie).count()
-
-            # Statystyki wydanych vs nadchodzących
             today = date.today()
-            released_movies = (
-                self.session.query(Movie).filter(Movie.release_date <= today).count()
-            )
-            upcoming_movies = (
-                self.session.query(Movie).filter(Movie.release_date > today).count()
-            )
-
+            thirty_days_ago = datetime.utcnow() - timedelta(days=30)
+
+            columns = [
+                func.count(Movie.movie_id),
+                func.count(Movie.movie_id).filter(Movie.release_date <= today),
+                func.count(Movie.movie_id).filter(Movie.release_date > today),
+                func.count(Movie.poster_url),
+                func.max(Movie.duration_minutes),
+                func.min(Movie.duration_minutes),
+                func.avg(Movie.duration_minutes),
+                # Średnia wszystkich ocen z agregatów filmów (bez skanu ratings)
+                func.sum(Movie.rating_sum),
+                func.sum(Movie.rating_count),
+            ]
             if hasattr(Movie, "created_at"):
-                thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-                recent_movies = (
-                    self.session.query(Movie)
-                    .filter(Movie.created_at >= thirty_days_ago)
-                    .count()
+                columns.append(
+                    func.count(Movie.movie_id).filter(
+                        Movie.created_at >= thirty_days_ago
+                    )
                 )
-            else:
-                recent_movies = 0
-
-            try:
-                from app.models.rating import Rating
-
-                avg_rating = self.session.query(func.avg(Rating.rating)).scalar()
-            except:
-                avg_rating = 0
-
-            with_posters = (
-                self.session.query(Movie).filter(Movie.poster_url.isnot(None)).count()
-            )
+            row = self.session.query(*columns).one()
+
+            (
+                total_movies,
+                released_movies,
+                upcoming_movies,
+                with_posters,
+                longest_movie,
+                shortest_movie,
+                avg_duration,
+                rating_sum,
+                rating_count,
+            ) = row[:9]
+            recent_movies = row[9] if len(row) > 9 else 0
+            avg_rating = rating_sum / rating_count if rating_count else 0
             without_posters = total_movies - with_posters
 
-            try:
-                longest_movie = self.session.query(
-                    func.max(Movie.duration_minutes)
-                ).scalar()
-                shortest_movie = self.session.query(
-                    func.min(Movie.duration_minutes)
-                ).scalar()
-                avg_duration = self.session.query(
-                    func.avg(Movie.duration_minutes)
-                ).scalar()
-            except:
-                longest_movie = 0
-                shortest_movie = 0
-                avg_duration = 0
-
             return {
                 "total_movies": total_movies,
                 "released_movies": released_movies,
@@ -464,7 +582,9 @@ class MovieRepository:
                     ),
                 },
                 "duration_statistics": {
-                    "average_duration": round(avg_duration, 1) if avg_duration else 0,
+                    "average_duration": (
+                        round(float(avg_duration), 1) if avg_duration else 0
+                    ),
                     "longest_movie": longest_movie or 0,
                     "shortest_movie": shortest_movie or 0,
                 },
@@ -472,6 +592,7 @@ class MovieRepository:
 
         except Exception as e:
             print(f"Błąd podczas pobierania podstawowych statystyk: {e}")
+            self.session.rollback()
             total_movies = self.session.query(Movie).count()
             return {
                 "total_movies": total_movies,
@@ -492,31 +613,114 @@ class MovieRepository:
                 },
             }
 
-    def get_dashboard_data(self):
-        """✅ POPRAWIONE - dashboard WSZYSTKICH filmów"""
+    def get_dashboard_aggregates(self):
+        """
+        Zagregowana część dashboardu (zapytania GROUP BY niezależne od
+        liczby lat / przedziałów ocen + trend ocen z rollupów). Wynik jest serializowalny do JSON -
+        trzyma go snapshot statystyk (app.services.stats_snapshot_service).
+        """
         try:
-            from sqlalchemy import func, extract
-            from datetime import datetime
-
-            today = date.today()
-            basic_stats = self.get_basic_statistics()
+            current_year = datetime.utcnow().year
+            first_year = current_year - 9
+
+            year = extract("year", Movie.release_date).label("year")
+            # extract() w PostgreSQL zwraca numeric - klucze jako int
+            counts_by_year = {
+                int(row_year): count
+                for row_year, count in self.session.query(
+                    year, func.count(Movie.movie_id)
+                )
+                .filter(
+                    Movie.release_date >= date(first_year, 1, 1),
+                    Movie.release_date < date(current_year + 1, 1, 1),
+                )
+                .group_by(year)
+                .all()
+            }
+            movies_by_year = [
+                {"year": year, "count": counts_by_year.get(year, 0)}
+                for year in range(first_year, current_year + 1)
+            ]
 
             try:
-                from app.models.rating import Rating
-
-                avg_rating_subq = (
+                top_genres = (
                     self.session.query(
-                        Rating.movie_id, func.avg(Rating.rating).label("avg_rating")
+                        Genre.genre_name,
+                        func.count(Movie.movie_id).label("movie_count"),
                     )
-                    .group_by(Rating.movie_id)
-                    .subquery()
+                    .join(Movie.genres)
+                    .group_by(Genre.genre_id, Genre.genre_name)
+                    .order_by(func.count(Movie.movie_id).desc())
+                    .limit(5)
+                    .all()
                 )
+                genre_distribution = [
+                    {"genre": name, "movie_count": count} for name, count in top_genres
+                ]
+            except Exception as e:
+                print(f"Błąd w genre_distribution: {e}")
+                self.session.rollback()
+                genre_distribution = []
+
+            try:
+                # Oceny są całkowite - przedział [r, r + 1) to po prostu r
+                counts_by_rating = dict(
+                    self.session.query(Rating.rating, func.count(Rating.rating_id))
+                    .filter(Rating.rating.between(1, 5))
+                    .group_by(Rating.rating)
+                    .all()
+                )
+                rating_distribution = [
+                    {
+                        "rating_range": f"{rating}-{rating}",
+                        "count": counts_by_rating.get(rating, 0),
+                    }
+                    for rating in [1, 2, 3, 4, 5]
+                ]
+            except Exception as e:
+                print(f"Błąd w rating_distribution: {e}")
+                self.session.rollback()
+                rating_distribution = []
+
+            # Oceny wystawione w ostatnich 12 miesiącach (z rollupów)
+            monthly_ratings = [
+                {
+                    "month": month.strftime("%Y-%m"),
+                    "count": count,
+                    "average_rating": round(total / count, 2) if count else None,
+                }
+                for month, count, total in StatsRollupRepository(
+                    self.session
+                ).get_trend("ratings", "month", 12)
+            ]
 
+            return {
+                "statistics": self.get_basic_statistics(),
+                "movies_by_year": movies_by_year,
+                "genre_distribution": genre_distribution,
+                "rating_distribution": rating_distribution,
+                "monthly_ratings": monthly_ratings,
+            }
+
+        except Exception as e:
+            print(f"Błąd podczas pobierania agregatów dashboard: {e}")
+            raise
+
+    def get_dashboard_data(self, aggregates=None):
+        """
+        Dashboard wszystkich filmów: agregaty (z snapshotu albo liczone teraz)
+        + listy top / ostatnich filmów (dwa zapytania z LIMIT)
+        """
+        try:
+            today = date.today()
+            if aggregates is None:
+                aggregates = self.get_dashboard_aggregates()
+
+            try:
                 top_rated_movies_query = (
-                    self.session.query(Movie, avg_rating_subq.c.avg_rating)
-                    # USUNIĘTO: .filter(Movie.release_date <= today)
-                    .join(avg_rating_subq, Movie.movie_id == avg_rating_subq.c.movie_id)
-                    .order_by(avg_rating_subq.c.avg_rating.desc())
+                    self.session.query(Movie, Movie.average_rating)
+                    .filter(Movie.rating_count > 0)
+                    .order_by(Movie.average_rating.desc())
                     .limit(10)
                     .all()
                 )
@@ -557,74 +761,13 @@ class MovieRepository:
                     for movie in movies
                 ]
 
-            current_year = datetime.utcnow().year
-            movies_by_year = []
-            for year in range(current_year - 9, current_year + 1):
-                count = (
-                    self.session.query(Movie).filter(
-                        extract("year", Movie.release_date) == year
-                    )
-                    # USUNIĘTO: .filter(Movie.release_date <= today)
-                    .count()
-                )
-                movies_by_year.append({"year": year, "count": count})
-
-            try:
-                from app.models.genre import Genre
-
-                top_genres = (
-                    self.session.query(
-                        Genre.genre_name,
-                        func.count(Movie.movie_id).label("movie_count"),
-                    )
-                    .join(Movie.genres)
-                    # USUNIĘTO: .filter(Movie.release_date <= today)
-                    .group_by(Genre.genre_id, Genre.genre_name)
-                    .order_by(func.count(Movie.movie_id).desc())
-                    .limit(5)
-                    .all()
-                )
-                genre_distribution = [
-                    {"genre": name, "movie_count": count} for name, count in top_genres
-                ]
-            except Exception as e:
-                print(f"Błąd w genre_distribution: {e}")
-                genre_distribution = []
-
-            try:
-                from app.models.rating import Rating
-
-                rating_distribution = []
-                for rating in [1, 2, 3, 4, 5]:
-                    count = (
-                        self.session.query(Rating)
-                        .filter(
-                            Rating.rating >= rating,
-                            Rating.rating < rating + 1,
-                        )
-                        .count()
-                    )
-                    rating_distribution.append(
-                        {"rating_range": f"{rating}-{rating}", "count": count}
-                    )
-            except Exception as e:
-                print(f"Błąd w rating_distribution: {e}")
-                rating_distribution = []
-
             recent_movies = (
-                self.session.query(Movie)
-                # USUNIĘTO: .filter(Movie.release_date <= today)
-                .order_by(Movie.movie_id.desc())
-                .limit(5)
-                .all()
+                self.session.query(Movie).order_by(Movie.movie_id.desc()).limit(5).all()
             )
 
             return {
-                "statistics": basic_stats,
+                **aggregates,
                 "top_rated_movies": top_rated_movies,
-                "movies_by_year": movies_by_year,
-                "genre_distribution": genre_distribution,
-                "rating_distribution": rating_distribution,
                 "recent_movies": [
                     {
                         "id": movie.movie_id,
@@ -6,6 +6,8 @@ from app.models.movie_director import MovieDirector
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy import or_, func, select, desc, asc, text, union_all
 from app.utils.people_utils import serialize_person, get_people_query
+from app.utils.pagination import SortKey, apply_keyset, cursor_page
+from datetime import date
 from flask import url_for
 
 
@@ -52,15 +54,64 @@ class PeopleRepository:
                 person_dict["photo_url"] = photo_url_final
         return person_dict
 
+    def _keyset_sort_keys(self, people, sort_by="name", sort_order="asc"):
+        """Klucz keyset dla unii aktorów i reżyserów - id jest unikalne tylko z type"""
+        descending = sort_order.lower() != "asc"
+
+        if sort_by == "birth_date":
+            first = SortKey(
+                func.coalesce(people.c.birth_date, date.min),
+                descending,
+                lambda row: row.birth_date or date.min,
+            )
+        else:
+            first = SortKey(people.c.name, descending, lambda row: row.name)
+
+        return [
+            first,
+            SortKey(people.c.type, descending, lambda row: row.type),
+            SortKey(people.c.id, descending, lambda row: row.id),
+        ]
+
     def get_all(
-        self, page=1, per_page=10, sort_by="name", sort_order="asc", filters=None
+        self,
+        page=1,
+        per_page=10,
+        sort_by="name",
+        sort_order="asc",
+        filters=None,
+        after=None,
+        include_total=False,
     ):
+        """
+        after: kursor z poprzedniej strony ("" = pierwsza strona) włącza
+        paginację keyset zamiast page; include_total dolicza COUNT(*)
+        """
         base_query = get_people_query(filters)
-        query = self._apply_sorting(base_query, sort_by, sort_order)
-        count_query = select(func.count()).select_from(base_query.alias())
-        total = self.session.execute(count_query).scalar()
-        final_query = query.offset((page - 1) * per_page).limit(per_page)
-        result = self.session.execute(final_query)
+
+        if after is not None:
+            people_alias = base_query.alias("people")
+            keys = self._keyset_sort_keys(people_alias, sort_by, sort_order)
+            signature = f"people:{sort_by}:{sort_order.lower()}"
+            rows = self.session.execute(
+                apply_keyset(select(people_alias), keys, after, signature, per_page)
+            ).all()
+            result, pagination = cursor_page(rows, keys, signature, per_page)
+            if include_total:
+                count_query = select(func.count()).select_from(base_query.alias())
+                pagination["total"] = self.session.execute(count_query).scalar()
+        else:
+            query = self._apply_sorting(base_query, sort_by, sort_order)
+            count_query = select(func.count()).select_from(base_query.alias())
+            total = self.session.execute(count_query).scalar()
+            final_query = query.offset((page - 1) * per_page).limit(per_page)
+            result = self.session.execute(final_query)
+            pagination = {
+                "page": page,
+                "per_page": per_page,
+                "total": total,
+                "total_pages": (total + per_page - 1) // per_page,
+            }
 
         people = []
         for row in result:
@@ -76,17 +127,7 @@ class PeopleRepository:
             person_dict = self._process_photo_url(person_dict, person_type)
             people.append(person_dict)
 
-        total_pages = (total + per_page - 1) // per_page
-
-        return {
-            "people": people,
-            "pagination": {
-                "page": page,
-                "per_page": per_page,
-                "total": total,
-                "total_pages": total_pages,
-            },
-        }
+        return {"people": people, "pagination": pagination}
 
     def get_by_id(self, id, person_type):
         if person_type == "actor":
@@ -235,9 +276,18 @@ class PeopleRepository:
         return countries
 
     def filter_people(
-        self, filters, page=1, per_page=10, sort_by="name", sort_order="asc"
+        self,
+        filters,
+        page=1,
+        per_page=10,
+        sort_by="name",
+        sort_order="asc",
+        after=None,
+        include_total=False,
     ):
-        return self.get_all(page, per_page, sort_by, sort_order, filters)
+        return self.get_all(
+            page, per_page, sort_by, sort_order, filters, after, include_total
+        )
 
     def get_people_with_birthday_today(self):
         actor_query = select(
@@ -245,7 +295,7 @@ class PeopleRepository:
             Actor.actor_id.label("id"),
             Actor.actor_name.label("name"),
             Actor.birth_date,
-            Actor.photo_url,  
+            Actor.photo_url,
             func.extract("year", func.age(Actor.birth_date)).label("age"),
         ).where(
             func.extract("month", Actor.birth_date)
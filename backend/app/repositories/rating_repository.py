@@ -1,7 +1,23 @@
 from app.models.rating import Rating
-from app.models.movie import Movie
+from app.models.user import User
+from app.models.movie import Movie, RATING_HISTOGRAM_SIZE
+from app.recommendation_algorithm.config import BATCH_SIZE
+from app.repositories.stats_rollup_repository import StatsRollupRepository
+from app.repositories.user_taste_profile_repository import UserTasteProfileRepository
 from sqlalchemy import func, and_
+from sqlalchemy.orm import lazyload
 from sqlalchemy.exc import SQLAlchemyError
+from datetime import datetime
+
+
+def mark_ratings_deleted(session, user_ids):
+    """
+    Zapisuje chwilę usunięcia ocen (User.ratings_deleted_at) - rekomendacje
+    liczone z usuniętą oceną są nieaktualne. Bez commitu.
+    """
+    session.query(User).filter(User.user_id.in_(user_ids)).update(
+        {User.ratings_deleted_at: datetime.utcnow()}, synchronize_session=False
+    )
 
 
 class RatingRepository:
@@ -74,33 +90,36 @@ class RatingRepository:
 
     def get_movie_average_rating(self, movie_id):
         return (
-            self.session.query(func.avg(Rating.rating))
-            .filter(Rating.movie_id == movie_id)
+            self.session.query(Movie.average_rating)
+            .filter(Movie.movie_id == movie_id)
             .scalar()
         ) or None
 
     def get_movie_rating_count(self, movie_id):
         return (
-            self.session.query(func.count(Rating.rating_id))
-            .filter(Rating.movie_id == movie_id)
+            self.session.query(Movie.rating_count)
+            .filter(Movie.movie_id == movie_id)
             .scalar()
         ) or 0
 
     def get_movie_rating_stats(self, movie_id):
+        """Średnia i liczba ocen z agregatów na movies (bez AVG/COUNT po ratings)"""
         result = (
-            self.session.query(
-                func.avg(Rating.rating).label("average"),
-                func.count(Rating.rating_id).label("count"),
-            )
-            .filter(Rating.movie_id == movie_id)
+            self.session.query(Movie.average_rating, Movie.rating_count)
+            .filter(Movie.movie_id == movie_id)
             .first()
         )
 
+        if result is None:
+            return {"average_rating": None, "rating_count": 0}
+
         return {
             "average_rating": (
-                float(result.average) if result.average is not None else None
+                float(result.average_rating)
+                if result.average_rating is not None
+                else None
             ),
-            "rating_count": result.count,
+            "rating_count": result.rating_count or 0,
         }
 
     def get_user_ratings_for_movies(self, user_id, movie_ids):
@@ -115,9 +134,41 @@ class RatingRepository:
 
         return {rating.movie_id: rating.rating for rating in ratings}
 
+    def _lock_movie(self, movie_id):
+        """
+        Film z blokadą wiersza (SELECT ... FOR UPDATE) do końca transakcji -
+        równoległe zapisy ocen tego samego filmu nie gubią zmian agregatów
+        """
+        return (
+            self.session.query(Movie)
+            .options(lazyload(Movie.genres))
+            .filter(Movie.movie_id == movie_id)
+            .with_for_update()
+            .populate_existing()
+            .one_or_none()
+        )
+
+    def _lock_rating(self, rating_id):
+        return (
+            self.session.query(Rating)
+            .filter(Rating.rating_id == rating_id)
+            .with_for_update()
+            .populate_existing()
+            .one_or_none()
+        )
+
     def add(self, rating):
         try:
+            movie = self._lock_movie(rating.movie_id)
+            if movie:
+                movie.apply_rating_change(added=rating.rating)
             self.session.add(rating)
+            StatsRollupRepository(self.session).increment(
+                "ratings", rating.rated_at, value=rating.rating
+            )
+            UserTasteProfileRepository(self.session).apply_rating_change(
+                rating.user_id, rating.movie_id, added=rating.rating
+            )
             self.session.commit()
             return rating
         except SQLAlchemyError as e:
@@ -129,7 +180,31 @@ class RatingRepository:
         try:
             rating = self.get_by_id(rating_id)
             if rating:
+                movie = self._lock_movie(rating.movie_id)
+                # Wartość sprzed zmiany czytana dopiero pod blokadą filmu -
+                # równoległa zmiana tej oceny mogła ją już nadpisać
+                rating = self._lock_rating(rating_id)
+                if rating is None:
+                    self.session.rollback()
+                    return None
+                if movie:
+                    movie.apply_rating_change(
+                        added=new_rating_value, removed=rating.rating
+                    )
+                previous_value = rating.rating
+                # Rollup jak stan tabeli: ocena przenosi się na dzień zmiany
+                rollups = StatsRollupRepository(self.session)
+                rollups.remove("ratings", [(rating.rated_at, previous_value)])
                 rating.rating = new_rating_value
+                # Data ostatniej zmiany - batch rebuild wykrywa po niej zmienione profile
+                rating.rated_at = datetime.utcnow()
+                rollups.increment("ratings", rating.rated_at, value=new_rating_value)
+                UserTasteProfileRepository(self.session).apply_rating_change(
+                    rating.user_id,
+                    rating.movie_id,
+                    added=new_rating_value,
+                    removed=previous_value,
+                )
                 self.session.commit()
                 return rating
             return None
@@ -142,7 +217,22 @@ class RatingRepository:
         try:
             rating = self.get_by_user_and_movie(user_id, movie_id)
             if rating:
+                movie = self._lock_movie(movie_id)
+                # jak w update: ocena czytana ponownie pod blokadą filmu
+                rating = self._lock_rating(rating.rating_id)
+                if rating is None:
+                    self.session.rollback()
+                    return False
+                if movie:
+                    movie.apply_rating_change(removed=rating.rating)
                 self.session.delete(rating)
+                mark_ratings_deleted(self.session, [user_id])
+                StatsRollupRepository(self.session).remove(
+                    "ratings", [(rating.rated_at, rating.rating)]
+                )
+                UserTasteProfileRepository(self.session).apply_rating_change(
+                    user_id, movie_id, removed=rating.rating
+                )
                 self.session.commit()
                 return True
             return False
@@ -150,3 +240,92 @@ class RatingRepository:
             self.session.rollback()
             print(f"Błąd podczas usuwania oceny użytkownika dla filmu: {e}")
             return False
+
+    def delete_user_ratings(self, user_id):
+        """
+        Usuwa wszystkie oceny użytkownika (usuwanie konta) razem z ich
+        udziałem w agregatach filmów i rollupach ocen oraz z profilem gustu.
+        Bez commitu - wywołujący usuwa konto w tej samej transakcji.
+        Zwraca liczbę usuniętych ocen.
+        """
+        movie_ids = [
+            movie_id
+            for (movie_id,) in self.session.query(Rating.movie_id)
+            .filter(Rating.user_id == user_id)
+            .distinct()
+        ]
+        if not movie_ids:
+            UserTasteProfileRepository(self.session).delete(user_id)
+            return 0
+
+        # Blokady filmów w stałej kolejności (jak _lock_movie), potem oceny
+        # czytane na nowo - bez nieaktualnych wartości z równoległych zmian
+        movies = {}
+        for i in range(0, len(movie_ids), BATCH_SIZE):
+            for movie in (
+                self.session.query(Movie)
+                .options(lazyload(Movie.genres))
+                .filter(Movie.movie_id.in_(movie_ids[i : i + BATCH_SIZE]))
+                .order_by(Movie.movie_id)
+                .with_for_update()
+                .populate_existing()
+            ):
+                movies[movie.movie_id] = movie
+
+        ratings = (
+            self.session.query(Rating)
+            .filter(Rating.user_id == user_id)
+            .with_for_update()
+            .populate_existing()
+            .all()
+        )
+
+        for rating in ratings:
+            movie = movies.get(rating.movie_id)
+            if movie:
+                movie.apply_rating_change(removed=rating.rating)
+            self.session.delete(rating)
+
+        StatsRollupRepository(self.session).remove(
+            "ratings", [(rating.rated_at, rating.rating) for rating in ratings]
+        )
+
+        UserTasteProfileRepository(self.session).delete(user_id)
+        return len(ratings)
+
+    def rebuild_movie_aggregates(self):
+        """
+        Przelicza agregaty ocen wszystkich filmów z tabeli ratings
+        (naprawa rozjazdów, np. po imporcie danych z pominięciem repozytorium).
+        Zwraca liczbę poprawionych filmów.
+        """
+        try:
+            histograms = {}
+            rows = self.session.query(
+                Rating.movie_id, Rating.rating, func.count(Rating.rating_id)
+            ).group_by(Rating.movie_id, Rating.rating)
+            for movie_id, value, count in rows:
+                histogram = histograms.setdefault(movie_id, [0] * RATING_HISTOGRAM_SIZE)
+                histogram[value] = count
+
+            fixed = 0
+            for movie in self.session.query(Movie).options(lazyload(Movie.genres)):
+                histogram = histograms.get(movie.movie_id, [0] * RATING_HISTOGRAM_SIZE)
+                count = sum(histogram)
+                total = sum(value * n for value, n in enumerate(histogram))
+
+                if (
+                    movie.rating_count != count
+                    or movie.rating_sum != total
+                    or movie.rating_histogram != histogram
+                    or movie.average_rating != (total / count if count else None)
+                ):
+                    movie.set_rating_aggregates(count, total, histogram)
+                    fixed += 1
+
+            self.session.commit()
+            return fixed
+
+        except SQLAlchemyError as e:
+            self.session.rollback()
+            raise e
@@ -0,0 +1,112 @@
+from app.models.recommendation_job import (
+    RecommendationJob,
+    JobStatus,
+    ACTIVE_JOB_STATUSES,
+)
+from sqlalchemy import and_, desc, or_
+from datetime import datetime, timedelta
+
+
+class RecommendationJobRepository:
+    def __init__(self, session):
+        self.session = session
+
+    def get_by_id(self, job_id):
+        return self.session.get(RecommendationJob, job_id)
+
+    def get_latest_for_user(self, user_id):
+        return (
+            self.session.query(RecommendationJob)
+            .filter(RecommendationJob.user_id == user_id)
+            .order_by(
+                desc(RecommendationJob.created_at), desc(RecommendationJob.job_id)
+            )
+            .first()
+        )
+
+    def get_active_for_user(self, user_id):
+        """Zadanie w kolejce / w trakcie dla użytkownika (lub None)"""
+        return (
+            self.session.query(RecommendationJob)
+            .filter(
+                RecommendationJob.user_id == user_id,
+                RecommendationJob.status.in_(ACTIVE_JOB_STATUSES),
+            )
+            .order_by(desc(RecommendationJob.created_at))
+            .first()
+        )
+
+    def create(self, user_id):
+        try:
+            job = RecommendationJob(user_id=user_id, status=JobStatus.QUEUED.value)
+            self.session.add(job)
+            self.session.commit()
+            return job
+
+        except Exception as e:
+            self.session.rollback()
+            raise e
+
+    def update(self, job_id, **fields):
+        """Aktualizuje pola zadania i od razu commituje (postęp widoczny dla /status)"""
+        try:
+            job = self.get_by_id(job_id)
+            if not job:
+                return None
+
+            for key, value in fields.items():
+                setattr(job, key, value)
+            job.updated_at = datetime.utcnow()
+
+            self.session.commit()
+            return job
+
+        except Exception as e:
+            self.session.rollback()
+            raise e
+
+    def fail_stale_jobs(self, user_id, timeout_minutes, queue_timeout_minutes):
+        """
+        Zamyka zadania, które utknęły - np. po restarcie procesu, który je
+        wykonywał. Inaczej blokowałyby deduplikację na zawsze.
+
+        - running: bez postępu (updated_at) od timeout_minutes
+        - queued: utworzone ponad queue_timeout_minutes temu - czekają na
+          wolny wątek puli, więc brak aktualizacji nie znaczy, że utknęły
+        """
+        try:
+            now = datetime.utcnow()
+            stale_count = (
+                self.session.query(RecommendationJob)
+                .filter(
+                    RecommendationJob.user_id == user_id,
+                    or_(
+                        and_(
+                            RecommendationJob.status == JobStatus.RUNNING.value,
+                            RecommendationJob.updated_at
+                            < now - timedelta(minutes=timeout_minutes),
+                        ),
+                        and_(
+                            RecommendationJob.status == JobStatus.QUEUED.value,
+                            RecommendationJob.created_at
+                            < now - timedelta(minutes=queue_timeout_minutes),
+                        ),
+                    ),
+                )
+                .update(
+                    {
+                        RecommendationJob.status: JobStatus.FAILED.value,
+                        RecommendationJob.message: "Przekroczono czas oczekiwania",
+                        RecommendationJob.finished_at: datetime.utcnow(),
+                        RecommendationJob.updated_at: datetime.utcnow(),
+                    },
+                    synchronize_session=False,
+                )
+            )
+
+            self.session.commit()
+            return stale_count
+
+        except Exception as e:
+            self.session.rollback()
+            raise e
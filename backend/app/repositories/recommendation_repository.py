@@ -2,10 +2,11 @@ from app.models.recommendation import Recommendation
 from app.models.movie import Movie
 from app.models.user import User
 from app.models.rating import Rating
-from sqlalchemy import func, desc
+from sqlalchemy import func, desc, insert
 from sqlalchemy.orm import joinedload
 from datetime import datetime
 from app.recommendation_algorithm.config import MIN_USER_RATINGS
+from app.repositories.stats_rollup_repository import StatsRollupRepository
 
 
 class RecommendationRepository:
@@ -99,6 +100,9 @@ class RecommendationRepository:
                 new_recommendations.append(recommendation)
 
             self.session.add_all(new_recommendations)
+            StatsRollupRepository(self.session).increment(
+                "recommendations", value=len(new_recommendations)
+            )
             self.session.commit()
 
             return new_recommendations
@@ -107,6 +111,98 @@ class RecommendationRepository:
             self.session.rollback()
             raise e
 
+    def bulk_replace_user_recommendations(self, recommendations_by_user):
+        """
+        Zastępuje rekomendacje wielu użytkowników w jednej transakcji:
+        jeden DELETE + jeden INSERT (executemany; na PostgreSQL jedno
+        INSERT ... VALUES z wieloma wierszami) dla całej paczki.
+        Wszystkie wiersze dostają ten sam created_at.
+
+        Args:
+            recommendations_by_user: {user_id: [{"movie_id", "score", "algorithm_type"}]}
+        """
+        try:
+            user_ids = list(recommendations_by_user.keys())
+            if not user_ids:
+                return 0
+
+            created_at = datetime.utcnow()
+            for recs in recommendations_by_user.values():
+                for rec in recs:
+                    # Core INSERT omija @validates modelu - ta sama walidacja tutaj
+                    if not (0 <= rec["score"] <= 1):
+                        raise ValueError("Score must be between 0 and 1.")
+
+            rows = [
+                {
+                    "user_id": user_id,
+                    "movie_id": rec["movie_id"],
+                    "score": rec["score"],
+                    "algorithm_type": rec["algorithm_type"],
+                    "created_at": created_at,
+                }
+                for user_id, recs in recommendations_by_user.items()
+                for rec in recs
+            ]
+
+            self.session.query(Recommendation).filter(
+                Recommendation.user_id.in_(user_ids)
+            ).delete(synchronize_session=False)
+
+            if rows:
+                self.session.execute(insert(Recommendation), rows)
+            StatsRollupRepository(self.session).increment(
+                "recommendations", created_at, count=len(user_ids), value=len(rows)
+            )
+
+            self.session.commit()
+            return len(rows)
+
+        except Exception as e:
+            self.session.rollback()
+            raise e
+
+    def get_users_for_rebuild(self, incremental=False):
+        """
+        Użytkownicy z co najmniej MIN_USER_RATINGS ocenami
+
+        incremental=True: tylko ci bez rekomendacji albo z ocenami nowszymi
+        (dodanymi, zmienionymi lub usuniętymi - User.ratings_deleted_at) niż
+        ostatnio wygenerowane rekomendacje (last_generated)
+        """
+        ratings = (
+            self.session.query(
+                Rating.user_id.label("user_id"),
+                func.max(Rating.rated_at).label("last_rated"),
+            )
+            .group_by(Rating.user_id)
+            .having(func.count(Rating.rating_id) >= MIN_USER_RATINGS)
+            .subquery()
+        )
+
+        query = self.session.query(ratings.c.user_id)
+
+        if incremental:
+            generated = (
+                self.session.query(
+                    Recommendation.user_id.label("user_id"),
+                    func.max(Recommendation.created_at).label("last_generated"),
+                )
+                .group_by(Recommendation.user_id)
+                .subquery()
+            )
+            query = (
+                query.join(User, User.user_id == ratings.c.user_id)
+                .outerjoin(generated, generated.c.user_id == ratings.c.user_id)
+                .filter(
+                    (generated.c.last_generated.is_(None))
+                    | (ratings.c.last_rated > generated.c.last_generated)
+                    | (User.ratings_deleted_at > generated.c.last_generated)
+                )
+            )
+
+        return [row.user_id for row in query.order_by(ratings.c.user_id).all()]
+
     def delete_user_recommendations(self, user_id):
         """Usuwa wszystkie rekomendacje użytkownika"""
         try:
@@ -143,10 +239,23 @@ class RecommendationRepository:
                 self.session.query(Recommendation.user_id).distinct().count()
             )
 
+            # Generowania rekomendacji (użytkownicy) z rollupów - ostatnie 30 dni
+            daily_generations = [
+                {"date": day.isoformat(), "users": users, "recommendations": rows}
+                for day, users, rows in StatsRollupRepository(self.session).get_trend(
+                    "recommendations", "day", 30
+                )
+            ]
+
             return {
                 "total_recommendations": total_recommendations,
                 "users_with_recommendations": users_with_recommendations,
+                "generations_last_30_days": sum(
+                    day["users"] for day in daily_generations
+                ),
+                "daily_generations": daily_generations,
             }
         except Exception as e:
             print(f"Błąd podczas pobierania statystyk: {e}")
+            self.session.rollback()
             return {"total_recommendations": 0, "users_with_recommendations": 0}
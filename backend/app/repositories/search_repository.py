@@ -0,0 +1,238 @@
+from app.models.search_term import SearchTerm
+from app.utils.search_text import get_search_analyzer
+from sqlalchemy import (
+    and_,
+    delete,
+    distinct,
+    func,
+    insert,
+    literal,
+    or_,
+    select,
+    union_all,
+)
+from sqlalchemy.exc import SQLAlchemyError
+
+# Dopasowanie tylko po prefiksie (np. "matr" -> "matrix") waży mniej niż pełny term
+PREFIX_MATCH_FACTOR = 0.5
+
+
+class SearchRepository:
+    def __init__(self, session):
+        self.session = session
+
+    # ---------- zapis indeksu ----------
+
+    def replace_documents(self, doc_type, documents, commit=True):
+        """
+        Podmienia termy dokumentów: documents = {doc_id: {term: waga}}.
+        Dokument z pustym słownikiem (albo usunięty) znika z indeksu.
+        """
+        try:
+            doc_ids = list(documents)
+            if doc_ids:
+                self.session.execute(
+                    delete(SearchTerm)
+                    .where(
+                        SearchTerm.doc_type == doc_type,
+                        SearchTerm.doc_id.in_(doc_ids),
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+
+            rows = [
+                {"term": term, "doc_type": doc_type, "doc_id": doc_id, "weight": weight}
+                for doc_id, terms in documents.items()
+                for term, weight in terms.items()
+            ]
+            if rows:
+                self.session.execute(insert(SearchTerm), rows)
+
+            if commit:
+                self.session.commit()
+            return len(rows)
+
+        except SQLAlchemyError as e:
+            self.session.rollback()
+            raise e
+
+    def clear_doc_type(self, doc_type):
+        try:
+            self.session.execute(
+                delete(SearchTerm)
+                .where(SearchTerm.doc_type == doc_type)
+                .execution_options(synchronize_session=False)
+            )
+            self.session.commit()
+        except SQLAlchemyError as e:
+            self.session.rollback()
+            raise e
+
+    # ---------- zapytania ----------
+
+    def _prefix_branch_filter(self, prefix, doc_types):
+        if self.session.get_bind().dialect.name == "postgresql":
+            # indeks ix_search_terms_term_pattern (varchar_pattern_ops)
+            return and_(
+                SearchTerm.doc_type.in_(doc_types), SearchTerm.term.like(prefix + "%")
+            )
+        # SQLite: przedział po kluczu głównym (term, ...). Bez statystyk planer
+        # wybrałby ix_search_terms_doc (równość na doc_type) i skanował cały
+        # typ - "|| ''" wyłącza ten indeks dla warunku.
+        return and_(
+            SearchTerm.doc_type.concat("").in_(doc_types),
+            SearchTerm.term >= prefix,
+            SearchTerm.term < prefix + "\uffff",
+        )
+
+    def _token_matches(self, text, doc_types):
+        """
+        Subquery (doc_type, doc_id, token, weight): jeden wiersz na term
+        dokumentu pasujący do słowa zapytania o numerze token. Ostatnie słowo
+        dopasowuje też prefiks (z wagą PREFIX_MATCH_FACTOR). None, gdy
+        zapytanie nie ma słów po odrzuceniu stopwords.
+
+        Każda gałąź UNION ALL to osobny warunek na term, więc zarówno SQLite,
+        jak i PostgreSQL czytają ją z indeksu (OR termów i przedziału kończył
+        się skanem całego typu dokumentu).
+        """
+        analyzer = get_search_analyzer()
+        # Powtórzone słowo to wciąż jeden warunek (HAVING liczy różne słowa)
+        token_groups = list(
+            dict.fromkeys(frozenset(group) for group in analyzer.query_tokens(text))
+        )
+        if not token_groups:
+            return None
+
+        def branch(token, condition, factor=1.0):
+            return select(
+                SearchTerm.doc_type,
+                SearchTerm.doc_id,
+                literal(token).label("token"),
+                (SearchTerm.weight * factor).label("weight"),
+            ).where(condition)
+
+        branches = [
+            branch(
+                token,
+                and_(
+                    SearchTerm.doc_type.in_(doc_types),
+                    SearchTerm.term.in_(sorted(group)),
+                ),
+            )
+            for token, group in enumerate(token_groups)
+        ]
+
+        prefix = analyzer.prefix(text)
+        if prefix:
+            last = len(token_groups) - 1
+            branches.append(
+                branch(
+                    last,
+                    and_(
+                        self._prefix_branch_filter(prefix, doc_types),
+                        SearchTerm.term.not_in(sorted(token_groups[last])),
+                    ),
+                    PREFIX_MATCH_FACTOR,
+                )
+            )
+
+        return union_all(*branches).subquery(), len(token_groups)
+
+    def search(self, text, doc_types, limit_per_type=5):
+        """
+        Ranking dokumentów wielu typów jednym zapytaniem. Kolejność w typie:
+        liczba dopasowanych słów zapytania, potem suma wag termów.
+
+        Returns:
+            Lista (doc_type, doc_id, matched_words, score), posortowana
+            w obrębie typu od najlepszego.
+        """
+        token_matches = self._token_matches(text, doc_types)
+        if token_matches is None:
+            return []
+        terms, _ = token_matches
+
+        # Słowo liczy się raz na dokument - najlepszy z pasujących termów
+        # (oba warianty słowa albo term i prefiks nie dublują wyniku)
+        per_token = (
+            select(
+                terms.c.doc_type,
+                terms.c.doc_id,
+                terms.c.token,
+                func.max(terms.c.weight).label("weight"),
+            )
+            .group_by(terms.c.doc_type, terms.c.doc_id, terms.c.token)
+            .subquery()
+        )
+        matches = (
+            select(
+                per_token.c.doc_type,
+                per_token.c.doc_id,
+                func.count().label("matched"),
+                func.sum(per_token.c.weight).label("score"),
+            )
+            .group_by(per_token.c.doc_type, per_token.c.doc_id)
+            .subquery()
+        )
+
+        ranked = select(
+            matches,
+            func.row_number()
+            .over(
+                partition_by=matches.c.doc_type,
+                order_by=(
+                    matches.c.matched.desc(),
+                    matches.c.score.desc(),
+                    matches.c.doc_id,
+                ),
+            )
+            .label("position"),
+        ).subquery()
+
+        rows = self.session.execute(
+            select(ranked.c.doc_type, ranked.c.doc_id, ranked.c.matched, ranked.c.score)
+            .where(ranked.c.position <= limit_per_type)
+            .order_by(ranked.c.doc_type, ranked.c.position)
+        )
+        return [tuple(row) for row in rows]
+
+    def matching_ids(self, doc_type, text):
+        """
+        Select z id dokumentów typu doc_type zawierających WSZYSTKIE słowa
+        zapytania (do użycia w .in_() filtrów list). None, gdy zapytanie nie
+        ma słów po odrzuceniu stopwords - wtedy filtr należy pominąć / obsłużyć inaczej.
+        """
+        token_matches = self._token_matches(text, [doc_type])
+        if token_matches is None:
+            return None
+        terms, token_count = token_matches
+
+        return (
+            select(terms.c.doc_id)
+            .group_by(terms.c.doc_id)
+            .having(func.count(distinct(terms.c.token)) == token_count)
+        )
+
+    def text_condition(self, text, targets, fallback_columns):
+        """
+        Warunek filtra listy: id IN (dokumenty ze wszystkimi słowami frazy)
+        dla par targets = [(doc_type, kolumna id)], połączonych OR.
+
+        ILIKE '%fraza%' po fallback_columns (jak przed indeksem), gdy fraza
+        nie ma słów albo indeks nie znajduje żadnego dokumentu - np. fragment
+        ze środka słowa ("itt" -> "Pitt"), którego termy nie wyrażą.
+        Sprawdzenie to jedno zapytanie LIMIT 1 po indeksie na typ.
+        """
+        conditions = []
+        for doc_type, id_column in targets:
+            matching = self.matching_ids(doc_type, text)
+            if matching is None:
+                conditions = []
+                break
+            if self.session.execute(matching.limit(1)).first() is not None:
+                conditions.append(id_column.in_(matching))
+
+        if not conditions:
+            return or_(*(column.ilike(f"%{text}%") for column in fallback_columns))
+        return or_(*conditions)
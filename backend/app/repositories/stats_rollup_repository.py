@@ -0,0 +1,151 @@
+from app.models.stats_rollup import StatsRollup
+from sqlalchemy import delete, func, insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import SQLAlchemyError
+from datetime import datetime, timedelta
+
+
+def period_start(day, period):
+    """Początek okresu zawierającego dzień (dla "month" - pierwszy dzień miesiąca)"""
+    return day.replace(day=1) if period == "month" else day
+
+
+class StatsRollupRepository:
+    def __init__(self, session):
+        self.session = session
+
+    def _upsert(self):
+        dialect = self.session.get_bind().dialect.name
+        if dialect == "postgresql":
+            return postgresql.insert(StatsRollup)
+        if dialect == "sqlite":
+            return sqlite.insert(StatsRollup)
+        return None
+
+    def increment(self, metric, at=None, count=1, value=0):
+        """
+        Dolicza zdarzenie do liczników dnia i miesiąca. Bez commitu - zmiana
+        wchodzi do transakcji wywołującego razem z samym zdarzeniem.
+        INSERT ... ON CONFLICT DO UPDATE jest atomowy, więc równoległe
+        zdarzenia nie gubią się ani nie kolidują przy pierwszym wierszu okresu.
+        """
+        day = (at or datetime.utcnow()).date()
+        for period in ("day", "month"):
+            key = {
+                "metric": metric,
+                "period": period,
+                "period_start": period_start(day, period),
+            }
+            upsert = self._upsert()
+            if upsert is not None:
+                statement = upsert.values(
+                    **key, event_count=count, value_sum=value
+                ).on_conflict_do_update(
+                    index_elements=["metric", "period", "period_start"],
+                    set_={
+                        "event_count": StatsRollup.event_count
+                        + upsert.excluded.event_count,
+                        "value_sum": StatsRollup.value_sum + upsert.excluded.value_sum,
+                    },
+                )
+                self.session.execute(statement)
+                continue
+
+            # Inne bazy: UPDATE, a gdy wiersza jeszcze nie ma - INSERT
+            rollup = self.session.get(StatsRollup, key)
+            if rollup is None:
+                self.session.add(StatsRollup(**key, event_count=count, value_sum=value))
+            else:
+                rollup.event_count += count
+                rollup.value_sum += value
+
+    def remove(self, metric, events):
+        """
+        Odejmuje usunięte zdarzenia: events = [(chwila, wartość), ...], po
+        jednym zapytaniu na dzień. Bez commitu - jak increment.
+        """
+        daily = {}
+        for at, value in events:
+            if at is None:
+                continue
+            first, count, total = daily.get(at.date(), (at, 0, 0))
+            daily[at.date()] = (first, count + 1, total + (value or 0))
+
+        for at, count, total in daily.values():
+            self.increment(metric, at, count=-count, value=-total)
+
+    def get_trend(self, metric, period="month", periods=12, end=None):
+        """
+        Ostatnie `periods` okresów do dnia end (domyślnie dziś) włącznie,
+        od najstarszego, z zerami dla okresów bez zdarzeń:
+        [(period_start, event_count, value_sum), ...]
+        """
+        starts = [period_start(end or datetime.utcnow().date(), period)]
+        for _ in range(periods - 1):
+            previous = starts[-1] - timedelta(days=1)
+            starts.append(period_start(previous, period))
+        starts.reverse()
+
+        rows = self.session.query(
+            StatsRollup.period_start, StatsRollup.event_count, StatsRollup.value_sum
+        ).filter(
+            StatsRollup.metric == metric,
+            StatsRollup.period == period,
+            StatsRollup.period_start >= starts[0],
+            StatsRollup.period_start <= starts[-1],
+        )
+        counters = {row_start: (count, value) for row_start, count, value in rows}
+        return [(start, *counters.get(start, (0, 0))) for start in starts]
+
+    def get_totals(self, metric, since=None):
+        """
+        (event_count, value_sum) od dnia since włącznie (wiersze dzienne)
+        albo z całej historii (wiersze miesięczne), gdy since=None
+        """
+        query = self.session.query(
+            func.coalesce(func.sum(StatsRollup.event_count), 0),
+            func.coalesce(func.sum(StatsRollup.value_sum), 0),
+        ).filter(StatsRollup.metric == metric)
+        if since is None:
+            query = query.filter(StatsRollup.period == "month")
+        else:
+            query = query.filter(
+                StatsRollup.period == "day", StatsRollup.period_start >= since
+            )
+        count, value = query.one()
+        return int(count), int(value)
+
+    def replace_metric(self, metric, daily):
+        """
+        Podmienia wszystkie liczniki metryki: daily = {dzień: (liczba, suma)};
+        wiersze miesięczne są sumowane z dziennych
+        """
+        try:
+            monthly = {}
+            for day, (count, value) in daily.items():
+                month = period_start(day, "month")
+                month_count, month_value = monthly.get(month, (0, 0))
+                monthly[month] = (month_count + count, month_value + value)
+
+            self.session.execute(
+                delete(StatsRollup).where(StatsRollup.metric == metric)
+            )
+            rows = [
+                {
+                    "metric": metric,
+                    "period": period,
+                    "period_start": start,
+                    "event_count": count,
+                    "value_sum": value,
+                }
+                for period, counters in (("day", daily), ("month", monthly))
+                for start, (count, value) in counters.items()
+            ]
+            if rows:
+                self.session.execute(insert(StatsRollup), rows)
+            self.session.commit()
+            return len(rows)
+
+        except SQLAlchemyError as e:
+            self.session.rollback()
+            raise e
@@ -0,0 +1,24 @@
+from app.models.stats_snapshot import StatsSnapshot
+from sqlalchemy.exc import SQLAlchemyError
+from datetime import datetime
+
+
+class StatsSnapshotRepository:
+    def __init__(self, session):
+        self.session = session
+
+    def get(self, name):
+        return self.session.get(StatsSnapshot, name)
+
+    def save(self, name, payload):
+        """Zapisuje (albo nadpisuje) snapshot i zwraca go"""
+        try:
+            snapshot = self.session.merge(
+                StatsSnapshot(name=name, payload=payload, computed_at=datetime.utcnow())
+            )
+            self.session.commit()
+            return snapshot
+
+        except SQLAlchemyError as e:
+            self.session.rollback()
+            raise e
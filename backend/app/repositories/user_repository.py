@@ -1,10 +1,12 @@
-from sqlalchemy import or_, func
+from sqlalchemy import and_, or_, func
+from datetime import datetime, timedelta
 from flask import url_for
 from app.models.user import User
 from app.models.rating import Rating
 from app.models.movie import Movie
 from app.models.favorite_movie import FavoriteMovie
 from app.models.watchlist import Watchlist
+from app.repositories.stats_rollup_repository import StatsRollupRepository
 
 
 def _get_poster_url_for_movie(poster_url):
@@ -37,6 +39,9 @@ class UserRepository:
 
     def add(self, user):
         self.session.add(user)
+        StatsRollupRepository(self.session).increment(
+            "registrations", user.registration_date
+        )
         self.session.commit()
         return user
 
@@ -410,168 +415,153 @@ class UserRepository:
             return self.get_by_github_id(provider_id)
         return None
 
-    def get_basic_statistics(self):
-        """Pobiera podstawowe statystyki użytkowników"""
-        try:
-            from sqlalchemy import func
-            from datetime import datetime, timedelta
-
-            # Podstawowe liczby użytkowników
-            total_users = self.session.query(User).count()
-
-            # Użytkownicy według ról
-            admins_count = (
-                self.session.query(User).filter(User.role == 1).count()
-            )  # Admin
-            moderators_count = (
-                self.session.query(User).filter(User.role == 2).count()
-            )  # Moderator
-            regular_users_count = (
-                self.session.query(User).filter(User.role == 3).count()
-            )  # Regular user
-
-            # Aktywne konta
-            active_users = (
-                self.session.query(User).filter(User.is_active == True).count()
-            )
-            inactive_users = (
-                self.session.query(User).filter(User.is_active == False).count()
-            )
-
-            # Użytkownicy OAuth vs zwykli
-            oauth_users = (
-                self.session.query(User).filter(User.oauth_created == True).count()
-            )
-            regular_login_users = (
-                self.session.query(User).filter(User.oauth_created == False).count()
-            )
+    def _count_users(self, conditions):
+        """
+        Wiele liczników naraz: {nazwa: warunek} -> {nazwa: liczba}, jedno
+        zapytanie z COUNT(...) FILTER (WHERE ...) zamiast COUNT na warunek
+        """
+        names = list(conditions)
+        row = self.session.query(
+            func.count(User.user_id),
+            *[func.count(User.user_id).filter(conditions[name]) for name in names],
+        ).one()
+        return {"total": row[0], **dict(zip(names, row[1:]))}
+
+    def _basic_statistics_conditions(self):
+        now = datetime.utcnow()
+        return {
+            "admins": User.role == 1,
+            "moderators": User.role == 2,
+            "regular_users": User.role == 3,
+            "active": User.is_active == True,
+            "inactive": User.is_active == False,
+            "oauth": User.oauth_created == True,
+            "regular_login": User.oauth_created == False,
+            "recent_30_days": User.registration_date >= now - timedelta(days=30),
+            "recent_7_days": User.registration_date >= now - timedelta(days=7),
+            "with_profile_pictures": User.profile_picture.isnot(None),
+            "with_bio": and_(User.bio.isnot(None), User.bio != ""),
+        }
 
-            # Użytkownicy z ostatnich 30 dni
-            thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-            recent_users = (
-                self.session.query(User)
-                .filter(User.registration_date >= thirty_days_ago)
-                .count()
-            )
+    @staticmethod
+    def _format_basic_statistics(counts):
+        total_users = counts["total"]
 
-            # Użytkownicy z ostatnich 7 dni
-            week_ago = datetime.utcnow() - timedelta(days=7)
-            weekly_users = (
-                self.session.query(User)
-                .filter(User.registration_date >= week_ago)
-                .count()
-            )
+        def percentage(value):
+            return round((value / total_users * 100), 2) if total_users > 0 else 0
 
-            # Użytkownicy z profilowymi zdjęciami
-            with_profile_pictures = (
-                self.session.query(User)
-                .filter(User.profile_picture.isnot(None))
-                .count()
-            )
-
-            # Użytkownicy z bio
-            with_bio = (
-                self.session.query(User)
-                .filter(User.bio.isnot(None), User.bio != "")
-                .count()
-            )
+        return {
+            "total_users": total_users,
+            "role_distribution": {
+                "admins": counts["admins"],
+                "moderators": counts["moderators"],
+                "regular_users": counts["regular_users"],
+            },
+            "account_status": {
+                "active_users": counts["active"],
+                "inactive_users": counts["inactive"],
+                "active_percentage": percentage(counts["active"]),
+            },
+            "authentication_types": {
+                "oauth_users": counts["oauth"],
+                "regular_login_users": counts["regular_login"],
+                "oauth_percentage": percentage(counts["oauth"]),
+            },
+            "registration_trends": {
+                "recent_users_30_days": counts["recent_30_days"],
+                "weekly_users": counts["recent_7_days"],
+            },
+            "profile_completion": {
+                "with_profile_pictures": counts["with_profile_pictures"],
+                "with_bio": counts["with_bio"],
+                "profile_picture_percentage": percentage(
+                    counts["with_profile_pictures"]
+                ),
+                "bio_percentage": percentage(counts["with_bio"]),
+            },
+        }
 
-            return {
-                "total_users": total_users,
-                "role_distribution": {
-                    "admins": admins_count,
-                    "moderators": moderators_count,
-                    "regular_users": regular_users_count,
-                },
-                "account_status": {
-                    "active_users": active_users,
-                    "inactive_users": inactive_users,
-                    "active_percentage": (
-                        round((active_users / total_users * 100), 2)
-                        if total_users > 0
-                        else 0
-                    ),
-                },
-                "authentication_types": {
-                    "oauth_users": oauth_users,
-                    "regular_login_users": regular_login_users,
-                    "oauth_percentage": (
-                        round((oauth_users / total_users * 100), 2)
-                        if total_users > 0
-                        else 0
-                    ),
-                },
-                "registration_trends": {
-                    "recent_users_30_days": recent_users,
-                    "weekly_users": weekly_users,
-                },
-                "profile_completion": {
-                    "with_profile_pictures": with_profile_pictures,
-                    "with_bio": with_bio,
-                    "profile_picture_percentage": (
-                        round((with_profile_pictures / total_users * 100), 2)
-                        if total_users > 0
-                        else 0
-                    ),
-                    "bio_percentage": (
-                        round((with_bio / total_users * 100), 2)
-                        if total_users > 0
-                        else 0
-                    ),
-                },
-            }
+    def get_basic_statistics(self):
+        """Pobiera podstawowe statystyki użytkowników (jedno zapytanie)"""
+        try:
+            counts = self._count_users(self._basic_statistics_conditions())
+            return self._format_basic_statistics(counts)
 
         except Exception as e:
             print(f"Błąd podczas pobierania podstawowych statystyk: {e}")
             raise
 
-    def get_dashboard_data(self):
-        """Pobiera dane dashboard dla użytkowników"""
+    def get_dashboard_aggregates(self):
+        """
+        Zagregowana część dashboardu użytkowników: liczniki (z aktywnością
+        logowań) jednym zapytaniem, dostawcy OAuth GROUP BY i miesięczne
+        trendy rejestracji / logowań z rollupów.
+        Wynik jest serializowalny do JSON (snapshot statystyk).
+        """
         try:
-            from sqlalchemy import func, extract
-            from datetime import datetime, timedelta
-
-            # Podstawowe statystyki
-            basic_stats = self.get_basic_statistics()
-
-            # Rejestracje według miesięcy (ostatnie 12 miesięcy)
-            monthly_registrations = []
-            for i in range(12):
-                month_start = datetime.utcnow().replace(day=1) - timedelta(days=30 * i)
-                month_end = (month_start + timedelta(days=32)).replace(
-                    day=1
-                ) - timedelta(days=1)
-
-                count = (
-                    self.session.query(User)
-                    .filter(
-                        User.registration_date >= month_start,
-                        User.registration_date <= month_end,
-                    )
-                    .count()
-                )
+            now = datetime.utcnow()
 
-                monthly_registrations.append(
-                    {"month": month_start.strftime("%Y-%m"), "count": count}
-                )
-
-            # Ostatnie logowania (aktywność użytkowników)
-            last_login_stats = []
+            # Ostatnie logowania (aktywność użytkowników) - w tym samym
+            # zapytaniu co statystyki podstawowe
             time_ranges = [
                 ("last_24h", timedelta(hours=24)),
                 ("last_7_days", timedelta(days=7)),
                 ("last_30_days", timedelta(days=30)),
                 ("last_90_days", timedelta(days=90)),
             ]
-
+            conditions = self._basic_statistics_conditions()
             for label, delta in time_ranges:
-                threshold = datetime.utcnow() - delta
-                count = (
-                    self.session.query(User)
-                    .filter(User.last_login >= threshold)
-                    .count()
-                )
-                last_login_stats.append({"period": label, "active_users": count})
+                conditions[f"login_{label}"] = User.last_login >= now - delta
+            counts = self._count_users(conditions)
+
+            # Rejestracje i logowania według miesięcy kalendarzowych (ostatnie
+            # 12, z bieżącym) - z rollupów zamiast GROUP BY po tabelach źródłowych
+            rollups = StatsRollupRepository(self.session)
+            monthly_registrations = [
+                {"month": month.strftime("%Y-%m"), "count": count}
+                for month, count, _ in rollups.get_trend("registrations", "month", 12)
+            ]
+            monthly_logins = [
+                {"month": month.strftime("%Y-%m"), "count": count}
+                for month, count, _ in rollups.get_trend("logins", "month", 12)
+            ]
+
+            # Rozkład według dostawców OAuth
+            providers = ["google", "facebook", "github"]
+            provider_counts = dict(
+                self.session.query(User.oauth_provider, func.count(User.user_id))
+                .filter(User.oauth_provider.in_(providers))
+                .group_by(User.oauth_provider)
+                .all()
+            )
+
+            return {
+                "statistics": self._format_basic_statistics(counts),
+                "monthly_registrations": monthly_registrations,
+                "monthly_logins": monthly_logins,
+                "user_activity": [
+                    {"period": label, "active_users": counts[f"login_{label}"]}
+                    for label, _ in time_ranges
+                ],
+                "oauth_providers": [
+                    {"provider": provider, "count": provider_counts[provider]}
+                    for provider in providers
+                    if provider_counts.get(provider, 0) > 0
+                ],
+            }
+
+        except Exception as e:
+            print(f"Błąd podczas pobierania agregatów dashboard: {e}")
+            raise
+
+    def get_dashboard_data(self, aggregates=None):
+        """
+        Pobiera dane dashboard dla użytkowników: agregaty (z snapshotu albo
+        liczone teraz) + listy ostatnio aktywnych / zarejestrowanych
+        """
+        try:
+            if aggregates is None:
+                aggregates = self.get_dashboard_aggregates()
 
             # Najaktywniejsze konta (według ostatniego logowania)
             most_active_users = (
@@ -590,23 +580,8 @@ class UserRepository:
                 .all()
             )
 
-            # Rozkład według dostawców OAuth
-            oauth_providers = []
-            providers = ["google", "facebook", "github"]
-            for provider in providers:
-                count = (
-                    self.session.query(User)
-                    .filter(User.oauth_provider == provider)
-                    .count()
-                )
-                if count > 0:
-                    oauth_providers.append({"provider": provider, "count": count})
-
             return {
-                "statistics": basic_stats,
-                "monthly_registrations": list(reversed(monthly_registrations)),
-                "user_activity": last_login_stats,
-                "oauth_providers": oauth_providers,
+                **aggregates,
                 "most_active_users": [
                     {
                         "id": user.user_id,
@@ -0,0 +1,272 @@
+from app.models.rating import Rating
+from app.models.user_taste_profile import UserTasteProfile, TASTE_POLARITIES
+from app.recommendation_algorithm.config import (
+    BATCH_SIZE,
+    NEGATIVE_RATING_THRESHOLD,
+    POSITIVE_RATING_THRESHOLD,
+    TRAINING_NEGATIVE_LIMIT,
+    TRAINING_POSITIVE_LIMIT,
+)
+from app.recommendation_algorithm.utils.feature_store import load_movie_features
+from sqlalchemy import and_, case, func, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
+from datetime import datetime
+
+# Długość okien profilu - jak w get_training_data
+WINDOW_LIMITS = {
+    "positive": TRAINING_POSITIVE_LIMIT,
+    "negative": TRAINING_NEGATIVE_LIMIT,
+}
+
+PROFILE_COLUMNS = (
+    "positive_window",
+    "positive_counts",
+    "negative_window",
+    "negative_counts",
+)
+
+
+def rating_polarity(value):
+    """Okno, do którego trafia ocena ("positive" / "negative"), None dla neutralnych"""
+    if value is None:
+        return None
+    if value >= POSITIVE_RATING_THRESHOLD:
+        return "positive"
+    if value <= NEGATIVE_RATING_THRESHOLD:
+        return "negative"
+    return None
+
+
+def _polarity_condition(polarity):
+    if polarity == "positive":
+        return Rating.rating >= POSITIVE_RATING_THRESHOLD
+    return Rating.rating <= NEGATIVE_RATING_THRESHOLD
+
+
+class UserTasteProfileRepository:
+    def __init__(self, session):
+        self.session = session
+
+    def get(self, user_id):
+        return self.session.get(UserTasteProfile, user_id)
+
+    def delete(self, user_id):
+        """Usuwa profil (usuwanie konta); bez commitu"""
+        self.session.query(UserTasteProfile).filter(
+            UserTasteProfile.user_id == user_id
+        ).delete(synchronize_session=False)
+
+    def invalidate_movies(self, movie_ids):
+        """
+        Usuwa profile użytkowników z oceną pozytywną lub negatywną któregoś
+        z filmów - po zmianie ich metadanych (gatunki, obsada, rok...) cechy
+        zapisane w oknach są nieaktualne. Profil liczony jest od nowa przy
+        następnej ocenie albo rekomendacjach (ensure). Commit.
+
+        Returns:
+            liczba usuniętych profili
+        """
+        movie_ids = sorted({int(movie_id) for movie_id in movie_ids})
+        deleted = 0
+        for i in range(0, len(movie_ids), BATCH_SIZE):
+            raters = select(Rating.user_id).where(
+                Rating.movie_id.in_(movie_ids[i : i + BATCH_SIZE]),
+                or_(*(_polarity_condition(name) for name in TASTE_POLARITIES)),
+            )
+            deleted += (
+                self.session.query(UserTasteProfile)
+                .filter(UserTasteProfile.user_id.in_(raters))
+                .delete(synchronize_session=False)
+            )
+        self.session.commit()
+        return deleted
+
+    def ensure(self, user_id):
+        """
+        Zapisany profil; brakujący (unieważniony po zmianie metadanych, sprzed
+        migracji) liczony od zera z ocen. Nie nadpisuje profilu zapisanego
+        w międzyczasie przez równoległą ocenę. Commit tylko przy zapisie.
+        """
+        profile = self.get(user_id)
+        if profile is None:
+            self._write(self._compute([user_id]), overwrite=False)
+            self.session.commit()
+            profile = self.get(user_id)
+        return profile
+
+    def _lock(self, user_id):
+        """
+        Profil z blokadą wiersza do końca transakcji - równoległe oceny
+        jednego użytkownika nie nadpisują sobie okien
+        """
+        return (
+            self.session.query(UserTasteProfile)
+            .filter(UserTasteProfile.user_id == user_id)
+            .with_for_update()
+            .populate_existing()
+            .one_or_none()
+        )
+
+    def _upsert(self):
+        dialect = self.session.get_bind().dialect.name
+        if dialect == "postgresql":
+            return postgresql.insert(UserTasteProfile)
+        if dialect == "sqlite":
+            return sqlite.insert(UserTasteProfile)
+        return None
+
+    def apply_rating_change(self, user_id, movie_id, added=None, removed=None):
+        """
+        Przesuwa okna profilu o jedną ocenę filmu (nowa: added, zmiana:
+        added + removed, usunięcie: removed). Zapisana ocena jest najnowsza,
+        więc trafia na początek okna. Bez commitu - zmiana wchodzi do
+        transakcji wywołującego razem z oceną.
+
+        Koszt: cechy jednego filmu; gdy film wypada z okna przed końcem,
+        dodatkowo jedno zapytanie LIMIT 1 o następną ocenę w kolejności.
+        Brakujący profil (użytkownik sprzed migracji) jest liczony od zera.
+        """
+        profile = self._lock(user_id)
+        if profile is None:
+            self._write(self._compute([user_id]), overwrite=False)
+            return
+
+        shortened = [
+            polarity
+            for polarity in TASTE_POLARITIES
+            if profile.remove_movie(polarity, movie_id)
+        ]
+
+        polarity = rating_polarity(added)
+        if polarity is not None:
+            entry = self._entries([movie_id]).get(movie_id)
+            if entry is not None:
+                profile.add_movie(polarity, entry, WINDOW_LIMITS[polarity])
+
+        for polarity in shortened:
+            self._backfill(profile, polarity, movie_id)
+
+    def _backfill(self, profile, polarity, movie_id):
+        """Uzupełnia okno najnowszą oceną spoza niego (starszą od całego okna)"""
+        window_ids = profile.movie_ids(polarity)
+        if len(window_ids) >= WINDOW_LIMITS[polarity]:
+            return
+
+        row = (
+            self.session.query(Rating.movie_id)
+            .filter(
+                Rating.user_id == profile.user_id,
+                _polarity_condition(polarity),
+                Rating.movie_id.notin_(window_ids + [movie_id]),
+            )
+            .order_by(Rating.rated_at.desc())
+            .first()
+        )
+        if row is None:
+            return
+
+        entry = self._entries([row.movie_id]).get(row.movie_id)
+        if entry is not None:
+            profile.add_movie(polarity, entry, WINDOW_LIMITS[polarity], newest=False)
+
+    def rebuild(self, user_ids):
+        """
+        Liczy profile od zera z ocen (po migracji albo po zmianach metadanych
+        wprowadzonych z pominięciem serwisów). Commit po całej paczce.
+
+        Returns:
+            liczba zapisanych profili
+        """
+        saved = 0
+        user_ids = list(user_ids)
+        for i in range(0, len(user_ids), BATCH_SIZE):
+            profiles = self._compute(user_ids[i : i + BATCH_SIZE])
+            self._write(profiles, overwrite=True)
+            self.session.commit()
+            saved += len(profiles)
+        return saved
+
+    def _compute(self, user_ids):
+        """Nowe (niezapisane) profile użytkowników z ich ocen - jedno zapytanie na paczkę"""
+        polarity = case(
+            (Rating.rating >= POSITIVE_RATING_THRESHOLD, "positive"),
+            (Rating.rating <= NEGATIVE_RATING_THRESHOLD, "negative"),
+            else_=None,
+        )
+        ranked = (
+            select(
+                Rating.user_id,
+                Rating.movie_id,
+                polarity.label("polarity"),
+                func.row_number()
+                .over(
+                    partition_by=(Rating.user_id, polarity),
+                    order_by=Rating.rated_at.desc(),
+                )
+                .label("position"),
+            )
+            .where(Rating.user_id.in_(user_ids))
+            .subquery()
+        )
+        rows = self.session.execute(
+            select(ranked.c.user_id, ranked.c.movie_id, ranked.c.polarity)
+            .where(
+                or_(
+                    *(
+                        and_(
+                            ranked.c.polarity == name,
+                            ranked.c.position <= WINDOW_LIMITS[name],
+                        )
+                        for name in TASTE_POLARITIES
+                    )
+                )
+            )
+            .order_by(ranked.c.user_id, ranked.c.polarity, ranked.c.position)
+        ).all()
+
+        entries = self._entries({row.movie_id for row in rows})
+        profiles = {
+            user_id: UserTasteProfile(
+                user_id=user_id,
+                positive_window=[],
+                positive_counts={},
+                negative_window=[],
+                negative_counts={},
+            )
+            for user_id in user_ids
+        }
+        for user_id, movie_id, name in rows:
+            if movie_id in entries:
+                profiles[user_id].add_movie(
+                    name, entries[movie_id], WINDOW_LIMITS[name], newest=False
+                )
+        return list(profiles.values())
+
+    def _write(self, profiles, overwrite):
+        now = datetime.utcnow()
+        for profile in profiles:
+            values = {column: getattr(profile, column) for column in PROFILE_COLUMNS}
+            upsert = self._upsert()
+            if upsert is None:
+                # Inne bazy: merge (bez ochrony przed równoległym pierwszym zapisem)
+                if overwrite or self.get(profile.user_id) is None:
+                    self.session.merge(profile)
+                continue
+
+            statement = upsert.values(user_id=profile.user_id, updated_at=now, **values)
+            if overwrite:
+                statement = statement.on_conflict_do_update(
+                    index_elements=["user_id"], set_={**values, "updated_at": now}
+                )
+            else:
+                # Równoległa pierwsza ocena mogła już zapisać profil
+                statement = statement.on_conflict_do_nothing(index_elements=["user_id"])
+            self.session.execute(statement)
+
+    def _entries(self, movie_ids):
+        return {
+            movie_id: {"movie_id": movie_id, **features}
+            for movie_id, features in load_movie_features(
+                self.session, movie_ids
+            ).items()
+        }
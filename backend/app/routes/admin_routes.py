@@ -1,8 +1,13 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify
 from app.services.database import db
+from app.extensions import request_metrics, response_cache
 from app.repositories.user_repository import UserRepository
+from app.repositories.rating_repository import RatingRepository
+from app.repositories.comment_repository import CommentRepository
+from app.repositories.stats_rollup_repository import StatsRollupRepository
 from app.services.auth_service import admin_required, staff_required
 from app.models.user import User
+from app.services.search_service import refresh_search_documents
 from app.services.user_activity_service import (
     log_role_change,
     log_account_block,
@@ -178,6 +183,8 @@ def update_user(user_id):
             user.role = new_role
 
         db.session.commit()
+        if "username" in data:
+            refresh_search_documents("user", [user_id])
 
         return (
             jsonify(
@@ -386,23 +393,22 @@ def delete_user(user_id):
         user_data = user.serialize()
 
         try:
+            comment_ids = []
 
             try:
-                result = db.session.execute(
-                    text("DELETE FROM ratings WHERE user_id = :user_id"),
-                    {"user_id": user_id},
-                )
-                print(f"Usunięto {result.rowcount} ocen")
+                # Przez repozytorium - agregaty filmów, rollupy i profil gustu
+                deleted = RatingRepository(db.session).delete_user_ratings(user_id)
+                print(f"Usunięto {deleted} ocen")
             except Exception as e:
                 print(f"Błąd ratings: {e}")
                 db.session.rollback()
 
             try:
-                result = db.session.execute(
-                    text("DELETE FROM comments WHERE user_id = :user_id"),
-                    {"user_id": user_id},
+                # Przez repozytorium - rollupy komentarzy
+                comment_ids = CommentRepository(db.session).delete_user_comments(
+                    user_id
                 )
-                print(f"Usunięto {result.rowcount} komentarzy")
+                print(f"Usunięto {len(comment_ids)} komentarzy")
             except Exception as e:
                 print(f"Błąd comments: {e}")
                 db.session.rollback()
@@ -453,6 +459,10 @@ def delete_user(user_id):
                     {"user_id": user_id},
                 )
                 db.session.commit()
+                refresh_search_documents("user", [user_id])
+                # Usunięte komentarze znikają też z indeksu wyszukiwania
+                refresh_search_documents("comment", comment_ids)
+                response_cache.invalidate_tags("ratings")
 
                 return (
                     jsonify(
@@ -522,7 +532,9 @@ def create_user():
         new_user.set_password(data["password"])
 
         db.session.add(new_user)
+        StatsRollupRepository(db.session).increment("registrations")
         db.session.commit()
+        refresh_search_documents("user", [new_user.user_id])
 
         return (
             jsonify(
@@ -537,3 +549,53 @@ def create_user():
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": str(e)}), 500
+
+
+@admin_bp.route("/cache/stats", methods=["GET"])
+@admin_required
+def get_response_cache_stats():
+    try:
+        return jsonify(response_cache.stats()), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@admin_bp.route("/cache", methods=["DELETE"])
+@admin_required
+def clear_response_cache():
+    try:
+        response_cache.clear()
+        return jsonify({"message": "Cache odpowiedzi został wyczyszczony"}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@admin_bp.route("/metrics", methods=["GET"])
+def get_request_metrics():
+    """
+    Metryki żądań w formacie Prometheusa. Dostęp: administrator albo
+    scraper z nagłówkiem "Authorization: Bearer <METRICS_TOKEN>"
+    """
+    if request_metrics.is_scrape_authorized(request.headers.get("Authorization")):
+        return _request_metrics_response()
+    return admin_required(_request_metrics_response)()
+
+
+def _request_metrics_response():
+    try:
+        return Response(
+            request_metrics.prometheus_text(),
+            mimetype="text/plain; version=0.0.4",
+        )
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@admin_bp.route("/metrics", methods=["DELETE"])
+@admin_required
+def reset_request_metrics():
+    try:
+        request_metrics.reset()
+        return jsonify({"message": "Metryki żądań zostały wyzerowane"}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
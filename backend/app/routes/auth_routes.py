@@ -10,6 +10,7 @@ from app.models.user import User
 from app.repositories.user_repository import UserRepository
 from app.services.database import db
 from app.services.user_service import change_user_password
+from app.services.search_service import refresh_search_documents
 from app.services.login_activity_service import (
     log_login_activity,
     log_failed_login_attempt,
@@ -49,6 +50,7 @@ def register():
 
     try:
         user_repo.add(new_user)
+        refresh_search_documents("user", [new_user.user_id])
 
         # 🔥 LOGUJ PIERWSZĄ AKTYWNOŚĆ (REJESTRACJA + PIERWSZE LOGOWANIE)
         log_login_activity(new_user.user_id, status="Registration & First Login")
@@ -284,6 +286,7 @@ def handle_oauth_user(user_info, provider, provider_id):
                 )
 
                 user_repo.add(user)
+                refresh_search_documents("user", [user.user_id])
 
         # Aktualizuj ostatnie logowanie
         user.update_last_login()
@@ -0,0 +1,47 @@
+from flask import Blueprint, jsonify, request, current_app
+
+from app.services.autocomplete_service import autocomplete, AUTOCOMPLETE_DOC_TYPES
+
+autocomplete_bp = Blueprint("autocomplete", __name__)
+
+
+@autocomplete_bp.route("", methods=["GET"])
+@autocomplete_bp.route("/", methods=["GET"])
+def get_suggestions():
+    """
+    Podpowiedzi tytułów filmów i nazwisk (z pamięci, bez zapytań do bazy)
+
+    Query params:
+        q: wpisywany tekst (literówki i brak polskich znaków są tolerowane)
+        types: typy oddzielone przecinkami (movie, actor, director), domyślnie wszystkie
+        limit: liczba podpowiedzi (domyślnie 8, maks. 32)
+    """
+    try:
+        query = request.args.get("q", "").strip()
+        if not query:
+            return jsonify({"query": "", "suggestions": []}), 200
+
+        types_param = request.args.get("types")
+        if types_param:
+            doc_types = [t.strip() for t in types_param.split(",") if t.strip()]
+            invalid = [t for t in doc_types if t not in AUTOCOMPLETE_DOC_TYPES]
+            if invalid or not doc_types:
+                return (
+                    jsonify(
+                        {
+                            "error": f"Nieprawidłowe typy: {', '.join(invalid)}",
+                            "allowed_types": list(AUTOCOMPLETE_DOC_TYPES),
+                        }
+                    ),
+                    400,
+                )
+        else:
+            doc_types = list(AUTOCOMPLETE_DOC_TYPES)
+
+        limit = request.args.get("limit", 8, type=int)
+        suggestions = autocomplete(query, doc_types, limit=limit)
+        return jsonify({"query": query, "suggestions": suggestions}), 200
+
+    except Exception as e:
+        current_app.logger.error(f"Error in get_suggestions: {str(e)}")
+        return jsonify({"error": "Błąd podczas pobierania podpowiedzi"}), 500
@@ -120,6 +120,9 @@ def get_movie_comments(movie_id):
         sort_by = request.args.get("sort_by", "created_at")
         sort_order = request.args.get("sort_order", "desc")
         include_ratings = request.args.get("include_ratings", "true").lower() == "true"
+        # Paginacja kursorowa: ?after= (pusty = pierwsza strona), dalej next_cursor
+        after = request.args.get("after")
+        include_total = request.args.get("include_total", "false").lower() == "true"
 
         # Walidacja parametrów sortowania
         valid_sort_fields = ["created_at", "rating"]
@@ -129,10 +132,19 @@ def get_movie_comments(movie_id):
             sort_order = "desc"
 
         result = comment_service.get_movie_comments(
-            movie_id, page, per_page, sort_by, sort_order, include_ratings
+            movie_id,
+            page,
+            per_page,
+            sort_by,
+            sort_order,
+            include_ratings,
+            after=after,
+            include_total=include_total,
         )
         current_app.logger.info(f"Retrieved comments for movie {movie_id}, page {page}")
         return jsonify(result), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         current_app.logger.error(f"Error in get_movie_comments: {str(e)}")
         return jsonify({"error": "Wystąpił błąd podczas pobierania komentarzy"}), 500
@@ -146,12 +158,22 @@ def get_user_comments():
         page = request.args.get("page", 1, type=int)
         per_page = min(request.args.get("per_page", 10, type=int), 50)
         include_ratings = request.args.get("include_ratings", "true").lower() == "true"
+        # Paginacja kursorowa: ?after= (pusty = pierwsza strona), dalej next_cursor
+        after = request.args.get("after")
+        include_total = request.args.get("include_total", "false").lower() == "true"
 
         result = comment_service.get_user_comments(
-            user_id, page, per_page, include_ratings
+            user_id,
+            page,
+            per_page,
+            include_ratings,
+            after=after,
+            include_total=include_total,
         )
         current_app.logger.info(f"Retrieved comments for user {user_id}, page {page}")
         return jsonify(result), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         current_app.logger.error(f"Error in get_user_comments: {str(e)}")
         return (
@@ -265,6 +287,8 @@ def get_all_comments():
         date_to = request.args.get("date_to", None)
         sort_by = request.args.get("sort_by", "created_at")
         sort_order = request.args.get("sort_order", "desc")
+        after = request.args.get("after")
+        include_total = request.args.get("include_total", "false").lower() == "true"
 
         # Walidacja parametrów sortowania
         valid_sort_fields = ["created_at", "movie_title", "username"]
@@ -281,6 +305,8 @@ def get_all_comments():
             date_to=date_to,
             sort_by=sort_by,
             sort_order=sort_order,
+            after=after,
+            include_total=include_total,
         )
 
         current_app.logger.info(f"Staff retrieved all comments, page {page}")
@@ -1,12 +1,13 @@
-from flask import Blueprint, jsonify, request, current_app
+from flask import Blueprint, Response, jsonify, request, current_app
+from flask import stream_with_context
 from sqlalchemy import desc
-import time
-from functools import wraps
 from flask_jwt_extended import get_jwt_identity, jwt_required, verify_jwt_in_request
 from app.services.auth_service import admin_required, staff_required
+from app.extensions import response_cache
 
 from app.services.movie_service import (
     get_all_movies,
+    stream_all_movies,
     get_movies_paginated,
     get_movie_by_id,
     create_movie,
@@ -14,6 +15,7 @@ from app.services.movie_service import (
     filter_movies,
     get_movie_filter_options,
     get_top_rated_movies,
+    get_similar_movies,
     search_movies,
     get_all_movies_with_title_filter,
     update_movie,
@@ -25,26 +27,6 @@ from app.services.movie_service import (
 movies_bp = Blueprint("movies", __name__)
 
 
-def cached_response(timeout=300):
-    def decorator(f):
-        cache = {}
-
-        @wraps(f)
-        def decorated_function(*args, **kwargs):
-            cache_key = str(args) + str(kwargs) + str(request.args)
-            if cache_key in cache:
-                cached_data, timestamp = cache[cache_key]
-                if time.time() - timestamp < timeout:
-                    return cached_data
-            result = f(*args, **kwargs)
-            cache[cache_key] = (result, time.time())
-            return result
-
-        return decorated_function
-
-    return decorator
-
-
 def get_current_user_id():
     try:
         verify_jwt_in_request(optional=True)
@@ -55,7 +37,7 @@ def get_current_user_id():
 
 
 @movies_bp.route("/", methods=["GET"])
-@cached_response(timeout=60)
+@response_cache.cached(timeout=60, tags=("movies", "ratings"))
 def get_movies_list():
     """Pobiera wszystkie filmy z paginacją - przeszłe i przyszłe"""
     try:
@@ -83,13 +65,33 @@ def get_movies_list():
 
 
 @movies_bp.route("/all", methods=["GET"])
-@cached_response(timeout=300)
+@response_cache.cached(timeout=300, tags=("movies", "ratings"))
 def get_all_movies_list():
-    """Pobiera wszystkie filmy - przeszłe i przyszłe"""
+    """
+    Pobiera wszystkie filmy - przeszłe i przyszłe
+
+    ?format=ndjson: strumień (chunked) z jednym filmem w linii, bez
+    budowania całej listy w pamięci - do eksportu dużego katalogu
+    """
     try:
         user_id = get_current_user_id()
         serialize_basic = request.args.get("basic", "false").lower() == "true"
 
+        if request.args.get("format") == "ndjson":
+            chunks = stream_all_movies(serialize_basic=serialize_basic, user_id=user_id)
+            # Pierwsza partia jeszcze tutaj - błąd bazy to 500, a nie ucięty strumień
+            first = next(chunks, "")
+
+            def generate():
+                yield first
+                yield from chunks
+
+            return Response(
+                stream_with_context(generate()),
+                mimetype="application/x-ndjson",
+                headers={"Cache-Control": "private, max-age=300"},
+            )
+
         # ✅ Zwraca wszystkie filmy bez filtrowania dat
         movies = get_all_movies(serialize_basic=serialize_basic, user_id=user_id)
 
@@ -131,6 +133,22 @@ def get_movie(id):
         )
 
 
+@movies_bp.route("/<int:id>/similar", methods=["GET"])
+@response_cache.cached(timeout=300, tags=("movies", "ratings"))
+def get_similar_movies_route(id):
+    """Filmy podobne (metadane + opis) z indeksu sąsiadów"""
+    try:
+        limit = max(1, min(request.args.get("limit", 10, type=int), 50))
+        movies = get_similar_movies(id, limit, user_id=get_current_user_id())
+        if movies is None:
+            return jsonify({"error": "Film o podanym ID nie istnieje"}), 404
+
+        return jsonify(movies), 200
+    except Exception as e:
+        current_app.logger.error(f"Error in get_similar_movies_route: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+
 @movies_bp.route("/top-rated", methods=["GET"])
 def get_top_rated_movies_route():
     """Pobiera najlepiej oceniane filmy - wszystkie bez względu na datę premiery"""
@@ -230,6 +248,10 @@ def filter_movies_route():
         per_page = request.args.get("per_page", 10, type=int)
         per_page = min(per_page, 20)
 
+        # Paginacja kursorowa: ?after= (pusty = pierwsza strona), dalej next_cursor
+        after = request.args.get("after")
+        include_total = request.args.get("include_total", "false").lower() == "true"
+
         # ✅ Filtruje wszystkie filmy bez ograniczenia dat
         result = filter_movies(
             filters,
@@ -239,6 +261,8 @@ def filter_movies_route():
             sort_by=sort_by,
             sort_order=sort_order,
             user_id=user_id,
+            after=after,
+            include_total=include_total,
         )
 
         response = jsonify(result)
@@ -246,6 +270,8 @@ def filter_movies_route():
             response.headers["Cache-Control"] = "private, max-age=60"
 
         return response, 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         current_app.logger.error(f"Error in filter_movies_route: {str(e)}")
         return (
@@ -257,7 +283,7 @@ def filter_movies_route():
 
 
 @movies_bp.route("/filter-options", methods=["GET"])
-@cached_response(timeout=3600)
+@response_cache.cached(timeout=300, tags=("movies",), per_user=False)
 def get_filter_options_route():
     """Pobiera opcje filtrów - wszystkie filmy"""
     try:
@@ -601,7 +627,7 @@ def get_movies_dashboard():
 
 
 @movies_bp.route("/upcoming/<int:year>/<int:month>", methods=["GET"])
-@cached_response(timeout=300)
+@response_cache.cached(timeout=300, tags=("movies",), per_user=False)
 def get_upcoming_movies_by_month_route(year, month):
     """
     ✅ Pobiera filmy z premierami w danym miesiącu i roku - WSZYSTKIE
@@ -641,7 +667,7 @@ def get_upcoming_movies_by_month_route(year, month):
 
 
 @movies_bp.route("/upcoming-premieres", methods=["GET"])
-@cached_response(timeout=300)  # Cache na 5 minut
+@response_cache.cached(timeout=300, tags=("movies",), per_user=False)  # 5 minut
 def get_upcoming_premieres_route():
     """Pobiera nadchodzące premiery filmowe z trailerami"""
     try:
@@ -44,13 +44,24 @@ def get_all_people():
         if key in request.args:
             filters[key] = request.args.get(key)
 
-    result = people_service.get_all_people(
-        page=page,
-        per_page=per_page,
-        sort_by=sort_by,
-        sort_order=sort_order,
-        filters=filters,
-    )
+    # Paginacja kursorowa: ?after= (pusty = pierwsza strona), dalej next_cursor
+    after = request.args.get("after")
+    include_total = request.args.get("include_total", "false").lower() == "true"
+    if after is not None:
+        per_page = min(per_page or 100, 100)
+
+    try:
+        result = people_service.get_all_people(
+            page=page,
+            per_page=per_page,
+            sort_by=sort_by,
+            sort_order=sort_order,
+            filters=filters,
+            after=after,
+            include_total=include_total,
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     return jsonify(result)
 
 
@@ -196,6 +207,8 @@ def filter_people():
 
         sort_by = request.args.get("sort_by", "name")
         sort_order = request.args.get("sort_order", "asc")
+        after = request.args.get("after")
+        include_total = request.args.get("include_total", "false").lower() == "true"
 
         valid_sort_fields = ["name", "birth_date"]
         valid_sort_orders = ["asc", "desc"]
@@ -211,8 +224,12 @@ def filter_people():
             per_page=per_page,
             sort_by=sort_by,
             sort_order=sort_order,
+            after=after,
+            include_total=include_total,
         )
         return jsonify(result), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         current_app.logger.error(f"Error in filter_people route: {str(e)}")
         return (
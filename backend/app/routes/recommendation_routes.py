@@ -1,13 +1,16 @@
-from flask import Blueprint, jsonify, request, current_app
+from flask import Blueprint, jsonify, request, current_app, url_for
 from flask_jwt_extended import get_jwt_identity, jwt_required
 
 from app.services.recommendation_service import (
     get_recommendation_status,
-    generate_recommendations_for_user,
     get_user_recommendations,
     delete_user_recommendations,
     get_basic_statistics,
 )
+from app.services.recommendation_job_service import (
+    submit_recommendation_job,
+    get_recommendation_job,
+)
 
 recommendations_bp = Blueprint("recommendations", __name__)
 
@@ -69,27 +72,31 @@ def get_my_recommendations():
 @recommendations_bp.route("/", methods=["POST"])
 @jwt_required()
 def generate_recommendations():
-    """Generuje nowe rekomendacje (zastępuje stare) - długa operacja!"""
+    """
+    Zleca generowanie rekomendacji w tle (5-30 sekund) - zwraca 202 + job_id.
+    Postęp: GET /status (pole "job") lub GET /jobs/<job_id>
+    """
     try:
-        user_id = get_jwt_identity()
+        user_id = int(get_jwt_identity())
 
-        # To może potrwać 5-30 sekund!
-        result = generate_recommendations_for_user(user_id)
+        result = submit_recommendation_job(user_id)
 
-        if result["success"]:
-            return (
-                jsonify(
-                    {
-                        "message": result["message"],
-                        "recommendations": result["recommendations"],
-                        "count": len(result["recommendations"]),
-                    }
-                ),
-                200,
-            )
-        else:
+        if not result["success"]:
             return jsonify({"error": result["message"], "recommendations": []}), 400
 
+        response = jsonify(
+            {
+                "message": result["message"],
+                "job": result["job"],
+                "status_url": url_for(
+                    "recommendations.get_job",
+                    job_id=result["job"]["job_id"],
+                ),
+            }
+        )
+        response.headers["Location"] = url_for("recommendations.get_status")
+        return response, 202
+
     except Exception as e:
         current_app.logger.error(f"Error in generate_recommendations: {str(e)}")
         return (
@@ -103,6 +110,32 @@ def generate_recommendations():
         )
 
 
+@recommendations_bp.route("/jobs/<int:job_id>", methods=["GET"])
+@jwt_required()
+def get_job(job_id):
+    """Status / postęp zadania generowania rekomendacji"""
+    try:
+        user_id = int(get_jwt_identity())
+
+        job = get_recommendation_job(user_id, job_id)
+        if not job:
+            return jsonify({"error": "Nie znaleziono zadania"}), 404
+
+        return jsonify(job), 200
+
+    except Exception as e:
+        current_app.logger.error(f"Error in get_job: {str(e)}")
+        return (
+            jsonify(
+                {
+                    "error": "Wystąpił błąd podczas pobierania zadania",
+                    "details": str(e),
+                }
+            ),
+            500,
+        )
+
+
 @recommendations_bp.route("/", methods=["DELETE"])
 @jwt_required()
 def clear_recommendations():
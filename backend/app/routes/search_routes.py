@@ -0,0 +1,50 @@
+from flask import Blueprint, jsonify, request, current_app
+
+from app.services.search_service import search, PUBLIC_SEARCH_TYPES
+
+search_bp = Blueprint("search", __name__)
+
+MAX_SEARCH_LIMIT = 20
+
+
+@search_bp.route("", methods=["GET"])
+@search_bp.route("/", methods=["GET"])
+def search_all():
+    """
+    Wyszukiwanie filmów, aktorów, reżyserów i użytkowników
+
+    Query params:
+        q: tekst (polskie znaki opcjonalne, ostatnie słowo działa jako prefiks)
+        types: typy oddzielone przecinkami, domyślnie wszystkie
+        limit: maks. wyników na typ (domyślnie 5, maks. 20)
+    """
+    try:
+        query = request.args.get("q", "").strip()
+        if not query:
+            return jsonify({"error": "Parametr q jest wymagany"}), 400
+
+        types_param = request.args.get("types")
+        if types_param:
+            doc_types = [t.strip() for t in types_param.split(",") if t.strip()]
+            invalid = [t for t in doc_types if t not in PUBLIC_SEARCH_TYPES]
+            if invalid or not doc_types:
+                return (
+                    jsonify(
+                        {
+                            "error": f"Nieprawidłowe typy: {', '.join(invalid)}",
+                            "allowed_types": list(PUBLIC_SEARCH_TYPES),
+                        }
+                    ),
+                    400,
+                )
+        else:
+            doc_types = list(PUBLIC_SEARCH_TYPES)
+
+        limit = request.args.get("limit", 5, type=int)
+        limit = max(1, min(limit, MAX_SEARCH_LIMIT))
+
+        return jsonify(search(query, doc_types, limit=limit)), 200
+
+    except Exception as e:
+        current_app.logger.error(f"Error in search_all: {str(e)}")
+        return jsonify({"error": "Błąd podczas wyszukiwania"}), 500
@@ -0,0 +1,64 @@
+from flask import Blueprint, jsonify, request, current_app
+
+from app.models.stats_rollup import ROLLUP_METRICS, ROLLUP_PERIODS
+from app.services.auth_service import staff_required
+from app.services.stats_rollup_service import get_trend
+
+stats_bp = Blueprint("statistics", __name__)
+
+# Górna granica długości szeregu (10 lat miesięcy / 3 lata dni)
+MAX_TREND_PERIODS = {"month": 120, "day": 1096}
+
+
+@stats_bp.route("/trends/<metric>", methods=["GET"])
+@staff_required
+def get_metric_trend(metric):
+    """
+    Szereg czasowy zdarzeń z rollupów do wykresów admina
+
+    Query params:
+        period: month (domyślnie) albo day
+        periods: liczba ostatnich okresów (domyślnie 12 miesięcy / 30 dni)
+    """
+    try:
+        if metric not in ROLLUP_METRICS:
+            return (
+                jsonify(
+                    {
+                        "error": f"Nieznana metryka: {metric}",
+                        "allowed_metrics": list(ROLLUP_METRICS),
+                    }
+                ),
+                404,
+            )
+
+        period = request.args.get("period", "month")
+        if period not in ROLLUP_PERIODS:
+            return (
+                jsonify(
+                    {
+                        "error": f"Nieprawidłowy okres: {period}",
+                        "allowed_periods": list(ROLLUP_PERIODS),
+                    }
+                ),
+                400,
+            )
+
+        default_periods = 12 if period == "month" else 30
+        periods = request.args.get("periods", default_periods, type=int)
+        periods = max(1, min(periods, MAX_TREND_PERIODS[period]))
+
+        return (
+            jsonify(
+                {
+                    "metric": metric,
+                    "period": period,
+                    "points": get_trend(metric, period, periods),
+                }
+            ),
+            200,
+        )
+
+    except Exception as e:
+        current_app.logger.error(f"Error in get_metric_trend: {str(e)}")
+        return jsonify({"error": "Błąd podczas pobierania trendu"}), 500
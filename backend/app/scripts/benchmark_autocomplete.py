@@ -0,0 +1,166 @@
+"""
+Benchmark podpowiedzi: czas budowy indeksu autocomplete i odpowiedzi na zapytania.
+
+Buduje AutocompleteIndex (ten sam co /api/autocomplete) z syntetycznych nazw:
+aktorzy i reżyserzy jako imię + nazwisko, filmy jako 1-4 słowa tytułów,
+popularność (liczba ocen) z rozkładu Zipfa. Mierzy medianę i p99 czasu
+suggest() dla prefiksów, pełnych słów, literówek i zapytań bez polskich znaków.
+Baza danych nie jest potrzebna.
+
+Uruchomienie (z katalogu backend):
+    python -m app.scripts.benchmark_autocomplete
+    python -m app.scripts.benchmark_autocomplete --movies 200000 --people 300000
+"""
+
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+from app.utils.autocomplete import AutocompleteEntry, AutocompleteIndex
+
+FIRST_NAMES = (
+    "Adam Agnieszka Aleksander Alicja Andrzej Anna Barbara Bartosz Cate Chris "
+    "Christopher Daniel Denzel Dorota Edward Emma Ewa Frances Gary Grzegorz "
+    "Harrison Helena Hugh Jakub Jan Janusz Jennifer Joanna Jodie Julia Kate "
+    "Katarzyna Keanu Krzysztof Leonardo Łukasz Magdalena Małgorzata Marek Maria "
+    "Marta Matt Meryl Michał Natalie Paweł Piotr Quentin Robert Sandra Scarlett "
+    "Stanisław Tom Tomasz Wojciech Zbigniew Zofia Żaneta"
+).split()
+
+SURNAMES = (
+    "Kowalski Nowak Wiśniewski Wójcik Kowalczyk Kamiński Lewandowski Zieliński "
+    "Szymański Woźniak Dąbrowski Kozłowski Jankowski Mazur Kwiatkowski Krawczyk "
+    "Piotrowski Grabowski Zając Pawłowski Michalski Król Wieczorek Jabłoński "
+    "Wróbel Nowakowski Majewski Olszewski Stępień Malinowski Jaworski Adamczyk "
+    "Dudek Nowicki Pawlak Górski Witkowski Walczak Sikora Baran Rutkowski "
+    "Michalak Szewczyk Ostrowski Tomaszewski Pietrzak Marciniak Wróblewski "
+    "Zalewski Jakubowski Jasiński Zawadzki Sadowski Bąk Chmielewski Włodarczyk "
+    "Borkowski Czarnecki Sawicki Sokołowski Urbański Kubiak Maciejewski "
+    "Szczepański Kucharski Wilk Kalinowski Lis Mazurek Wysocki Adamski Kaźmierczak "
+    "Wasilewski Sobczak Czerwiński Andrzejewski Cieślak Głowacki Zakrzewski "
+    "Kołodziej Sikorski Krajewski Gajewski Szulc Szymczak Baranowski Laskowski "
+    "Brzeziński Makowski Ziółkowski Przybylski Reeves Streep Hanks Washington "
+    "Blanchett Nolan Tarantino Scorsese Kubrick Spielberg Johansson Portman "
+    "DiCaprio Damon Foster McDormand Oldman Ford Grant Lawrence Bullock Hardy"
+).split()
+
+TITLE_WORDS = (
+    "matrix miasto noc dzień ostatni pierwszy wielki mały czarny biały król "
+    "królowa wojna pokój miłość śmierć życie gwiazdy kosmos podróż powrót "
+    "ucieczka tajemnica zagadka dom ogień woda ziemia niebo piekło anioł diabeł "
+    "człowiek kobieta dziecko ojciec matka brat siostra przyjaciel wróg złodziej "
+    "detektyw żołnierz rycerz smok władca pierścieni zemsta sprawiedliwość "
+    "przebudzenie upadek imperium rewolucja legenda historia opowieść sekret "
+    "cień światło burza zima lato jesień wiosna ocean pustynia góra las rzeka "
+    "most droga pociąg statek samolot wyspa zamek więzienie szkoła szpital "
+    "incepcja interstellar gladiator avatar titanic psychoza obcy terminator "
+    "szczęki rocky predator blade runner skazani shawshank ojciec chrzestny "
+    "pulp fiction fight club forrest gump joker batman superman spiderman "
+    "avengers diuna oppenheimer parasite amelia solaris stalker ran"
+).split()
+
+QUERIES = (
+    "ma",
+    "matr",
+    "matrix",
+    "mtrix",
+    "matirx",
+    "kowal",
+    "kowlaski",
+    "lukasz",
+    "zolw",
+    "wladca pier",
+    "keanu reev",
+    "scorsese",
+    "scorcese",
+    "dabrowski",
+    "ostatni sam",
+    "interstelar",
+)
+
+
+def synthetic_entries(movies: int, people: int, rng: np.random.Generator):
+    """Wpisy wszystkich typów z popularnością z rozkładu Zipfa"""
+
+    def popularity(count):
+        return np.minimum(rng.zipf(1.6, size=count) - 1, 1_000_000)
+
+    entries = {"movie": [], "actor": [], "director": []}
+    title_lengths = rng.integers(1, 5, size=movies)
+    years = rng.integers(1920, 2026, size=movies)
+    for movie_id, (length, votes, year) in enumerate(
+        zip(title_lengths, popularity(movies), years), start=1
+    ):
+        words = rng.choice(TITLE_WORDS, size=length)
+        title = " ".join(words).capitalize()
+        if rng.random() < 0.3:
+            title += f" {rng.integers(2, 6)}"
+        entries["movie"].append(
+            AutocompleteEntry("movie", movie_id, title, int(votes), {"year": int(year)})
+        )
+
+    directors = max(people // 10, 1)
+    for doc_type, count in (("actor", people - directors), ("director", directors)):
+        first = rng.choice(FIRST_NAMES, size=count)
+        last = rng.choice(SURNAMES, size=count)
+        for person_id, (name, surname, votes) in enumerate(
+            zip(first, last, popularity(count)), start=1
+        ):
+            entries[doc_type].append(
+                AutocompleteEntry(
+                    doc_type, person_id, f"{name} {surname}", int(votes), {}
+                )
+            )
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--movies", type=int, default=100_000)
+    parser.add_argument("--people", type=int, default=150_000)
+    parser.add_argument("--limit", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    entries = synthetic_entries(args.movies, args.people, rng)
+
+    start = time.perf_counter()
+    index = AutocompleteIndex(entries)
+    for doc_type, doc_entries in entries.items():
+        index.upsert(doc_type, doc_entries)
+    print(f"🏗️  Indeks: {len(index)} wpisów w {time.perf_counter() - start:.1f}s")
+
+    print("=" * 80)
+    all_latencies = []
+    for query in QUERIES:
+        latencies = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            suggestions = index.suggest(query, entries, limit=args.limit)
+            latencies.append(time.perf_counter() - start)
+        all_latencies.extend(latencies)
+
+        latencies.sort()
+        p99 = latencies[int(len(latencies) * 0.99) - 1]
+        best = (
+            f"{suggestions[0][0].name} (d={suggestions[0][1]})" if suggestions else "-"
+        )
+        print(
+            f"🔎 '{query}': mediana {statistics.median(latencies) * 1000:.3f} ms, "
+            f"p99 {p99 * 1000:.3f} ms, {len(suggestions)} podpowiedzi, np. {best}"
+        )
+
+    all_latencies.sort()
+    print("=" * 80)
+    print(
+        f"⚡ Wszystkie zapytania: mediana {statistics.median(all_latencies) * 1000:.3f} ms, "
+        f"p99 {all_latencies[int(len(all_latencies) * 0.99) - 1] * 1000:.3f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""
+Benchmark shortlisty kandydatów (CandidateShortlist) przed K-NN i NB.
+
+Dla każdego syntetycznego użytkownika liczy K-NN, Naive Bayes i hybrydę
+na całym nieocenionym katalogu (jak przy MAX_CANDIDATES = None) oraz na
+shortliście z indeksów odwróconych i raportuje recall@K: jaka część top K
+pełnego scoringu trafia do top K liczonego tylko na shortliście, razem
+z czasem obu wariantów.
+
+Katalog jest syntetyczny: 1-3 gatunki z rozkładu Zipfa, obsada i reżyserzy
+z puli o rozkładzie potęgowym, opisy z mieszanki słownictwa gatunku głównego
+i słownictwa ogólnego. Użytkownik ma dwa ulubione gatunki - oceny pozytywne
+pochodzą głównie z nich, negatywne z pozostałych.
+
+Uruchomienie (z katalogu backend):
+    python -m app.scripts.benchmark_candidate_shortlist
+    python -m app.scripts.benchmark_candidate_shortlist --movies 50000 --size 3000
+"""
+
+import argparse
+import logging
+import time
+
+import numpy as np
+import scipy.sparse as sp
+
+from app.recommendation_algorithm.config import (
+    ADAPTIVE_BASE_ACTOR_WEIGHT,
+    ADAPTIVE_BASE_COUNTRY_WEIGHT,
+    ADAPTIVE_BASE_DIRECTOR_WEIGHT,
+    ADAPTIVE_BASE_GENRE_WEIGHT,
+    ADAPTIVE_BASE_YEAR_WEIGHT,
+    CANDIDATE_SHORTLIST_SIZE,
+    ENSEMBLE_KNN_WEIGHT,
+    ENSEMBLE_NB_WEIGHT,
+    TRAINING_NEGATIVE_LIMIT,
+    TRAINING_POSITIVE_LIMIT,
+)
+from app.recommendation_algorithm.content_based.knn_recommender import KNNRecommender
+from app.recommendation_algorithm.content_based.naive_bayes_recommender import (
+    NaiveBayesRecommender,
+)
+from app.recommendation_algorithm.utils.candidate_shortlist import CandidateShortlist
+from app.recommendation_algorithm.utils.description_index import (
+    MovieDescriptionIndex,
+)
+from app.recommendation_algorithm.utils.feature_store import MovieFeatureStore
+from app.recommendation_algorithm.utils.similarity_metrics import SimilarityMetrics
+
+GENRES = 20
+COUNTRIES = 30
+TOPIC_TERMS = 300
+GENERAL_TERMS = 20000
+TERMS_PER_DESCRIPTION = 40
+TOPIC_SHARE = 0.6
+
+ADAPTIVE_WEIGHTS = {
+    "genres": ADAPTIVE_BASE_GENRE_WEIGHT,
+    "actors": ADAPTIVE_BASE_ACTOR_WEIGHT,
+    "directors": ADAPTIVE_BASE_DIRECTOR_WEIGHT,
+    "country": ADAPTIVE_BASE_COUNTRY_WEIGHT,
+    "year": ADAPTIVE_BASE_YEAR_WEIGHT,
+}
+
+
+def zipf_choice(rng, count, size, exponent=1.0):
+    weights = 1.0 / np.arange(1, count + 1) ** exponent
+    return rng.choice(count, size=size, p=weights / weights.sum())
+
+
+def synthetic_catalogue(movies: int, rng: np.random.Generator):
+    """(MovieFeatureStore, MovieDescriptionIndex, gatunek główny filmu)"""
+    movie_ids = np.arange(1, movies + 1)
+    actors, directors = max(movies // 2, 10), max(movies // 5, 10)
+
+    names = (
+        [f"genre_g{i}" for i in range(GENRES)]
+        + [f"actor_a{i}" for i in range(actors)]
+        + [f"director_d{i}" for i in range(directors)]
+        + [f"country_c{i}" for i in range(COUNTRIES)]
+    )
+    actor_offset = GENRES
+    director_offset = actor_offset + actors
+    country_offset = director_offset + directors
+
+    main_genre = zipf_choice(rng, GENRES, movies, 0.8)
+    rows, cols = [], []
+    for row in range(movies):
+        genres = {main_genre[row], *zipf_choice(rng, GENRES, rng.integers(0, 3))}
+        columns = (
+            list(genres)
+            + (actor_offset + zipf_choice(rng, actors, 6, 1.1)).tolist()
+            + [director_offset + int(zipf_choice(rng, directors, 1, 1.1)[0])]
+            + [country_offset + int(zipf_choice(rng, COUNTRIES, 1)[0])]
+        )
+        rows.extend([row] * len(columns))
+        cols.extend(columns)
+
+    matrix = sp.csr_matrix(
+        (np.ones(len(rows)), (rows, cols)), shape=(movies, len(names))
+    )
+    matrix.sum_duplicates()
+    matrix.data[:] = 1.0
+
+    years = 2025 - np.minimum(rng.exponential(18, movies), 75).astype(int)
+    durations = rng.normal(110, 20, movies).clip(70, 200).round()
+    store = MovieFeatureStore(movie_ids, matrix, names, years, durations)
+
+    # Opisy: słownictwo gatunku głównego (TOPIC_TERMS na gatunek) + ogólne
+    topic_terms = int(TERMS_PER_DESCRIPTION * TOPIC_SHARE)
+    topic = main_genre[:, None] * TOPIC_TERMS + zipf_choice(
+        rng, TOPIC_TERMS, (movies, topic_terms)
+    )
+    general = GENRES * TOPIC_TERMS + zipf_choice(
+        rng, GENERAL_TERMS, (movies, TERMS_PER_DESCRIPTION - topic_terms)
+    )
+    terms = np.hstack([topic, general])
+    counts = sp.csr_matrix(
+        (
+            np.ones(terms.size, dtype=np.int32),
+            terms.ravel(),
+            np.arange(0, terms.size + 1, TERMS_PER_DESCRIPTION),
+        ),
+        shape=(movies, GENRES * TOPIC_TERMS + GENERAL_TERMS),
+    )
+    counts.sum_duplicates()
+    index = MovieDescriptionIndex(
+        movie_ids,
+        counts,
+        [f"w{i}" for i in range(counts.shape[1])],
+        np.ones(movies, dtype=bool),
+    )
+    return store, index, main_genre
+
+
+def synthetic_user(main_genre: np.ndarray, rng: np.random.Generator):
+    """(pozytywne, negatywne, wszystkie ocenione) movie_ids"""
+    liked = rng.choice(GENRES, size=2, replace=False)
+    in_taste = np.flatnonzero(np.isin(main_genre, liked)) + 1
+    outside = np.flatnonzero(~np.isin(main_genre, liked)) + 1
+
+    positives = rng.choice(in_taste, size=TRAINING_POSITIVE_LIMIT, replace=False)
+    negatives = rng.choice(outside, size=TRAINING_NEGATIVE_LIMIT, replace=False)
+    neutral = rng.choice(len(main_genre), size=20, replace=False) + 1
+    rated = np.union1d(np.union1d(positives, negatives), neutral)
+    return positives.tolist(), negatives.tolist(), rated.tolist()
+
+
+def score(store, index, positive_ids, negative_ids, candidate_ids):
+    """Wyniki K-NN, NB i hybrydy jak w MovieRecommender (bez MMR i selekcji)"""
+    _, positive_matrix = store.get_features(positive_ids)
+    _, negative_matrix = store.get_features(negative_ids)
+    candidate_ids, candidate_matrix = store.get_features(candidate_ids)
+    columns = store.active_columns(positive_matrix, negative_matrix, candidate_matrix)
+
+    knn = KNNRecommender().recommend_sparse(
+        positive_matrix[:, columns],
+        negative_matrix[:, columns],
+        candidate_ids,
+        candidate_matrix[:, columns],
+        [store.all_feature_names[i] for i in columns],
+        ADAPTIVE_WEIGHTS,
+        top_k=len(candidate_ids),
+    )
+    nb = NaiveBayesRecommender(model_type="multinomial").recommend_from_index(
+        index,
+        positive_ids,
+        negative_ids,
+        candidate_ids.tolist(),
+        top_k=len(candidate_ids),
+    )
+    knn, nb = dict(knn), {mid: min(1.0, s * 0.95) for mid, s in nb}
+    hybrid = SimilarityMetrics().combine_algorithm_scores(
+        knn, nb, ENSEMBLE_KNN_WEIGHT, ENSEMBLE_NB_WEIGHT
+    )
+    return {"knn": knn, "naive_bayes": nb, "hybrid": hybrid}
+
+
+def top_ids(scores, k):
+    return {mid for mid, _ in sorted(scores.items(), key=lambda x: -x[1])[:k]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--movies", type=int, default=20000)
+    parser.add_argument("--size", type=int, default=CANDIDATE_SHORTLIST_SIZE)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    rng = np.random.default_rng(args.seed)
+
+    store, index, main_genre = synthetic_catalogue(args.movies, rng)
+    start = time.perf_counter()
+    shortlist = CandidateShortlist(store, index)
+    build_time = time.perf_counter() - start
+
+    print(
+        f"🎬 {args.movies} filmów, shortlista {args.size}, {args.users} użytkowników, "
+        f"recall@{args.k}"
+    )
+    print(f"🗂️  Indeksy odwrócone: {build_time * 1000:.0f} ms (raz na wersję katalogu)")
+    print("=" * 80)
+
+    recalls = {name: [] for name in ("knn", "naive_bayes", "hybrid")}
+    full_time = short_time = select_time = 0.0
+    for _ in range(args.users):
+        positive_ids, negative_ids, rated_ids = synthetic_user(main_genre, rng)
+        unrated = np.setdiff1d(store.movie_ids, rated_ids).tolist()
+
+        start = time.perf_counter()
+        full = score(store, index, positive_ids, negative_ids, unrated)
+        full_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        candidate_ids = shortlist.select(
+            positive_ids, rated_ids, ADAPTIVE_WEIGHTS, args.size
+        )
+        select_time += time.perf_counter() - start
+        if candidate_ids is None:
+            candidate_ids = unrated
+        short = score(store, index, positive_ids, negative_ids, candidate_ids)
+        short_time += time.perf_counter() - start
+
+        for name, values in recalls.items():
+            expected = top_ids(full[name], args.k)
+            values.append(len(expected & top_ids(short[name], args.k)) / args.k)
+
+    for name, values in recalls.items():
+        print(
+            f"🎯 {name:12s} recall@{args.k}: średnio {np.mean(values):.3f}, "
+            f"min {np.min(values):.3f}"
+        )
+    print(f"🐢 Cały katalog: {full_time / args.users * 1000:.0f} ms / użytkownika")
+    print(
+        f"✅ Shortlista: {short_time / args.users * 1000:.0f} ms / użytkownika "
+        f"(w tym wybór {select_time / args.users * 1000:.1f} ms, "
+        f"~{full_time / max(short_time, 1e-9):.1f}x)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Benchmark dywersyfikacji MMR (SimilarityMetrics.rank_recommendations).
+
+Porównuje poprzednią pętlę (wyszukiwanie filmu w DataFrame per id, iterrows()
+po całych metadanych i Jaccard z list Pythona względem wszystkich wybranych
+filmów dla każdego kandydata w każdej iteracji) z wersją na spakowanej
+macierzy bitów gatunków i wektorze max podobieństwa aktualizowanym raz
+na wybór.
+
+Kandydaci mają 1-4 gatunki z rozkładu Zipfa i losowe wyniki trafności.
+Stara pętla jest wolna, dlatego domyślnie uruchamiana na pierwszych
+--legacy-candidates kandydatach; na tym samym zbiorze obie wersje muszą
+zwrócić identyczny ranking.
+
+Uruchomienie (z katalogu backend):
+    python -m app.scripts.benchmark_mmr
+    python -m app.scripts.benchmark_mmr --candidates 50000 --top-k 50
+"""
+
+import argparse
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.recommendation_algorithm.config import (
+    MMR_DIVERSITY_FACTOR,
+    MMR_UNIQUE_THRESHOLD,
+)
+from app.recommendation_algorithm.utils.similarity_metrics import SimilarityMetrics
+
+GENRES = (
+    "Dramat Komedia Thriller Akcja Romans Horror Sci-Fi Kryminał Przygodowy "
+    "Animacja Familijny Fantasy Dokumentalny Wojenny Biograficzny Historyczny "
+    "Muzyczny Western Sportowy Psychologiczny Obyczajowy Sensacyjny Musical"
+).split()
+
+
+def synthetic_candidates(count: int, rng: np.random.Generator):
+    """(scores, movies_metadata) dla count kandydatów"""
+    weights = 1.0 / np.arange(1, len(GENRES) + 1)
+    weights /= weights.sum()
+
+    genres = [
+        sorted(set(rng.choice(GENRES, size=rng.integers(1, 5), p=weights).tolist()))
+        for _ in range(count)
+    ]
+    movie_ids = rng.permutation(count * 3)[:count] + 1
+    scores = dict(zip(movie_ids.tolist(), rng.random(count).round(6).tolist()))
+    metadata = pd.DataFrame({"movie_id": movie_ids, "genres": genres})
+    return scores, metadata
+
+
+def legacy_mmr(metrics, scores, movies_metadata, diversity_factor, top_k):
+    """Kopia poprzedniej implementacji rank_recommendations (bez logów)"""
+    ranked_base = sorted(scores.items(), key=lambda x: x[1], reverse=True)
+
+    genres_in_top = []
+    for mid, _ in ranked_base[: min(top_k, len(ranked_base))]:
+        movie_info = movies_metadata[movies_metadata["movie_id"] == mid]
+        if not movie_info.empty:
+            genres = movie_info.iloc[0].get("genres", [])
+            if isinstance(genres, list):
+                genres_in_top.extend(genres)
+    if genres_in_top and len(set(genres_in_top)) / len(genres_in_top) < (
+        MMR_UNIQUE_THRESHOLD
+    ):
+        return ranked_base[:top_k]
+
+    features_dict = {}
+    for _, row in movies_metadata.iterrows():
+        features_dict[row["movie_id"]] = row.get("genres", [])
+
+    remaining = dict(ranked_base)
+    best_item = max(remaining.items(), key=lambda x: x[1])
+    final_ranking = [best_item]
+    selected_ids = {best_item[0]}
+    del remaining[best_item[0]]
+
+    while remaining and len(final_ranking) < top_k:
+        best_score = -np.inf
+        best_item = None
+        for mid, relevance in remaining.items():
+            max_sim = 0.0
+            for sel_mid in selected_ids:
+                if mid in features_dict and sel_mid in features_dict:
+                    sim = metrics.jaccard_similarity_score(
+                        features_dict[mid], features_dict[sel_mid]
+                    )
+                    max_sim = max(max_sim, sim)
+            mmr_score = relevance - diversity_factor * max_sim
+            if mmr_score > best_score:
+                best_score = mmr_score
+                best_item = (mid, relevance)
+
+        final_ranking.append((best_item[0], best_score))
+        selected_ids.add(best_item[0])
+        del remaining[best_item[0]]
+
+    return [(mid, max(0.0, score)) for mid, score in final_ranking]
+
+
+def timed(function, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--candidates", type=int, default=20000)
+    parser.add_argument("--legacy-candidates", type=int, default=2000)
+    parser.add_argument("--top-k", type=int, default=20)
+    parser.add_argument("--diversity", type=float, default=MMR_DIVERSITY_FACTOR)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    rng = np.random.default_rng(args.seed)
+    metrics = SimilarityMetrics()
+
+    scores, metadata = synthetic_candidates(args.candidates, rng)
+    print(
+        f"🎬 {args.candidates} kandydatów, top {args.top_k}, "
+        f"λ={args.diversity}, stara pętla na {args.legacy_candidates}"
+    )
+    print("=" * 80)
+
+    ranked, new_time = timed(
+        lambda: metrics.rank_recommendations(
+            scores, metadata, args.diversity, args.top_k
+        ),
+        args.repeat,
+    )
+    print(f"✅ Wektorowo ({args.candidates}): {new_time * 1000:.2f} ms")
+
+    legacy_scores = dict(list(scores.items())[: args.legacy_candidates])
+    legacy_metadata = metadata.iloc[: args.legacy_candidates]
+    new_small, new_small_time = timed(
+        lambda: metrics.rank_recommendations(
+            legacy_scores, legacy_metadata, args.diversity, args.top_k
+        ),
+        args.repeat,
+    )
+    legacy_small, legacy_time = timed(
+        lambda: legacy_mmr(
+            metrics, legacy_scores, legacy_metadata, args.diversity, args.top_k
+        ),
+        1,
+    )
+    print(
+        f"🐢 Stara pętla ({args.legacy_candidates}): {legacy_time * 1000:.1f} ms "
+        f"vs wektorowo {new_small_time * 1000:.2f} ms "
+        f"(~{legacy_time / max(new_small_time, 1e-9):.0f}x)"
+    )
+    print(f"🔍 Ranking identyczny: {'tak' if new_small == legacy_small else 'NIE'}")
+    print(f"🏆 Top 5: {ranked[:5]}")
+
+
+if __name__ == "__main__":
+    main()
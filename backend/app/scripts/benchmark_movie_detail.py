@@ -0,0 +1,115 @@
+"""
+Budżet zapytań SQL widoku filmu: GET /api/movies/<id>.
+
+Liczy zapytania (zdarzenie before_cursor_execute silnika) i czas odpowiedzi
+dla filmów z bazy aplikacji (DATABASE_URL) - z rolami obsady i bez, anonimowo
+i z tokenem użytkownika, który ocenił film. Kończy się kodem 1, gdy któreś
+żądanie przekroczy MOVIE_DETAIL_QUERY_BUDGET, więc nadaje się do CI.
+
+Uruchomienie (z katalogu backend):
+    python -m app.scripts.benchmark_movie_detail
+    python -m app.scripts.benchmark_movie_detail --movies 50 --repeat 5
+"""
+
+import argparse
+import logging
+import statistics
+import sys
+import time
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event, func
+
+from app import create_app
+from app.models.movie_actor import MovieActor
+from app.models.rating import Rating
+from app.repositories.movie_repository import MOVIE_DETAIL_QUERY_BUDGET
+from app.services.database import db
+
+
+def sample_movies(limit):
+    """Filmy z największą obsadą + oceniający je użytkownik (None, gdy brak ocen)"""
+    cast_size = func.count(MovieActor.actor_id)
+    movie_ids = [
+        movie_id
+        for movie_id, _ in db.session.query(MovieActor.movie_id, cast_size)
+        .group_by(MovieActor.movie_id)
+        .order_by(cast_size.desc(), MovieActor.movie_id)
+        .limit(limit)
+    ]
+    raters = dict(
+        db.session.query(Rating.movie_id, func.min(Rating.user_id))
+        .filter(Rating.movie_id.in_(movie_ids))
+        .group_by(Rating.movie_id)
+    )
+    return [(movie_id, raters.get(movie_id)) for movie_id in movie_ids]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--movies", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    app = create_app()
+    logging.disable(logging.INFO)
+    client = app.test_client()
+
+    statements = []
+    with app.app_context():
+        event.listen(
+            db.engine,
+            "before_cursor_execute",
+            lambda *_: statements.append(1),
+        )
+        movies = sample_movies(args.movies)
+        tokens = {
+            user_id: create_access_token(identity=str(user_id))
+            for _, user_id in movies
+            if user_id
+        }
+
+    if not movies:
+        print("❌ Brak filmów z obsadą w bazie")
+        sys.exit(1)
+
+    print(f"🎬 {len(movies)} filmów, budżet: {MOVIE_DETAIL_QUERY_BUDGET} zapytania")
+    print("=" * 80)
+    over_budget = []
+    for query_string in ("", "?include_roles=true"):
+        for authenticated in (False, True):
+            counts, latencies = [], []
+            for movie_id, user_id in movies:
+                headers = {}
+                if authenticated and user_id:
+                    headers["Authorization"] = f"Bearer {tokens[user_id]}"
+                url = f"/api/movies/{movie_id}{query_string}"
+                for _ in range(args.repeat):
+                    statements.clear()
+                    start = time.perf_counter()
+                    response = client.get(url, headers=headers)
+                    latencies.append(time.perf_counter() - start)
+                    counts.append(len(statements))
+                    if response.status_code != 200:
+                        print(f"❌ {url}: HTTP {response.status_code}")
+                        sys.exit(1)
+                    if len(statements) > MOVIE_DETAIL_QUERY_BUDGET:
+                        over_budget.append((url, authenticated, len(statements)))
+
+            variant = "z rolami" if query_string else "bez ról"
+            user = "zalogowany" if authenticated else "anonimowy"
+            print(
+                f"📊 {variant}, {user}: maks. {max(counts)} zapytań, "
+                f"mediana {statistics.median(latencies) * 1000:.1f} ms"
+            )
+
+    print("=" * 80)
+    if over_budget:
+        for url, authenticated, count in over_budget[:10]:
+            print(f"❌ {url} (zalogowany={authenticated}): {count} zapytań")
+        sys.exit(1)
+    print("✅ Wszystkie żądania w budżecie zapytań")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Benchmark scoringu NaiveBayesRecommender (multinomial i bernoulli).
+
+Porównuje poprzednią pętlę z predict_with_movie_ids (toarray() per kandydat
++ math.log per słowo słownika i klasę) z wektorowym scoringiem
+(_positive_probabilities: jeden iloczyn macierzy rzadkiej + logsumexp).
+
+Oba warianty dostają tę samą syntetyczną macierz TF-IDF, więc mierzony jest
+sam scoring, bez wektoryzacji tekstu. Stara pętla jest bardzo wolna, dlatego
+domyślnie uruchamiana na pierwszych --legacy-candidates kandydatach
+i ekstrapolowana liniowo na cały zbiór.
+
+Uruchomienie (z katalogu backend):
+    python -m app.scripts.benchmark_naive_bayes
+    python -m app.scripts.benchmark_naive_bayes --features 5000 --candidates 20000
+"""
+
+import argparse
+import logging
+import math
+import time
+
+import numpy as np
+import scipy.sparse as sp
+
+from app.recommendation_algorithm.content_based.naive_bayes_recommender import (
+    NaiveBayesRecommender,
+)
+
+
+def synthetic_tfidf(
+    rows: int, features: int, terms_per_doc: int, rng: np.random.Generator
+) -> sp.csr_matrix:
+    """Macierz TF-IDF (l2) o rozkładzie Zipfa słów, jak dla opisów filmów"""
+    word_weights = 1.0 / np.arange(1, features + 1) ** 0.9
+    word_weights /= word_weights.sum()
+
+    indices = rng.choice(features, size=(rows, terms_per_doc), p=word_weights)
+    matrix = sp.csr_matrix(
+        (
+            rng.random(rows * terms_per_doc) + 0.1,
+            indices.ravel(),
+            np.arange(0, rows * terms_per_doc + 1, terms_per_doc),
+        ),
+        shape=(rows, features),
+    )
+    matrix.sum_duplicates()
+
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1))).ravel()
+    return sp.csr_matrix(sp.diags(1.0 / norms) @ matrix)
+
+
+def legacy_predict(model: NaiveBayesRecommender, candidate_tfidf) -> np.ndarray:
+    """Kopia poprzedniej pętli z predict_with_movie_ids"""
+    if model.model_type == "bernoulli":
+        candidate_tfidf = (candidate_tfidf > 0).astype(int)
+
+    predictions = []
+    for i in range(candidate_tfidf.shape[0]):
+        doc_vector = candidate_tfidf[i].toarray().flatten()
+
+        class_log_probs = {}
+        for class_label in model.class_labels:
+            log_prob = math.log(model.class_priors[class_label])
+
+            for j, tf_idf_weight in enumerate(doc_vector):
+                p_w_c = model.feature_likelihoods[class_label][j]
+
+                if model.model_type == "multinomial":
+                    if tf_idf_weight > 0:
+                        log_prob += tf_idf_weight * math.log(p_w_c)
+                else:
+                    if tf_idf_weight > 0:
+                        log_prob += math.log(p_w_c)
+                    else:
+                        log_prob += math.log(1 - p_w_c)
+
+            class_log_probs[class_label] = log_prob
+
+        max_log = max(class_log_probs.values())
+        exp_probs = {k: math.exp(v - max_log) for k, v in class_log_probs.items()}
+        total = sum(exp_probs.values())
+        predictions.append(exp_probs["positive"] / total)
+
+    return np.array(predictions)
+
+
+def fitted_model(
+    model_type: str, X_train: sp.csr_matrix, y: np.ndarray
+) -> NaiveBayesRecommender:
+    model = NaiveBayesRecommender(model_type=model_type)
+    model.vocabulary_size = X_train.shape[1]
+
+    if model_type == "multinomial":
+        model._train_multinomial_nb(X_train, y)
+    else:
+        model._train_bernoulli_nb(X_train, y)
+
+    model._precompute_log_parameters()
+    model.is_fitted = True
+    return model
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--features", type=int, default=5000)
+    parser.add_argument("--candidates", type=int, default=20000)
+    parser.add_argument("--legacy-candidates", type=int, default=200)
+    parser.add_argument("--training-docs", type=int, default=60)
+    parser.add_argument("--terms-per-doc", type=int, default=60)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    rng = np.random.default_rng(args.seed)
+
+    X_train = synthetic_tfidf(
+        args.training_docs, args.features, args.terms_per_doc, rng
+    )
+    y = np.array(
+        ["positive"] * (args.training_docs // 2)
+        + ["negative"] * (args.training_docs - args.training_docs // 2)
+    )
+    candidates = synthetic_tfidf(
+        args.candidates, args.features, args.terms_per_doc, rng
+    )
+    legacy_slice = candidates[: args.legacy_candidates]
+
+    print(
+        f"🎬 {args.features} cech x {args.candidates} kandydatów "
+        f"(nnz={candidates.nnz}), stara pętla na {legacy_slice.shape[0]} kandydatach"
+    )
+
+    for model_type in ("multinomial", "bernoulli"):
+        model = fitted_model(model_type, X_train, y)
+        print("=" * 80)
+
+        start = time.perf_counter()
+        probabilities = model._positive_probabilities(candidates)
+        new_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        legacy = legacy_predict(model, legacy_slice)
+        legacy_time = time.perf_counter() - start
+        legacy_full = legacy_time * candidates.shape[0] / legacy_slice.shape[0]
+
+        max_diff = np.max(np.abs(legacy - probabilities[: legacy_slice.shape[0]]))
+
+        print(f"✅ {model_type} wektorowo: {new_time:.3f}s")
+        print(
+            f"🐢 {model_type} pętla: {legacy_time:.2f}s na {legacy_slice.shape[0]} "
+            f"(~{legacy_full:.0f}s na {candidates.shape[0]})"
+        )
+        print(f"⚡ Przyspieszenie: ~{legacy_full / max(new_time, 1e-9):.0f}x")
+        print(f"🔍 Maks. różnica P(positive): {max_diff:.2e}")
+
+
+if __name__ == "__main__":
+    main()
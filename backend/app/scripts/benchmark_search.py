@@ -0,0 +1,219 @@
+"""
+Benchmark wyszukiwania komentarzy: ILIKE '%fraza%' kontra indeks search_terms.
+
+Buduje syntetyczną tabelę komentarzy (domyślnie 1M, słownictwo o rozkładzie
+Zipfa) w osobnej bazie SQLite, indeksuje ją tą samą ścieżką co aplikacja
+(SearchTextAnalyzer + SearchRepository.replace_documents) i porównuje czas
+zapytań: pełny skan z LIKE na lower(tekst) oraz SearchRepository.matching_ids /
+search. Liczby trafień obu metod różnią się tam, gdzie indeks dopasowuje
+odmiany słowa ("aktorzy" ~ "aktorów") albo pisownię bez polskich znaków.
+
+Uruchomienie (z katalogu backend):
+    python -m app.scripts.benchmark_search
+    python -m app.scripts.benchmark_search --comments 100000 --db /tmp/search.db
+"""
+
+import argparse
+import logging
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+
+import numpy as np
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+
+from app import create_app
+from app.models.search_term import SearchTerm
+from app.repositories.search_repository import SearchRepository
+from app.utils.search_text import get_search_analyzer
+
+VOCABULARY = (
+    "film filmu filmie filmy filmów kino aktor aktora aktorzy aktorów aktorka "
+    "aktorki reżyser reżysera reżyserii scenariusz scenariusza fabuła fabuły "
+    "muzyka muzyki zdjęcia zdjęć efekty efektów specjalne klimat klimatu "
+    "napięcie napięcia zakończenie zakończenia początek postać postaci bohater "
+    "bohatera bohaterowie dialogi dialogów humor humoru akcja akcji scena sceny "
+    "scen świetny świetna świetne słaby słaba słabe nudny nudna nudne piękny "
+    "piękna piękne genialny genialna znakomity znakomicie polecam polecam "
+    "rozczarowanie rozczarowaniem arcydzieło arcydzieła miłość miłości wojna "
+    "wojny historia historii przyjaźń przyjaźni rodzina rodziny zemsta zemsty "
+    "kosmos kosmosie przyszłość przeszłość potwór potwora detektyw detektywa "
+    "morderstwo zagadka zagadki dramat dramatu komedia komedii horror horroru "
+    "thriller animacja animacji seans seansie widz widza widzów emocje emocji "
+    "kreacja kreacji rola roli obsada obsady montaż montażu tempo tempa "
+    "oglądałem oglądałam obejrzałem obejrzałam zobaczyłem warto trzeba"
+).split()
+
+QUERIES = (
+    "aktor",
+    "świetny film",
+    "swietny film",
+    "zakończenie",
+    "rozczarowanie muzyka",
+    "arcydzieło kina",
+    "detekt",
+)
+
+
+SYLLABLES = "ba ko mi ra te lu no wy sza cze prze dzi sta gro pa le ki my".split()
+
+
+def synthetic_vocabulary(size: int, rng: np.random.Generator):
+    """
+    Słowa filmowe rozrzucone między sztuczne słowa z sylab, tak żeby
+    częstość słów z zapytań była różna (rozkład Zipfa po całym słowniku)
+    """
+    filler = set()
+    while len(filler) < size - len(VOCABULARY):
+        length = rng.integers(2, 5)
+        filler.add("".join(rng.choice(SYLLABLES, size=length)))
+
+    vocabulary = sorted(filler)
+    positions = rng.choice(size, size=len(VOCABULARY), replace=False)
+    for word, position in zip(VOCABULARY, sorted(positions)):
+        vocabulary.insert(position, word)
+    return vocabulary
+
+
+def synthetic_comments(
+    count: int, vocabulary_size: int, rng: np.random.Generator, words_per_comment=14
+):
+    """Komentarze z losowych słów (Zipf) - różna długość, jak prawdziwe recenzje"""
+    vocabulary = synthetic_vocabulary(vocabulary_size, rng)
+    weights = 1.0 / np.arange(1, len(vocabulary) + 1) ** 1.05
+    weights /= weights.sum()
+    lengths = rng.integers(3, words_per_comment * 2, size=count)
+    words = rng.choice(len(vocabulary), size=int(lengths.sum()), p=weights)
+
+    position = 0
+    for comment_id, length in enumerate(lengths, start=1):
+        chunk = words[position : position + length]
+        position += length
+        yield comment_id, " ".join(vocabulary[i] for i in chunk).capitalize() + "."
+
+
+def build_database(
+    path: str, count: int, vocabulary_size: int, batch_size: int, seed: int
+):
+    engine = create_engine(f"sqlite:///{path}")
+    SearchTerm.__table__.create(engine)
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            "CREATE TABLE comments (comment_id INTEGER PRIMARY KEY, comment_text TEXT)"
+        )
+
+    analyzer = get_search_analyzer()
+    rng = np.random.default_rng(seed)
+    insert_time = index_time = 0.0
+
+    with Session(engine) as session:
+        repo = SearchRepository(session)
+        batch = []
+        for row in synthetic_comments(count, vocabulary_size, rng):
+            batch.append(row)
+            if len(batch) < batch_size and row[0] < count:
+                continue
+
+            start = time.perf_counter()
+            session.connection().exec_driver_sql(
+                "INSERT INTO comments VALUES (?, ?)", batch
+            )
+            insert_time += time.perf_counter() - start
+
+            start = time.perf_counter()
+            repo.replace_documents(
+                "comment",
+                {doc_id: analyzer.document_terms(text) for doc_id, text in batch},
+                commit=False,
+            )
+            session.commit()
+            index_time += time.perf_counter() - start
+            batch = []
+
+        terms = session.scalar(select(func.count()).select_from(SearchTerm))
+
+    print(
+        f"📥 Komentarze: {insert_time:.1f}s, indeks ({terms} termów): {index_time:.1f}s"
+    )
+    return engine
+
+
+def timed(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return result, statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--comments", type=int, default=1_000_000)
+    parser.add_argument("--vocabulary", type=int, default=20_000)
+    parser.add_argument("--batch-size", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--db", help="Plik bazy (domyślnie tymczasowy, usuwany po benchmarku)"
+    )
+    args = parser.parse_args()
+
+    # Tylko rejestracja wszystkich modeli (relacje mapperów) - baza aplikacji
+    # nie jest używana, benchmark ma własny plik SQLite
+    create_app()
+    logging.disable(logging.INFO)
+    path = args.db or os.path.join(tempfile.mkdtemp(), "benchmark_search.db")
+    if os.path.exists(path):
+        os.remove(path)
+
+    print(f"🎬 {args.comments} syntetycznych komentarzy -> {path}")
+    engine = build_database(
+        path, args.comments, args.vocabulary, args.batch_size, args.seed
+    )
+
+    # Pełny skan przez sqlite3 - LIKE na lower() jak ILIKE w PostgreSQL
+    raw = sqlite3.connect(path)
+    raw.create_function("lower", 1, lambda text: text.lower() if text else text)
+
+    with Session(engine) as session:
+        repo = SearchRepository(session)
+        print("=" * 80)
+        for query in QUERIES:
+            like_count, like_time = timed(
+                lambda: raw.execute(
+                    "SELECT COUNT(*) FROM comments WHERE lower(comment_text) LIKE ?",
+                    (f"%{query.lower()}%",),
+                ).fetchone()[0],
+                args.repeat,
+            )
+            index_count, index_time = timed(
+                lambda: session.scalar(
+                    select(func.count()).select_from(
+                        repo.matching_ids("comment", query).subquery()
+                    )
+                ),
+                args.repeat,
+            )
+            _, ranked_time = timed(
+                lambda: repo.search(query, ["comment"], limit_per_type=20),
+                args.repeat,
+            )
+
+            print(f"🔎 '{query}'")
+            print(f"   ILIKE:  {like_time * 1000:8.1f} ms  ({like_count} trafień)")
+            print(f"   indeks: {index_time * 1000:8.1f} ms  ({index_count} trafień)")
+            print(f"   top 20 z rankingiem: {ranked_time * 1000:8.1f} ms")
+            print(f"   ⚡ ~{like_time / max(index_time, 1e-9):.1f}x")
+
+    raw.close()
+    engine.dispose()
+    if not args.db:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
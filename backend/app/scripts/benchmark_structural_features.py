@@ -0,0 +1,227 @@
+"""
+Benchmark kodowania cech strukturalnych (one-hot) dla KNN.
+
+Porównuje poprzednią implementację prepare_structural_features (jedna kolumna
+pandas na gatunek/aktora/reżysera/kraj przez .apply) z
+DataPreprocessor.encode_structural_features (jeden przebieg, scipy CSR)
+na syntetycznym katalogu.
+
+Stara implementacja buduje gęste kolumny float64 (filmy x TOP_ENTITIES), więc
+przy 50k filmów potrzebuje kilku GB RAM - dlatego domyślnie jest uruchamiana
+na pierwszych --legacy-movies filmach, a nowa na całym katalogu.
+
+Uruchomienie (z katalogu backend):
+    python -m app.scripts.benchmark_structural_features
+    python -m app.scripts.benchmark_structural_features --movies 50000 --legacy-movies 50000
+"""
+
+import argparse
+import logging
+import random
+import time
+from collections import Counter
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from app.recommendation_algorithm.config import TOP_ENTITIES
+from app.recommendation_algorithm.utils.data_preprocessor import DataPreprocessor
+
+
+def build_synthetic_catalogue(
+    movies: int,
+    genres: int = 20,
+    actors: int = 40000,
+    directors: int = 8000,
+    countries: int = 60,
+    seed: int = 42,
+) -> pd.DataFrame:
+    """Katalog w formacie get_candidate_movies (listy genres/actors/directors)"""
+    rnd = random.Random(seed)
+    genre_names = [f"Gatunek {i}" for i in range(genres)]
+    country_names = [f"Kraj {i}" for i in range(countries)] + ["Unknown"]
+
+    # Rozkład Zipfa - kilku aktorów gra w wielu filmach, większość w kilku
+    actor_weights = [1.0 / (i + 1) ** 0.8 for i in range(actors)]
+    actor_names = [f"Aktor {i}" for i in range(actors)]
+
+    rows = []
+    for movie_id in range(1, movies + 1):
+        rows.append(
+            {
+                "movie_id": movie_id,
+                "title": f"Film {movie_id}",
+                "release_date": date(rnd.randint(1920, 2025), 1, 1),
+                "duration_minutes": rnd.choice([None, 85, 95, 110, 125, 140, 180]),
+                "country": rnd.choice(country_names),
+                "genres": rnd.sample(genre_names, rnd.randint(1, 3)),
+                "actors": list(
+                    set(rnd.choices(actor_names, weights=actor_weights, k=8))
+                ),
+                "directors": [f"Reżyser {rnd.randrange(directors)}"],
+            }
+        )
+    return pd.DataFrame(rows)
+
+
+def legacy_prepare_structural_features(movies_df: pd.DataFrame) -> pd.DataFrame:
+    """Kopia poprzedniej implementacji (kolumna po kolumnie przez .apply)"""
+    if movies_df.empty:
+        return pd.DataFrame()
+
+    features_df = movies_df[["movie_id"]].copy()
+
+    all_genres = set()
+    for genres_list in movies_df["genres"]:
+        if isinstance(genres_list, list):
+            all_genres.update(genres_list)
+
+    genre_cols = {}
+    for genre in sorted(all_genres):
+        genre_cols[f"genre_{genre}"] = movies_df["genres"].apply(
+            lambda x: 1.0 if isinstance(x, list) and genre in x else 0.0
+        )
+    if genre_cols:
+        features_df = pd.concat(
+            [features_df, pd.DataFrame(genre_cols, index=features_df.index)], axis=1
+        )
+
+    all_actors = []
+    for actors_list in movies_df["actors"]:
+        if isinstance(actors_list, list):
+            all_actors.extend(actors_list)
+    top_actors = [actor for actor, _ in Counter(all_actors).most_common(TOP_ENTITIES)]
+
+    actor_cols = {}
+    for actor in sorted(top_actors):
+        actor_cols[f"actor_{actor}"] = movies_df["actors"].apply(
+            lambda x: 1.0 if isinstance(x, list) and actor in x else 0.0
+        )
+    if actor_cols:
+        features_df = pd.concat(
+            [features_df, pd.DataFrame(actor_cols, index=features_df.index)], axis=1
+        )
+
+    all_directors = []
+    for directors_list in movies_df["directors"]:
+        if isinstance(directors_list, list):
+            all_directors.extend(directors_list)
+    top_directors = [
+        director for director, _ in Counter(all_directors).most_common(TOP_ENTITIES)
+    ]
+
+    director_cols = {}
+    for director in sorted(top_directors):
+        director_cols[f"director_{director}"] = movies_df["directors"].apply(
+            lambda x: 1.0 if isinstance(x, list) and director in x else 0.0
+        )
+    if director_cols:
+        features_df = pd.concat(
+            [features_df, pd.DataFrame(director_cols, index=features_df.index)],
+            axis=1,
+        )
+
+    all_countries = movies_df["country"].dropna().unique().tolist()
+    all_countries = [c for c in all_countries if c != "Unknown"]
+    top_countries = Counter(all_countries).most_common(TOP_ENTITIES)
+
+    country_cols = {}
+    for country, _ in top_countries:
+        country_cols[f"country_{country}"] = movies_df["country"].apply(
+            lambda x: 1.0 if x == country else 0.0
+        )
+    if country_cols:
+        features_df = pd.concat(
+            [features_df, pd.DataFrame(country_cols, index=features_df.index)],
+            axis=1,
+        )
+
+    if "release_date" in movies_df.columns:
+        movies_df_copy = movies_df.copy()
+        movies_df_copy["release_year"] = pd.to_datetime(
+            movies_df_copy["release_date"], errors="coerce"
+        ).dt.year
+        year_series = movies_df_copy["release_year"].fillna(0)
+        if year_series.nunique() > 1:
+            year_min, year_max = year_series.min(), year_series.max()
+            features_df["release_year_normalized"] = (year_series - year_min) / (
+                year_max - year_min + 1e-9
+            )
+        else:
+            features_df["release_year_normalized"] = 0.0
+
+    if "duration_minutes" in movies_df.columns:
+        duration_series = pd.to_numeric(
+            movies_df["duration_minutes"], errors="coerce"
+        ).fillna(0)
+        if duration_series.nunique() > 1:
+            duration_min, duration_max = (
+                duration_series.min(),
+                duration_series.max(),
+            )
+            features_df["duration_normalized"] = (duration_series - duration_min) / (
+                duration_max - duration_min + 1e-9
+            )
+        else:
+            features_df["duration_normalized"] = 0.0
+
+    return features_df.fillna(0.0)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--movies", type=int, default=50000)
+    parser.add_argument("--legacy-movies", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    preprocessor = DataPreprocessor(db_session=None)
+
+    print(
+        f"🎬 Generowanie katalogu: {args.movies} filmów (TOP_ENTITIES={TOP_ENTITIES})"
+    )
+    catalogue = build_synthetic_catalogue(args.movies, seed=args.seed)
+    legacy_slice = catalogue.head(args.legacy_movies)
+
+    print("=" * 80)
+    (ids, matrix, names), new_full = timed(
+        preprocessor.encode_structural_features, catalogue
+    )
+    density = matrix.nnz / max(1, matrix.shape[0] * matrix.shape[1])
+    print(
+        f"✅ encode_structural_features ({len(catalogue)} filmów): {new_full:.2f}s, "
+        f"{matrix.shape[1]} cech, nnz={matrix.nnz} ({density:.4%}), "
+        f"{(matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes) / 2**20:.1f} MB"
+    )
+
+    (_, slice_matrix, slice_names), new_slice = timed(
+        preprocessor.encode_structural_features, legacy_slice
+    )
+    print(
+        f"✅ encode_structural_features ({len(legacy_slice)} filmów): {new_slice:.2f}s"
+    )
+
+    legacy_df, legacy_time = timed(legacy_prepare_structural_features, legacy_slice)
+    print(
+        f"🐢 legacy prepare_structural_features ({len(legacy_slice)} filmów): "
+        f"{legacy_time:.2f}s, {legacy_df.memory_usage(deep=False).sum() / 2**20:.1f} MB"
+    )
+    print(f"⚡ Przyspieszenie: {legacy_time / max(new_slice, 1e-9):.1f}x")
+
+    legacy_values = legacy_df.drop(columns="movie_id")
+    identical = list(legacy_values.columns) == slice_names and np.array_equal(
+        legacy_values.to_numpy(), slice_matrix.toarray()
+    )
+    print(f"🔍 Wyniki identyczne: {identical}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Benchmark preprocessingu opisów w TFIDFProcessor (tokeny/s).
+
+Porównuje poprzednią wersję preprocess_text (trzy przebiegi re.sub +
+liniowy skan ~40 sufiksów dla każdego słowa) z obecną (jeden skompilowany
+regex tokenizera, SuffixTrie i pamięć LRU stemów) na wszystkich opisach
+filmów z bazy - z tym samym fallbackiem co indeks opisów ("Film: <tytuł>").
+
+Uruchomienie (z katalogu backend):
+    python -m app.scripts.benchmark_tfidf_preprocessing
+    python -m app.scripts.benchmark_tfidf_preprocessing --repeat 3
+"""
+
+import argparse
+import logging
+import re
+import time
+
+from app import create_app
+from app.extensions import db
+from app.models.movie import Movie
+from app.recommendation_algorithm.content_based.tfidf_processor import (
+    POLISH_SUFFIXES,
+    TFIDFProcessor,
+)
+from app.recommendation_algorithm.utils.description_index import (
+    MovieDescriptionIndex,
+)
+
+
+def legacy_polish_stemming(word: str) -> str:
+    """Kopia poprzedniego _simple_polish_stemming (liniowy skan listy)"""
+    polish_suffixes = list(POLISH_SUFFIXES)
+
+    for suffix in polish_suffixes:
+        if word.endswith(suffix) and len(word) > len(suffix) + 2:
+            return word[: -len(suffix)]
+
+    return word
+
+
+def legacy_preprocess_text(text: str) -> str:
+    """Kopia poprzedniego preprocess_text (custom stemmer dla polskiego)"""
+    if not isinstance(text, str) or not text.strip():
+        return ""
+
+    text = text.lower()
+    text = re.sub(r"[^\w\sąćęłńóśźżĄĆĘŁŃÓŚŹŻ]", " ", text, flags=re.UNICODE)
+    text = re.sub(r"\d+", " ", text)
+    text = re.sub(r"\s+", " ", text).strip()
+
+    stemmed_words = []
+    for word in text.split():
+        if len(word) <= 2:
+            continue
+        stemmed_words.append(legacy_polish_stemming(word))
+
+    return " ".join(stemmed_words)
+
+
+def load_descriptions() -> list:
+    movies = db.session.query(Movie.movie_id, Movie.description, Movie.title).all()
+    return [MovieDescriptionIndex._description(movie) for movie in movies]
+
+
+def timed(preprocess, descriptions: list, repeat: int):
+    outputs = None
+    start = time.perf_counter()
+    for _ in range(repeat):
+        outputs = [preprocess(text) for text in descriptions]
+    return outputs, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        descriptions = load_descriptions()
+
+    logging.disable(logging.INFO)
+
+    if not descriptions:
+        print("❌ Brak filmów w bazie")
+        return
+
+    # Tokeny liczone jak w starej wersji: słowa po czyszczeniu, przed stemmingiem
+    tokens = sum(len(legacy_preprocess_text(text).split()) for text in descriptions)
+    tokens *= args.repeat
+    print(
+        f"🎬 {len(descriptions)} opisów, {tokens // args.repeat} tokenów "
+        f"(x{args.repeat} powtórzeń)"
+    )
+    print("=" * 80)
+
+    legacy, legacy_time = timed(legacy_preprocess_text, descriptions, args.repeat)
+
+    processor = TFIDFProcessor(language="polish", use_snowball=False)
+    current, current_time = timed(processor.preprocess_text, descriptions, args.repeat)
+    cache = processor._stem_token.cache_info()
+
+    mismatches = sum(a != b for a, b in zip(legacy, current))
+
+    print(
+        f"🐢 Stara wersja: {legacy_time:.2f}s ({tokens / max(legacy_time, 1e-9):,.0f} tokenów/s)"
+    )
+    print(
+        f"✅ Nowa wersja: {current_time:.2f}s ({tokens / max(current_time, 1e-9):,.0f} tokenów/s)"
+    )
+    print(f"⚡ Przyspieszenie: {legacy_time / max(current_time, 1e-9):.1f}x")
+    print(
+        f"🧠 Pamięć stemów: {cache.currsize} słów, "
+        f"trafienia {cache.hits / max(cache.hits + cache.misses, 1):.1%}"
+    )
+    print(f"🔍 Różne wyniki: {mismatches}/{len(descriptions)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,9 @@ from app.repositories.MovieRelationsRepository import MovieRelationsRepository
 from app.services.database import db
 from sqlalchemy.exc import SQLAlchemyError
 from flask import current_app
+from app.recommendation_algorithm.utils.feature_store import refresh_movie_features
+from app.services.similar_movies_service import schedule_similar_movies_refresh
+from app.services.movie_service import invalidate_movie_caches
 
 
 class MovieRelationsService:
@@ -10,54 +13,78 @@ class MovieRelationsService:
 
     def add_actor_to_movie(self, movie_id, actor_id, role=None):
         try:
-            return self.movie_relations_repository.add_actor_to_movie(
+            result = self.movie_relations_repository.add_actor_to_movie(
                 movie_id, actor_id, role
             )
+            refresh_movie_features(db.session, [movie_id])
+            schedule_similar_movies_refresh([movie_id])
+            invalidate_movie_caches()
+            return result
         except SQLAlchemyError as e:
             current_app.logger.error(f"Error adding actor to movie: {str(e)}")
             raise Exception("Failed to add actor to movie")
 
     def remove_actor_from_movie(self, movie_id, actor_id):
         try:
-            return self.movie_relations_repository.remove_actor_from_movie(
+            result = self.movie_relations_repository.remove_actor_from_movie(
                 movie_id, actor_id
             )
+            refresh_movie_features(db.session, [movie_id])
+            schedule_similar_movies_refresh([movie_id])
+            invalidate_movie_caches()
+            return result
         except SQLAlchemyError as e:
             current_app.logger.error(f"Error removing actor from movie: {str(e)}")
             raise Exception("Failed to remove actor from movie")
 
     def add_director_to_movie(self, movie_id, director_id):
         try:
-            return self.movie_relations_repository.add_director_to_movie(
+            result = self.movie_relations_repository.add_director_to_movie(
                 movie_id, director_id
             )
+            refresh_movie_features(db.session, [movie_id])
+            schedule_similar_movies_refresh([movie_id])
+            invalidate_movie_caches()
+            return result
         except SQLAlchemyError as e:
             current_app.logger.error(f"Error adding director to movie: {str(e)}")
             raise Exception("Failed to add director to movie")
 
     def remove_director_from_movie(self, movie_id, director_id):
         try:
-            return self.movie_relations_repository.remove_director_from_movie(
+            result = self.movie_relations_repository.remove_director_from_movie(
                 movie_id, director_id
             )
+            refresh_movie_features(db.session, [movie_id])
+            schedule_similar_movies_refresh([movie_id])
+            invalidate_movie_caches()
+            return result
         except SQLAlchemyError as e:
             current_app.logger.error(f"Error removing director from movie: {str(e)}")
             raise Exception("Failed to remove director from movie")
 
     def add_genre_to_movie(self, movie_id, genre_id):
         try:
-            return self.movie_relations_repository.add_genre_to_movie(
+            result = self.movie_relations_repository.add_genre_to_movie(
                 movie_id, genre_id
             )
+            refresh_movie_features(db.session, [movie_id])
+            schedule_similar_movies_refresh([movie_id])
+            invalidate_movie_caches()
+            return result
         except SQLAlchemyError as e:
             current_app.logger.error(f"Error adding genre to movie: {str(e)}")
             raise Exception("Failed to add genre to movie")
 
     def remove_genre_from_movie(self, movie_id, genre_id):
         try:
-            return self.movie_relations_repository.remove_genre_from_movie(
+            result = self.movie_relations_repository.remove_genre_from_movie(
                 movie_id, genre_id
             )
+            refresh_movie_features(db.session, [movie_id])
+            schedule_similar_movies_refresh([movie_id])
+            invalidate_movie_caches()
+            return result
         except SQLAlchemyError as e:
             current_app.logger.error(f"Error removing genre from movie: {str(e)}")
             raise Exception("Failed to remove genre from movie")
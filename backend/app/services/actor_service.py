@@ -1,13 +1,18 @@
 from app.repositories.actor_repository import ActorRepository
+from app.repositories.movie_repository import MovieRepository
 from app.services.database import db
 from sqlalchemy.exc import SQLAlchemyError
 from flask import current_app
+from app.recommendation_algorithm.utils.feature_store import refresh_movie_features
+from app.services.search_service import refresh_search_documents
+from app.services.autocomplete_service import refresh_autocomplete_entries
 import os
 
 
 class ActorService:
     def __init__(self):
         self.actor_repository = ActorRepository(db.session)
+        self.movie_repository = MovieRepository(db.session)
 
     def get_all_actors(self, page=1, per_page=10):
         result = self.actor_repository.get_all(page, per_page)
@@ -111,6 +116,8 @@ class ActorService:
             current_app.logger.info(f"📋 Dane aktora do zapisu: {actor_data}")
 
             new_actor = self.actor_repository.add(actor_data)
+            refresh_search_documents("actor", [new_actor.actor_id])
+            refresh_autocomplete_entries("actor", [new_actor.actor_id])
 
             # DEBUG: Wyloguj zapisanego aktora
             current_app.logger.info(
@@ -215,6 +222,8 @@ class ActorService:
                 f"📋 Dane do aktualizacji w repository: {actor_data}"
             )
 
+            renamed = "name" in actor_data and actor_data["name"] != actor.actor_name
+
             updated_actor = self.actor_repository.update(actor_id, actor_data)
 
             if updated_actor:
@@ -222,6 +231,14 @@ class ActorService:
                     f"✅ Zaktualizowano aktora: {updated_actor.actor_name}, photo_url: {updated_actor.photo_url}"
                 )
 
+            if updated_actor and renamed:
+                # Nazwa jest częścią kolumny cech (actor_<nazwa>) w feature store
+                refresh_movie_features(
+                    db.session, [movie.movie_id for movie in updated_actor.movies]
+                )
+                refresh_search_documents("actor", [actor_id])
+                refresh_autocomplete_entries("actor", [actor_id])
+
             return updated_actor
 
         except ValueError as e:
@@ -253,7 +270,11 @@ class ActorService:
                 if os.path.exists(photo_path):
                     os.remove(photo_path)
 
-            return self.actor_repository.delete(actor_id)
+            deleted = self.actor_repository.delete(actor_id)
+            if deleted:
+                refresh_search_documents("actor", [actor_id])
+                refresh_autocomplete_entries("actor", [actor_id])
+            return deleted
         except ValueError as e:
             # Przekazujemy błędy walidacji dalej
             raise e
@@ -277,7 +298,7 @@ class ActorService:
         if not result:
             return None
 
-        movies = result["movies"]
+        movies = self.movie_repository.load_credits(result["movies"])
         pagination = result["pagination"]
 
         serialized_movies = [
@@ -0,0 +1,258 @@
+from app.services.database import db
+from app.models.movie import Movie
+from app.models.actor import Actor
+from app.models.director import Director
+from app.models.movie_actor import MovieActor
+from app.models.movie_director import MovieDirector
+from app.utils.autocomplete import AutocompleteEntry, AutocompleteIndex, TOP_K
+from sqlalchemy import func, select
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+AUTOCOMPLETE_DOC_TYPES = ("movie", "actor", "director")
+
+_index = None
+_built_at = 0.0
+_building = False
+_warmup_started = False
+# Zmiany z czasu przebudowy - nakładane na nowy indeks po podmianie
+_pending = []
+_state_lock = threading.Lock()
+_build_lock = threading.RLock()
+_refresh_seconds = int(os.environ.get("AUTOCOMPLETE_REFRESH_SECONDS", 600))
+
+
+def init_autocomplete(app):
+    """
+    Konfiguracja bez efektów ubocznych: indeks zaczyna się budować w tle
+    dopiero przy pierwszym żądaniu HTTP obsłużonym przez proces, więc
+    komendy CLI, skrypty i procesy batch rekomendacji go nie budują
+    (AUTOCOMPLETE_WARMUP=0 wyłącza - wtedy powstaje przy pierwszym
+    zapytaniu o podpowiedzi)
+    """
+    global _refresh_seconds
+    _refresh_seconds = int(
+        app.config.get("AUTOCOMPLETE_REFRESH_SECONDS", _refresh_seconds)
+    )
+    warmup = app.config.get(
+        "AUTOCOMPLETE_WARMUP", os.environ.get("AUTOCOMPLETE_WARMUP", "1")
+    )
+    if str(warmup).lower() in ("0", "false", "no"):
+        return
+
+    app.before_request(_warm_up_on_first_request)
+
+
+def _warm_up_on_first_request():
+    global _building, _warmup_started
+    if _warmup_started:
+        return
+    with _state_lock:
+        if _warmup_started:
+            return
+        _warmup_started = True
+        if _index is not None or _building:
+            return
+        _building = True
+
+    from flask import current_app
+
+    threading.Thread(
+        target=_rebuild_in_background,
+        args=(current_app._get_current_object(),),
+        name="autocomplete-warmup",
+        daemon=True,
+    ).start()
+
+
+def _entry_queries():
+    """Zapytania (doc_type -> select id, nazwa, popularność, rok) dla wszystkich typów"""
+    actor_popularity = (
+        select(
+            Actor.actor_id,
+            Actor.actor_name,
+            func.coalesce(func.sum(Movie.rating_count), 0),
+        )
+        .select_from(Actor)
+        .outerjoin(MovieActor, MovieActor.actor_id == Actor.actor_id)
+        .outerjoin(Movie, Movie.movie_id == MovieActor.movie_id)
+        .group_by(Actor.actor_id, Actor.actor_name)
+    )
+    director_popularity = (
+        select(
+            Director.director_id,
+            Director.director_name,
+            func.coalesce(func.sum(Movie.rating_count), 0),
+        )
+        .select_from(Director)
+        .outerjoin(MovieDirector, MovieDirector.director_id == Director.director_id)
+        .outerjoin(Movie, Movie.movie_id == MovieDirector.movie_id)
+        .group_by(Director.director_id, Director.director_name)
+    )
+    return {
+        "movie": (
+            Movie.movie_id,
+            select(Movie.movie_id, Movie.title, Movie.rating_count, Movie.release_date),
+        ),
+        "actor": (Actor.actor_id, actor_popularity),
+        "director": (Director.director_id, director_popularity),
+    }
+
+
+def _load_entries(doc_type, doc_ids=None):
+    id_column, query = _entry_queries()[doc_type]
+    if doc_ids is not None:
+        query = query.where(id_column.in_(doc_ids))
+
+    entries = []
+    for row in db.session.execute(query):
+        extra = {}
+        if doc_type == "movie":
+            extra["year"] = row[3].year if row[3] else None
+        entries.append(
+            AutocompleteEntry(doc_type, row[0], row[1], int(row[2] or 0), extra)
+        )
+    return entries
+
+
+def _build_index():
+    start = time.perf_counter()
+    index = AutocompleteIndex(AUTOCOMPLETE_DOC_TYPES)
+    for doc_type in AUTOCOMPLETE_DOC_TYPES:
+        index.upsert(doc_type, _load_entries(doc_type))
+    logger.info(
+        f"Autocomplete index built: {len(index)} entries "
+        f"in {(time.perf_counter() - start) * 1000:.0f} ms"
+    )
+    return index
+
+
+def rebuild_autocomplete_index():
+    """Buduje indeks od zera i podmienia go; zmiany z czasu budowy są nakładane"""
+    global _index, _built_at, _building
+    with _build_lock:
+        with _state_lock:
+            # _pending nie jest czyszczone - wątek z _get_index ustawia
+            # _building wcześniej i zmiany mogą już czekać
+            _building = True
+        try:
+            index = _build_index()
+            while True:
+                with _state_lock:
+                    pending = list(_pending)
+                    _pending.clear()
+                    if not pending:
+                        # Podmiana w tej samej sekcji - żadna zmiana nie przepadnie
+                        _index = index
+                        _built_at = time.monotonic()
+                        return index
+                for doc_type, doc_ids in pending:
+                    _apply_refresh(index, doc_type, doc_ids)
+        finally:
+            with _state_lock:
+                _building = False
+
+
+def _rebuild_in_background(app):
+    with app.app_context():
+        try:
+            rebuild_autocomplete_index()
+        except Exception as e:
+            logger.error(f"Autocomplete index build failed: {str(e)}")
+        finally:
+            db.session.remove()
+
+
+def _get_index():
+    """Bieżący indeks; przy pierwszym użyciu budowany od razu, przeterminowany - w tle"""
+    global _building
+    with _state_lock:
+        index, built_at, building = _index, _built_at, _building
+
+    if index is None:
+        with _build_lock:
+            if _index is None:
+                return rebuild_autocomplete_index()
+            return _index
+
+    if (
+        _refresh_seconds > 0
+        and not building
+        and time.monotonic() - built_at > _refresh_seconds
+    ):
+        from flask import current_app
+
+        with _state_lock:
+            # Jeden wątek przebudowy naraz
+            if _building:
+                return index
+            _building = True
+        threading.Thread(
+            target=_rebuild_in_background,
+            args=(current_app._get_current_object(),),
+            name="autocomplete-refresh",
+            daemon=True,
+        ).start()
+
+    return index
+
+
+def _apply_refresh(index, doc_type, doc_ids):
+    entries = _load_entries(doc_type, doc_ids)
+    found = {entry.doc_id for entry in entries}
+    index.upsert(
+        doc_type, entries, deleted=[doc_id for doc_id in doc_ids if doc_id not in found]
+    )
+
+
+def refresh_autocomplete_entries(doc_type, doc_ids):
+    """
+    Aktualizuje wpisy po dodaniu / zmianie nazwy / usunięciu. Błędy są tylko
+    logowane - następna przebudowa (AUTOCOMPLETE_REFRESH_SECONDS) je naprawi.
+    """
+    doc_ids = [doc_id for doc_id in doc_ids if doc_id is not None]
+    if not doc_ids:
+        return
+
+    try:
+        with _state_lock:
+            index = _index
+            if _building:
+                _pending.append((doc_type, doc_ids))
+        if index is not None:
+            _apply_refresh(index, doc_type, doc_ids)
+
+    except Exception as e:
+        logger.error(f"Autocomplete refresh failed for {doc_type} {doc_ids}: {str(e)}")
+
+
+def autocomplete(query, doc_types=AUTOCOMPLETE_DOC_TYPES, limit=8):
+    """
+    Podpowiedzi dla wpisywanego tekstu z pamięci procesu (bez zapytań do bazy)
+
+    Returns:
+        Lista słowników od najlepszego: type, id, name, popularity, distance
+        (liczba poprawionych literówek) i pola dodatkowe (year dla filmów)
+    """
+    try:
+        limit = max(1, min(limit, TOP_K))
+        suggestions = _get_index().suggest(query, doc_types, limit=limit)
+        return [
+            {
+                "type": entry.doc_type,
+                "id": entry.doc_id,
+                "name": entry.name,
+                "popularity": entry.popularity,
+                "distance": distance,
+                **entry.extra,
+            }
+            for entry, distance in suggestions
+        ]
+
+    except Exception as e:
+        logger.error(f"Error in autocomplete: {str(e)}")
+        raise Exception(f"Błąd podczas pobierania podpowiedzi: {str(e)}")
@@ -5,6 +5,7 @@ from flask import current_app
 from app.models.movie import Movie
 from app.models.user import User
 from app.models.comment import Comment
+from app.services.search_service import refresh_search_documents
 
 
 class CommentService:
@@ -34,6 +35,7 @@ class CommentService:
             current_app.logger.info(
                 f"Dodano komentarz do filmu {movie_id} przez użytkownika {user_id}"
             )
+            refresh_search_documents("comment", [comment.comment_id])
             return comment.serialize(include_user=True)
         except ValueError as e:
             current_app.logger.error(f"ValueError adding comment: {str(e)}")
@@ -71,6 +73,7 @@ class CommentService:
             current_app.logger.info(
                 f"Zaktualizowano komentarz {comment_id} przez użytkownika {user_id}"
             )
+            refresh_search_documents("comment", [comment_id])
             return comment.serialize(include_user=True)
         except ValueError as e:
             current_app.logger.error(f"ValueError updating comment: {str(e)}")
@@ -95,6 +98,7 @@ class CommentService:
                 current_app.logger.info(
                     f"Usunięto komentarz {comment_id} przez użytkownika {user_id}"
                 )
+                refresh_search_documents("comment", [comment_id])
             else:
                 current_app.logger.info(
                     f"Komentarz {comment_id} nie istnieje lub nie należy do użytkownika {user_id}"
@@ -139,6 +143,8 @@ class CommentService:
         sort_by="created_at",
         sort_order="desc",
         include_ratings=True,
+        after=None,
+        include_total=False,
     ):
         try:
             movie = db.session.get(Movie, movie_id)
@@ -159,7 +165,14 @@ class CommentService:
                 sort_order = "desc"
 
             result = self.comment_repository.get_movie_comments(
-                movie_id, page, per_page, sort_by, sort_order, include_ratings
+                movie_id,
+                page,
+                per_page,
+                sort_by,
+                sort_order,
+                include_ratings,
+                after=after,
+                include_total=include_total,
             )
             current_app.logger.info(
                 f"Pobrano komentarze dla filmu {movie_id}, strona {page}, {len(result['comments'])} komentarzy"
@@ -179,7 +192,15 @@ class CommentService:
             )
             raise Exception(f"Wystąpił nieoczekiwany błąd: {str(e)}")
 
-    def get_user_comments(self, user_id, page=1, per_page=10, include_ratings=True):
+    def get_user_comments(
+        self,
+        user_id,
+        page=1,
+        per_page=10,
+        include_ratings=True,
+        after=None,
+        include_total=False,
+    ):
         try:
             user = db.session.get(User, user_id)
             if not user:
@@ -193,7 +214,12 @@ class CommentService:
                 per_page = 50
 
             result = self.comment_repository.get_user_comments(
-                user_id, page, per_page, include_ratings
+                user_id,
+                page,
+                per_page,
+                include_ratings,
+                after=after,
+                include_total=include_total,
             )
             current_app.logger.info(
                 f"Pobrano komentarze użytkownika {user_id}, strona {page}, {len(result['comments'])} komentarzy"
@@ -339,6 +365,8 @@ class CommentService:
         date_to=None,
         sort_by="created_at",
         sort_order="desc",
+        after=None,
+        include_total=False,
     ):
         """Pobiera wszystkie komentarze dla staff z filtrowaniem i sortowaniem"""
         try:
@@ -385,10 +413,12 @@ class CommentService:
                 date_to=date_to,
                 sort_by=sort_by,
                 sort_order=sort_order,
+                after=after,
+                include_total=include_total,
             )
 
             current_app.logger.info(
-                f"Staff pobrał wszystkie komentarze: strona {page}, {len(result['comments'])} z {result['pagination']['total']} komentarzy"
+                f"Staff pobrał wszystkie komentarze: strona {page}, {len(result['comments'])} z {result['pagination'].get('total')} komentarzy"
             )
             return result
 
@@ -440,6 +470,7 @@ class CommentService:
             current_app.logger.info(
                 f"Staff {staff_user_id} ({staff_user.username}) zaktualizował komentarz {comment_id}"
             )
+            refresh_search_documents("comment", [comment_id])
             return comment.serialize(include_user=True, include_movie=True)
 
         except ValueError as e:
@@ -480,6 +511,7 @@ class CommentService:
                 current_app.logger.info(
                     f"Staff {staff_user_id} ({staff_user.username}) usunął komentarz {comment_id}"
                 )
+                refresh_search_documents("comment", [comment_id])
             else:
                 current_app.logger.info(f"Komentarz {comment_id} nie istnieje")
 
@@ -2,6 +2,9 @@ from app.repositories.director_repository import DirectorRepository
 from app.services.database import db
 from sqlalchemy.exc import SQLAlchemyError
 from flask import current_app
+from app.recommendation_algorithm.utils.feature_store import refresh_movie_features
+from app.services.search_service import refresh_search_documents
+from app.services.autocomplete_service import refresh_autocomplete_entries
 import os
 
 
@@ -114,6 +117,8 @@ class DirectorService:
             current_app.logger.info(f"📋 Dane reżysera do zapisu: {director_data}")
 
             new_director = self.director_repository.add(director_data)
+            refresh_search_documents("director", [new_director.director_id])
+            refresh_autocomplete_entries("director", [new_director.director_id])
 
             # DEBUG: Wyloguj zapisanego reżysera
             current_app.logger.info(
@@ -229,6 +234,11 @@ class DirectorService:
                 f"📋 Dane do aktualizacji reżysera w repository: {director_data}"
             )
 
+            renamed = (
+                "name" in director_data
+                and director_data["name"] != director.director_name
+            )
+
             updated_director = self.director_repository.update(
                 director_id, director_data
             )
@@ -238,6 +248,14 @@ class DirectorService:
                     f"✅ Zaktualizowano reżysera: {updated_director.director_name}, photo_url: {updated_director.photo_url}"
                 )
 
+            if updated_director and renamed:
+                # Nazwa jest częścią kolumny cech (director_<nazwa>) w feature store
+                refresh_movie_features(
+                    db.session, [movie.movie_id for movie in updated_director.movies]
+                )
+                refresh_search_documents("director", [director_id])
+                refresh_autocomplete_entries("director", [director_id])
+
             return updated_director
 
         except ValueError as e:
@@ -269,7 +287,11 @@ class DirectorService:
                 if os.path.exists(photo_path):
                     os.remove(photo_path)
 
-            return self.director_repository.delete(director_id)
+            deleted = self.director_repository.delete(director_id)
+            if deleted:
+                refresh_search_documents("director", [director_id])
+                refresh_autocomplete_entries("director", [director_id])
+            return deleted
 
         except ValueError as e:
             # Przekazujemy błędy walidacji dalej
@@ -1,6 +1,9 @@
 from app.repositories.genre_repository import GenreRepository
 from app.services.database import db
 from app.models.genre import Genre
+from app.recommendation_algorithm.utils.feature_store import refresh_movie_features
+from app.services.similar_movies_service import schedule_similar_movies_refresh
+from app.services.movie_service import invalidate_movie_caches
 
 genre_repo = GenreRepository(db.session)
 
@@ -31,6 +34,7 @@ def create_genre(data):
 
         new_genre = Genre(genre_name=genre_name)
         genre_repo.add(new_genre)
+        invalidate_movie_caches()
         return new_genre.serialize()
     except Exception as e:
         raise Exception(f"Błąd podczas tworzenia gatunku: {str(e)}")
@@ -38,7 +42,15 @@ def create_genre(data):
 
 def delete_genre(genre_id):
     try:
+        genre = genre_repo.get_by_id(genre_id)
+        movie_ids = [movie.movie_id for movie in genre.movies] if genre else []
+
         success = genre_repo.delete(genre_id)
+        if success and movie_ids:
+            refresh_movie_features(db.session, movie_ids)
+            schedule_similar_movies_refresh(movie_ids)
+        if success:
+            invalidate_movie_caches()
         return success
     except Exception as e:
         raise Exception(f"Błąd podczas usuwania gatunku o ID {genre_id}: {str(e)}")
@@ -53,6 +65,11 @@ def update_genre(genre_id, data):
         updated_genre = genre_repo.update(genre_id, genre_name)
         if not updated_genre:
             return None
+
+        refresh_movie_features(
+            db.session, [movie.movie_id for movie in updated_genre.movies]
+        )
+        invalidate_movie_caches()
         return updated_genre.serialize()
     except Exception as e:
         raise Exception(f"Błąd podczas aktualizacji gatunku o ID {genre_id}: {str(e)}")
@@ -2,6 +2,7 @@ from flask import request
 from datetime import datetime
 from app.models.login_activity import LoginActivity
 from app.services.database import db
+from app.repositories.stats_rollup_repository import StatsRollupRepository
 
 
 def log_login_activity(user_id, status="Success", additional_info=None):
@@ -28,6 +29,10 @@ def log_login_activity(user_id, status="Success", additional_info=None):
         )
 
         db.session.add(login_activity)
+        if not status.startswith("Failed"):
+            StatsRollupRepository(db.session).increment(
+                "logins", login_activity.login_timestamp
+            )
         db.session.commit()
 
         print(
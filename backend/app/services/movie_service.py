@@ -1,8 +1,24 @@
 from app.repositories.movie_repository import MovieRepository
 from app.services.database import db
 from app.models.movie import Movie
+from app.recommendation_algorithm.utils.feature_store import refresh_movie_features
+from app.recommendation_algorithm.utils.description_index import (
+    refresh_movie_descriptions,
+)
+from app.recommendation_algorithm.utils.similar_movies import (
+    get_similar_movies_index,
+)
+from app.services.similar_movies_service import (
+    process_pending_similar_movies,
+    schedule_similar_movies_refresh,
+)
+from app.extensions import response_cache
+from app.services.search_service import refresh_search_documents
+from app.services.autocomplete_service import refresh_autocomplete_entries
+from app.services.stats_snapshot_service import get_stats_snapshot
+from flask import current_app
 from sqlalchemy import desc
-from functools import lru_cache
+from sqlalchemy.orm import Session
 import logging
 from datetime import date
 from datetime import datetime
@@ -11,9 +27,9 @@ logger = logging.getLogger(__name__)
 movie_repo = MovieRepository(db.session)
 
 
-@lru_cache(maxsize=1)
-def get_filter_options_cached():
-    return movie_repo.get_filter_options()
+def invalidate_movie_caches():
+    """Unieważnia cache list / opcji filtrów po zmianie danych filmów"""
+    response_cache.invalidate_tags("movies")
 
 
 def get_all_movies(serialize_basic=False, user_id=None):
@@ -51,6 +67,45 @@ def get_all_movies(serialize_basic=False, user_id=None):
         raise Exception(f"Błąd podczas pobierania filmów: {str(e)}")
 
 
+def stream_all_movies(serialize_basic=False, user_id=None, batch_size=500):
+    """
+    Wszystkie filmy jako NDJSON (jeden obiekt JSON w linii) - generator
+    porcji tekstu, po jednej na partię z bazy. Pola jak w get_all_movies.
+
+    Własna sesja: Flask kończy kontekst żądania (teardown zamyka db.session)
+    zanim serwer przeczyta dalsze porcje odpowiedzi.
+    """
+    try:
+        with Session(db.engine) as session:
+            yield from _ndjson_batches(
+                MovieRepository(session), serialize_basic, user_id, batch_size
+            )
+    except Exception as e:
+        # Nagłówki 200 są już wysłane - przerwany strumień to jedyny sygnał błędu
+        logger.error(f"Error in stream_all_movies: {str(e)}")
+        raise Exception(f"Błąd podczas eksportu filmów: {str(e)}")
+
+
+def _ndjson_batches(repo, serialize_basic, user_id, batch_size):
+    batches = repo.iter_all(
+        user_id=None if serialize_basic else user_id,
+        include_genres=not serialize_basic,
+        batch_size=batch_size,
+    )
+    for movies in batches:
+        if serialize_basic:
+            items = [movie.serialize_basic() for movie in movies]
+        else:
+            items = [
+                {
+                    **movie.serialize(include_genres=True),
+                    "user_rating": getattr(movie, "_user_rating", None),
+                }
+                for movie in movies
+            ]
+        yield "".join(f"{current_app.json.dumps(item)}\n" for item in items)
+
+
 def get_movies_paginated(page=1, per_page=10, genre_id=None, user_id=None):
     """✅ POPRAWIONE - pobiera WSZYSTKIE filmy z paginacją"""
     try:
@@ -73,7 +128,7 @@ def get_movies_paginated(page=1, per_page=10, genre_id=None, user_id=None):
 def get_movie_by_id(movie_id, include_actors_roles=False, user_id=None):
     """Pobiera pojedynczy film - bez względu na datę premiery"""
     try:
-        movie = movie_repo.get_by_id(movie_id, user_id)
+        movie = movie_repo.get_detail(movie_id, user_id)
         if not movie:
             return None
 
@@ -91,6 +146,41 @@ def get_movie_by_id(movie_id, include_actors_roles=False, user_id=None):
         raise Exception(f"Błąd podczas pobierania filmu o ID {movie_id}: {str(e)}")
 
 
+def get_similar_movies(movie_id, limit=10, user_id=None):
+    """
+    Filmy podobne z prekomputowanego indeksu (SimilarMoviesIndex) - bez
+    liczenia podobieństw w czasie żądania
+
+    Returns:
+        None gdy filmu nie ma w indeksie, inaczej lista filmów z polem similarity
+    """
+    try:
+        # Nieznany film - 404 bez budowania indeksu
+        if not movie_repo.exists(movie_id):
+            return None
+
+        process_pending_similar_movies()
+        neighbors = get_similar_movies_index(db.session).get_similar(movie_id, limit)
+        if neighbors is None:
+            return None
+
+        scores = dict(neighbors)
+        movies = movie_repo.get_by_ids(list(scores), user_id)
+        return [
+            {
+                **movie.serialize(include_genres=True),
+                "user_rating": getattr(movie, "_user_rating", None),
+                "similarity": round(scores[movie.movie_id], 4),
+            }
+            for movie in movies
+        ]
+    except Exception as e:
+        logger.error(f"Error in get_similar_movies: {str(e)}")
+        raise Exception(
+            f"Błąd podczas pobierania filmów podobnych do filmu o ID {movie_id}: {str(e)}"
+        )
+
+
 def get_top_rated_movies(limit=10, user_id=None):
     """✅ POPRAWIONE - najlepiej oceniane WSZYSTKIE filmy"""
     try:
@@ -98,7 +188,7 @@ def get_top_rated_movies(limit=10, user_id=None):
 
         for movie in movies:
             logger.debug(
-                f"Movie: {movie.title}, Rating count: {movie._rating_count}, Avg rating: {movie._average_rating}"
+                f"Movie: {movie.title}, Rating count: {movie.rating_count}, Avg rating: {movie.average_rating}"
             )
 
         return [
@@ -127,6 +217,12 @@ def create_movie(data):
             trailer_url=data.get("trailer_url", ""),
         )
         movie_repo.add(new_movie)
+        refresh_movie_features(db.session, [new_movie.movie_id])
+        refresh_movie_descriptions(db.session, [new_movie.movie_id])
+        schedule_similar_movies_refresh([new_movie.movie_id])
+        refresh_search_documents("movie", [new_movie.movie_id])
+        refresh_autocomplete_entries("movie", [new_movie.movie_id])
+        invalidate_movie_caches()
         return new_movie.serialize()
     except Exception as e:
         logger.error(f"Error in create_movie: {str(e)}")
@@ -137,6 +233,13 @@ def delete_movie(movie_id):
     """Usuwa film - bez względu na datę premiery"""
     try:
         success = movie_repo.delete(movie_id)
+        if success:
+            refresh_movie_features(db.session, [movie_id])
+            refresh_movie_descriptions(db.session, [movie_id])
+            schedule_similar_movies_refresh([movie_id])
+            refresh_search_documents("movie", [movie_id])
+            refresh_autocomplete_entries("movie", [movie_id])
+            invalidate_movie_caches()
         return success
     except Exception as e:
         logger.error(f"Error in delete_movie: {str(e)}")
@@ -151,6 +254,8 @@ def filter_movies(
     sort_by="title",
     sort_order="asc",
     user_id=None,
+    after=None,
+    include_total=False,
 ):
     """✅ POPRAWIONE - filtruje WSZYSTKIE filmy bez ograniczenia dat"""
     try:
@@ -161,6 +266,8 @@ def filter_movies(
             sort_by=sort_by,
             sort_order=sort_order,
             user_id=user_id,
+            after=after,
+            include_total=include_total,
         )
 
         serialized_movies = [
@@ -172,6 +279,8 @@ def filter_movies(
         ]
 
         return {"movies": serialized_movies, "pagination": result["pagination"]}
+    except ValueError:
+        raise
     except Exception as e:
         logger.error(f"Error in filter_movies: {str(e)}")
         raise Exception(f"Błąd podczas filtrowania filmów: {str(e)}")
@@ -180,7 +289,7 @@ def filter_movies(
 def get_movie_filter_options():
     """✅ POPRAWIONE - opcje filtrów dla WSZYSTKICH filmów"""
     try:
-        return get_filter_options_cached()
+        return movie_repo.get_filter_options()
     except Exception as e:
         logger.error(f"Error in get_movie_filter_options: {str(e)}")
         raise Exception(f"Błąd podczas pobierania opcji filtrów: {str(e)}")
@@ -235,6 +344,12 @@ def update_movie(movie_id, data):
         if not updated_movie:
             return None
 
+        refresh_movie_features(db.session, [movie_id])
+        refresh_movie_descriptions(db.session, [movie_id])
+        schedule_similar_movies_refresh([movie_id])
+        refresh_search_documents("movie", [movie_id])
+        refresh_autocomplete_entries("movie", [movie_id])
+        invalidate_movie_caches()
         return updated_movie.serialize(
             include_genres=True, include_actors=True, include_directors=True
         )
@@ -250,6 +365,7 @@ def update_movie_poster(movie_id, poster_url):
         if not updated_movie:
             return None
 
+        invalidate_movie_caches()
         return updated_movie.serialize(
             include_genres=True, include_actors=True, include_directors=True
         )
@@ -261,18 +377,20 @@ def update_movie_poster(movie_id, poster_url):
 
 
 def get_basic_statistics():
-    """✅ POPRAWIONE - statystyki WSZYSTKICH filmów"""
+    """✅ POPRAWIONE - statystyki WSZYSTKICH filmów (ze snapshotu statystyk)"""
     try:
-        stats = movie_repo.get_basic_statistics()
+        stats = get_stats_snapshot("movies_dashboard")["statistics"]
         return stats
     except Exception as e:
         raise Exception(f"Nie udało się pobrać statystyk: {str(e)}")
 
 
 def get_dashboard_data():
-    """✅ POPRAWIONE - dashboard WSZYSTKICH filmów"""
+    """✅ POPRAWIONE - dashboard WSZYSTKICH filmów (agregaty ze snapshotu)"""
     try:
-        dashboard_data = movie_repo.get_dashboard_data()
+        dashboard_data = movie_repo.get_dashboard_data(
+            get_stats_snapshot("movies_dashboard")
+        )
         return dashboard_data
     except Exception as e:
         raise Exception(f"Nie udało się pobrać danych dashboard: {str(e)}")
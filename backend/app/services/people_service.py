@@ -1,4 +1,5 @@
 from app.repositories.people_repository import PeopleRepository
+from app.repositories.movie_repository import MovieRepository
 from app.services.database import db
 from sqlalchemy.exc import SQLAlchemyError
 from flask import current_app
@@ -8,9 +9,17 @@ import os
 class PeopleService:
     def __init__(self):
         self.people_repository = PeopleRepository(db.session)
+        self.movie_repository = MovieRepository(db.session)
 
     def get_all_people(
-        self, page=1, per_page=10, sort_by="name", sort_order="asc", filters=None
+        self,
+        page=1,
+        per_page=10,
+        sort_by="name",
+        sort_order="asc",
+        filters=None,
+        after=None,
+        include_total=False,
     ):
         try:
             result = self.people_repository.get_all(
@@ -19,6 +28,8 @@ class PeopleService:
                 sort_by=sort_by,
                 sort_order=sort_order,
                 filters=filters,
+                after=after,
+                include_total=include_total,
             )
             return {
                 "people": result["people"],
@@ -94,6 +105,7 @@ class PeopleService:
             if not result:
                 return None
 
+            self.movie_repository.load_credits(result["movies"], include_directors=True)
             movies = []
             for movie in result["movies"]:
                 movie_data = movie.serialize(
@@ -124,11 +136,18 @@ class PeopleService:
             raise
 
     def filter_people(
-        self, filters, page=1, per_page=10, sort_by="name", sort_order="asc"
+        self,
+        filters,
+        page=1,
+        per_page=10,
+        sort_by="name",
+        sort_order="asc",
+        after=None,
+        include_total=False,
     ):
         try:
             result = self.people_repository.filter_people(
-                filters, page, per_page, sort_by, sort_order
+                filters, page, per_page, sort_by, sort_order, after, include_total
             )
             return {
                 "people": result["people"],
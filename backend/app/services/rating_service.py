@@ -3,6 +3,7 @@ from app.services.database import db
 from app.models.rating import Rating
 from app.models.movie import Movie
 from app.models.user import User
+from app.extensions import response_cache
 from datetime import datetime
 
 rating_repo = RatingRepository(db.session)
@@ -99,10 +100,10 @@ def create_rating(user_id, movie_id, rating_value):
 
         existing_rating = rating_repo.get_by_user_and_movie(user_id, movie_id)
         if existing_rating:
-            existing_rating.rating = rating_value
-            existing_rating.rated_at = datetime.utcnow()
-            db.session.commit()
-            result = existing_rating.serialize()
+            updated_rating = rating_repo.update(existing_rating.rating_id, rating_value)
+            if not updated_rating:
+                raise Exception("Nie udało się zaktualizować oceny")
+            result = updated_rating.serialize()
         else:
             new_rating = Rating(
                 user_id=user_id,
@@ -110,9 +111,11 @@ def create_rating(user_id, movie_id, rating_value):
                 rating=rating_value,
                 rated_at=datetime.utcnow(),
             )
-            rating_repo.add(new_rating)
+            if not rating_repo.add(new_rating):
+                raise Exception("Nie udało się zapisać oceny")
             result = new_rating.serialize()
 
+        response_cache.invalidate_tags("ratings")
         stats = get_movie_rating_stats(movie_id)
         result.update(stats)
         return result
@@ -148,6 +151,7 @@ def update_rating(rating_id, new_rating_value, user_id):
 
         updated_rating = rating_repo.update(rating_id, new_rating_value)
         result = updated_rating.serialize()
+        response_cache.invalidate_tags("ratings")
         stats = get_movie_rating_stats(updated_rating.movie_id)
         result.update(stats)
         return result
@@ -172,6 +176,7 @@ def delete_rating(user_id, movie_id):
         result = {"success": success, "movie_id": movie_id}
 
         if success:
+            response_cache.invalidate_tags("ratings")
             stats = get_movie_rating_stats(movie_id)
             result.update(stats)
 
@@ -180,3 +185,14 @@ def delete_rating(user_id, movie_id):
         raise e
     except Exception as e:
         raise Exception(f"Błąd podczas usuwania oceny: {str(e)}")
+
+
+def rebuild_rating_aggregates():
+    """Przelicza agregaty ocen na movies; zwraca liczbę poprawionych filmów"""
+    try:
+        fixed = rating_repo.rebuild_movie_aggregates()
+        if fixed:
+            response_cache.invalidate_tags("ratings")
+        return fixed
+    except Exception as e:
+        raise Exception(f"Błąd podczas przeliczania agregatów ocen: {str(e)}")
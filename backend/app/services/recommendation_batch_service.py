@@ -0,0 +1,215 @@
+from app.repositories.recommendation_repository import RecommendationRepository
+from app.repositories.user_taste_profile_repository import UserTasteProfileRepository
+from app.models.rating import Rating
+from app.services.database import db
+from app.recommendation_algorithm.recommender import MovieRecommender
+from app.recommendation_algorithm.utils.feature_store import get_feature_store
+from app.recommendation_algorithm.utils.description_index import (
+    get_description_index,
+)
+from app.recommendation_algorithm.utils.candidate_shortlist import (
+    get_candidate_shortlist,
+)
+from concurrent.futures import ProcessPoolExecutor
+from flask import current_app
+import multiprocessing
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+recommendation_repo = RecommendationRepository(db.session)
+taste_profile_repo = UserTasteProfileRepository(db.session)
+
+# Aplikacja w procesie workera puli (ustawiana w _init_worker)
+_worker_app = None
+
+
+def find_users_to_rebuild(incremental=False):
+    """Użytkownicy kwalifikujący się do rekomendacji (incremental: tylko zmienieni)"""
+    try:
+        return recommendation_repo.get_users_for_rebuild(incremental=incremental)
+
+    except Exception as e:
+        logger.error(f"Error in find_users_to_rebuild: {str(e)}")
+        raise Exception(f"Błąd podczas wyszukiwania użytkowników: {str(e)}")
+
+
+def rebuild_recommendations(
+    user_ids, workers=1, batch_size=100, quiet=True, on_batch_saved=None
+):
+    """
+    Przelicza i zapisuje rekomendacje dla podanych użytkowników
+
+    Katalog (feature store + indeks opisów) ładowany jest raz, przed
+    uruchomieniem puli - procesy potomne (fork) dziedziczą go bez kopiowania,
+    a przy spawn wczytują gotowe pliki .npz. Workery tylko liczą wyniki,
+    zapis idzie paczkami po batch_size użytkowników w jednej transakcji.
+
+    Args:
+        workers: liczba procesów (1 = w bieżącym procesie)
+        quiet: wycisza logi INFO algorytmu (tysiące linii na użytkownika)
+        on_batch_saved: callback(processed, total) po zapisie każdej paczki
+    """
+    try:
+        start = time.perf_counter()
+        stats = {"users": len(user_ids), "succeeded": 0, "failed": 0, "saved_rows": 0}
+        errors = {}
+
+        if not user_ids:
+            stats.update(elapsed_seconds=0.0, users_per_second=0.0, errors=errors)
+            return stats
+
+        get_feature_store(db.session)
+        get_description_index(db.session)
+        get_candidate_shortlist(db.session)
+
+        log_level = logging.WARNING if quiet else logging.INFO
+        pending = {}
+        processed = 0
+
+        for user_id, success, payload in _score_users(user_ids, workers, log_level):
+            processed += 1
+            if success:
+                pending[user_id] = payload
+                stats["succeeded"] += 1
+            else:
+                errors[user_id] = payload
+                stats["failed"] += 1
+
+            if len(pending) >= batch_size or processed == len(user_ids):
+                stats[
+                    "saved_rows"
+                ] += recommendation_repo.bulk_replace_user_recommendations(pending)
+                pending = {}
+                if on_batch_saved:
+                    on_batch_saved(processed, len(user_ids))
+
+        elapsed = time.perf_counter() - start
+        stats.update(
+            elapsed_seconds=round(elapsed, 3),
+            users_per_second=round(len(user_ids) / max(elapsed, 1e-9), 2),
+            errors=errors,
+        )
+
+        logger.info(
+            f"Rebuilt recommendations for {stats['succeeded']}/{stats['users']} users "
+            f"in {elapsed:.1f}s ({stats['users_per_second']} users/s)"
+        )
+        return stats
+
+    except Exception as e:
+        logger.error(f"Error in rebuild_recommendations: {str(e)}")
+        raise Exception(f"Błąd podczas przebudowy rekomendacji: {str(e)}")
+
+
+def rebuild_taste_profiles(user_ids=None):
+    """
+    Liczy profile gustu K-NN od zera (po migracji albo po zmianach metadanych
+    filmów - zapisane okna trzymają cechy z chwili oceny)
+
+    Args:
+        user_ids: None = wszyscy użytkownicy z ocenami
+
+    Returns:
+        liczba zapisanych profili
+    """
+    try:
+        start = time.perf_counter()
+        if user_ids is None:
+            user_ids = [
+                user_id
+                for (user_id,) in db.session.query(Rating.user_id)
+                .distinct()
+                .order_by(Rating.user_id)
+            ]
+
+        saved = taste_profile_repo.rebuild(user_ids)
+        logger.info(
+            f"Rebuilt {saved} taste profiles in {time.perf_counter() - start:.1f}s"
+        )
+        return saved
+
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error in rebuild_taste_profiles: {str(e)}")
+        raise Exception(f"Błąd podczas przebudowy profili gustu: {str(e)}")
+
+
+def _score_users(user_ids, workers, log_level):
+    """Generator (user_id, success, rekomendacje | komunikat błędu)"""
+    global _worker_app
+
+    if workers <= 1:
+        _set_algorithm_log_level(log_level)
+        for user_id in user_ids:
+            yield _score_user(user_id)
+        return
+
+    # fork: dzieci dziedziczą aplikację i załadowany katalog
+    _worker_app = current_app._get_current_object()
+    start_methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context(
+        "fork" if "fork" in start_methods else "spawn"
+    )
+
+    # Połączenia z puli nie mogą być współdzielone z procesami potomnymi
+    db.session.close()
+    db.engine.dispose()
+
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(log_level,),
+        ) as executor:
+            chunksize = max(1, min(20, len(user_ids) // (workers * 4)))
+            yield from executor.map(_score_user, user_ids, chunksize=chunksize)
+    finally:
+        _worker_app = None
+
+
+def _init_worker(log_level):
+    global _worker_app
+
+    if _worker_app is None:
+        # spawn: nowy interpreter - własna aplikacja, katalog wczytany z dysku
+        from app import create_app
+
+        _worker_app = create_app()
+
+    with _worker_app.app_context():
+        db.engine.dispose(close=False)
+
+    _set_algorithm_log_level(log_level)
+
+
+def _set_algorithm_log_level(log_level):
+    logging.getLogger("app.recommendation_algorithm").setLevel(log_level)
+
+
+def _score_user(user_id):
+    app = _worker_app or current_app._get_current_object()
+
+    with app.app_context():
+        try:
+            recommender = MovieRecommender(db.session)
+            result = recommender.generate_recommendations(user_id, save=False)
+
+            if not result["success"]:
+                return user_id, False, result["message"]
+
+            recommendations = [
+                {
+                    "movie_id": rec["movie_id"],
+                    "score": rec["score"],
+                    "algorithm_type": rec["algorithm_type"],
+                }
+                for algorithm_recs in result["recommendations"].values()
+                for rec in algorithm_recs
+            ]
+            return user_id, True, recommendations
+
+        except Exception as e:
+            db.session.rollback()
+            return user_id, False, str(e)
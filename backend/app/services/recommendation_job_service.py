@@ -0,0 +1,159 @@
+from app.repositories.recommendation_job_repository import (
+    RecommendationJobRepository,
+)
+from app.repositories.recommendation_repository import RecommendationRepository
+from app.services.database import db
+from app.services.recommendation_service import generate_recommendations_for_user
+from app.models.recommendation_job import JobStatus
+from app.recommendation_algorithm.config import (
+    RECOMMENDATION_JOB_WORKERS,
+    RECOMMENDATION_JOB_TIMEOUT_MINUTES,
+    RECOMMENDATION_JOB_QUEUE_TIMEOUT_MINUTES,
+)
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+job_repo = RecommendationJobRepository(db.session)
+recommendation_repo = RecommendationRepository(db.session)
+
+# Pula wątków w procesie - ogranicza liczbę równoległych generowań,
+# żeby długie obliczenia nie zajmowały workerów HTTP
+_executor = None
+_executor_lock = threading.Lock()
+_submit_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=RECOMMENDATION_JOB_WORKERS,
+                thread_name_prefix="recommendation-job",
+            )
+        return _executor
+
+
+def submit_recommendation_job(user_id):
+    """
+    Zleca generowanie rekomendacji w tle
+
+    Jeśli użytkownik ma już zadanie w kolejce / w trakcie, zwraca je zamiast
+    tworzyć nowe (created=False).
+    """
+    try:
+        status = recommendation_repo.get_recommendation_status(user_id)
+        if not status["eligible"]:
+            return {"success": False, "message": status["message"], "job": None}
+
+        with _submit_lock:
+            job_repo.fail_stale_jobs(
+                user_id,
+                RECOMMENDATION_JOB_TIMEOUT_MINUTES,
+                RECOMMENDATION_JOB_QUEUE_TIMEOUT_MINUTES,
+            )
+
+            job = job_repo.get_active_for_user(user_id)
+            created = job is None
+            if created:
+                try:
+                    job = job_repo.create(user_id)
+                except IntegrityError:
+                    # Inny proces zdążył utworzyć zadanie (unikalny indeks)
+                    job = job_repo.get_active_for_user(user_id)
+                    created = False
+
+        if created:
+            _get_executor().submit(
+                _run_job, current_app._get_current_object(), job.job_id, user_id
+            )
+            logger.info(f"Queued recommendation job {job.job_id} for user {user_id}")
+        else:
+            logger.info(
+                f"User {user_id} already has active job {job.job_id} - not queuing"
+            )
+
+        return {
+            "success": True,
+            "message": (
+                "Generowanie rekomendacji rozpoczęte"
+                if created
+                else "Rekomendacje są już generowane"
+            ),
+            "job": job.serialize(),
+            "created": created,
+        }
+
+    except Exception as e:
+        logger.error(f"Error in submit_recommendation_job: {str(e)}")
+        raise Exception(f"Błąd podczas zlecania generowania rekomendacji: {str(e)}")
+
+
+def get_recommendation_job(user_id, job_id):
+    """Zadanie użytkownika po id (None dla cudzych / nieistniejących)"""
+    try:
+        job = job_repo.get_by_id(job_id)
+        if not job or job.user_id != user_id:
+            return None
+        return job.serialize()
+
+    except Exception as e:
+        logger.error(f"Error in get_recommendation_job: {str(e)}")
+        raise Exception(f"Błąd podczas pobierania zadania: {str(e)}")
+
+
+def _run_job(app, job_id, user_id):
+    """Wykonuje zadanie w wątku puli - z własnym kontekstem aplikacji i sesją"""
+    with app.app_context():
+        try:
+            job_repo.update(
+                job_id,
+                status=JobStatus.RUNNING.value,
+                stage="started",
+                progress=0.0,
+                started_at=datetime.utcnow(),
+            )
+
+            def report_progress(stage, progress):
+                job_repo.update(job_id, stage=stage, progress=progress)
+
+            result = generate_recommendations_for_user(
+                user_id, progress_callback=report_progress
+            )
+
+            if result["success"]:
+                job_repo.update(
+                    job_id,
+                    status=JobStatus.COMPLETED.value,
+                    stage="done",
+                    progress=1.0,
+                    message=result["message"][:500],
+                    finished_at=datetime.utcnow(),
+                )
+            else:
+                job_repo.update(
+                    job_id,
+                    status=JobStatus.FAILED.value,
+                    message=result["message"][:500],
+                    finished_at=datetime.utcnow(),
+                )
+
+        except Exception as e:
+            logger.error(f"Recommendation job {job_id} failed: {str(e)}")
+            db.session.rollback()
+            try:
+                job_repo.update(
+                    job_id,
+                    status=JobStatus.FAILED.value,
+                    message=str(e)[:500],
+                    finished_at=datetime.utcnow(),
+                )
+            except Exception as update_error:
+                logger.error(
+                    f"Could not mark job {job_id} as failed: {str(update_error)}"
+                )
@@ -1,16 +1,25 @@
 from app.repositories.recommendation_repository import RecommendationRepository
+from app.repositories.recommendation_job_repository import (
+    RecommendationJobRepository,
+)
 from app.services.database import db
 from app.recommendation_algorithm.recommender import MovieRecommender
 import logging
 
 logger = logging.getLogger(__name__)
 recommendation_repo = RecommendationRepository(db.session)
+recommendation_job_repo = RecommendationJobRepository(db.session)
 
 
 def get_recommendation_status(user_id):
     """Główna metoda - sprawdza status rekomendacji dla UI"""
     try:
         status = recommendation_repo.get_recommendation_status(user_id)
+
+        # Postęp ostatniego zadania generowania (POST zwraca 202 + job_id)
+        latest_job = recommendation_job_repo.get_latest_for_user(user_id)
+        status["job"] = latest_job.serialize() if latest_job else None
+
         logger.info(
             f"Status check for user {user_id}: eligible={status['eligible']}, has_recs={status['has_recommendations']}"
         )
@@ -21,8 +30,13 @@ def get_recommendation_status(user_id):
         raise Exception(f"Błąd podczas sprawdzania statusu rekomendacji: {str(e)}")
 
 
-def generate_recommendations_for_user(user_id):
-    """Generuje nowe rekomendacje (zastępuje stare)"""
+def generate_recommendations_for_user(user_id, progress_callback=None):
+    """
+    Generuje nowe rekomendacje (zastępuje stare)
+
+    Wywoływane z RecommendationJob w tle - progress_callback(etap, postęp)
+    raportuje kolejne kroki algorytmu.
+    """
     try:
         # Sprawdź czy użytkownik kwalifikuje się
         status = recommendation_repo.get_recommendation_status(user_id)
@@ -37,7 +51,9 @@ def generate_recommendations_for_user(user_id):
         recommender = MovieRecommender(db.session)
 
         # Wygeneruj rekomendacje
-        result = recommender.generate_recommendations(user_id)
+        result = recommender.generate_recommendations(
+            user_id, progress_callback=progress_callback
+        )
 
         if not result["success"]:
             logger.warning(f"Algorithm failed for user {user_id}: {result['message']}")
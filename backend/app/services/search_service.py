@@ -0,0 +1,200 @@
+from app.repositories.search_repository import SearchRepository
+from app.services.database import db
+from app.models.search_term import SEARCH_DOC_TYPES
+from app.models.movie import Movie
+from app.models.actor import Actor
+from app.models.director import Director
+from app.models.user import User
+from app.models.comment import Comment
+from app.utils.people_utils import serialize_person
+from app.utils.search_text import get_search_analyzer
+from flask import url_for
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+search_repo = SearchRepository(db.session)
+
+# Typ dokumentu -> (kolumna id, kolumna z tekstem)
+DOCUMENT_SOURCES = {
+    "movie": (Movie.movie_id, Movie.title),
+    "actor": (Actor.actor_id, Actor.actor_name),
+    "director": (Director.director_id, Director.director_name),
+    "user": (User.user_id, User.username),
+    "comment": (Comment.comment_id, Comment.comment_text),
+}
+
+# Typy przeszukiwane przez /api/search (komentarze tylko w panelu staff)
+PUBLIC_SEARCH_TYPES = ("movie", "actor", "director", "user")
+
+
+def _analyze(rows):
+    analyzer = get_search_analyzer()
+    return {doc_id: analyzer.document_terms(text) for doc_id, text in rows}
+
+
+def refresh_search_documents(doc_type, doc_ids):
+    """
+    Przelicza termy dokumentów po zmianie (lub usunięciu) w bazie.
+    Błędy są tylko logowane - indeks naprawia `flask search rebuild-index`.
+    """
+    doc_ids = [doc_id for doc_id in doc_ids if doc_id is not None]
+    if not doc_ids:
+        return
+
+    try:
+        id_column, text_column = DOCUMENT_SOURCES[doc_type]
+        rows = db.session.query(id_column, text_column).filter(id_column.in_(doc_ids))
+        documents = {doc_id: {} for doc_id in doc_ids}
+        documents.update(_analyze(rows))
+        search_repo.replace_documents(doc_type, documents)
+
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Search index refresh failed for {doc_type} {doc_ids}: {str(e)}")
+
+
+def rebuild_search_index(doc_types=None, batch_size=5000, on_batch=None):
+    """
+    Buduje indeks od zera dla podanych typów (domyślnie wszystkich)
+
+    Args:
+        on_batch: callback(doc_type, indexed_documents) po każdej paczce
+    Returns:
+        {doc_type: liczba zaindeksowanych dokumentów}
+    """
+    try:
+        stats = {}
+        for doc_type in doc_types or SEARCH_DOC_TYPES:
+            start = time.perf_counter()
+            id_column, text_column = DOCUMENT_SOURCES[doc_type]
+            search_repo.clear_doc_type(doc_type)
+
+            indexed = 0
+            batch = []
+            rows = (
+                db.session.query(id_column, text_column)
+                .order_by(id_column)
+                .yield_per(batch_size)
+            )
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    indexed += _write_batch(doc_type, batch)
+                    batch = []
+                    if on_batch:
+                        on_batch(doc_type, indexed)
+            if batch:
+                indexed += _write_batch(doc_type, batch)
+            db.session.commit()
+
+            stats[doc_type] = indexed
+            logger.info(
+                f"Search index: {indexed} {doc_type} documents "
+                f"in {time.perf_counter() - start:.1f}s"
+            )
+        return stats
+
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error in rebuild_search_index: {str(e)}")
+        raise Exception(f"Błąd podczas przebudowy indeksu wyszukiwania: {str(e)}")
+
+
+def _write_batch(doc_type, rows):
+    # Bez commitu - yield_per trzyma otwarty kursor na tej samej sesji
+    search_repo.replace_documents(doc_type, _analyze(rows), commit=False)
+    return len(rows)
+
+
+def search(query, doc_types=PUBLIC_SEARCH_TYPES, limit=5):
+    """
+    Wyszukuje naraz w wielu typach dokumentów (jedno zapytanie do indeksu)
+
+    Returns:
+        {"query": ..., "results": {doc_type: [wynik, ...]}} - wyniki w kolejności
+        trafności, każdy z polem "score"
+    """
+    try:
+        hits = search_repo.search(query, doc_types, limit_per_type=limit)
+
+        ids_by_type = {doc_type: [] for doc_type in doc_types}
+        scores = {}
+        for doc_type, doc_id, matched, score in hits:
+            ids_by_type[doc_type].append(doc_id)
+            scores[(doc_type, doc_id)] = round(float(score), 4)
+
+        results = {}
+        for doc_type, doc_ids in ids_by_type.items():
+            loaded = _load_documents(doc_type, doc_ids)
+            results[doc_type] = [
+                {**loaded[doc_id], "score": scores[(doc_type, doc_id)]}
+                for doc_id in doc_ids
+                if doc_id in loaded
+            ]
+
+        return {"query": query, "results": results}
+
+    except Exception as e:
+        logger.error(f"Error in search: {str(e)}")
+        raise Exception(f"Błąd podczas wyszukiwania: {str(e)}")
+
+
+def _load_documents(doc_type, doc_ids):
+    """Dane wyników do odpowiedzi: {doc_id: słownik}"""
+    if not doc_ids:
+        return {}
+
+    if doc_type == "movie":
+        movies = db.session.query(Movie).filter(Movie.movie_id.in_(doc_ids))
+        return {
+            movie.movie_id: {
+                **movie.serialize_basic(),
+                "release_date": (
+                    movie.release_date.isoformat() if movie.release_date else None
+                ),
+                "average_rating": movie.average_rating,
+                "rating_count": movie.rating_count,
+            }
+            for movie in movies
+        }
+
+    if doc_type in ("actor", "director"):
+        model = Actor if doc_type == "actor" else Director
+        id_column, _ = DOCUMENT_SOURCES[doc_type]
+        people = db.session.query(model).filter(id_column.in_(doc_ids))
+        return {
+            person_id: serialize_person(person, doc_type)
+            for person in people
+            for person_id in [getattr(person, id_column.key)]
+        }
+
+    if doc_type == "user":
+        users = db.session.query(User).filter(
+            User.user_id.in_(doc_ids), User.is_active.is_(True)
+        )
+        return {
+            user.user_id: {
+                "id": user.user_id,
+                "username": user.username,
+                "profile_picture": (
+                    url_for(
+                        "static",
+                        filename=user.profile_picture.lstrip("/static/"),
+                        _external=True,
+                    )
+                    if user.profile_picture
+                    else None
+                ),
+            }
+            for user in users
+        }
+
+    if doc_type == "comment":
+        comments = db.session.query(Comment).filter(Comment.comment_id.in_(doc_ids))
+        return {
+            comment.comment_id: comment.serialize(include_user=True)
+            for comment in comments
+        }
+
+    return {}
@@ -0,0 +1,81 @@
+from app.services.database import db
+from app.recommendation_algorithm.utils.similar_movies import (
+    apply_pending_similar_movies,
+    has_pending_similar_movies,
+    mark_similar_movies_stale,
+)
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Jeden wątek w procesie - odświeżenia indeksu filmów podobnych idą po kolei,
+# a kolejne zmiany z czasu trwania odświeżenia scalają się w jedno zadanie
+_executor = None
+_executor_lock = threading.Lock()
+_queued = False
+_queued_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="similar-movies"
+            )
+        return _executor
+
+
+def schedule_similar_movies_refresh(movie_ids):
+    """
+    Oznacza filmy do odświeżenia sąsiadów i zleca odświeżenie w tle - żądanie
+    edycji filmu / gatunku / relacji nie czeka na przeliczenie katalogu.
+    Wołać po refresh_movie_features / refresh_movie_descriptions.
+    Błędy są tylko logowane: zapis filmu nie może się wywrócić przez indeks.
+    """
+    try:
+        mark_similar_movies_stale(movie_ids)
+        _submit(current_app._get_current_object())
+    except Exception as e:
+        logger.error(f"Similar movies refresh not scheduled for {movie_ids}: {e}")
+
+
+def process_pending_similar_movies():
+    """
+    Zleca odświeżenie w tle, jeśli kolejka nie jest pusta (np. po restarcie
+    workera, który nie zdążył jej przetworzyć) - woła je odczyt indeksu
+    """
+    try:
+        if has_pending_similar_movies():
+            _submit(current_app._get_current_object())
+    except Exception as e:
+        logger.error(f"Similar movies pending check failed: {e}")
+
+
+def _submit(app):
+    global _queued
+    with _queued_lock:
+        if _queued:
+            return
+        _queued = True
+    _get_executor().submit(_run_refresh, app)
+
+
+def _run_refresh(app):
+    """Przetwarza kolejkę w wątku puli - z własnym kontekstem aplikacji i sesją"""
+    global _queued
+    with app.app_context():
+        try:
+            # Przed zabraniem kolejki - zmiany z czasu odświeżenia zlecą kolejne
+            with _queued_lock:
+                _queued = False
+            refreshed = apply_pending_similar_movies(db.session)
+            if refreshed:
+                logger.info(f"Similar movies refreshed in background: {refreshed}")
+        except Exception as e:
+            logger.error(f"Similar movies background refresh failed: {e}")
+        finally:
+            db.session.remove()
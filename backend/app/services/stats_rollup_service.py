@@ -0,0 +1,118 @@
+from app.services.database import db
+from app.repositories.stats_rollup_repository import StatsRollupRepository
+from app.models.stats_rollup import ROLLUP_METRICS
+from app.models.rating import Rating
+from app.models.comment import Comment
+from app.models.user import User
+from app.models.login_activity import LoginActivity
+from app.models.recommendation import Recommendation
+from sqlalchemy import distinct, func, literal
+from datetime import date
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+rollup_repo = StatsRollupRepository(db.session)
+
+# Metryki z wartością zdarzenia (ocena, długość komentarza, liczba pozycji) -
+# pozostałe tylko liczą zdarzenia i nie mają średniej
+VALUED_METRICS = ("ratings", "comments", "recommendations")
+
+
+def _rollup_sources():
+    """
+    Metryka -> (kolumna czasu, liczba zdarzeń, suma wartości, warunek) do
+    odtworzenia liczników z tabel źródłowych
+    """
+    return {
+        "ratings": (Rating.rated_at, func.count(), func.sum(Rating.rating), None),
+        "comments": (
+            Comment.created_at,
+            func.count(),
+            func.sum(func.length(Comment.comment_text)),
+            None,
+        ),
+        "registrations": (User.registration_date, func.count(), literal(0), None),
+        "logins": (
+            LoginActivity.login_timestamp,
+            func.count(),
+            literal(0),
+            ~LoginActivity.status.like("Failed%"),
+        ),
+        # zdarzenie = wygenerowanie rekomendacji dla użytkownika, wartość = liczba pozycji
+        "recommendations": (
+            Recommendation.created_at,
+            func.count(distinct(Recommendation.user_id)),
+            func.count(),
+            None,
+        ),
+    }
+
+
+def _as_date(value):
+    # SQLite zwraca date() jako tekst 'YYYY-MM-DD'
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def rebuild_rollups(metrics=None):
+    """
+    Odtwarza liczniki z tabel źródłowych (po migracji albo po naprawie
+    danych). "ratings" i "comments" i tak odpowiadają bieżącym wierszom;
+    dla pozostałych metryk tabele trzymają tylko stan bieżący - nadpisane
+    rekomendacje czy usunięte konta nie wrócą do historii zdarzeń.
+
+    Returns:
+        {metryka: liczba zapisanych wierszy liczników}
+    """
+    try:
+        stats = {}
+        sources = _rollup_sources()
+        for metric in metrics or ROLLUP_METRICS:
+            start = time.perf_counter()
+            timestamp, count, value, condition = sources[metric]
+            day = func.date(timestamp)
+            query = db.session.query(day, count, value).filter(timestamp.isnot(None))
+            if condition is not None:
+                query = query.filter(condition)
+
+            daily = {
+                _as_date(row_day): (int(row_count), int(row_value or 0))
+                for row_day, row_count, row_value in query.group_by(day)
+            }
+            stats[metric] = rollup_repo.replace_metric(metric, daily)
+            logger.info(
+                f"Stats rollups: {metric} rebuilt ({stats[metric]} rows) "
+                f"in {time.perf_counter() - start:.1f}s"
+            )
+        return stats
+
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error in rebuild_rollups: {str(e)}")
+        raise Exception(f"Błąd podczas przebudowy liczników statystyk: {str(e)}")
+
+
+def get_trend(metric, period="month", periods=12):
+    """
+    Szereg czasowy metryki z rollupów (bez skanu tabel źródłowych)
+
+    Returns:
+        Lista od najstarszego okresu: {"period": "YYYY-MM" / "YYYY-MM-DD",
+        "count": liczba zdarzeń, "average": średnia wartość lub None
+        dla okresu bez zdarzeń i metryk bez wartości}
+    """
+    try:
+        label_format = "%Y-%m" if period == "month" else "%Y-%m-%d"
+        valued = metric in VALUED_METRICS
+        return [
+            {
+                "period": start.strftime(label_format),
+                "count": count,
+                "average": round(value / count, 2) if valued and count else None,
+            }
+            for start, count, value in rollup_repo.get_trend(metric, period, periods)
+        ]
+
+    except Exception as e:
+        logger.error(f"Error in get_trend: {str(e)}")
+        raise Exception(f"Błąd podczas pobierania trendu {metric}: {str(e)}")
@@ -0,0 +1,83 @@
+from app.services.database import db
+from app.repositories.stats_snapshot_repository import StatsSnapshotRepository
+from app.repositories.movie_repository import MovieRepository
+from app.repositories.user_repository import UserRepository
+from flask import current_app
+from sqlalchemy.exc import SQLAlchemyError
+from datetime import datetime
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+snapshot_repo = StatsSnapshotRepository(db.session)
+
+# Nazwa snapshotu -> funkcja licząca agregaty (słownik serializowalny do JSON)
+STATS_SNAPSHOTS = {
+    "movies_dashboard": lambda: MovieRepository(db.session).get_dashboard_aggregates(),
+    "users_dashboard": lambda: UserRepository(db.session).get_dashboard_aggregates(),
+}
+
+# Po jakim czasie odczyt przelicza snapshot sam (gdy cron nie zdążył)
+DEFAULT_MAX_AGE_SECONDS = 300
+
+
+def _max_age_seconds():
+    return int(
+        current_app.config.get(
+            "STATS_SNAPSHOT_MAX_AGE",
+            os.environ.get("STATS_SNAPSHOT_MAX_AGE", DEFAULT_MAX_AGE_SECONDS),
+        )
+    )
+
+
+def refresh_stats_snapshot(name):
+    """Przelicza agregaty snapshotu i zapisuje je; zwraca {**agregaty, snapshot_at}"""
+    payload = STATS_SNAPSHOTS[name]()
+    computed_at = datetime.utcnow()
+    try:
+        computed_at = snapshot_repo.save(name, payload).computed_at
+    except SQLAlchemyError as e:
+        # Np. równoległe odświeżenie w innym workerze - wynik i tak jest aktualny
+        logger.warning(f"Stats snapshot {name} not saved: {str(e)}")
+    return {**payload, "snapshot_at": computed_at.isoformat()}
+
+
+def refresh_stats_snapshots(names=None):
+    """
+    Przelicza wskazane (domyślnie wszystkie) snapshoty - do uruchamiania
+    z harmonogramu przez `flask stats refresh`
+
+    Returns:
+        {nazwa: czas liczenia w sekundach}
+    """
+    try:
+        timings = {}
+        for name in names or STATS_SNAPSHOTS:
+            start = time.perf_counter()
+            refresh_stats_snapshot(name)
+            timings[name] = time.perf_counter() - start
+            logger.info(f"Stats snapshot {name} refreshed in {timings[name]:.2f}s")
+        return timings
+
+    except Exception as e:
+        logger.error(f"Error in refresh_stats_snapshots: {str(e)}")
+        raise Exception(f"Błąd podczas odświeżania statystyk: {str(e)}")
+
+
+def get_stats_snapshot(name):
+    """
+    Agregaty z tabeli stats_snapshots (jedno zapytanie po kluczu). Snapshot
+    starszy niż STATS_SNAPSHOT_MAX_AGE sekund (0 = zawsze liczone na żywo)
+    jest przeliczany przy odczycie.
+    """
+    max_age = _max_age_seconds()
+    if max_age > 0:
+        snapshot = snapshot_repo.get(name)
+        if (
+            snapshot is not None
+            and (datetime.utcnow() - snapshot.computed_at).total_seconds() <= max_age
+        ):
+            return {**snapshot.payload, "snapshot_at": snapshot.computed_at.isoformat()}
+
+    return refresh_stats_snapshot(name)
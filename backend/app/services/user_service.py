@@ -2,6 +2,8 @@ from app.repositories.user_repository import UserRepository
 from app.services.database import db
 from werkzeug.exceptions import BadRequest
 from app.utils.file_handlers import save_user_image
+from app.services.search_service import refresh_search_documents
+from app.services.stats_snapshot_service import get_stats_snapshot
 from app.services.user_activity_service import (
     log_password_change,
     log_username_change,
@@ -59,6 +61,7 @@ def update_user_profile(user_id, data):
         # Zmiana nazwy użytkownika
         if "username" in data and data["username"] != old_username:
             log_username_change(user_id, old_username, data["username"])
+            refresh_search_documents("user", [user_id])
 
         # Zmiana emailu
         if "email" in data and data["email"] != old_email:
@@ -235,18 +238,20 @@ def search_users(query, page=1, per_page=10):
 
 
 def get_basic_statistics():
-    """Pobiera podstawowe statystyki użytkowników"""
+    """Pobiera podstawowe statystyki użytkowników (ze snapshotu statystyk)"""
     try:
-        stats = user_repo.get_basic_statistics()
+        stats = get_stats_snapshot("users_dashboard")["statistics"]
         return stats
     except Exception as e:
         raise Exception(f"Nie udało się pobrać statystyk: {str(e)}")
 
 
 def get_dashboard_data():
-    """Pobiera dane dashboard dla użytkowników"""
+    """Pobiera dane dashboard dla użytkowników (agregaty ze snapshotu)"""
     try:
-        dashboard_data = user_repo.get_dashboard_data()
+        dashboard_data = user_repo.get_dashboard_data(
+            get_stats_snapshot("users_dashboard")
+        )
         return dashboard_data
     except Exception as e:
         raise Exception(f"Nie udało się pobrać danych dashboard: {str(e)}")
@@ -0,0 +1,321 @@
+"""
+Indeks podpowiedzi (autocomplete) w pamięci procesu
+
+Jedno trie na typ dokumentu (film / aktor / reżyser) z kluczami nazwy po
+złożeniu (lowercase + unaccent, więc "zolw" trafia w "żółw") - od każdego
+słowa do końca nazwy, więc "keanu reev" i "reev" to zwykłe prefiksy. Każdy
+węzeł trzyma TOP_K najpopularniejszych wpisów ze swojego poddrzewa, dlatego
+dokładny prefiks to tylko zejście po literach zapytania.
+
+Literówki: przejście po trie z wierszem tablicy odległości Damerau-
+Levenshteina (jak w Lucene/Elasticsearch "fuzziness: AUTO"); pierwsza litera
+musi się zgadzać, co ogranicza przeszukiwanie do jednej gałęzi korzenia.
+Przejścia z 1 i 2 literówkami są robione tylko, gdy lepsze dopasowania nie
+wypełniły limitu.
+
+Kolejność: liczba literówek, potem popularność - liczba ocen (dla osób suma
+ocen ich filmów).
+"""
+
+from threading import RLock
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from app.utils.search_text import SEARCH_TOKEN_PATTERN, unaccent
+
+# Wpisów zapamiętanych w każdym węźle (górna granica limitu odpowiedzi)
+TOP_K = 32
+
+# Klucze tylko od pierwszych słów nazwy (długie tytuły)
+MAX_KEY_WORDS = 6
+
+
+def fold(text: Optional[str]) -> List[str]:
+    """Słowa tekstu do porównań: lowercase, bez znaków diakrytycznych"""
+    if not text:
+        return []
+    return SEARCH_TOKEN_PATTERN.findall(unaccent(text.lower()))
+
+
+def phrase_keys(name: Optional[str]) -> Tuple[str, ...]:
+    """
+    Klucze nazwy w trie: złożony tekst od każdego kolejnego słowa
+    ("Władca Pierścieni" -> "wladca pierscieni", "pierscieni"), więc
+    zapytanie pasuje od początku dowolnego słowa, także wielowyrazowe
+    """
+    words = fold(name)[:MAX_KEY_WORDS]
+    return tuple(dict.fromkeys(" ".join(words[i:]) for i in range(len(words))))
+
+
+def max_distance(key: str) -> int:
+    """Dozwolona liczba literówek zależnie od długości zapytania (jak AUTO w ES)"""
+    if len(key) <= 2:
+        return 0
+    if len(key) <= 5:
+        return 1
+    return 2
+
+
+def _next_row(query, char, previous_char, previous, before_previous):
+    """Kolejny wiersz tablicy Damerau-Levenshteina (bez min() - gorąca pętla)"""
+    left = previous[0] + 1
+    row = [left]
+    transposition = before_previous is not None and previous_char is not None
+    for j in range(1, len(query) + 1):
+        value = previous[j - 1] if query[j - 1] == char else previous[j - 1] + 1
+        if previous[j] + 1 < value:
+            value = previous[j] + 1
+        if left + 1 < value:
+            value = left + 1
+        if (
+            transposition
+            and j > 1
+            and query[j - 1] == previous_char
+            and query[j - 2] == char
+            and before_previous[j - 2] + 1 < value
+        ):
+            value = before_previous[j - 2] + 1
+        row.append(value)
+        left = value
+    return row
+
+
+class AutocompleteEntry(NamedTuple):
+    doc_type: str
+    doc_id: int
+    name: str
+    popularity: int
+    # dodatkowe pola odpowiedzi (np. rok premiery filmu)
+    extra: dict
+
+    @property
+    def key(self) -> Tuple[str, int]:
+        return self.doc_type, self.doc_id
+
+
+class _Node:
+    __slots__ = ("children", "entries", "top")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        # wpisy, których słowo kończy się w tym węźle
+        self.entries = set()
+        # TOP_K doc_id z poddrzewa od najpopularniejszego
+        self.top: Tuple[int, ...] = ()
+
+
+class _TypeTrie:
+    """Trie kluczy (phrase_keys) nazw jednego typu dokumentu"""
+
+    def __init__(self):
+        self.root = _Node()
+        self.entries: Dict[int, AutocompleteEntry] = {}
+        self.keys: Dict[int, Tuple[str, ...]] = {}
+        # klucz sortowania top: najpopularniejsze, potem alfabetycznie
+        self.sort_keys: Dict[int, tuple] = {}
+
+    def _recompute(self, node: _Node) -> None:
+        candidates = set(node.entries)
+        for child in node.children.values():
+            candidates.update(child.top)
+        node.top = tuple(sorted(candidates, key=self.sort_keys.__getitem__)[:TOP_K])
+
+    def _path(self, key: str, create: bool) -> List[_Node]:
+        path = [self.root]
+        node = self.root
+        for char in key:
+            child = node.children.get(char)
+            if child is None:
+                if not create:
+                    return []
+                child = node.children[char] = _Node()
+            path.append(child)
+            node = child
+        return path
+
+    def _refresh_paths(self, paths: Iterable[List[Tuple[str, _Node]]]) -> None:
+        """Przelicza top węzłów ze ścieżek od najgłębszych; usuwa puste liście"""
+        by_depth = {}
+        for path in paths:
+            for depth, (char, parent, node) in enumerate(path):
+                by_depth[id(node)] = (depth, char, parent, node)
+
+        for depth, char, parent, node in sorted(
+            by_depth.values(), key=lambda item: -item[0]
+        ):
+            if parent is not None and not node.entries and not node.children:
+                if parent.children.get(char) is node:
+                    del parent.children[char]
+                continue
+            self._recompute(node)
+
+    def _key_path(self, key: str, create: bool):
+        nodes = self._path(key, create)
+        if not nodes:
+            return []
+        path = [(None, None, self.root)]
+        for char, parent, node in zip(key, nodes, nodes[1:]):
+            path.append((char, parent, node))
+        return path
+
+    def upsert(self, entries: Iterable[AutocompleteEntry], deleted=()) -> None:
+        if not self.entries:
+            self._build(entries)
+            return
+
+        paths = []
+        for doc_id in deleted:
+            paths.extend(self._unlink(doc_id))
+
+        for entry in entries:
+            paths.extend(self._unlink(entry.doc_id))
+            keys = phrase_keys(entry.name)
+            if not keys:
+                continue
+            self.entries[entry.doc_id] = entry
+            self.keys[entry.doc_id] = keys
+            self.sort_keys[entry.doc_id] = (-entry.popularity, entry.name, entry.doc_id)
+            for key in keys:
+                path = self._key_path(key, create=True)
+                path[-1][2].entries.add(entry.doc_id)
+                paths.append(path)
+
+        self._refresh_paths(paths)
+
+    def _build(self, entries: Iterable[AutocompleteEntry]) -> None:
+        """Pierwsze wypełnienie: wszystkie klucze, potem jedno przejście post-order"""
+        for entry in entries:
+            keys = phrase_keys(entry.name)
+            if not keys:
+                continue
+            self.entries[entry.doc_id] = entry
+            self.keys[entry.doc_id] = keys
+            self.sort_keys[entry.doc_id] = (-entry.popularity, entry.name, entry.doc_id)
+            for key in keys:
+                self._path(key, create=True)[-1].entries.add(entry.doc_id)
+
+        stack = [(self.root, False)]
+        while stack:
+            node, children_done = stack.pop()
+            if children_done:
+                self._recompute(node)
+                continue
+            stack.append((node, True))
+            stack.extend((child, False) for child in node.children.values())
+
+    def _unlink(self, doc_id: int):
+        paths = []
+        for key in self.keys.pop(doc_id, ()):
+            path = self._key_path(key, create=False)
+            if path:
+                path[-1][2].entries.discard(doc_id)
+                paths.append(path)
+        self.entries.pop(doc_id, None)
+        self.sort_keys.pop(doc_id, None)
+        return paths
+
+    def fuzzy_nodes(self, key: str, distance: int) -> Dict[int, Tuple[_Node, int]]:
+        """
+        Węzły, których prefiks jest w odległości <= distance od key
+        (id węzła -> (węzeł, odległość)). Pierwsza litera musi się zgadzać.
+
+        Pod węzłem pasującym z odległością d schodzimy tylko po lepsze
+        dopasowania (< d): top węzła ma już najpopularniejsze wpisy
+        poddrzewa, a głębsze węzły z odległością >= d nic by nie dodały.
+        """
+        first = self.root.children.get(key[0])
+        if first is None:
+            return {}
+
+        initial = list(range(len(key) + 1))
+        first_row = _next_row(key, key[0], None, initial, None)
+        found = {}
+        stack = [(first, key[0], first_row, initial, distance + 1)]
+        while stack:
+            node, char, row, previous, bound = stack.pop()
+            if row[-1] < bound:
+                found[id(node)] = (node, row[-1])
+                bound = row[-1]
+            if min(row) >= bound:
+                continue
+            for child_char, child in node.children.items():
+                child_row = _next_row(key, child_char, char, row, previous)
+                stack.append((child, child_char, child_row, row, bound))
+        return found
+
+
+class AutocompleteIndex:
+    """Tria wszystkich typów + blokada (odczyty i zmiany z wielu wątków)"""
+
+    def __init__(self, doc_types: Iterable[str]):
+        self.tries = {doc_type: _TypeTrie() for doc_type in doc_types}
+        self._lock = RLock()
+
+    def __len__(self) -> int:
+        return sum(len(trie.entries) for trie in self.tries.values())
+
+    def upsert(
+        self, doc_type: str, entries: Iterable[AutocompleteEntry], deleted=()
+    ) -> None:
+        with self._lock:
+            self.tries[doc_type].upsert(entries, deleted)
+
+    def suggest(
+        self, query: str, doc_types: Iterable[str], limit: int = 10
+    ) -> List[Tuple[AutocompleteEntry, int]]:
+        """
+        Najlepsze wpisy dla zapytania: lista (wpis, liczba literówek).
+        Zapytanie po złożeniu musi być (z tolerancją) prefiksem nazwy
+        zaczynającym się od któregoś jej słowa.
+        """
+        key = " ".join(fold(query))
+        if not key:
+            return []
+
+        scored = []
+        seen = set()
+        with self._lock:
+            tries = [self.tries[doc_type] for doc_type in doc_types]
+            # Najpierw dokładne prefiksy; każda kolejna dozwolona literówka
+            # tylko dopełnia listę do limitu
+            for distance in range(max_distance(key) + 1):
+                tier = [
+                    item
+                    for item in self._collect(tries, key, distance)
+                    if item[0].key not in seen
+                ]
+                seen.update(item[0].key for item in tier)
+                scored.extend(tier)
+                if len(scored) >= limit:
+                    break
+        return scored[:limit]
+
+    @staticmethod
+    def _collect(tries, key, distance):
+        """Wpisy z literówkami <= distance, od najpopularniejszego"""
+        scored = []
+        for trie in tries:
+            if distance:
+                nodes = trie.fuzzy_nodes(key, distance).values()
+            else:
+                path = trie._path(key, create=False)
+                nodes = [(path[-1], 0)] if path else []
+
+            distances = {}
+            for node, node_distance in nodes:
+                for doc_id in node.top:
+                    if node_distance < distances.get(doc_id, node_distance + 1):
+                        distances[doc_id] = node_distance
+            scored.extend(
+                (trie.entries[doc_id], doc_distance)
+                for doc_id, doc_distance in distances.items()
+            )
+
+        scored.sort(
+            key=lambda item: (
+                item[1],
+                -item[0].popularity,
+                item[0].name,
+                item[0].key,
+            )
+        )
+        return scored
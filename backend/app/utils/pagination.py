@@ -0,0 +1,134 @@
+"""
+Paginacja keyset (kursorowa) - alternatywa dla OFFSET na długich listach
+
+Kursor `after` to nieprzezroczysty token (base64 z JSON) z wartościami klucza
+sortowania ostatniego elementu strony, zakończonego unikalnym id. Kolejna
+strona to WHERE (klucz, id) > (wartości z kursora) ORDER BY klucz, id LIMIT n,
+więc koszt nie rośnie z numerem strony, a COUNT(*) po całym filtrze liczony
+jest tylko na żądanie.
+
+Wyrażenia klucza muszą być NOT NULL (np. coalesce) - porównanie z NULL
+wycięłoby wiersze z kolejnych stron.
+"""
+
+from datetime import date, datetime
+from typing import Any, Callable, List, NamedTuple, Optional, Tuple
+import base64
+import json
+
+from sqlalchemy import and_, literal, or_, tuple_
+
+
+class SortKey(NamedTuple):
+    expression: Any
+    descending: bool
+    # wartość klucza z elementu wyniku (obiekt ORM / wiersz)
+    getter: Callable[[Any], Any]
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"d": value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if "dt" in value:
+            return datetime.fromisoformat(value["dt"])
+        if "d" in value:
+            return date.fromisoformat(value["d"])
+        raise ValueError("Nieprawidłowy kursor")
+    return value
+
+
+def encode_cursor(signature: str, values: List[Any]) -> str:
+    payload = {"s": signature, "k": [_encode_value(value) for value in values]}
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str, signature: str, size: int) -> List[Any]:
+    """
+    Wartości klucza z kursora. ValueError, gdy token jest uszkodzony albo
+    pochodzi z innego sortowania (signature) niż bieżące zapytanie.
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        values = [_decode_value(value) for value in payload["k"]]
+        cursor_signature = payload["s"]
+    except (TypeError, KeyError, ValueError):
+        # binascii.Error / UnicodeError / JSONDecodeError to podklasy ValueError
+        raise ValueError("Nieprawidłowy kursor")
+
+    if cursor_signature != signature or len(values) != size:
+        raise ValueError("Kursor nie pasuje do bieżącego sortowania")
+    return values
+
+
+def order_clauses(keys: List[SortKey]):
+    return [
+        key.expression.desc() if key.descending else key.expression.asc()
+        for key in keys
+    ]
+
+
+def keyset_condition(keys: List[SortKey], values: List[Any]):
+    """Warunek 'za kursorem' zgodny z kierunkami sortowania kluczy"""
+    bound = [
+        literal(value, type_=key.expression.type) for key, value in zip(keys, values)
+    ]
+
+    directions = {key.descending for key in keys}
+    if len(directions) == 1:
+        # Jednolity kierunek - porównanie krotek (row values), korzysta z indeksu
+        expressions = tuple_(*[key.expression for key in keys])
+        if keys[0].descending:
+            return expressions < tuple_(*bound)
+        return expressions > tuple_(*bound)
+
+    # Mieszane kierunki: (k1 > v1) OR (k1 = v1 AND k2 < v2) OR ...
+    alternatives = []
+    for i, key in enumerate(keys):
+        equal_prefix = [keys[j].expression == bound[j] for j in range(i)]
+        step = (
+            key.expression < bound[i] if key.descending else key.expression > bound[i]
+        )
+        alternatives.append(and_(*equal_prefix, step))
+    return or_(*alternatives)
+
+
+def apply_keyset(
+    query, keys: List[SortKey], after: Optional[str], signature: str, per_page: int
+):
+    """
+    Sortuje po kluczach, zawęża do elementów za kursorem i pobiera per_page + 1
+    (dodatkowy wiersz mówi, czy istnieje następna strona). Działa dla Query
+    ORM i dla select() z Core.
+    """
+    if after:
+        values = decode_cursor(after, signature, len(keys))
+        query = query.filter(keyset_condition(keys, values))
+
+    return query.order_by(*order_clauses(keys)).limit(per_page + 1)
+
+
+def cursor_page(
+    rows: List[Any], keys: List[SortKey], signature: str, per_page: int
+) -> Tuple[List[Any], dict]:
+    """Przycina wynik apply_keyset do strony i buduje sekcję pagination"""
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+
+    next_cursor = None
+    if has_next and rows:
+        next_cursor = encode_cursor(signature, [key.getter(rows[-1]) for key in keys])
+
+    return rows, {
+        "per_page": per_page,
+        "has_next": has_next,
+        "next_cursor": next_cursor,
+    }
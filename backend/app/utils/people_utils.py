@@ -4,6 +4,7 @@ from sqlalchemy.orm import aliased
 from app.models.actor import Actor
 from app.models.director import Director
 from app.extensions import db
+from app.repositories.search_repository import SearchRepository
 from urllib.parse import urlparse
 
 
@@ -71,10 +72,22 @@ def get_people_query(filters=None):
 
     if filters:
         if "name" in filters:
-            name_filter = f"%{filters['name']}%"
-            actors_query = actors_query.where(actor_alias.actor_name.ilike(name_filter))
+            # Indeks search_terms; ILIKE gdy fraza nie ma słów albo indeks
+            # nic nie znajduje (np. fragment ze środka nazwiska)
+            search_repo = SearchRepository(db.session)
+            actors_query = actors_query.where(
+                search_repo.text_condition(
+                    filters["name"],
+                    [("actor", actor_alias.actor_id)],
+                    [actor_alias.actor_name],
+                )
+            )
             directors_query = directors_query.where(
-                director_alias.director_name.ilike(name_filter)
+                search_repo.text_condition(
+                    filters["name"],
+                    [("director", director_alias.director_id)],
+                    [director_alias.director_name],
+                )
             )
 
         if "gender" in filters:
@@ -0,0 +1,328 @@
+"""
+Metryki żądań: liczba zapytań SQL, czas SQL, czas serializacji JSON,
+rozmiar odpowiedzi i czas całego żądania - per endpoint
+
+- zapytania liczą zdarzenia silnika before/after_cursor_execute, przypisane
+  do bieżącego żądania przez flask.g (wątki w tle i komendy CLI pomijane)
+- początek / koniec żądania: sygnały request_started / request_finished
+- serializacja: czas dumps() dostawcy JSON aplikacji (jsonify); budowa
+  słowników w serwisach liczy się do czasu żądania, nie serializacji
+- wolne żądania (> SLOW_REQUEST_MS) trafiają do logu z najwolniejszymi
+  i najczęściej powtarzanymi zapytaniami (bez parametrów - dane osobowe)
+- export w formacie tekstowym Prometheusa (/api/admin/metrics); liczniki
+  są per proces (worker), jak statystyki cache odpowiedzi
+
+Dla odpowiedzi strumieniowych (NDJSON) czas i rozmiar kończą się na
+wysłaniu nagłówków - treść jest generowana później.
+
+Konfiguracja (app.config / zmienne środowiskowe):
+    REQUEST_METRICS_ENABLED  1 | 0                       (domyślnie 1)
+    SLOW_REQUEST_MS          próg logu wolnych żądań     (domyślnie 500)
+    METRICS_TOKEN            token Bearer dla scrapera (bez niego tylko admin)
+"""
+
+from collections import Counter, defaultdict
+from typing import Dict, List, Tuple
+import hmac
+import logging
+import os
+import threading
+import time
+
+from flask import g, has_app_context, request, request_finished, request_started
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Granice kubełków histogramu czasu żądania (sekundy)
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Zapytania zapamiętane na żądanie (do logu wolnych żądań)
+MAX_RECORDED_STATEMENTS = 500
+SLOW_LOG_STATEMENTS = 5
+SLOW_LOG_SQL_CHARS = 300
+
+
+class _RequestState:
+    __slots__ = ("started", "queries", "sql_seconds", "json_seconds", "statements")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.json_seconds = 0.0
+        # (sql, czas) - ograniczone MAX_RECORDED_STATEMENTS
+        self.statements: List[Tuple[str, float]] = []
+
+
+class _EndpointStats:
+    __slots__ = (
+        "requests",
+        "errors",
+        "duration",
+        "queries",
+        "max_queries",
+        "sql_seconds",
+        "json_seconds",
+        "response_bytes",
+        "buckets",
+    )
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.duration = 0.0
+        self.queries = 0
+        self.max_queries = 0
+        self.sql_seconds = 0.0
+        self.json_seconds = 0.0
+        self.response_bytes = 0
+        self.buckets = [0] * len(DURATION_BUCKETS)
+
+
+class _TimedJSONProvider(DefaultJSONProvider):
+    """Dostawca JSON aplikacji mierzący czas dumps() w bieżącym żądaniu"""
+
+    def dumps(self, obj, **kwargs):
+        start = time.perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            state = _current_state()
+            if state is not None:
+                state.json_seconds += time.perf_counter() - start
+
+
+def _current_state():
+    if not has_app_context():
+        return None
+    return g.get("_request_metrics")
+
+
+def _label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+class RequestMetrics:
+    """Fasada: rejestracja hooków (init_app), eksport i statystyki"""
+
+    def __init__(self):
+        self.enabled = False
+        self.slow_request_seconds = 0.5
+        self.token = None
+        # (endpoint, metoda, status) -> _EndpointStats
+        self._stats: Dict[Tuple[str, str, int], _EndpointStats] = defaultdict(
+            _EndpointStats
+        )
+        self._lock = threading.Lock()
+
+    def init_app(self, app) -> None:
+        enabled = app.config.get(
+            "REQUEST_METRICS_ENABLED", os.environ.get("REQUEST_METRICS_ENABLED", "1")
+        )
+        self.enabled = str(enabled).lower() not in ("0", "false", "no")
+        self.slow_request_seconds = (
+            float(
+                app.config.get(
+                    "SLOW_REQUEST_MS", os.environ.get("SLOW_REQUEST_MS", 500)
+                )
+            )
+            / 1000
+        )
+        self.token = app.config.get("METRICS_TOKEN", os.environ.get("METRICS_TOKEN"))
+        if not self.enabled:
+            return
+
+        app.json = _TimedJSONProvider(app)
+        request_started.connect(self._request_started, app)
+        request_finished.connect(self._request_finished, app)
+        with app.app_context():
+            from app.extensions import db
+
+            for engine in db.engines.values():
+                event.listen(engine, "before_cursor_execute", self._before_cursor)
+                event.listen(engine, "after_cursor_execute", self._after_cursor)
+
+        logger.info(
+            f"Request metrics enabled, slow request threshold "
+            f"{self.slow_request_seconds * 1000:.0f} ms"
+        )
+
+    # ---------- hooki ----------
+
+    @staticmethod
+    def _request_started(sender, **extra):
+        g._request_metrics = _RequestState()
+
+    @staticmethod
+    def _before_cursor(conn, cursor, statement, parameters, context, executemany):
+        # Start na kontekście wykonania, nie na połączeniu z puli - zapytanie
+        # zakończone błędem (bez after_cursor_execute) nie zostawia po sobie
+        # wpisu, który przesunąłby pomiar kolejnych zapytań
+        if context is not None and _current_state() is not None:
+            context._request_metrics_start = time.perf_counter()
+
+    @staticmethod
+    def _after_cursor(conn, cursor, statement, parameters, context, executemany):
+        state = _current_state()
+        started = getattr(context, "_request_metrics_start", None)
+        if state is None or started is None:
+            return
+        elapsed = time.perf_counter() - started
+        state.queries += 1
+        state.sql_seconds += elapsed
+        if len(state.statements) < MAX_RECORDED_STATEMENTS:
+            state.statements.append((statement, elapsed))
+
+    def _request_finished(self, sender, response, **extra):
+        state = g.pop("_request_metrics", None)
+        if state is None:
+            return
+
+        duration = time.perf_counter() - state.started
+        endpoint = request.endpoint or "unmatched"
+        size = 0 if response.is_streamed else response.calculate_content_length()
+
+        with self._lock:
+            stats = self._stats[(endpoint, request.method, response.status_code)]
+            stats.requests += 1
+            stats.errors += response.status_code >= 500
+            stats.duration += duration
+            stats.queries += state.queries
+            stats.max_queries = max(stats.max_queries, state.queries)
+            stats.sql_seconds += state.sql_seconds
+            stats.json_seconds += state.json_seconds
+            stats.response_bytes += size or 0
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if duration <= bound:
+                    stats.buckets[i] += 1
+                    break
+
+        if duration >= self.slow_request_seconds:
+            self._log_slow_request(endpoint, response, duration, size, state)
+
+    @staticmethod
+    def _log_slow_request(endpoint, response, duration, size, state) -> None:
+        slowest = sorted(state.statements, key=lambda item: -item[1])
+        repeated = Counter(sql for sql, _ in state.statements).most_common(1)
+
+        lines = [
+            f"Slow request {request.method} {request.full_path.rstrip('?')} "
+            f"({endpoint}, {response.status_code}): {duration * 1000:.0f} ms, "
+            f"{state.queries} queries / {state.sql_seconds * 1000:.0f} ms SQL, "
+            f"JSON {state.json_seconds * 1000:.0f} ms, {size or 0} B"
+        ]
+        for sql, elapsed in slowest[:SLOW_LOG_STATEMENTS]:
+            lines.append(
+                f"  {elapsed * 1000:8.1f} ms  {' '.join(sql.split())[:SLOW_LOG_SQL_CHARS]}"
+            )
+        if repeated and repeated[0][1] > 1:
+            sql, count = repeated[0]
+            lines.append(
+                f"  most repeated ({count}x): "
+                f"{' '.join(sql.split())[:SLOW_LOG_SQL_CHARS]}"
+            )
+        logger.warning("\n".join(lines))
+
+    # ---------- odczyt ----------
+
+    def is_scrape_authorized(self, authorization) -> bool:
+        """Nagłówek Authorization scrapera zgodny z METRICS_TOKEN"""
+        if not self.token or not authorization:
+            return False
+        return hmac.compare_digest(authorization, f"Bearer {self.token}")
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+    def prometheus_text(self) -> str:
+        """Liczniki w formacie tekstowym Prometheusa (text/plain; version=0.0.4)"""
+        with self._lock:
+            snapshot = sorted(
+                (key, _copy_stats(stats)) for key, stats in self._stats.items()
+            )
+
+        pid = os.getpid()
+        counters = (
+            ("http_requests_total", "Liczba żądań", lambda s: s.requests),
+            ("http_request_errors_total", "Odpowiedzi 5xx", lambda s: s.errors),
+            ("db_queries_total", "Zapytania SQL", lambda s: s.queries),
+            (
+                "db_query_duration_seconds_total",
+                "Łączny czas zapytań SQL",
+                lambda s: s.sql_seconds,
+            ),
+            (
+                "serialization_duration_seconds_total",
+                "Łączny czas serializacji JSON",
+                lambda s: s.json_seconds,
+            ),
+            (
+                "http_response_size_bytes_total",
+                "Rozmiar odpowiedzi (bez strumieni)",
+                lambda s: s.response_bytes,
+            ),
+        )
+
+        lines = []
+        for name, help_text, value in counters:
+            lines.append(f"# HELP filmhive_{name} {help_text}")
+            lines.append(f"# TYPE filmhive_{name} counter")
+            for (endpoint, method, status), stats in snapshot:
+                labels = _labels(endpoint, method, status, pid)
+                lines.append(f"filmhive_{name}{{{labels}}} {_number(value(stats))}")
+
+        lines.append("# HELP filmhive_db_queries_per_request_max Najwięcej zapytań SQL")
+        lines.append("# TYPE filmhive_db_queries_per_request_max gauge")
+        for (endpoint, method, status), stats in snapshot:
+            labels = _labels(endpoint, method, status, pid)
+            lines.append(
+                f"filmhive_db_queries_per_request_max{{{labels}}} {stats.max_queries}"
+            )
+
+        lines.append("# HELP filmhive_http_request_duration_seconds Czas żądania")
+        lines.append("# TYPE filmhive_http_request_duration_seconds histogram")
+        for (endpoint, method, status), stats in snapshot:
+            labels = _labels(endpoint, method, status, pid)
+            cumulative = 0
+            for bound, count in zip(DURATION_BUCKETS, stats.buckets):
+                cumulative += count
+                lines.append(
+                    f'filmhive_http_request_duration_seconds_bucket{{{labels},le="{bound}"}} '
+                    f"{cumulative}"
+                )
+            lines.append(
+                f'filmhive_http_request_duration_seconds_bucket{{{labels},le="+Inf"}} '
+                f"{stats.requests}"
+            )
+            lines.append(
+                f"filmhive_http_request_duration_seconds_sum{{{labels}}} "
+                f"{_number(stats.duration)}"
+            )
+            lines.append(
+                f"filmhive_http_request_duration_seconds_count{{{labels}}} "
+                f"{stats.requests}"
+            )
+
+        return "\n".join(lines) + "\n"
+
+
+def _copy_stats(stats: _EndpointStats) -> _EndpointStats:
+    copy = _EndpointStats()
+    for name in _EndpointStats.__slots__:
+        value = getattr(stats, name)
+        setattr(copy, name, list(value) if isinstance(value, list) else value)
+    return copy
+
+
+def _labels(endpoint, method, status, pid) -> str:
+    return (
+        f'endpoint="{_label(endpoint)}",method="{method}",'
+        f'status="{status}",pid="{pid}"'
+    )
+
+
+def _number(value) -> str:
+    return f"{value:.6f}" if isinstance(value, float) else str(value)
@@ -0,0 +1,406 @@
+"""
+Cache odpowiedzi endpointów GET (zastępuje movie_routes.cached_response)
+
+- backend "memory": LRU z limitem wpisów + TTL, osobny w każdym procesie
+- backend "sqlite": plik SQLite współdzielony przez wszystkie workery
+  Gunicorna na jednej maszynie (WAL, LRU po czasie ostatniego odczytu)
+- tagi: invalidate_tags("movies") usuwa wszystkie wpisy oznaczone tagiem
+- klucz zawiera endpoint, argumenty widoku, query string i (domyślnie)
+  id zalogowanego użytkownika - odpowiedzi z user_rating nie wyciekają
+- liczniki trafień / chybień per endpoint (stats())
+
+Konfiguracja (app.config / zmienne środowiskowe):
+    RESPONSE_CACHE_BACKEND      memory | sqlite | none   (domyślnie sqlite gdy
+                                WEB_CONCURRENCY > 1, inaczej memory)
+    RESPONSE_CACHE_MAX_ENTRIES  limit wpisów             (domyślnie 1024)
+    RESPONSE_CACHE_PATH         plik bazy dla sqlite
+
+Backend "memory" przy kilku workerach: invalidate_tags czyści tylko worker,
+który obsłużył zapis - pozostałe serwują stare odpowiedzi do końca TTL.
+"""
+
+from collections import OrderedDict, defaultdict
+from functools import wraps
+from typing import Dict, Iterable, Optional, Tuple
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from flask import Response, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+
+logger = logging.getLogger(__name__)
+
+# (body, status, headers) - format niezależny od procesu, da się zapisać w SQLite
+CachedEntry = Tuple[bytes, int, Dict[str, str]]
+
+# Nagłówki przenoszone z oryginalnej odpowiedzi do odpowiedzi z cache
+CACHED_HEADERS = ("Content-Type", "Cache-Control")
+
+
+class MemoryCacheBackend:
+    """LRU w pamięci procesu z TTL per wpis i indeksem tagów"""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        # key -> (wpis, expires_at, tagi); kolejność = LRU
+        self._entries = OrderedDict()
+        self._tags: Dict[str, set] = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CachedEntry]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+
+            value, expires_at, _ = item
+            if expires_at <= time.time():
+                self._remove(key)
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: CachedEntry, ttl: float, tags: Iterable[str]):
+        tags = tuple(tags)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (value, time.time() + ttl, tags)
+            for tag in tags:
+                self._tags[tag].add(key)
+
+            while len(self._entries) > self.max_entries:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+
+    def invalidate_tags(self, tags: Iterable[str]) -> int:
+        with self._lock:
+            keys = set()
+            for tag in tags:
+                keys |= self._tags.pop(tag, set())
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    def size(self) -> int:
+        return len(self._entries)
+
+    def _remove(self, key: str) -> None:
+        item = self._entries.pop(key, None)
+        if item is None:
+            return
+        for tag in item[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+class SQLiteCacheBackend:
+    """
+    Cache w lokalnym pliku SQLite - jeden dla wszystkich workerów na maszynie,
+    więc unieważnienie w jednym workerze widzą pozostałe
+    """
+
+    def __init__(self, path: str, max_entries: int = 1024):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connection() as conn:
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    key TEXT PRIMARY KEY,
+                    body BLOB NOT NULL,
+                    status INTEGER NOT NULL,
+                    headers TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS cache_tags (
+                    tag TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    PRIMARY KEY (tag, key)
+                );
+                CREATE INDEX IF NOT EXISTS ix_cache_tags_key ON cache_tags (key);
+                CREATE INDEX IF NOT EXISTS ix_cache_entries_accessed
+                    ON cache_entries (accessed_at);
+                """
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        # Połączenie per wątek (i per proces - po forku tworzone od nowa)
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key: str) -> Optional[CachedEntry]:
+        conn = self._connection()
+        row = conn.execute(
+            "SELECT body, status, headers, expires_at FROM cache_entries WHERE key = ?",
+            (key,),
+        ).fetchone()
+        if row is None:
+            return None
+
+        body, status, headers, expires_at = row
+        now = time.time()
+        if expires_at <= now:
+            self._delete_keys(conn, [key])
+            return None
+
+        conn.execute(
+            "UPDATE cache_entries SET accessed_at = ? WHERE key = ?", (now, key)
+        )
+        return bytes(body), status, json.loads(headers)
+
+    def set(self, key: str, value: CachedEntry, ttl: float, tags: Iterable[str]):
+        body, status, headers = value
+        now = time.time()
+        conn = self._connection()
+
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT OR REPLACE INTO cache_entries VALUES (?, ?, ?, ?, ?, ?)",
+                (key, body, status, json.dumps(headers), now + ttl, now),
+            )
+            conn.execute("DELETE FROM cache_tags WHERE key = ?", (key,))
+            conn.executemany(
+                "INSERT OR IGNORE INTO cache_tags VALUES (?, ?)",
+                [(tag, key) for tag in tags],
+            )
+
+            (count,) = conn.execute("SELECT COUNT(*) FROM cache_entries").fetchone()
+            if count > self.max_entries:
+                evicted = [
+                    row[0]
+                    for row in conn.execute(
+                        "SELECT key FROM cache_entries ORDER BY accessed_at LIMIT ?",
+                        (count - self.max_entries,),
+                    )
+                ]
+                self._delete_keys(conn, evicted)
+
+    def invalidate_tags(self, tags: Iterable[str]) -> int:
+        tags = list(tags)
+        if not tags:
+            return 0
+
+        conn = self._connection()
+        placeholders = ",".join("?" * len(tags))
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            keys = [
+                row[0]
+                for row in conn.execute(
+                    f"SELECT DISTINCT key FROM cache_tags WHERE tag IN ({placeholders})",
+                    tags,
+                )
+            ]
+            self._delete_keys(conn, keys)
+        return len(keys)
+
+    def clear(self) -> None:
+        conn = self._connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM cache_entries")
+            conn.execute("DELETE FROM cache_tags")
+
+    def size(self) -> int:
+        (count,) = (
+            self._connection().execute("SELECT COUNT(*) FROM cache_entries").fetchone()
+        )
+        return count
+
+    @staticmethod
+    def _delete_keys(conn: sqlite3.Connection, keys) -> None:
+        if not keys:
+            return
+        conn.executemany(
+            "DELETE FROM cache_entries WHERE key = ?", [(k,) for k in keys]
+        )
+        conn.executemany("DELETE FROM cache_tags WHERE key = ?", [(k,) for k in keys])
+
+
+class ResponseCache:
+    """Fasada używana przez trasy (cached) i serwisy (invalidate_tags)"""
+
+    def __init__(self):
+        self.backend = None
+        self.backend_name = "none"
+        self._stats = defaultdict(lambda: {"hits": 0, "misses": 0})
+        self._stats_lock = threading.Lock()
+
+    def init_app(self, app) -> None:
+        workers = int(os.environ.get("WEB_CONCURRENCY", 1))
+        backend = app.config.get(
+            "RESPONSE_CACHE_BACKEND",
+            os.environ.get(
+                "RESPONSE_CACHE_BACKEND", "sqlite" if workers > 1 else "memory"
+            ),
+        )
+        max_entries = int(
+            app.config.get(
+                "RESPONSE_CACHE_MAX_ENTRIES",
+                os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", 1024),
+            )
+        )
+
+        if backend == "sqlite":
+            path = app.config.get(
+                "RESPONSE_CACHE_PATH",
+                os.environ.get(
+                    "RESPONSE_CACHE_PATH",
+                    os.path.join(app.instance_path, "response_cache.sqlite3"),
+                ),
+            )
+            self.backend = SQLiteCacheBackend(path, max_entries)
+        elif backend == "memory":
+            self.backend = MemoryCacheBackend(max_entries)
+        else:
+            self.backend = None
+
+        self.backend_name = backend if self.backend is not None else "none"
+        if backend == "memory" and workers > 1:
+            logger.warning(
+                f"Response cache: memory backend with {workers} workers - "
+                "invalidation reaches only the worker handling the write"
+            )
+        logger.info(
+            f"Response cache: backend={self.backend_name}, max_entries={max_entries}"
+        )
+
+    def cached(self, timeout: int = 300, tags: Iterable[str] = (), per_user=True):
+        """
+        Dekorator widoku GET. Cache'owane są tylko odpowiedzi 200.
+
+        Args:
+            timeout: TTL w sekundach
+            tags: tagi do unieważniania (np. "movies", "ratings")
+            per_user: osobny wpis dla każdego zalogowanego użytkownika
+        """
+        tags = tuple(tags)
+
+        def decorator(f):
+            @wraps(f)
+            def decorated_function(*args, **kwargs):
+                if self.backend is None or request.method != "GET":
+                    return f(*args, **kwargs)
+
+                endpoint = request.endpoint or f.__name__
+                key = self._make_key(endpoint, kwargs, per_user)
+                try:
+                    entry = self.backend.get(key)
+                except Exception as e:
+                    logger.warning(f"Response cache read failed: {e}")
+                    entry = None
+
+                self._count(endpoint, entry is not None)
+                if entry is not None:
+                    body, status, headers = entry
+                    return Response(body, status=status, headers=headers)
+
+                result = f(*args, **kwargs)
+                self._store(key, result, timeout, tags)
+                return result
+
+            return decorated_function
+
+        return decorator
+
+    def invalidate_tags(self, *tags: str) -> int:
+        """Usuwa wpisy z tagami. Błędy cache tylko logujemy - zapis danych ważniejszy."""
+        if self.backend is None:
+            return 0
+        try:
+            removed = self.backend.invalidate_tags(tags)
+            logger.debug(f"Response cache: invalidated {removed} entries for {tags}")
+            return removed
+        except Exception as e:
+            logger.error(f"Response cache invalidation failed for {tags}: {e}")
+            return 0
+
+    def clear(self) -> None:
+        if self.backend is not None:
+            self.backend.clear()
+
+    def stats(self) -> Dict:
+        with self._stats_lock:
+            endpoints = {
+                name: {
+                    **counts,
+                    "hit_ratio": round(
+                        counts["hits"] / max(counts["hits"] + counts["misses"], 1), 3
+                    ),
+                }
+                for name, counts in self._stats.items()
+            }
+
+        return {
+            "backend": self.backend_name,
+            "entries": self.backend.size() if self.backend is not None else 0,
+            "max_entries": getattr(self.backend, "max_entries", 0),
+            # Liczniki są per proces (worker), wpisy - per backend
+            "pid": os.getpid(),
+            "hits": sum(c["hits"] for c in endpoints.values()),
+            "misses": sum(c["misses"] for c in endpoints.values()),
+            "endpoints": endpoints,
+        }
+
+    def _make_key(self, endpoint: str, view_kwargs: Dict, per_user: bool) -> str:
+        user_part = ""
+        if per_user:
+            try:
+                verify_jwt_in_request(optional=True)
+                user_part = str(get_jwt_identity() or "")
+            except Exception:
+                user_part = ""
+
+        query = "&".join(f"{k}={v}" for k, v in sorted(request.args.items(multi=True)))
+        view_args = ",".join(f"{k}={v}" for k, v in sorted(view_kwargs.items()))
+        return f"{endpoint}|{view_args}|{query}|u={user_part}"
+
+    def _store(self, key: str, result, timeout: int, tags: Tuple[str, ...]) -> None:
+        response, status = result if isinstance(result, tuple) else (result, None)
+        # Strumienia nie buforujemy - get_data() wczytałby go całego do pamięci
+        if not isinstance(response, Response) or response.is_streamed:
+            return
+
+        status = status or response.status_code
+        if status != 200:
+            return
+
+        headers = {
+            name: response.headers[name]
+            for name in CACHED_HEADERS
+            if name in response.headers
+        }
+        try:
+            self.backend.set(key, (response.get_data(), status, headers), timeout, tags)
+        except Exception as e:
+            logger.warning(f"Response cache write failed: {e}")
+
+    def _count(self, endpoint: str, hit: bool) -> None:
+        with self._stats_lock:
+            self._stats[endpoint]["hits" if hit else "misses"] += 1
@@ -0,0 +1,114 @@
+"""
+Analiza tekstu dla indeksu wyszukiwania (search_terms)
+
+Dokument i zapytanie przechodzą tę samą ścieżkę: lowercase -> tokeny
+(litery i cyfry) -> bez polskich stopwords -> stem -> unaccent. Stemmer i
+stopwords pochodzą z TFIDFProcessor, więc wyszukiwarka i rekomendacje
+rozumieją słowa tak samo.
+
+Stemmer zna sufiksy z polskimi znakami ("ość", "ów"), a użytkownicy często
+piszą bez nich - dlatego każde słowo daje dwa warianty termu:
+unaccent(stem(słowo)) i stem(unaccent(słowo)). "miłość" i "milosc" mają
+wspólny wariant, więc się odnajdują.
+"""
+
+from collections import Counter
+from threading import Lock
+from typing import Dict, List, Optional, Set
+import math
+import re
+import unicodedata
+
+SEARCH_TOKEN_PATTERN = re.compile(r"[^\W_]+", flags=re.UNICODE)
+
+# Dłuższe termy są ucinane (kolumna search_terms.term)
+MAX_TERM_LENGTH = 64
+
+_POLISH_CHARS = str.maketrans("ąćęłńóśźż", "acelnoszz")
+
+
+def unaccent(text: str) -> str:
+    """Usuwa polskie znaki diakrytyczne (i pozostałe akcenty przez NFKD)"""
+    text = text.translate(_POLISH_CHARS)
+    if text.isascii():
+        return text
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+class SearchTextAnalyzer:
+    def __init__(self):
+        from app.recommendation_algorithm.content_based.tfidf_processor import (
+            TFIDFProcessor,
+        )
+
+        processor = TFIDFProcessor(language="polish")
+        self._stem_token = processor._stem_token
+        self.stopwords = frozenset(processor._get_polish_stopwords())
+
+    def words(self, text: Optional[str]) -> List[str]:
+        """Tokeny tekstu (lowercase) bez stopwords"""
+        if not text:
+            return []
+        return [
+            word
+            for word in SEARCH_TOKEN_PATTERN.findall(text.lower())
+            if word not in self.stopwords
+        ]
+
+    def variants(self, word: str) -> Set[str]:
+        """Termy indeksu dla jednego słowa (patrz opis modułu)"""
+        stem = self._stem_token(word) or word
+        plain = unaccent(word)
+        plain_stem = self._stem_token(plain) or plain
+        return {unaccent(stem)[:MAX_TERM_LENGTH], plain_stem[:MAX_TERM_LENGTH]}
+
+    def document_terms(self, text: Optional[str]) -> Dict[str, float]:
+        """
+        term -> waga dokumentu: (1 + log tf) / sqrt(liczba słów), więc krótki
+        tytuł "Matrix" wypada wyżej niż długi, w którym "matrix" to jedno z wielu słów
+        """
+        words = self.words(text)
+        if not words:
+            return {}
+
+        counts = Counter()
+        for word in words:
+            for term in self.variants(word):
+                counts[term] += 1
+
+        norm = math.sqrt(len(words))
+        return {
+            term: round((1.0 + math.log(count)) / norm, 6)
+            for term, count in counts.items()
+        }
+
+    def query_tokens(self, text: Optional[str]) -> List[Set[str]]:
+        """Zapytanie -> lista zbiorów wariantów (jeden zbiór na słowo)"""
+        return [self.variants(word) for word in self.words(text)]
+
+    def prefix(self, text: Optional[str]) -> Optional[str]:
+        """
+        Ostatnie słowo zapytania jako prefiks (wyszukiwanie w trakcie pisania),
+        także jednoliterowe ("Brad P"); None, gdy zapytanie kończy się spacją
+        albo ostatnie słowo to stopword (nie jest wtedy wymagane)
+        """
+        if not text or text[-1:].isspace():
+            return None
+        words = SEARCH_TOKEN_PATTERN.findall(text.lower())
+        if not words or words[-1] in self.stopwords:
+            return None
+        return unaccent(words[-1])[:MAX_TERM_LENGTH]
+
+
+_analyzer = None
+_analyzer_lock = Lock()
+
+
+def get_search_analyzer() -> SearchTextAnalyzer:
+    global _analyzer
+    if _analyzer is None:
+        with _analyzer_lock:
+            if _analyzer is None:
+                _analyzer = SearchTextAnalyzer()
+    return _analyzer
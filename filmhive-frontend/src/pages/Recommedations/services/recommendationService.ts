@@ -37,6 +37,18 @@ export interface Recommendation {
     };
 }
 
+export interface RecommendationJob {
+    job_id: number;
+    user_id: number;
+    status: 'queued' | 'running' | 'completed' | 'failed';
+    progress: number;
+    stage: string | null;
+    message: string | null;
+    created_at: string | null;
+    started_at: string | null;
+    finished_at: string | null;
+}
+
 export interface RecommendationStatus {
     eligible: boolean;
     has_recommendations: boolean;
@@ -45,6 +57,7 @@ export interface RecommendationStatus {
     recommendations_count: number;
     last_generated: string | null;
     message: string;
+    job?: RecommendationJob | null;
 }
 
 export interface RecommendationResponse {
@@ -137,10 +150,16 @@ export const getRecommendations = async (limit: number = 10): Promise<Recommenda
     }
 };
 
+const JOB_POLL_INTERVAL_MS = 1000;
+const JOB_POLL_TIMEOUT_MS = 5 * 60 * 1000;
+
 /**
- * Generuje nowe rekomendacje (może potrwać długo!)
+ * Zleca generowanie rekomendacji (backend zwraca 202 + zadanie w tle)
+ * i czeka, aż zadanie się zakończy - postęp z /status
  */
-export const generateRecommendations = async (): Promise<any> => {
+export const generateRecommendations = async (
+    onProgress?: (job: RecommendationJob) => void
+): Promise<RecommendationJob> => {
     if (!authUtils.isAuthenticated()) {
         throw new Error('User not authenticated');
     }
@@ -151,17 +170,43 @@ export const generateRecommendations = async (): Promise<any> => {
             method: 'POST',
         });
 
+        let data: any;
         if (response && typeof response === 'object' && 'ok' in response) {
             if (!response.ok) {
                 throw new Error(`HTTP error! status: ${response.status}`);
             }
-            return await response.json();
+            data = await response.json();
         } else if (response && typeof response === 'object') {
-            return response;
+            data = response;
         } else {
             throw new Error('Unexpected response format');
         }
 
+        let job: RecommendationJob = data.job;
+        const startedAt = Date.now();
+
+        while (job.status === 'queued' || job.status === 'running') {
+            onProgress?.(job);
+
+            if (Date.now() - startedAt > JOB_POLL_TIMEOUT_MS) {
+                throw new Error('Recommendation job timed out');
+            }
+
+            await new Promise(resolve => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+            const status = await getRecommendationStatus();
+            if (status.job && status.job.job_id === job.job_id) {
+                job = status.job;
+            }
+        }
+
+        onProgress?.(job);
+
+        if (job.status === 'failed') {
+            throw new Error(job.message || 'Recommendation job failed');
+        }
+
+        return job;
+
     } catch (error) {
         console.error('💥 Error in generateRecommendations:', error);
         throw error;